@@ -1,6 +1,8 @@
 from pathlib import Path
+from datetime import timedelta
 import environ
 import os
+from celery.schedules import crontab
 
 env = environ.Env(
     DEBUG=(bool, False)
@@ -134,6 +136,21 @@ AWS_S3_REGION_NAME = 'us-east-1'
 AWS_S3_FILE_OVERWRITE = False
 AWS_DEFAULT_ACL = None
 AWS_S3_VERIFY = True
+# Shared client (core.storage.client): pool size should cover the busiest thread pool
+AWS_S3_MAX_POOL_CONNECTIONS = env.int('AWS_S3_MAX_POOL_CONNECTIONS', default=32)
+AWS_S3_CONNECT_TIMEOUT = env.int('AWS_S3_CONNECT_TIMEOUT', default=5)  # seconds
+AWS_S3_READ_TIMEOUT = env.int('AWS_S3_READ_TIMEOUT', default=60)  # seconds
+AWS_S3_MAX_ATTEMPTS = env.int('AWS_S3_MAX_ATTEMPTS', default=5)
+# Object storage backend (core.storage.backends): 's3', or 'local' and 'memory' to run
+# on one machine without S3. Local objects are kept under STORAGE_LOCAL_ROOT
+STORAGE_BACKEND = env('STORAGE_BACKEND', default='s3')
+STORAGE_LOCAL_ROOT = env('STORAGE_LOCAL_ROOT', default=str(BASE_DIR / 'storage'))
+# Simulated network for the memory backend: per-request latency and random jitter,
+# transfer rate (0 for unlimited) and the fraction of requests that fail
+STORAGE_MEMORY_LATENCY_MS = env.int('STORAGE_MEMORY_LATENCY_MS', default=0)
+STORAGE_MEMORY_JITTER_MS = env.int('STORAGE_MEMORY_JITTER_MS', default=0)
+STORAGE_MEMORY_BANDWIDTH = env.int('STORAGE_MEMORY_BANDWIDTH', default=0)  # bytes per second
+STORAGE_MEMORY_ERROR_RATE = env.float('STORAGE_MEMORY_ERROR_RATE', default=0.0)
 
 # Use S3 for media files if configured
 USE_S3 = env.bool('USE_S3', default=False)
@@ -175,6 +192,46 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Document tasks run on named queues; start workers per queue, such as
+# `celery -A config worker -Q processing`, and size each for its work. The
+# upload pipeline stays on one queue so its stages can share the copy the scan
+# downloaded (modules/documents/scratch.py). Tasks not routed here stay on the
+# default `celery` queue.
+# Within the pipeline, priorities keep scans of new uploads from waiting behind
+# long extractions: Redis serves priority 0 first, then 3, 6 and 9 (its default
+# priority_steps), and unprioritized tasks count as 0.
+CELERY_TASK_ROUTES = {
+    'modules.documents.tasks.document_tasks.process_uploaded_document': {'queue': 'processing', 'priority': 0},
+    'modules.documents.tasks.document_tasks.finish_document_processing': {'queue': 'processing', 'priority': 0},
+    'modules.documents.tasks.document_tasks.generate_previews': {'queue': 'processing', 'priority': 3},
+    'modules.documents.tasks.document_tasks.extract_document_text': {'queue': 'processing', 'priority': 6},
+    'modules.documents.tasks.document_tasks.scan_document_for_viruses': {'queue': 'scan'},
+    'modules.documents.tasks.document_tasks.generate_document_report': {'queue': 'reports'},
+    'modules.documents.tasks.document_tasks.cleanup_expired_shares': {'queue': 'maintenance'},
+    'modules.documents.tasks.upload_tasks.*': {'queue': 'maintenance'},
+    'modules.documents.tasks.storage_tasks.*': {'queue': 'maintenance'},
+}
+# Workers reserve one task at a time, so a long task does not hold others back
+# that an idle worker could run
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULE = {
+    'documents-cleanup-expired-upload-sessions': {
+        'task': 'modules.documents.tasks.upload_tasks.cleanup_expired_upload_sessions',
+        'schedule': crontab(minute=15),
+    },
+    'documents-collect-unreferenced-blobs': {
+        'task': 'modules.documents.tasks.storage_tasks.collect_unreferenced_blobs',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'documents-move-cold-documents': {
+        'task': 'modules.documents.tasks.storage_tasks.move_cold_documents',
+        'schedule': crontab(hour=2, minute=45),
+    },
+    'documents-reconcile-storage': {
+        'task': 'modules.documents.tasks.storage_tasks.reconcile_storage',
+        'schedule': crontab(hour=4, minute=30, day_of_week=0),
+    },
+}
 
 # Cache
 CACHES = {
@@ -200,6 +257,125 @@ if env.bool('USE_S3', default=False):
     }
     DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
 
+# Documents module
+# Resumable uploads: S3 requires every part but the last to be at least 5MB
+DOCUMENTS_UPLOAD_PART_SIZE = env.int('DOCUMENTS_UPLOAD_PART_SIZE', default=8 * 1024 * 1024)
+DOCUMENTS_UPLOAD_SESSION_TTL = env.int('DOCUMENTS_UPLOAD_SESSION_TTL', default=24 * 60 * 60)  # seconds
+# Upload validation: leading bytes of each file its type is detected from
+DOCUMENTS_SNIFF_SIZE = env.int('DOCUMENTS_SNIFF_SIZE', default=4096)
+# Deduplicated blobs stay this long after their last reference is dropped
+DOCUMENTS_BLOB_GC_GRACE_HOURS = env.int('DOCUMENTS_BLOB_GC_GRACE_HOURS', default=24)
+# Compression at rest: content of these type prefixes, from this size, is stored
+# with the codec ('gzip', or 'zstd' with the zstandard package; empty to disable)
+DOCUMENTS_COMPRESSION = env('DOCUMENTS_COMPRESSION', default='')
+DOCUMENTS_COMPRESSION_MIN_SIZE = env.int('DOCUMENTS_COMPRESSION_MIN_SIZE', default=1024)
+DOCUMENTS_COMPRESSIBLE_TYPES = env.list('DOCUMENTS_COMPRESSIBLE_TYPES', default=[
+    'text/', 'application/json', 'application/xml', 'application/x-ndjson', 'image/svg+xml'
+])
+# Bulk uploads: files are stored in batches with concurrent storage writes
+DOCUMENTS_BULK_UPLOAD_MAX_FILES = env.int('DOCUMENTS_BULK_UPLOAD_MAX_FILES', default=5000)
+DOCUMENTS_BULK_UPLOAD_WORKERS = env.int('DOCUMENTS_BULK_UPLOAD_WORKERS', default=8)
+DOCUMENTS_BULK_UPLOAD_BATCH_SIZE = env.int('DOCUMENTS_BULK_UPLOAD_BATCH_SIZE', default=50)
+DOCUMENTS_BULK_UPLOAD_BATCH_BYTES = env.int('DOCUMENTS_BULK_UPLOAD_BATCH_BYTES', default=64 * 1024 * 1024)
+DOCUMENTS_BULK_TASK_BATCH_SIZE = env.int('DOCUMENTS_BULK_TASK_BATCH_SIZE', default=100)
+# ZIP downloads: objects opened ahead of the one being streamed, and read size
+DOCUMENTS_ZIP_PREFETCH = env.int('DOCUMENTS_ZIP_PREFETCH', default=2)
+DOCUMENTS_ZIP_CHUNK_SIZE = env.int('DOCUMENTS_ZIP_CHUNK_SIZE', default=256 * 1024)
+# Content streaming (files/{id}/content/): read size, which bounds memory per request
+DOCUMENTS_STREAM_CHUNK_SIZE = env.int('DOCUMENTS_STREAM_CHUNK_SIZE', default=64 * 1024)
+# Listing a tenant's objects: prefixes listed concurrently
+DOCUMENTS_LISTING_WORKERS = env.int('DOCUMENTS_LISTING_WORKERS', default=8)
+# Storage reconciliation: objects newer than the grace period are not reported as
+# orphans, rows read and repairs written per batch, and issues listed per kind
+DOCUMENTS_RECONCILE_GRACE_HOURS = env.int('DOCUMENTS_RECONCILE_GRACE_HOURS', default=24)
+DOCUMENTS_RECONCILE_BATCH_SIZE = env.int('DOCUMENTS_RECONCILE_BATCH_SIZE', default=1000)
+DOCUMENTS_RECONCILE_MAX_REPORTED = env.int('DOCUMENTS_RECONCILE_MAX_REPORTED', default=1000)
+DOCUMENTS_RECONCILE_REPAIR = env.bool('DOCUMENTS_RECONCILE_REPAIR', default=False)
+# Download URLs: lifetime, and how long before expiry a cached URL is dropped
+DOCUMENTS_DOWNLOAD_URL_TTL = env.int('DOCUMENTS_DOWNLOAD_URL_TTL', default=3600)  # seconds
+DOCUMENTS_DOWNLOAD_URL_CACHE_MARGIN = env.int('DOCUMENTS_DOWNLOAD_URL_CACHE_MARGIN', default=300)  # seconds
+# Archiving only changes metadata; the background job tags archived objects and can
+# move them to an instantly retrievable class such as STANDARD_IA or GLACIER_IR
+DOCUMENTS_ARCHIVE_SYNC_STORAGE = env.bool('DOCUMENTS_ARCHIVE_SYNC_STORAGE', default=True)
+DOCUMENTS_ARCHIVE_STORAGE_CLASS = env('DOCUMENTS_ARCHIVE_STORAGE_CLASS', default='')
+# Storage tiering: documents nobody opened for DOCUMENTS_COLD_AFTER_DAYS move to the
+# cold tier, either rewritten in place under an instantly retrievable storage class
+# or moved to a separate bucket (for MinIO); accessing one moves it back. Last access
+# times are buffered per process and written in one UPDATE per flush
+DOCUMENTS_COLD_AFTER_DAYS = env.int('DOCUMENTS_COLD_AFTER_DAYS', default=30)
+DOCUMENTS_COLD_STORAGE_CLASS = env('DOCUMENTS_COLD_STORAGE_CLASS', default='')
+DOCUMENTS_COLD_BUCKET = env('DOCUMENTS_COLD_BUCKET', default='')
+DOCUMENTS_TIERING_BATCH_SIZE = env.int('DOCUMENTS_TIERING_BATCH_SIZE', default=200)
+DOCUMENTS_TIERING_WORKERS = env.int('DOCUMENTS_TIERING_WORKERS', default=8)
+DOCUMENTS_ACCESS_FLUSH_SIZE = env.int('DOCUMENTS_ACCESS_FLUSH_SIZE', default=500)
+DOCUMENTS_ACCESS_FLUSH_INTERVAL = env.int('DOCUMENTS_ACCESS_FLUSH_INTERVAL', default=60)  # seconds
+# Bulk archive, restore and move: documents updated per transaction, documents per
+# storage sync task, and concurrent storage requests within that task
+DOCUMENTS_BULK_ACTION_CHUNK_SIZE = env.int('DOCUMENTS_BULK_ACTION_CHUNK_SIZE', default=5000)
+DOCUMENTS_BULK_ACTION_MAX_IDS = env.int('DOCUMENTS_BULK_ACTION_MAX_IDS', default=50000)
+DOCUMENTS_ARCHIVE_SYNC_BATCH_SIZE = env.int('DOCUMENTS_ARCHIVE_SYNC_BATCH_SIZE', default=500)
+DOCUMENTS_ARCHIVE_SYNC_WORKERS = env.int('DOCUMENTS_ARCHIVE_SYNC_WORKERS', default=8)
+# Upload processing: each document is downloaded once into worker scratch space, a
+# directory on local disk or tmpfs (the system temp dir when empty), and every stage
+# reads that copy. Copies left behind by killed workers are swept after the max age
+DOCUMENTS_SCRATCH_DIR = env('DOCUMENTS_SCRATCH_DIR', default='')
+DOCUMENTS_SCRATCH_MAX_AGE = env.int('DOCUMENTS_SCRATCH_MAX_AGE', default=6 * 60 * 60)  # seconds
+# Previews of images and PDFs: longest side in pixels of each size, and the formats
+# each is stored in. Eager sizes are rendered after upload and the others on first
+# request; sources that would decode to more pixels than the limit are not previewed
+DOCUMENTS_PREVIEW_SIZES = env.list('DOCUMENTS_PREVIEW_SIZES', cast=int, default=[64, 200, 800])
+DOCUMENTS_PREVIEW_EAGER_SIZES = env.list('DOCUMENTS_PREVIEW_EAGER_SIZES', cast=int, default=[64, 200])
+DOCUMENTS_PREVIEW_FORMATS = env.list('DOCUMENTS_PREVIEW_FORMATS', default=['webp', 'jpeg'])
+DOCUMENTS_PREVIEW_QUALITY = env.int('DOCUMENTS_PREVIEW_QUALITY', default=80)
+DOCUMENTS_PREVIEW_MAX_PIXELS = env.int('DOCUMENTS_PREVIEW_MAX_PIXELS', default=50_000_000)
+# Derivative workers (manage.py run_derivative_worker): when enabled, uploads leave
+# previews to them. Each claims batches of documents, renders them in a process pool
+# (one process per available core when 0) and downloads and uploads on threads;
+# claims of workers that died expire after the timeout
+DOCUMENTS_DERIVATIVE_WORKERS = env.bool('DOCUMENTS_DERIVATIVE_WORKERS', default=False)
+DOCUMENTS_DERIVATIVE_BATCH_SIZE = env.int('DOCUMENTS_DERIVATIVE_BATCH_SIZE', default=32)
+DOCUMENTS_DERIVATIVE_PROCESSES = env.int('DOCUMENTS_DERIVATIVE_PROCESSES', default=0)
+DOCUMENTS_DERIVATIVE_IO_WORKERS = env.int('DOCUMENTS_DERIVATIVE_IO_WORKERS', default=8)
+DOCUMENTS_DERIVATIVE_CLAIM_TIMEOUT = env.int('DOCUMENTS_DERIVATIVE_CLAIM_TIMEOUT', default=15 * 60)  # seconds
+# Text extraction: text is stored in chunks of DOCUMENTS_EXTRACTION_CHUNK_SIZE characters,
+# up to DOCUMENTS_EXTRACTION_MAX_CHARS per document. Extracting one document may take the
+# time limit and the memory limit beyond what the process already uses (0 for no limit).
+# With processes, documents are extracted in a pool of that many processes per worker,
+# killed when stuck, and PDFs of DOCUMENTS_EXTRACTION_PARALLEL_PAGES pages or more in
+# ranges of DOCUMENTS_EXTRACTION_RANGE_PAGES pages across it
+DOCUMENTS_EXTRACTION_CHUNK_SIZE = env.int('DOCUMENTS_EXTRACTION_CHUNK_SIZE', default=64 * 1024)
+DOCUMENTS_EXTRACTION_MAX_CHARS = env.int('DOCUMENTS_EXTRACTION_MAX_CHARS', default=10_000_000)
+DOCUMENTS_EXTRACTION_TIME_LIMIT = env.int('DOCUMENTS_EXTRACTION_TIME_LIMIT', default=120)  # seconds
+DOCUMENTS_EXTRACTION_MEMORY_LIMIT = env.int('DOCUMENTS_EXTRACTION_MEMORY_LIMIT', default=1024 * 1024 * 1024)
+DOCUMENTS_EXTRACTION_PROCESSES = env.int('DOCUMENTS_EXTRACTION_PROCESSES', default=0)
+DOCUMENTS_EXTRACTION_PARALLEL_PAGES = env.int('DOCUMENTS_EXTRACTION_PARALLEL_PAGES', default=200)
+DOCUMENTS_EXTRACTION_RANGE_PAGES = env.int('DOCUMENTS_EXTRACTION_RANGE_PAGES', default=50)
+# Spreadsheets and CSV files: rows and columns of each sheet indexed, and characters of each cell
+DOCUMENTS_EXTRACTION_TABLE_ROWS = env.int('DOCUMENTS_EXTRACTION_TABLE_ROWS', default=10000)
+DOCUMENTS_EXTRACTION_TABLE_COLUMNS = env.int('DOCUMENTS_EXTRACTION_TABLE_COLUMNS', default=100)
+DOCUMENTS_EXTRACTION_CELL_CHARS = env.int('DOCUMENTS_EXTRACTION_CELL_CHARS', default=1000)
+# Virus scanning: clamd address ('unix:///path/to/clamd.ctl' or 'tcp://host:port'),
+# socket timeout, and the size of the chunks content is streamed to it in
+DOCUMENTS_CLAMD_ADDRESS = env('DOCUMENTS_CLAMD_ADDRESS', default='unix:///var/run/clamav/clamd.ctl')
+DOCUMENTS_CLAMD_TIMEOUT = env.int('DOCUMENTS_CLAMD_TIMEOUT', default=60)  # seconds
+DOCUMENTS_CLAMD_CHUNK_SIZE = env.int('DOCUMENTS_CLAMD_CHUNK_SIZE', default=64 * 1024)
+# clamd refuses streams beyond its StreamMaxLength (25MB unless configured);
+# set both to at least the largest upload, since larger content stays unscanned
+DOCUMENTS_CLAMD_STREAM_MAX_LENGTH = env.int('DOCUMENTS_CLAMD_STREAM_MAX_LENGTH', default=100 * 1024 * 1024)
+# Clean verdicts are reused for identical content this long; infected ones always are
+DOCUMENTS_SCAN_RESULT_MAX_AGE = env.int('DOCUMENTS_SCAN_RESULT_MAX_AGE', default=24 * 60 * 60)  # seconds
+# Uploads each tenant may start processing per window; those beyond wait for
+# the next windows so other tenants' uploads go first. 0 disables the limit
+DOCUMENTS_TENANT_PROCESSING_RATE = env.int('DOCUMENTS_TENANT_PROCESSING_RATE', default=200)
+DOCUMENTS_TENANT_RATE_WINDOW = env.int('DOCUMENTS_TENANT_RATE_WINDOW', default=10)  # seconds
+# Failed document tasks retry after a random delay up to the base delay doubled
+# on each retry, capped at the max
+DOCUMENTS_RETRY_BASE_DELAY = env.int('DOCUMENTS_RETRY_BASE_DELAY', default=10)  # seconds
+DOCUMENTS_RETRY_MAX_DELAY = env.int('DOCUMENTS_RETRY_MAX_DELAY', default=10 * 60)  # seconds
+# Serve the storage-bound document actions with async views; enable when running
+# under config.asgi so waiting on S3 or the database does not block a worker
+DOCUMENTS_ASYNC_VIEWS = env.bool('DOCUMENTS_ASYNC_VIEWS', default=False)
+
 # Email (using Mailpit in development)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = env('EMAIL_HOST', default='localhost')
@@ -216,8 +392,6 @@ SPECTACULAR_SETTINGS = {
 }
 
 # JWT Settings
-from datetime import timedelta
-
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
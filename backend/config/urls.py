@@ -23,6 +23,9 @@ urlpatterns = [
     path('api/v1/', include('modules.pm_templates.urls')),
     path('api/v1/', include('modules.risk_inspections.urls')),
     
+    # Presigned URLs of the local and memory storage backends
+    path('storage/', include('core.storage.urls')),
+    
     # API documentation
     path('api/v1/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/v1/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
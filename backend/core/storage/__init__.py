@@ -0,0 +1,3 @@
+"""
+Shared object storage clients.
+"""
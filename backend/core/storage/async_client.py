@@ -0,0 +1,50 @@
+"""
+Async S3 client for views served under ASGI.
+
+aiobotocore clients and their connection pools belong to the event loop
+that created them, so each loop gets its own client. An ASGI server runs
+one loop per worker process, which makes this one pooled client per
+process, like the sync client.
+"""
+import asyncio
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+
+from .client import client_options
+
+_clients = {}
+
+
+async def get_async_s3_client():
+    """Get the async S3 client for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    
+    # Concurrent first callers await the same creation task
+    client = _clients.get(loop)
+    if client is None:
+        # Loops that have finished, like those of async_to_sync under WSGI,
+        # cannot use their clients any more
+        for stale_loop in [other for other in _clients if other.is_closed()]:
+            del _clients[stale_loop]
+        client = _clients[loop] = loop.create_task(_build_client())
+    
+    try:
+        return await client
+    except Exception:
+        # Let the next call try again
+        _clients.pop(loop, None)
+        raise
+
+
+async def close_async_s3_client() -> None:
+    """Close the running loop's client and release its connections"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await (await client).close()
+
+
+async def _build_client():
+    """Create an async S3 client with the same pool, timeout and retry settings"""
+    session = get_session()
+    return await session.create_client('s3', **client_options(AioConfig)).__aenter__()
@@ -0,0 +1,55 @@
+"""
+Pluggable object storage backends.
+
+STORAGE_BACKEND selects S3 (or MinIO) for deployments, a local directory for
+single-machine runs, or process memory with simulated latency and failures
+for tests and benchmarks.
+"""
+import threading
+
+from django.conf import settings
+
+from .base import ObjectInfo, ObjectStream, StorageBackend, StorageError, load_signed_url
+from .local import LocalBackend
+from .memory import MemoryBackend
+from .s3 import S3Backend
+
+__all__ = [
+    'LocalBackend', 'MemoryBackend', 'ObjectInfo', 'ObjectStream', 'S3Backend',
+    'StorageBackend', 'StorageError', 'get_storage_backend', 'load_signed_url',
+]
+
+_lock = threading.Lock()
+_backends = {}
+
+
+def get_storage_backend(bucket_name: str = None) -> StorageBackend:
+    """
+    Get the configured backend for a bucket, by default the documents bucket,
+    creating it on first use in this process.
+    """
+    bucket_name = bucket_name or getattr(settings, 'AWS_STORAGE_BUCKET_NAME', None) or 'test-bucket'
+    
+    backend = _backends.get(bucket_name)
+    if backend is None:
+        with _lock:
+            backend = _backends.get(bucket_name)
+            if backend is None:
+                backend = _backends[bucket_name] = _build_backend(settings.STORAGE_BACKEND, bucket_name)
+    return backend
+
+
+def _build_backend(name: str, bucket_name: str) -> StorageBackend:
+    if name == 's3':
+        return S3Backend(bucket_name)
+    if name == 'local':
+        return LocalBackend(settings.STORAGE_LOCAL_ROOT, bucket_name)
+    if name == 'memory':
+        return MemoryBackend(
+            bucket_name,
+            latency=settings.STORAGE_MEMORY_LATENCY_MS / 1000,
+            jitter=settings.STORAGE_MEMORY_JITTER_MS / 1000,
+            bandwidth=settings.STORAGE_MEMORY_BANDWIDTH,
+            error_rate=settings.STORAGE_MEMORY_ERROR_RATE
+        )
+    raise ValueError(f"Unknown storage backend {name!r}")
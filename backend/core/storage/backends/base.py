@@ -0,0 +1,395 @@
+"""
+Storage backend interface.
+
+Backends expose the object-store operations the application relies on,
+modelled on S3 semantics: flat keys, ETags, object tags, multipart uploads
+and presigned URLs. Failures raise StorageError with an S3-style code so
+callers handle every backend alike.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Protocol, Tuple
+import base64
+import hashlib
+import re
+import time
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.urls import reverse
+
+# Salt for URLs signed by backends that serve objects through Django
+URL_SIGNING_SALT = 'core.storage.url'
+
+# Most keys S3 returns per ListObjectsV2 page
+LIST_PAGE_SIZE = 1000
+
+# Single byte range, the only form S3 supports
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class StorageError(Exception):
+    """Raised when a storage operation fails"""
+    
+    def __init__(self, code: str, message: str = ''):
+        super().__init__(message or code)
+        self.code = code
+
+
+@dataclass
+class ObjectInfo:
+    """Stored object as reported by a backend; size is None when a write response omits it"""
+    key: str
+    size: Optional[int]
+    etag: str = ''
+    last_modified: Optional[datetime] = None
+    content_type: str = ''
+    metadata: Dict[str, str] = field(default_factory=dict)
+    version_id: Optional[str] = None
+    storage_class: str = 'STANDARD'
+
+
+class ObjectStream:
+    """
+    File-like object body with the reading interface of botocore's StreamingBody.
+    For a ranged read, content_range holds the first and last byte offsets
+    returned and info.size the size of the whole object.
+    """
+    
+    def __init__(
+        self,
+        raw: BinaryIO,
+        on_read=None,
+        info: Optional[ObjectInfo] = None,
+        content_range: Optional[Tuple[int, int]] = None
+    ):
+        self._raw = raw
+        self._on_read = on_read
+        self.info = info
+        self.content_range = content_range
+        self._remaining = None if content_range is None else content_range[1] - content_range[0] + 1
+    
+    @property
+    def content_length(self) -> Optional[int]:
+        """Number of bytes in the body"""
+        if self.content_range is not None:
+            return self.content_range[1] - self.content_range[0] + 1
+        return self.info.size if self.info else None
+    
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if self._remaining is not None:
+            amt = self._remaining if amt is None else min(amt, self._remaining)
+        data = self._raw.read() if amt is None else self._raw.read(amt)
+        if self._remaining is not None:
+            self._remaining -= len(data)
+        if self._on_read:
+            self._on_read(len(data))
+        return data
+    
+    def iter_chunks(self, chunk_size: int = 1024) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    
+    def close(self) -> None:
+        self._raw.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StorageBackend(Protocol):
+    """Operations every storage backend provides"""
+    
+    bucket_name: str
+    
+    def put_object(
+        self,
+        key: str,
+        body: bytes,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> ObjectInfo: ...
+    
+    def get_object(
+        self,
+        key: str,
+        byte_range: str = None,
+        if_none_match: str = None
+    ) -> ObjectStream: ...
+    
+    def head_object(self, key: str) -> ObjectInfo: ...
+    
+    def delete_objects(self, keys: List[str]) -> List[str]: ...
+    
+    def copy_object(
+        self,
+        source_key: str,
+        destination_key: str,
+        storage_class: str = None
+    ) -> ObjectInfo: ...
+    
+    def get_object_tags(self, key: str) -> Dict[str, str]: ...
+    
+    def put_object_tags(self, key: str, tags: Dict[str, str]) -> None: ...
+    
+    def list_objects(
+        self,
+        prefix: str,
+        delimiter: str = None,
+        page_size: int = LIST_PAGE_SIZE
+    ) -> Iterator[Tuple[List[ObjectInfo], List[str]]]: ...
+    
+    def create_multipart_upload(
+        self,
+        key: str,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> str: ...
+    
+    def upload_part(
+        self,
+        key: str,
+        upload_id: str,
+        part_number: int,
+        body: bytes,
+        content_md5: str = None
+    ) -> str: ...
+    
+    def list_parts(self, key: str, upload_id: str) -> List[Dict]: ...
+    
+    def complete_multipart_upload(
+        self,
+        key: str,
+        upload_id: str,
+        parts: List[Dict]
+    ) -> ObjectInfo: ...
+    
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None: ...
+    
+    def presign_get(
+        self,
+        objects: List[Tuple[str, Dict[str, str]]],
+        expiration: int
+    ) -> List[str]: ...
+    
+    def presign_post(
+        self,
+        key: str,
+        content_type: str = None,
+        max_size: int = None,
+        expiration: int = 3600
+    ) -> Dict: ...
+    
+    async def alist_parts(self, key: str, upload_id: str) -> List[Dict]: ...
+    
+    async def acomplete_multipart_upload(
+        self,
+        key: str,
+        upload_id: str,
+        parts: List[Dict]
+    ) -> ObjectInfo: ...
+
+
+class ThreadedAsyncMixin:
+    """Async operations for backends without native async I/O, run on worker threads"""
+    
+    async def alist_parts(self, key: str, upload_id: str) -> List[Dict]:
+        return await sync_to_async(self.list_parts, thread_sensitive=False)(key, upload_id)
+    
+    async def acomplete_multipart_upload(
+        self,
+        key: str,
+        upload_id: str,
+        parts: List[Dict]
+    ) -> ObjectInfo:
+        return await sync_to_async(self.complete_multipart_upload, thread_sensitive=False)(
+            key, upload_id, parts
+        )
+
+
+class SignedURLMixin:
+    """
+    Presigned URLs for backends served through Django.
+    URLs carry a signed token naming the bucket and object, so the storage views can
+    check them without any server-side state, like S3 query signatures.
+    """
+    
+    def presign_get(
+        self,
+        objects: List[Tuple[str, Dict[str, str]]],
+        expiration: int
+    ) -> List[str]:
+        expires = int(time.time()) + expiration
+        return [
+            reverse('storage-object', args=[signing.dumps(
+                {'b': self.bucket_name, 'k': key, 'p': params, 'e': expires},
+                salt=URL_SIGNING_SALT,
+                compress=True
+            )])
+            for key, params in objects
+        ]
+    
+    def presign_post(
+        self,
+        key: str,
+        content_type: str = None,
+        max_size: int = None,
+        expiration: int = 3600
+    ) -> Dict:
+        token = signing.dumps(
+            {
+                'b': self.bucket_name,
+                'k': key,
+                't': content_type,
+                'm': max_size,
+                'e': int(time.time()) + expiration
+            },
+            salt=URL_SIGNING_SALT,
+            compress=True
+        )
+        return {
+            'url': reverse('storage-upload', args=[token]),
+            'fields': {'Content-Type': content_type} if content_type else {}
+        }
+
+
+def load_signed_url(token: str) -> Dict:
+    """Decode a token issued by SignedURLMixin; raises StorageError when invalid or expired"""
+    try:
+        payload = signing.loads(token, salt=URL_SIGNING_SALT)
+    except signing.BadSignature:
+        raise StorageError('SignatureDoesNotMatch')
+    
+    if payload['e'] < time.time():
+        raise StorageError('AccessDenied', 'Request has expired')
+    return payload
+
+
+def paginate_keys(
+    keys: List[str],
+    prefix: str,
+    delimiter: Optional[str],
+    page_size: int
+) -> Iterator[Tuple[List[str], List[str]]]:
+    """
+    Group sorted keys into ListObjectsV2 pages of object keys and common
+    prefixes, each page holding at most page_size entries of either kind.
+    """
+    object_keys = []
+    prefixes = []
+    for key in keys:
+        rest = key[len(prefix):]
+        if delimiter and delimiter in rest:
+            common_prefix = prefix + rest.split(delimiter, 1)[0] + delimiter
+            if prefixes and prefixes[-1] == common_prefix:
+                continue
+            prefixes.append(common_prefix)
+        else:
+            object_keys.append(key)
+        
+        if len(object_keys) + len(prefixes) == page_size:
+            yield object_keys, prefixes
+            object_keys, prefixes = [], []
+    
+    if object_keys or prefixes or not keys:
+        yield object_keys, prefixes
+
+
+def open_object(
+    raw: BinaryIO,
+    info: ObjectInfo,
+    byte_range: str = None,
+    if_none_match: str = None,
+    on_read=None
+) -> ObjectStream:
+    """
+    Apply GetObject's Range and If-None-Match handling to a seekable body.
+    Raises StorageError NotModified when the ETag matches and InvalidRange
+    when the range starts beyond the object.
+    """
+    if if_none_match and etag_matches(if_none_match, info.etag):
+        raw.close()
+        raise StorageError('NotModified')
+    
+    try:
+        content_range = resolve_range(byte_range, info.size)
+    except StorageError:
+        raw.close()
+        raise
+    
+    if content_range:
+        raw.seek(content_range[0])
+    return ObjectStream(raw, on_read=on_read, info=info, content_range=content_range)
+
+
+def resolve_range(byte_range: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Resolve a single 'bytes=first-last' range to inclusive offsets, as S3 does.
+    Returns None, meaning the whole object, for headers S3 would ignore.
+    """
+    match = RANGE_PATTERN.match(byte_range or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise StorageError('InvalidRange', 'The requested range is not satisfiable')
+        return max(size - int(last), 0), size - 1
+    
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size:
+        raise StorageError('InvalidRange', 'The requested range is not satisfiable')
+    if last < first:
+        return None
+    return first, last
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag, using weak comparison"""
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return any(candidate.removeprefix('W/').strip('"') == etag for candidate in candidates)
+
+
+def compute_etag(body: bytes) -> str:
+    """ETag of an object uploaded in one request: the hex MD5 of its content"""
+    return hashlib.md5(body).hexdigest()
+
+
+def multipart_etag(part_etags: List[str]) -> str:
+    """ETag of a multipart object: MD5 of the part MD5s, suffixed with the part count"""
+    digest = hashlib.md5(b''.join(bytes.fromhex(etag) for etag in part_etags)).hexdigest()
+    return f"{digest}-{len(part_etags)}"
+
+
+def check_content_md5(body: bytes, content_md5: Optional[str]) -> None:
+    """Reject a body that does not match its Content-MD5 header, as S3 does"""
+    if content_md5 and base64.b64encode(hashlib.md5(body).digest()).decode() != content_md5:
+        raise StorageError('BadDigest', 'The Content-MD5 you specified did not match what was received')
+
+
+def check_manifest(parts: List[Dict], stored: Dict[int, str]) -> List[str]:
+    """Validate a CompleteMultipartUpload part list; returns the part ETags in order"""
+    if not parts:
+        raise StorageError('MalformedXML', 'No parts given')
+    
+    numbers = [part['part_number'] for part in parts]
+    if numbers != sorted(set(numbers)):
+        raise StorageError('InvalidPartOrder')
+    
+    etags = []
+    for part in parts:
+        if stored.get(part['part_number']) != part['etag']:
+            raise StorageError('InvalidPart', f"Part {part['part_number']} not found")
+        etags.append(part['etag'])
+    return etags
@@ -0,0 +1,287 @@
+"""
+Local filesystem storage backend for development and single-machine runs.
+
+Objects are files under <root>/<bucket>/objects, with their content type,
+metadata, tags and storage class in JSON sidecars under <root>/<bucket>/meta.
+Files are written to a temporary name and renamed into place, so readers
+never see a partial object, and every process on the machine shares them.
+"""
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterator, List, Tuple
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+from .base import (
+    LIST_PAGE_SIZE, ObjectInfo, ObjectStream, SignedURLMixin, StorageError,
+    ThreadedAsyncMixin, check_content_md5, check_manifest, compute_etag, multipart_etag,
+    open_object, paginate_keys
+)
+
+# Read size when hashing and copying files
+CHUNK_SIZE = 1024 * 1024
+
+
+class LocalBackend(SignedURLMixin, ThreadedAsyncMixin):
+    """Object store kept in a directory tree"""
+    
+    def __init__(self, root: str, bucket_name: str = 'test-bucket'):
+        self.bucket_name = bucket_name
+        self.root = os.path.join(os.path.abspath(root), bucket_name)
+        self._objects = os.path.join(self.root, 'objects')
+        self._meta = os.path.join(self.root, 'meta')
+        self._uploads = os.path.join(self.root, 'uploads')
+    
+    def put_object(
+        self,
+        key: str,
+        body: bytes,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> ObjectInfo:
+        self._write(self._object_path(key), body)
+        return self._save_meta(key, {
+            'etag': compute_etag(body),
+            'content_type': content_type or 'binary/octet-stream',
+            'metadata': dict(metadata or {}),
+            'tags': {},
+            'storage_class': 'STANDARD'
+        })
+    
+    def get_object(
+        self,
+        key: str,
+        byte_range: str = None,
+        if_none_match: str = None
+    ) -> ObjectStream:
+        info = self.head_object(key)
+        try:
+            raw = open(self._object_path(key), 'rb')
+        except FileNotFoundError:
+            raise StorageError('NoSuchKey', f"No object {key}")
+        return open_object(raw, info, byte_range, if_none_match)
+    
+    def head_object(self, key: str) -> ObjectInfo:
+        return self._info(key, self._load_meta(key))
+    
+    def delete_objects(self, keys: List[str]) -> List[str]:
+        failed = []
+        for key in keys:
+            try:
+                for path in (self._object_path(key), self._meta_path(key)):
+                    if os.path.exists(path):
+                        os.remove(path)
+            except (OSError, StorageError):
+                failed.append(key)
+        return failed
+    
+    def copy_object(
+        self,
+        source_key: str,
+        destination_key: str,
+        storage_class: str = None
+    ) -> ObjectInfo:
+        meta = self._load_meta(source_key)
+        if storage_class:
+            meta['storage_class'] = storage_class
+        
+        if source_key != destination_key:
+            with open(self._object_path(source_key), 'rb') as source:
+                self._write(self._object_path(destination_key), source)
+        return self._save_meta(destination_key, meta)
+    
+    def get_object_tags(self, key: str) -> Dict[str, str]:
+        return self._load_meta(key)['tags']
+    
+    def put_object_tags(self, key: str, tags: Dict[str, str]) -> None:
+        meta = self._load_meta(key)
+        meta['tags'] = dict(tags)
+        self._write_json(self._meta_path(key), meta)
+    
+    def list_objects(
+        self,
+        prefix: str,
+        delimiter: str = None,
+        page_size: int = LIST_PAGE_SIZE
+    ) -> Iterator[Tuple[List[ObjectInfo], List[str]]]:
+        # Walk only the directory the prefix points into
+        directory = os.path.dirname(prefix)
+        root = os.path.join(self._objects, *_key_parts(directory)) if directory else self._objects
+        
+        keys = []
+        for path, _, files in os.walk(root):
+            relative = os.path.relpath(path, self._objects).replace(os.sep, '/')
+            for name in files:
+                if name.startswith('.tmp-'):
+                    continue
+                key = name if relative == '.' else f"{relative}/{name}"
+                if key.startswith(prefix):
+                    keys.append(key)
+        keys.sort()
+        
+        for object_keys, prefixes in paginate_keys(keys, prefix, delimiter, page_size):
+            objects = []
+            for key in object_keys:
+                try:
+                    objects.append(self.head_object(key))
+                except StorageError:
+                    # Deleted while listing
+                    continue
+            yield objects, prefixes
+    
+    def create_multipart_upload(
+        self,
+        key: str,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> str:
+        self._object_path(key)
+        upload_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self._uploads, upload_id))
+        self._write_json(os.path.join(self._uploads, upload_id, 'upload.json'), {
+            'key': key,
+            'content_type': content_type,
+            'metadata': dict(metadata or {})
+        })
+        return upload_id
+    
+    def upload_part(
+        self,
+        key: str,
+        upload_id: str,
+        part_number: int,
+        body: bytes,
+        content_md5: str = None
+    ) -> str:
+        directory = self._upload_dir(key, upload_id)
+        check_content_md5(body, content_md5)
+        self._write(os.path.join(directory, f"{part_number:05d}.part"), body)
+        return compute_etag(body)
+    
+    def list_parts(self, key: str, upload_id: str) -> List[Dict]:
+        directory = self._upload_dir(key, upload_id)
+        parts = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.part'):
+                continue
+            path = os.path.join(directory, name)
+            parts.append({
+                'part_number': int(name[:-len('.part')]),
+                'etag': _file_etag(path),
+                'size': os.path.getsize(path)
+            })
+        return parts
+    
+    def complete_multipart_upload(
+        self,
+        key: str,
+        upload_id: str,
+        parts: List[Dict]
+    ) -> ObjectInfo:
+        directory = self._upload_dir(key, upload_id)
+        stored = {part['part_number']: part['etag'] for part in self.list_parts(key, upload_id)}
+        etags = check_manifest(parts, stored)
+        
+        path = self._object_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as target:
+            for part in parts:
+                with open(os.path.join(directory, f"{part['part_number']:05d}.part"), 'rb') as source:
+                    shutil.copyfileobj(source, target, CHUNK_SIZE)
+        os.replace(temp_path, path)
+        
+        upload = self._read_json(os.path.join(directory, 'upload.json'))
+        shutil.rmtree(directory, ignore_errors=True)
+        return self._save_meta(key, {
+            'etag': multipart_etag(etags),
+            'content_type': upload['content_type'] or 'binary/octet-stream',
+            'metadata': upload['metadata'],
+            'tags': {},
+            'storage_class': 'STANDARD'
+        })
+    
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        shutil.rmtree(self._upload_dir(key, upload_id))
+    
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self._objects, *_key_parts(key))
+    
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self._meta, *_key_parts(key)) + '.json'
+    
+    def _upload_dir(self, key: str, upload_id: str) -> str:
+        directory = os.path.join(self._uploads, os.path.basename(upload_id))
+        try:
+            upload = self._read_json(os.path.join(directory, 'upload.json'))
+        except FileNotFoundError:
+            upload = None
+        if upload is None or upload['key'] != key:
+            raise StorageError('NoSuchUpload', f"No upload {upload_id}")
+        return directory
+    
+    def _load_meta(self, key: str) -> Dict:
+        try:
+            return self._read_json(self._meta_path(key))
+        except FileNotFoundError:
+            raise StorageError('NoSuchKey', f"No object {key}")
+    
+    def _save_meta(self, key: str, meta: Dict) -> ObjectInfo:
+        self._write_json(self._meta_path(key), meta)
+        return self._info(key, meta)
+    
+    def _info(self, key: str, meta: Dict) -> ObjectInfo:
+        try:
+            stat = os.stat(self._object_path(key))
+        except FileNotFoundError:
+            raise StorageError('NoSuchKey', f"No object {key}")
+        return ObjectInfo(
+            key=key,
+            size=stat.st_size,
+            etag=meta['etag'],
+            last_modified=datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc),
+            content_type=meta['content_type'],
+            metadata=meta['metadata'],
+            storage_class=meta['storage_class']
+        )
+    
+    def _write(self, path: str, body) -> None:
+        """Write bytes or a file object to path atomically"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as target:
+                if isinstance(body, (bytes, bytearray, memoryview)):
+                    target.write(body)
+                else:
+                    shutil.copyfileobj(body, target, CHUNK_SIZE)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    
+    def _write_json(self, path: str, data: Dict) -> None:
+        self._write(path, json.dumps(data).encode())
+    
+    def _read_json(self, path: str) -> Dict:
+        with open(path) as f:
+            return json.load(f)
+
+
+def _key_parts(key: str) -> List[str]:
+    """Split a key into path segments, refusing keys that would escape the root"""
+    parts = key.split('/')
+    if not key or key.startswith('/') or any(part in ('', '.', '..') for part in parts):
+        raise StorageError('InvalidKey', f"Key {key!r} cannot be stored on disk")
+    return parts
+
+
+def _file_etag(path: str) -> str:
+    with open(path, 'rb') as f:
+        digest = hashlib.md5()
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
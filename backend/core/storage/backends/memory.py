@@ -0,0 +1,254 @@
+"""
+In-memory storage backend for tests, demos and benchmarks.
+
+Objects live in the process, so every component must run in one process,
+for example with Celery tasks executed eagerly. Latency, bandwidth and
+error injection make timing and failure handling behave like a remote
+object store instead of an instant dictionary.
+"""
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional, Tuple
+import io
+import random
+import threading
+import time
+import uuid
+
+from django.utils import timezone
+
+from .base import (
+    LIST_PAGE_SIZE, ObjectInfo, ObjectStream, SignedURLMixin, StorageError,
+    ThreadedAsyncMixin, check_content_md5, check_manifest, compute_etag, multipart_etag,
+    open_object, paginate_keys
+)
+
+
+class MemoryBackend(SignedURLMixin, ThreadedAsyncMixin):
+    """Object store kept in a dictionary, with simulated network behavior"""
+    
+    def __init__(
+        self,
+        bucket_name: str = 'test-bucket',
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        bandwidth: int = 0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        """
+        latency and jitter are seconds added to every request, bandwidth is in
+        bytes per second (0 for unlimited), and error_rate is the probability
+        that a request fails with a retryable error.
+        """
+        self.bucket_name = bucket_name
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._objects: Dict[str, Tuple[ObjectInfo, bytes]] = {}
+        self._tags: Dict[str, Dict[str, str]] = {}
+        self._uploads: Dict[str, Dict] = {}
+    
+    def put_object(
+        self,
+        key: str,
+        body: bytes,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> ObjectInfo:
+        self._request(len(body))
+        info = ObjectInfo(
+            key=key,
+            size=len(body),
+            etag=compute_etag(body),
+            last_modified=timezone.now(),
+            content_type=content_type or 'binary/octet-stream',
+            metadata=dict(metadata or {})
+        )
+        with self._lock:
+            self._objects[key] = (info, bytes(body))
+            self._tags.pop(key, None)
+        return replace(info)
+    
+    def get_object(
+        self,
+        key: str,
+        byte_range: str = None,
+        if_none_match: str = None
+    ) -> ObjectStream:
+        self._request()
+        info, body = self._get(key)
+        # Bandwidth is spent as the body is read, like a streamed response
+        return open_object(
+            io.BytesIO(body),
+            replace(info),
+            byte_range,
+            if_none_match,
+            on_read=self._transfer
+        )
+    
+    def head_object(self, key: str) -> ObjectInfo:
+        self._request()
+        info, _ = self._get(key)
+        return replace(info, metadata=dict(info.metadata))
+    
+    def delete_objects(self, keys: List[str]) -> List[str]:
+        self._request()
+        with self._lock:
+            for key in keys:
+                self._objects.pop(key, None)
+                self._tags.pop(key, None)
+        return []
+    
+    def copy_object(
+        self,
+        source_key: str,
+        destination_key: str,
+        storage_class: str = None
+    ) -> ObjectInfo:
+        self._request()
+        info, body = self._get(source_key)
+        copied = replace(
+            info,
+            key=destination_key,
+            last_modified=timezone.now(),
+            metadata=dict(info.metadata),
+            storage_class=storage_class or info.storage_class
+        )
+        with self._lock:
+            tags = dict(self._tags.get(source_key, {}))
+            self._objects[destination_key] = (copied, body)
+            self._tags[destination_key] = tags
+        return replace(copied)
+    
+    def get_object_tags(self, key: str) -> Dict[str, str]:
+        self._request()
+        self._get(key)
+        with self._lock:
+            return dict(self._tags.get(key, {}))
+    
+    def put_object_tags(self, key: str, tags: Dict[str, str]) -> None:
+        self._request()
+        self._get(key)
+        with self._lock:
+            self._tags[key] = dict(tags)
+    
+    def list_objects(
+        self,
+        prefix: str,
+        delimiter: str = None,
+        page_size: int = LIST_PAGE_SIZE
+    ) -> Iterator[Tuple[List[ObjectInfo], List[str]]]:
+        with self._lock:
+            keys = sorted(key for key in self._objects if key.startswith(prefix))
+        
+        for object_keys, prefixes in paginate_keys(keys, prefix, delimiter, page_size):
+            # Each page is a request; objects deleted since the first one drop out
+            self._request()
+            with self._lock:
+                stored = [self._objects.get(key) for key in object_keys]
+            yield [replace(info) for info, _ in filter(None, stored)], prefixes
+    
+    def create_multipart_upload(
+        self,
+        key: str,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> str:
+        self._request()
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = {
+                'key': key,
+                'content_type': content_type,
+                'metadata': dict(metadata or {}),
+                'parts': {}
+            }
+        return upload_id
+    
+    def upload_part(
+        self,
+        key: str,
+        upload_id: str,
+        part_number: int,
+        body: bytes,
+        content_md5: str = None
+    ) -> str:
+        self._request(len(body))
+        check_content_md5(body, content_md5)
+        etag = compute_etag(body)
+        with self._lock:
+            self._get_upload(key, upload_id)['parts'][part_number] = (etag, bytes(body))
+        return etag
+    
+    def list_parts(self, key: str, upload_id: str) -> List[Dict]:
+        self._request()
+        with self._lock:
+            parts = self._get_upload(key, upload_id)['parts']
+            return [
+                {'part_number': number, 'etag': etag, 'size': len(body)}
+                for number, (etag, body) in sorted(parts.items())
+            ]
+    
+    def complete_multipart_upload(
+        self,
+        key: str,
+        upload_id: str,
+        parts: List[Dict]
+    ) -> ObjectInfo:
+        self._request()
+        with self._lock:
+            upload = self._get_upload(key, upload_id)
+            stored = upload['parts']
+            etags = check_manifest(parts, {number: etag for number, (etag, _) in stored.items()})
+            body = b''.join(stored[part['part_number']][1] for part in parts)
+            info = ObjectInfo(
+                key=key,
+                size=len(body),
+                etag=multipart_etag(etags),
+                last_modified=timezone.now(),
+                content_type=upload['content_type'] or 'binary/octet-stream',
+                metadata=upload['metadata']
+            )
+            self._objects[key] = (info, body)
+            self._tags.pop(key, None)
+            del self._uploads[upload_id]
+        return replace(info)
+    
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        self._request()
+        with self._lock:
+            self._get_upload(key, upload_id)
+            del self._uploads[upload_id]
+    
+    def _get(self, key: str) -> Tuple[ObjectInfo, bytes]:
+        with self._lock:
+            stored = self._objects.get(key)
+        if stored is None:
+            raise StorageError('NoSuchKey', f"No object {key}")
+        return stored
+    
+    def _get_upload(self, key: str, upload_id: str) -> Dict:
+        """Look up an upload; the caller holds the lock"""
+        upload = self._uploads.get(upload_id)
+        if upload is None or upload['key'] != key:
+            raise StorageError('NoSuchUpload', f"No upload {upload_id}")
+        return upload
+    
+    def _request(self, nbytes: int = 0) -> None:
+        """Simulate one round trip, failing it at the configured error rate"""
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        self._transfer(nbytes)
+        
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise StorageError('InternalError', 'Injected storage error')
+    
+    def _transfer(self, nbytes: int) -> None:
+        if self.bandwidth and nbytes:
+            time.sleep(nbytes / self.bandwidth)
@@ -0,0 +1,363 @@
+"""
+S3 storage backend, also used for MinIO and other S3-compatible stores.
+
+Calls go through the process-wide pooled clients from core.storage.client
+and core.storage.async_client; botocore errors become StorageError with the
+S3 error code.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+import re
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+
+from ..async_client import get_async_s3_client
+from ..client import get_s3_client
+from ..signing import BatchURLSigner
+from .base import LIST_PAGE_SIZE, ObjectInfo, ObjectStream, StorageError
+
+# Most keys S3 accepts in one DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+CONTENT_RANGE_PATTERN = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class S3Backend:
+    """Object store in an S3 bucket"""
+    
+    def __init__(self, bucket_name: str = None):
+        self.bucket_name = (
+            bucket_name or getattr(settings, 'AWS_STORAGE_BUCKET_NAME', None) or 'test-bucket'
+        )
+    
+    @property
+    def client(self):
+        return get_s3_client()
+    
+    def put_object(
+        self,
+        key: str,
+        body: bytes,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> ObjectInfo:
+        extra_args = {'Metadata': metadata or {}}
+        if content_type:
+            extra_args['ContentType'] = content_type
+        
+        with _translate_errors():
+            response = self.client.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=body,
+                **extra_args
+            )
+        return _written(key, response, size=len(body))
+    
+    def get_object(
+        self,
+        key: str,
+        byte_range: str = None,
+        if_none_match: str = None
+    ) -> ObjectStream:
+        extra_args = {}
+        if byte_range:
+            extra_args['Range'] = byte_range
+        if if_none_match:
+            extra_args['IfNoneMatch'] = if_none_match
+        
+        with _translate_errors():
+            response = self.client.get_object(Bucket=self.bucket_name, Key=key, **extra_args)
+        
+        content_range = None
+        size = response['ContentLength']
+        match = CONTENT_RANGE_PATTERN.match(response.get('ContentRange', ''))
+        if match:
+            first, last, size = (int(value) for value in match.groups())
+            content_range = (first, last)
+        
+        info = ObjectInfo(
+            key=key,
+            size=size,
+            etag=response.get('ETag', '').strip('"'),
+            last_modified=response.get('LastModified'),
+            content_type=response.get('ContentType', ''),
+            metadata=response.get('Metadata', {}),
+            version_id=response.get('VersionId'),
+            storage_class=response.get('StorageClass', 'STANDARD')
+        )
+        return ObjectStream(response['Body'], info=info, content_range=content_range)
+    
+    def head_object(self, key: str) -> ObjectInfo:
+        with _translate_errors():
+            response = self.client.head_object(Bucket=self.bucket_name, Key=key)
+        return ObjectInfo(
+            key=key,
+            size=response['ContentLength'],
+            etag=response.get('ETag', '').strip('"'),
+            last_modified=response['LastModified'],
+            content_type=response.get('ContentType', ''),
+            metadata=response.get('Metadata', {}),
+            version_id=response.get('VersionId'),
+            storage_class=response.get('StorageClass', 'STANDARD')
+        )
+    
+    def delete_objects(self, keys: List[str]) -> List[str]:
+        """Delete with one DeleteObjects request per 1000 keys"""
+        failed = []
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={
+                        'Objects': [{'Key': key} for key in batch],
+                        'Quiet': True
+                    }
+                )
+                failed.extend(error['Key'] for error in response.get('Errors', []))
+            except (BotoCoreError, ClientError):
+                failed.extend(batch)
+        return failed
+    
+    def copy_object(
+        self,
+        source_key: str,
+        destination_key: str,
+        storage_class: str = None
+    ) -> ObjectInfo:
+        extra_args = {}
+        if storage_class:
+            # Rewriting an object in place needs an explicit change, like its class
+            extra_args = {
+                'StorageClass': storage_class,
+                'MetadataDirective': 'COPY',
+                'TaggingDirective': 'COPY'
+            }
+        
+        with _translate_errors():
+            response = self.client.copy_object(
+                CopySource={'Bucket': self.bucket_name, 'Key': source_key},
+                Bucket=self.bucket_name,
+                Key=destination_key,
+                **extra_args
+            )
+        result = response.get('CopyObjectResult', {})
+        return ObjectInfo(
+            key=destination_key,
+            size=None,
+            etag=result.get('ETag', '').strip('"'),
+            last_modified=result.get('LastModified'),
+            version_id=response.get('VersionId'),
+            storage_class=storage_class or 'STANDARD'
+        )
+    
+    def get_object_tags(self, key: str) -> Dict[str, str]:
+        with _translate_errors():
+            response = self.client.get_object_tagging(Bucket=self.bucket_name, Key=key)
+        return {tag['Key']: tag['Value'] for tag in response.get('TagSet', [])}
+    
+    def put_object_tags(self, key: str, tags: Dict[str, str]) -> None:
+        with _translate_errors():
+            self.client.put_object_tagging(
+                Bucket=self.bucket_name,
+                Key=key,
+                Tagging={'TagSet': [{'Key': name, 'Value': value} for name, value in tags.items()]}
+            )
+    
+    def list_objects(
+        self,
+        prefix: str,
+        delimiter: str = None,
+        page_size: int = LIST_PAGE_SIZE
+    ) -> Iterator[Tuple[List[ObjectInfo], List[str]]]:
+        """Follow continuation tokens, one ListObjectsV2 request per page"""
+        extra_args = {'Delimiter': delimiter} if delimiter else {}
+        
+        with _translate_errors():
+            paginator = self.client.get_paginator('list_objects_v2')
+            pages = paginator.paginate(
+                Bucket=self.bucket_name,
+                Prefix=prefix,
+                PaginationConfig={'PageSize': page_size},
+                **extra_args
+            )
+            for page in pages:
+                yield [
+                    ObjectInfo(
+                        key=obj['Key'],
+                        size=obj['Size'],
+                        etag=obj.get('ETag', '').strip('"'),
+                        last_modified=obj['LastModified'],
+                        storage_class=obj.get('StorageClass', 'STANDARD')
+                    )
+                    for obj in page.get('Contents', [])
+                ], [info['Prefix'] for info in page.get('CommonPrefixes', [])]
+    
+    def create_multipart_upload(
+        self,
+        key: str,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> str:
+        extra_args = {}
+        if content_type:
+            extra_args['ContentType'] = content_type
+        if metadata:
+            extra_args['Metadata'] = metadata
+        
+        with _translate_errors():
+            response = self.client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                **extra_args
+            )
+        return response['UploadId']
+    
+    def upload_part(
+        self,
+        key: str,
+        upload_id: str,
+        part_number: int,
+        body: bytes,
+        content_md5: str = None
+    ) -> str:
+        # S3 rejects the part if the body does not match the checksum
+        extra_args = {'ContentMD5': content_md5} if content_md5 else {}
+        
+        with _translate_errors():
+            response = self.client.upload_part(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body,
+                **extra_args
+            )
+        return response.get('ETag', '').strip('"')
+    
+    def list_parts(self, key: str, upload_id: str) -> List[Dict]:
+        parts = []
+        with _translate_errors():
+            paginator = self.client.get_paginator('list_parts')
+            for page in paginator.paginate(Bucket=self.bucket_name, Key=key, UploadId=upload_id):
+                parts.extend(_uploaded_part(part) for part in page.get('Parts', []))
+        return parts
+    
+    def complete_multipart_upload(
+        self,
+        key: str,
+        upload_id: str,
+        parts: List[Dict]
+    ) -> ObjectInfo:
+        with _translate_errors():
+            response = self.client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload=_multipart_manifest(parts)
+            )
+        return _written(key, response)
+    
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        with _translate_errors():
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id
+            )
+    
+    def presign_get(
+        self,
+        objects: List[Tuple[str, Dict[str, str]]],
+        expiration: int
+    ) -> List[str]:
+        with _translate_errors():
+            signer = BatchURLSigner(self.client, self.bucket_name, expiration)
+        return [signer.sign(key, params) for key, params in objects]
+    
+    def presign_post(
+        self,
+        key: str,
+        content_type: str = None,
+        max_size: int = None,
+        expiration: int = 3600
+    ) -> Dict:
+        conditions = [['content-length-range', 0, max_size]] if max_size else []
+        
+        with _translate_errors():
+            response = self.client.generate_presigned_post(
+                Bucket=self.bucket_name,
+                Key=key,
+                Fields={'Content-Type': content_type} if content_type else None,
+                Conditions=conditions,
+                ExpiresIn=expiration
+            )
+        return {'url': response['url'], 'fields': response['fields']}
+    
+    async def alist_parts(self, key: str, upload_id: str) -> List[Dict]:
+        parts = []
+        with _translate_errors():
+            s3_client = await get_async_s3_client()
+            paginator = s3_client.get_paginator('list_parts')
+            async for page in paginator.paginate(Bucket=self.bucket_name, Key=key, UploadId=upload_id):
+                parts.extend(_uploaded_part(part) for part in page.get('Parts', []))
+        return parts
+    
+    async def acomplete_multipart_upload(
+        self,
+        key: str,
+        upload_id: str,
+        parts: List[Dict]
+    ) -> ObjectInfo:
+        with _translate_errors():
+            s3_client = await get_async_s3_client()
+            response = await s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload=_multipart_manifest(parts)
+            )
+        return _written(key, response)
+
+
+@contextmanager
+def _translate_errors():
+    try:
+        yield
+    except ClientError as e:
+        code = e.response.get('Error', {}).get('Code', 'Unknown')
+        # Conditional GETs fail with the bare status code
+        raise StorageError('NotModified' if code == '304' else code, str(e)) from e
+    except BotoCoreError as e:
+        raise StorageError('ServiceUnavailable', str(e)) from e
+
+
+def _written(key: str, response: Dict[str, Any], size: int = None) -> ObjectInfo:
+    """Describe an object from a PutObject or CompleteMultipartUpload response"""
+    return ObjectInfo(
+        key=key,
+        size=size,
+        etag=response.get('ETag', '').strip('"'),
+        version_id=response.get('VersionId')
+    )
+
+
+def _uploaded_part(part: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a ListParts entry"""
+    return {
+        'part_number': part['PartNumber'],
+        'etag': part.get('ETag', '').strip('"'),
+        'size': part['Size']
+    }
+
+
+def _multipart_manifest(parts: List[Dict]) -> Dict[str, Any]:
+    """Build the CompleteMultipartUpload part list, ordered by part number"""
+    return {
+        'Parts': [
+            {'PartNumber': part['part_number'], 'ETag': f'"{part["etag"]}"'}
+            for part in sorted(parts, key=lambda p: p['part_number'])
+        ]
+    }
@@ -0,0 +1,104 @@
+"""
+Process-wide S3 client shared by the web tier and Celery workers.
+
+botocore clients are thread-safe, so a single client and its connection
+pool serve every thread of a process. Forked children (Celery prefork,
+gunicorn workers) build their own client instead of sharing the parent's
+sockets.
+"""
+import os
+import threading
+from typing import Dict
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+
+def get_s3_client():
+    """Get the S3 client for this process, creating it on first use"""
+    global _client, _client_pid
+    
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = _build_client()
+                _client_pid = pid
+    return _client
+
+
+def reset_s3_client() -> None:
+    """Drop the client so the next call builds a fresh one"""
+    global _lock, _client, _client_pid
+    
+    # The lock may have been held by another thread when the process forked
+    _lock = threading.Lock()
+    _client = None
+    _client_pid = None
+
+
+def client_options(config_class=Config) -> Dict:
+    """Connection settings shared by the sync and async S3 clients"""
+    config = config_class(
+        max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+        connect_timeout=settings.AWS_S3_CONNECT_TIMEOUT,
+        read_timeout=settings.AWS_S3_READ_TIMEOUT,
+        retries={
+            'max_attempts': settings.AWS_S3_MAX_ATTEMPTS,
+            'mode': 'standard'
+        },
+        tcp_keepalive=True,
+        signature_version='s3v4'
+    )
+    
+    return {
+        'aws_access_key_id': settings.AWS_ACCESS_KEY_ID,
+        'aws_secret_access_key': settings.AWS_SECRET_ACCESS_KEY,
+        'endpoint_url': getattr(settings, 'AWS_S3_ENDPOINT_URL', None),  # For MinIO
+        'region_name': getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1'),
+        'config': config,
+    }
+
+
+def _build_client():
+    """Create an S3 client with pooled, kept-alive connections"""
+    # boto3's default session is not thread-safe; use a dedicated one
+    session = boto3.session.Session()
+    return session.client('s3', **client_options())
+
+
+def connection_stats() -> Dict[str, int]:
+    """
+    Report connection reuse for this process's client.
+    Every request that did not open a new connection reused a pooled one.
+    """
+    requests = 0
+    connections = 0
+    
+    if _client is not None and _client_pid == os.getpid():
+        # urllib3 keeps per-pool counters; botocore does not expose them publicly
+        http_session = getattr(_client._endpoint, 'http_session', None)
+        managers = [getattr(http_session, '_manager', None)]
+        managers.extend(getattr(http_session, '_proxy_managers', {}).values())
+        
+        for manager in filter(None, managers):
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    requests += pool.num_requests
+                    connections += pool.num_connections
+    
+    return {
+        'requests': requests,
+        'connections_opened': connections,
+        'connections_reused': max(requests - connections, 0),
+    }
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_s3_client)
@@ -0,0 +1,118 @@
+"""
+Compression of stored objects.
+
+An object stored compressed records its encoding and uncompressed size in
+user metadata. Readers wrap the stored body in a decoding stream, so callers
+read the original bytes one chunk at a time without the whole object in memory.
+"""
+from dataclasses import replace
+from typing import Dict, Optional
+import gzip
+import zlib
+
+from .backends.base import ObjectInfo, ObjectStream, StorageError, resolve_range
+
+# User metadata naming the encoding and the uncompressed size
+ENCODING_METADATA = 'encoding'
+ORIGINAL_SIZE_METADATA = 'original-size'
+
+ENCODINGS = ('gzip', 'zstd')
+
+# Stored bytes decoded per read
+READ_SIZE = 64 * 1024
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress data with gzip, or zstd when the zstandard package is installed"""
+    if encoding == 'gzip':
+        # A fixed mtime keeps identical content byte-identical
+        return gzip.compress(data, mtime=0)
+    if encoding == 'zstd':
+        import zstandard
+        
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unknown encoding {encoding!r}")
+
+
+def encoding_metadata(encoding: str, original_size: int) -> Dict[str, str]:
+    return {ENCODING_METADATA: encoding, ORIGINAL_SIZE_METADATA: str(original_size)}
+
+
+def stored_encoding(info: Optional[ObjectInfo]) -> Optional[str]:
+    """The encoding an object is stored with, or None when stored as is"""
+    if info is None or not info.metadata:
+        return None
+    return info.metadata.get(ENCODING_METADATA) or None
+
+
+def decoded(stream: ObjectStream, byte_range: str = None) -> ObjectStream:
+    """
+    Wrap a stored body so it reads as the original bytes, with the byte range
+    applied to them. Bodies stored as is are returned unchanged.
+    Raises StorageError InvalidRange when the range starts beyond the content.
+    """
+    encoding = stored_encoding(stream.info)
+    if encoding is None:
+        return stream
+    
+    info = replace(stream.info, size=int(stream.info.metadata[ORIGINAL_SIZE_METADATA]))
+    try:
+        content_range = resolve_range(byte_range, info.size)
+    except StorageError:
+        stream.close()
+        raise
+    
+    reader = DecodingReader(stream, encoding, skip=content_range[0] if content_range else 0)
+    return ObjectStream(reader, info=info, content_range=content_range)
+
+
+class DecodingReader:
+    """File-like reader of the decompressed content of a stored body"""
+    
+    def __init__(self, stream: ObjectStream, encoding: str, skip: int = 0):
+        self._stream = stream
+        self._decompressor = _decompressor(encoding)
+        self._buffer = bytearray()
+        self._skip = skip
+        self._eof = False
+    
+    def read(self, amt: Optional[int] = None) -> bytes:
+        while not self._eof and (amt is None or len(self._buffer) < amt):
+            self._fill()
+        
+        amt = len(self._buffer) if amt is None else amt
+        data = bytes(self._buffer[:amt])
+        del self._buffer[:amt]
+        return data
+    
+    def close(self) -> None:
+        self._stream.close()
+    
+    def _fill(self) -> None:
+        chunk = self._stream.read(READ_SIZE)
+        try:
+            if chunk:
+                data = self._decompressor.decompress(chunk)
+            else:
+                data = self._decompressor.flush()
+                self._eof = True
+        except Exception as e:
+            # zlib.error or zstandard.ZstdError
+            raise StorageError('InvalidEncoding', f"Cannot decode stored object: {e}") from e
+        
+        # Bytes before the requested range are decoded and dropped
+        if self._skip:
+            dropped = min(self._skip, len(data))
+            data = data[dropped:]
+            self._skip -= dropped
+        self._buffer += data
+
+
+def _decompressor(encoding: str):
+    if encoding == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'zstd':
+        import zstandard
+        
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise StorageError('InvalidEncoding', f"Unknown encoding {encoding!r}")
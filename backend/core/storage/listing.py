@@ -0,0 +1,123 @@
+"""
+Listing large key spaces with bounded memory.
+
+A prefix is split into the sub-prefixes found a few delimiter levels below
+it, for example the year/month levels of tenants/{id}/documents/, and the
+parts are listed concurrently. Objects are still yielded in key order: the
+parts are consumed one after another while the next ones are listed ahead
+into small bounded queues, so memory holds a few pages per worker at most.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Union
+import queue
+import threading
+
+from .backends.base import ObjectInfo, StorageBackend
+
+# Pages a worker may list ahead of the consumer
+PAGES_AHEAD = 2
+
+_DONE = object()
+
+
+def iter_objects(backend: StorageBackend, prefix: str) -> Iterator[ObjectInfo]:
+    """Yield every object under a prefix in key order, one page in memory at a time"""
+    for objects, _ in backend.list_objects(prefix):
+        yield from objects
+
+
+def iter_objects_parallel(
+    backend: StorageBackend,
+    prefix: str,
+    depth: int,
+    workers: int
+) -> Iterator[ObjectInfo]:
+    """
+    Yield every object under a prefix in key order, listing the sub-prefixes
+    depth levels down with up to workers concurrent listings.
+    """
+    parts = partition(backend, prefix, depth)
+    
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        stop = threading.Event()
+        pending = deque()
+        remaining = iter(parts)
+        
+        def start(part):
+            if isinstance(part, ObjectInfo):
+                return [part], None
+            pages = queue.Queue(maxsize=PAGES_AHEAD)
+            executor.submit(_fill, backend, part, pages, stop)
+            return None, pages
+        
+        pending.extend(start(part) for part in islice(remaining, workers))
+        try:
+            while pending:
+                objects, pages = pending.popleft()
+                if objects is not None:
+                    yield from objects
+                else:
+                    yield from _drain(pages)
+                
+                part = next(remaining, None)
+                if part is not None:
+                    pending.append(start(part))
+        finally:
+            # Let workers of an abandoned listing exit instead of blocking on full queues
+            stop.set()
+
+
+def partition(
+    backend: StorageBackend,
+    prefix: str,
+    depth: int
+) -> List[Union[str, ObjectInfo]]:
+    """
+    Split a prefix into the common prefixes depth '/' levels below it.
+    Objects found on the way are kept as they are; the result is in key order,
+    so listing the parts one after another yields keys in order.
+    """
+    parts = [prefix]
+    for _ in range(depth):
+        expanded = []
+        for part in parts:
+            if isinstance(part, ObjectInfo):
+                expanded.append(part)
+                continue
+            for objects, prefixes in backend.list_objects(part, delimiter='/'):
+                expanded.extend(objects)
+                expanded.extend(prefixes)
+        parts = sorted(expanded, key=lambda part: part.key if isinstance(part, ObjectInfo) else part)
+    return parts
+
+
+def _fill(backend: StorageBackend, prefix: str, pages: queue.Queue, stop: threading.Event) -> None:
+    try:
+        for objects, _ in backend.list_objects(prefix):
+            if not _put(pages, objects, stop):
+                return
+        _put(pages, _DONE, stop)
+    except Exception as e:
+        _put(pages, e, stop)
+
+
+def _put(pages: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(pages: queue.Queue) -> Iterator[ObjectInfo]:
+    while True:
+        item = pages.get()
+        if item is _DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield from item
@@ -0,0 +1,43 @@
+"""
+Batch signing of presigned S3 GET URLs.
+
+generate_presigned_url resolves credentials, endpoint rules and request
+serialization again for every URL. BatchURLSigner does that work once and
+then only computes the SigV4 query signature per object.
+"""
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from botocore.auth import S3SigV4QueryAuth
+from botocore.awsrequest import AWSRequest
+
+
+class BatchURLSigner:
+    """Signs GET URLs for many objects of one bucket with a shared signing context"""
+    
+    def __init__(self, s3_client, bucket: str, expiration: int):
+        credentials = s3_client._request_signer._credentials.get_frozen_credentials()
+        self._auth = S3SigV4QueryAuth(
+            credentials,
+            's3',
+            s3_client.meta.region_name,
+            expires=expiration
+        )
+        
+        # Let botocore resolve the addressing style (path or virtual host) once
+        probe_url = s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': bucket, 'Key': '_'},
+            ExpiresIn=expiration
+        )
+        self._base_url = probe_url.split('?', 1)[0][:-len('/_')]
+    
+    def sign(self, key: str, params: Optional[Dict[str, str]] = None) -> str:
+        """Return a presigned GET URL for the key with optional response overrides"""
+        request = AWSRequest(
+            method='GET',
+            url=f"{self._base_url}/{quote(key, safe='/~')}",
+            params=params or {}
+        )
+        self._auth.add_auth(request)
+        return request.url
@@ -0,0 +1,81 @@
+"""
+HTTP responses that stream stored objects.
+
+Bodies are read in fixed-size chunks as the client consumes them, so a
+request holds about one chunk in memory whatever the object size. Byte
+ranges and ETag revalidation are answered by the backend's GetObject.
+"""
+from typing import AsyncIterator, Iterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
+
+from .backends.base import RANGE_PATTERN, ObjectStream
+
+
+def single_range(header: Optional[str]) -> Optional[str]:
+    """The Range header if it asks for one byte range, which is all S3 serves"""
+    if header and RANGE_PATTERN.match(header.strip()):
+        return header.strip()
+    return None
+
+
+def iter_chunks(stream: ObjectStream, chunk_size: int) -> Iterator[bytes]:
+    # Closing the response closes the generator, and with it the object
+    with stream:
+        yield from stream.iter_chunks(chunk_size)
+
+
+async def aiter_chunks(stream: ObjectStream, chunk_size: int) -> AsyncIterator[bytes]:
+    """Read chunks on worker threads so an ASGI server streams without buffering"""
+    read = sync_to_async(stream.read, thread_sensitive=False)
+    try:
+        while True:
+            chunk = await read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(stream.close, thread_sensitive=False)()
+
+
+def object_response(
+    stream: ObjectStream,
+    chunks,
+    content_type: str = None,
+    disposition: str = None
+) -> StreamingHttpResponse:
+    """200 or 206 response with the body, length, range and validator headers"""
+    info = stream.info
+    response = StreamingHttpResponse(
+        chunks,
+        status=206 if stream.content_range else 200,
+        content_type=content_type or info.content_type or 'application/octet-stream'
+    )
+    response['Content-Length'] = stream.content_length
+    response['Accept-Ranges'] = 'bytes'
+    if stream.content_range:
+        first, last = stream.content_range
+        response['Content-Range'] = f"bytes {first}-{last}/{info.size}"
+    if info.etag:
+        response['ETag'] = f'"{info.etag}"'
+    if info.last_modified:
+        response['Last-Modified'] = http_date(info.last_modified.timestamp())
+    if disposition:
+        response['Content-Disposition'] = disposition
+    return response
+
+
+def not_modified_response(if_none_match: str) -> HttpResponse:
+    response = HttpResponse(status=304)
+    # Echo the validator when the client sent exactly one
+    if ',' not in if_none_match and if_none_match.strip() != '*':
+        response['ETag'] = if_none_match.strip()
+    return response
+
+
+def range_not_satisfiable_response(size: int) -> HttpResponse:
+    response = HttpResponse(status=416)
+    response['Content-Range'] = f"bytes */{size}"
+    return response
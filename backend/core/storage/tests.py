@@ -0,0 +1,226 @@
+from django.test import SimpleTestCase, override_settings
+from unittest import mock
+import asyncio
+import base64
+import hashlib
+import tempfile
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from core.storage import async_client, client, compression, listing, views
+from core.storage.backends import LocalBackend, MemoryBackend, StorageError
+
+
+@override_settings(
+    AWS_ACCESS_KEY_ID='test',
+    AWS_SECRET_ACCESS_KEY='test',
+    AWS_S3_ENDPOINT_URL='http://localhost:9000',
+    AWS_S3_MAX_POOL_CONNECTIONS=16
+)
+class TestSharedS3Client(SimpleTestCase):
+    """Test cases for the process-wide S3 client"""
+    
+    def setUp(self):
+        client.reset_s3_client()
+        self.addCleanup(client.reset_s3_client)
+    
+    def test_client_is_shared_and_configured(self):
+        """Test one pooled client is reused within a process"""
+        s3_client = client.get_s3_client()
+        
+        self.assertIs(client.get_s3_client(), s3_client)
+        self.assertEqual(s3_client.meta.config.max_pool_connections, 16)
+        self.assertTrue(s3_client.meta.config.tcp_keepalive)
+        self.assertEqual(s3_client.meta.endpoint_url, 'http://localhost:9000')
+    
+    def test_client_is_rebuilt_in_forked_process(self):
+        """Test a child process does not reuse the parent's client"""
+        parent_client = client.get_s3_client()
+        
+        with mock.patch.object(client.os, 'getpid', return_value=-1):
+            child_client = client.get_s3_client()
+            self.assertIsNot(child_client, parent_client)
+            self.assertEqual(client.connection_stats()['requests'], 0)
+    
+    def test_async_client_is_shared_per_event_loop(self):
+        """Test concurrent callers in one loop share a client and other loops get their own"""
+        async def get_clients():
+            clients = await asyncio.gather(*[async_client.get_async_s3_client() for _ in range(5)])
+            await async_client.close_async_s3_client()
+            return clients
+        
+        first = asyncio.run(get_clients())
+        second = asyncio.run(get_clients())
+        
+        self.assertEqual(len({id(s3_client) for s3_client in first}), 1)
+        self.assertIsNot(first[0], second[0])
+        self.assertEqual(first[0].meta.config.max_pool_connections, 16)
+        self.assertEqual(first[0].meta.endpoint_url, 'http://localhost:9000')
+
+
+class TestStorageBackends(SimpleTestCase):
+    """Test cases for the local and in-memory storage backends"""
+    
+    def _backends(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        return [MemoryBackend(), LocalBackend(root.name)]
+    
+    def test_objects_round_trip(self):
+        """Test objects, metadata, tags and listings behave like S3 on both backends"""
+        for backend in self._backends():
+            with self.subTest(backend=type(backend).__name__):
+                info = backend.put_object('a/b/one.txt', b'hello', 'text/plain', {'sha256': 'x'})
+                backend.put_object('a/two.txt', b'world')
+                
+                self.assertEqual(info.etag, hashlib.md5(b'hello').hexdigest())
+                with backend.get_object('a/b/one.txt') as body:
+                    self.assertEqual(b''.join(body.iter_chunks(2)), b'hello')
+                head = backend.head_object('a/b/one.txt')
+                self.assertEqual((head.size, head.content_type, head.metadata), (5, 'text/plain', {'sha256': 'x'}))
+                
+                backend.put_object_tags('a/b/one.txt', {'archived': 'true'})
+                backend.copy_object('a/b/one.txt', 'a/b/one.txt', storage_class='GLACIER_IR')
+                self.assertEqual(backend.head_object('a/b/one.txt').storage_class, 'GLACIER_IR')
+                self.assertEqual(backend.get_object_tags('a/b/one.txt'), {'archived': 'true'})
+                
+                objects, prefixes = next(backend.list_objects('a/', delimiter='/'))
+                self.assertEqual([obj.key for obj in objects], ['a/two.txt'])
+                self.assertEqual(prefixes, ['a/b/'])
+                
+                self.assertEqual(backend.delete_objects(['a/b/one.txt', 'missing']), [])
+                with self.assertRaises(StorageError) as error:
+                    backend.head_object('a/b/one.txt')
+                self.assertEqual(error.exception.code, 'NoSuchKey')
+    
+    def test_multipart_upload(self):
+        """Test parts are checked, assembled in order and get an S3-style ETag"""
+        for backend in self._backends():
+            with self.subTest(backend=type(backend).__name__):
+                upload_id = backend.create_multipart_upload('big.bin', 'application/octet-stream')
+                first = backend.upload_part('big.bin', upload_id, 1, b'a' * 10)
+                with self.assertRaises(StorageError) as error:
+                    backend.upload_part('big.bin', upload_id, 2, b'b', content_md5=base64.b64encode(b'0' * 16).decode())
+                self.assertEqual(error.exception.code, 'BadDigest')
+                second = backend.upload_part('big.bin', upload_id, 2, b'b')
+                
+                parts = backend.list_parts('big.bin', upload_id)
+                self.assertEqual([(part['part_number'], part['size']) for part in parts], [(1, 10), (2, 1)])
+                with self.assertRaises(StorageError) as error:
+                    backend.complete_multipart_upload('big.bin', upload_id, [{'part_number': 1, 'etag': second}])
+                self.assertEqual(error.exception.code, 'InvalidPart')
+                
+                info = backend.complete_multipart_upload('big.bin', upload_id, parts)
+                self.assertTrue(info.etag.endswith('-2'))
+                self.assertEqual(backend.get_object('big.bin').read(), b'a' * 10 + b'b')
+                self.assertEqual(first, hashlib.md5(b'a' * 10).hexdigest())
+                with self.assertRaises(StorageError):
+                    backend.list_parts('big.bin', upload_id)
+    
+    def test_local_backend_rejects_keys_outside_root(self):
+        """Test keys cannot address files outside the storage directory"""
+        backend = self._backends()[1]
+        for key in ['../escape', '/etc/passwd', 'a//b']:
+            with self.assertRaises(StorageError):
+                backend.put_object(key, b'x')
+    
+    def test_memory_backend_simulates_network(self):
+        """Test latency, bandwidth and injected errors"""
+        backend = MemoryBackend(latency=0.02, bandwidth=100000)
+        started = time.monotonic()
+        backend.put_object('key', b'x' * 2000)
+        backend.get_object('key').read()
+        self.assertGreaterEqual(time.monotonic() - started, 0.08)
+        
+        failing = MemoryBackend(error_rate=0.5, seed=1)
+        codes = []
+        for _ in range(20):
+            try:
+                failing.put_object('key', b'x')
+            except StorageError as e:
+                codes.append(e.code)
+        self.assertTrue(0 < len(codes) < 20)
+        self.assertEqual(set(codes), {'InternalError'})
+    
+    def test_presigned_urls_are_served(self):
+        """Test signed GET and POST URLs work against the storage views and reject tampering"""
+        backend = MemoryBackend()
+        self.enterContext(mock.patch.object(views, 'get_storage_backend', return_value=backend))
+        
+        form = backend.presign_post('uploads/report.pdf', 'application/pdf', max_size=10)
+        too_large = self.client.post(form['url'], {'file': SimpleUploadedFile('r.pdf', b'x' * 11)})
+        self.assertEqual(too_large.status_code, 400)
+        response = self.client.post(form['url'], {'file': SimpleUploadedFile('r.pdf', b'%PDF-1.4')})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(backend.head_object('uploads/report.pdf').content_type, 'application/pdf')
+        
+        url, = backend.presign_get(
+            [('uploads/report.pdf', {'response-content-disposition': 'attachment; filename="r.pdf"'})],
+            expiration=60
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="r.pdf"')
+        
+        self.assertEqual(self.client.get(url[:-2] + 'x/').status_code, 403)
+        expired, = backend.presign_get([('uploads/report.pdf', {})], expiration=-1)
+        self.assertEqual(self.client.get(expired).status_code, 403)
+    
+    def test_compressed_objects_read_as_original_content(self):
+        """Test gzip and zstd bodies decode as streams, with ranges on the original bytes"""
+        backend = MemoryBackend()
+        content = b'id,name,amount\n' + b''.join(b'%d,row %d,%d\n' % (i, i, i * 7) for i in range(20000))
+        
+        for encoding in compression.ENCODINGS:
+            with self.subTest(encoding=encoding):
+                body = compression.compress(content, encoding)
+                self.assertLess(len(body), len(content))
+                backend.put_object('data.csv', body, 'text/csv', compression.encoding_metadata(encoding, len(content)))
+                
+                with compression.decoded(backend.get_object('data.csv')) as stream:
+                    self.assertEqual(stream.info.size, len(content))
+                    self.assertEqual(b''.join(stream.iter_chunks(4096)), content)
+                
+                stream = compression.decoded(backend.get_object('data.csv'), 'bytes=100000-100099')
+                self.assertEqual(stream.content_range, (100000, 100099))
+                self.assertEqual(stream.read(), content[100000:100100])
+                
+                with self.assertRaises(StorageError) as raised:
+                    compression.decoded(backend.get_object('data.csv'), f'bytes={len(content)}-')
+                self.assertEqual(raised.exception.code, 'InvalidRange')
+        
+        # Objects stored as is pass through unchanged
+        backend.put_object('plain.csv', content, 'text/csv')
+        stream = backend.get_object('plain.csv')
+        self.assertIs(compression.decoded(stream), stream)
+        
+        backend.put_object('broken.csv', b'not gzip', 'text/csv', compression.encoding_metadata('gzip', 10))
+        with self.assertRaises(StorageError) as raised:
+            compression.decoded(backend.get_object('broken.csv')).read()
+        self.assertEqual(raised.exception.code, 'InvalidEncoding')
+    
+    def test_listing_is_paginated_and_parallel_listing_keeps_key_order(self):
+        """Test pages follow on from each other and split prefixes are merged back in order"""
+        backend = MemoryBackend()
+        keys = [
+            f"docs/{year}/{month:02d}/{number}.pdf"
+            for year in (2023, 2024) for month in range(1, 13) for number in range(30)
+        ] + ['docs/readme.txt', 'docs/2024-notes.txt']
+        for key in keys:
+            backend.put_object(key, b'x')
+        
+        pages = list(backend.list_objects('docs/', page_size=100))
+        self.assertEqual([len(objects) for objects, _ in pages], [100] * 7 + [22])
+        self.assertEqual(list(listing.iter_objects(backend, 'docs/')), [
+            obj for objects, _ in pages for obj in objects
+        ])
+        
+        listed = [obj.key for obj in listing.iter_objects_parallel(backend, 'docs/', depth=2, workers=4)]
+        self.assertEqual(listed, sorted(keys))
+        
+        # Stopping early releases the workers
+        abandoned = listing.iter_objects_parallel(backend, 'docs/', depth=2, workers=4)
+        self.assertEqual(next(abandoned).key, 'docs/2023/01/0.pdf')
+        abandoned.close()
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('objects/<str:token>/', views.get_object, name='storage-object'),
+    path('uploads/<str:token>/', views.upload_object, name='storage-upload'),
+]
@@ -0,0 +1,82 @@
+"""
+Endpoints behind the presigned URLs of the local and memory backends.
+
+They stand in for the bucket endpoint: the signed token in the URL names the
+object, so no session or login is involved, as with S3 presigned URLs.
+"""
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, require_POST
+
+from .backends import StorageError, get_storage_backend, load_signed_url
+from .streaming import (
+    iter_chunks, not_modified_response, object_response, range_not_satisfiable_response,
+    single_range
+)
+
+# Read size when streaming objects
+STREAM_CHUNK_SIZE = 64 * 1024
+
+ERROR_STATUS = {
+    'SignatureDoesNotMatch': 403,
+    'AccessDenied': 403,
+    'NoSuchKey': 404,
+    'EntityTooLarge': 400,
+    'InvalidKey': 400,
+}
+
+
+def _error(e: StorageError) -> JsonResponse:
+    return JsonResponse({'error': e.code}, status=ERROR_STATUS.get(e.code, 500))
+
+
+@require_http_methods(['GET', 'HEAD'])
+def get_object(request, token):
+    """Stream an object, or one byte range of it, for a presigned GET URL"""
+    if_none_match = request.headers.get('If-None-Match')
+    try:
+        payload = load_signed_url(token)
+        stream = get_storage_backend(payload['b']).get_object(
+            payload['k'],
+            byte_range=single_range(request.headers.get('Range')),
+            if_none_match=if_none_match
+        )
+    except StorageError as e:
+        if e.code == 'NotModified':
+            return not_modified_response(if_none_match)
+        if e.code == 'InvalidRange':
+            return range_not_satisfiable_response(get_storage_backend(payload['b']).head_object(payload['k']).size)
+        return _error(e)
+    
+    response = object_response(
+        stream,
+        iter_chunks(stream, STREAM_CHUNK_SIZE),
+        disposition=payload['p'].get('response-content-disposition')
+    )
+    if payload['p'].get('response-content-encoding'):
+        response['Content-Encoding'] = payload['p']['response-content-encoding']
+    return response
+
+
+@csrf_exempt
+@require_POST
+def upload_object(request, token):
+    """Store the file of a presigned POST form upload"""
+    try:
+        payload = load_signed_url(token)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return JsonResponse({'error': 'InvalidArgument'}, status=400)
+        if payload['m'] is not None and upload.size > payload['m']:
+            raise StorageError('EntityTooLarge')
+        
+        get_storage_backend(payload['b']).put_object(
+            payload['k'],
+            upload.read(),
+            content_type=payload['t'] or upload.content_type
+        )
+    except StorageError as e:
+        return _error(e)
+    
+    # S3's default success_action_status
+    return HttpResponse(status=204)
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from .models import (
     Folder, Document, DocumentShare, 
-    ShareNotification, FolderUserState
+    ShareNotification, FolderUserState, DocumentBlob
 )
 
 
@@ -124,4 +124,19 @@ class FolderUserStateAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         if not request.user.is_superuser:
             qs = qs.filter(tenant=request.user.account.tenant)
-        return qs
\ No newline at end of file
+        return qs
+
+
+@admin.register(DocumentBlob)
+class DocumentBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'tenant', 'size', 'ref_count', 'updated_at']
+    list_filter = ['tenant', 'updated_at']
+    search_fields = ['sha256']
+    ordering = ['-updated_at']
+    readonly_fields = ['id', 'sha256', 's3_key', 's3_bucket', 'size', 'ref_count', 'created_at', 'updated_at']
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if not request.user.is_superuser:
+            qs = qs.filter(tenant=request.user.account.tenant)
+        return qs
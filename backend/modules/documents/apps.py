@@ -7,4 +7,7 @@ from django.apps import AppConfig
 class DocumentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'modules.documents'
-    verbose_name = 'Documents'
\ No newline at end of file
+    verbose_name = 'Documents'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,273 @@
+"""
+Async versions of the storage-bound document actions.
+
+They answer on the same URLs and with the same responses as the
+DocumentViewSet and UploadSessionViewSet actions, and take their place when
+DOCUMENTS_ASYNC_VIEWS is enabled. Served through config.asgi, a worker keeps
+handling other requests while one waits on S3, MinIO or the database. Reads
+use the async ORM; writes that need a transaction, which the async ORM does
+not offer, run in a worker thread. Requests are authenticated with the
+viewsets' authentication_classes, so both serve the same users.
+"""
+from dataclasses import asdict
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+from rest_framework.request import Request
+
+from core.storage.streaming import aiter_chunks, object_response
+from core.tenancy.models import Account
+
+from .models import Document, UploadSession
+from .serializers import (
+    DocumentSerializer, DocumentBulkActionSerializer, DocumentBulkMoveSerializer
+)
+from .services.access_service import AccessService
+from .services.archive_service import ArchiveService
+from .services.bulk_action_service import BulkActionService
+from .services.presigned_url_service import PresignedUrlService
+from .services.upload_service import (
+    UploadSessionService, UploadSessionError, UploadSessionExpired
+)
+from .services.zip_download_service import downloadable_by
+from .views import (
+    DocumentViewSet, UploadSessionViewSet, _content_disposition, _open_content
+)
+
+
+def _not_found(model) -> JsonResponse:
+    return JsonResponse(
+        {'detail': f"No {model._meta.object_name} matches the given query."},
+        status=404
+    )
+
+
+async def _aget_document(request, pk):
+    """Look up a document like DocumentViewSet.get_object, or None"""
+    show_archived = request.GET.get('archived', 'false').lower() == 'true'
+    try:
+        return await Document.objects.filter(is_archived=show_archived).aget(pk=pk)
+    except Document.DoesNotExist:
+        return None
+
+
+async def _aauthenticate(request, viewset):
+    """The user the viewset's action would see, authenticated with its authentication_classes"""
+    drf_request = Request(request, authenticators=[auth() for auth in viewset.authentication_classes])
+    return await sync_to_async(lambda: drf_request.user)()
+
+
+async def _aget_request_tenant(request):
+    """Async variant of views._get_request_tenant"""
+    # TODO: Drop the fallback when authentication is configured
+    tenant = getattr(request, 'tenant', None)
+    if tenant:
+        return tenant
+    
+    tenant = await Account.objects.afirst()
+    if not tenant:
+        tenant = await Account.objects.acreate(
+            name="Test Company",
+            slug="test",
+            is_active=True
+        )
+    return tenant
+
+
+async def _aget_request_user(request, viewset):
+    """Async variant of views._get_request_user"""
+    # TODO: Drop the fallback when authentication is configured
+    user = await _aauthenticate(request, viewset)
+    if user.is_authenticated:
+        return user
+    
+    User = get_user_model()
+    user = await User.objects.afirst()
+    if not user:
+        user = await sync_to_async(User.objects.create_user)(
+            username='testuser',
+            email='test@example.com',
+            password='testpass'
+        )
+    return user
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+@require_GET
+async def download_url(request, pk):
+    """Get pre-signed download URL"""
+    document = await _aget_document(request, pk)
+    if document is None:
+        return _not_found(Document)
+    
+    user = await _aauthenticate(request, DocumentViewSet)
+    can_access = user.is_authenticated and await Document.objects.filter(
+        downloadable_by(user),
+        pk=document.pk
+    ).aexists()
+    
+    if not can_access:
+        return JsonResponse(
+            {'error': 'No permission to download this document'},
+            status=403
+        )
+    
+    url = await PresignedUrlService().aget_url(document)
+    await sync_to_async(AccessService.record)(document)
+    
+    return JsonResponse({'download_url': url})
+
+
+@require_http_methods(['GET', 'HEAD'])
+async def content(request, pk):
+    """Stream the document, or one byte range of it, through the API"""
+    document = await _aget_document(request, pk)
+    if document is None:
+        return _not_found(Document)
+    
+    user = await _aauthenticate(request, DocumentViewSet)
+    can_access = user.is_authenticated and await Document.objects.filter(
+        downloadable_by(user),
+        pk=document.pk
+    ).aexists()
+    
+    if not can_access:
+        return JsonResponse(
+            {'error': 'No permission to download this document'},
+            status=403
+        )
+    
+    stream, response = await sync_to_async(_open_content, thread_sensitive=False)(request, document)
+    if response is not None:
+        return response
+    await sync_to_async(AccessService.record)(document)
+    
+    # An async iterator keeps ASGI from buffering the whole body
+    return object_response(
+        stream,
+        aiter_chunks(stream, settings.DOCUMENTS_STREAM_CHUNK_SIZE),
+        content_type=document.mime_type,
+        disposition=_content_disposition(request, document)
+    )
+
+
+@csrf_exempt
+@require_POST
+async def archive(request, pk):
+    """Archive a document"""
+    document = await _aget_document(request, pk)
+    if document is None:
+        return _not_found(Document)
+    
+    tenant = await _aget_request_tenant(request)
+    if not await sync_to_async(ArchiveService(tenant).archive)(document):
+        return JsonResponse({'error': 'Document is already archived'}, status=400)
+    
+    return JsonResponse({'status': 'archived'})
+
+
+@csrf_exempt
+@require_POST
+async def restore(request, pk):
+    """Restore an archived document"""
+    document = await _aget_document(request, pk)
+    if document is None:
+        return _not_found(Document)
+    
+    tenant = await _aget_request_tenant(request)
+    if not await sync_to_async(ArchiveService(tenant).restore)(document):
+        return JsonResponse({'error': 'Document is not archived'}, status=400)
+    
+    return JsonResponse({'status': 'restored'})
+
+
+async def _bulk_action(request, serializer_class, run):
+    """Validate a bulk selection and run the action on it"""
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({'detail': 'JSON parse error'}, status=400)
+    
+    serializer = serializer_class(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    
+    tenant = await _aget_request_tenant(request)
+    try:
+        result = await run(BulkActionService(tenant), serializer.validated_data)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(asdict(result))
+
+
+@csrf_exempt
+@require_POST
+async def bulk_archive(request):
+    """Archive many documents selected by id or filter"""
+    return await _bulk_action(
+        request,
+        DocumentBulkActionSerializer,
+        lambda service, data: service.aarchive(data.get('ids'), data.get('filter'))
+    )
+
+
+@csrf_exempt
+@require_POST
+async def bulk_restore(request):
+    """Restore many archived documents selected by id or filter"""
+    return await _bulk_action(
+        request,
+        DocumentBulkActionSerializer,
+        lambda service, data: service.arestore(data.get('ids'), data.get('filter'))
+    )
+
+
+@csrf_exempt
+@require_POST
+async def bulk_move(request):
+    """Move many documents selected by id or filter into a folder"""
+    return await _bulk_action(
+        request,
+        DocumentBulkMoveSerializer,
+        lambda service, data: service.amove(data['folder'], data.get('ids'), data.get('filter'))
+    )
+
+
+@csrf_exempt
+@require_POST
+async def complete_upload(request, pk):
+    """Assemble the uploaded parts into a document"""
+    try:
+        session = await UploadSession.objects.select_related('folder').aget(pk=pk)
+    except UploadSession.DoesNotExist:
+        return _not_found(UploadSession)
+    
+    service = UploadSessionService(
+        await _aget_request_user(request, UploadSessionViewSet),
+        await _aget_request_tenant(request)
+    )
+    
+    try:
+        document = await service.acomplete(session)
+    except UploadSessionExpired as e:
+        return JsonResponse({'error': str(e)}, status=410)
+    except UploadSessionError as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    except RuntimeError:
+        return JsonResponse({'error': 'Failed to complete upload'}, status=500)
+    
+    data = await sync_to_async(
+        lambda: DocumentSerializer(document, context={'request': request}).data
+    )()
+    return JsonResponse(data, status=201)
@@ -0,0 +1,378 @@
+"""
+Text extraction for search.
+
+Text is produced piece by piece (PDF pages, Word paragraphs, spreadsheet and
+CSV rows, blocks of text files) so callers can store it in chunks and never
+hold a whole document. Word documents are parsed incrementally from their XML,
+dropping each paragraph once read, workbooks are opened read-only so openpyxl
+streams their rows, and PDFs are read from the open file rather than loaded
+into memory first. Tables are indexed up to TableLimits, and their extractors
+fill in a summary of each sheet and its columns as they go.
+
+Nothing here touches Django, so extraction can run in worker processes:
+extract_range extracts one range of pages there, which is how large PDFs are
+split across a pool. Extraction stops with ExtractionLimitExceeded once past
+its deadline, which time_limit enforces within a page too, and limit_memory
+caps the address space of the process so a pathological file fails with
+MemoryError instead of exhausting the host.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, time as time_of_day
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+import csv
+import logging
+import math
+import os
+import resource
+import signal
+import threading
+import time
+import zipfile
+
+import PyPDF2
+
+logger = logging.getLogger(__name__)
+
+# Version of the text extracted, stored for content (ProcessingResultService);
+# bump it when extractors change so stored content is extracted again
+EXTRACTION_VERSION = 1
+
+# Characters read from a text file at a time
+TEXT_BLOCK_SIZE = 64 * 1024
+
+# WordprocessingML elements, by their namespaced tags
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+WORD_PARAGRAPH = f'{WORD_NAMESPACE}p'
+WORD_TABLE = f'{WORD_NAMESPACE}tbl'
+WORD_TEXT = {
+    f'{WORD_NAMESPACE}tab': '\t',
+    f'{WORD_NAMESPACE}br': '\n',
+    f'{WORD_NAMESPACE}cr': '\n',
+}
+
+
+# Bytes of a CSV file its dialect is detected from
+CSV_SNIFF_SIZE = 16 * 1024
+
+
+class ExtractionLimitExceeded(RuntimeError):
+    """Raised when a document takes more time or memory to extract than allowed"""
+
+
+@dataclass
+class TableLimits:
+    """How much of each sheet of a spreadsheet or CSV file is indexed"""
+    rows: int = 10000
+    columns: int = 100
+    # Characters of each cell
+    cell_chars: int = 1000
+
+
+@dataclass
+class ExtractedRangeDTO:
+    """Text of a range of pages extracted in a pool process, with the document's structure"""
+    texts: List[str]
+    structure: dict = field(default_factory=dict)
+
+
+def page_count(path: str) -> int:
+    """Number of pages of a PDF"""
+    with open(path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def iter_text(
+    path: str,
+    file_type: str,
+    pages: Optional[range] = None,
+    deadline: Optional[float] = None,
+    limits: Optional[TableLimits] = None,
+    structure: Optional[dict] = None
+) -> Iterator[str]:
+    """
+    Yield the text of a local document piece by piece; of a PDF, only the
+    given range of pages (all by default). Spreadsheets and CSV files add a
+    summary of their sheets to structure. Raises ExtractionLimitExceeded once
+    time.monotonic() passes the deadline.
+    """
+    extractor = EXTRACTORS[file_type]
+    structure = {} if structure is None else structure
+    for text in extractor(path, pages, limits or TableLimits(), structure):
+        if deadline is not None and time.monotonic() > deadline:
+            raise ExtractionLimitExceeded(f"Extracting {path} took too long")
+        yield text
+
+
+def extract_range(
+    path: str,
+    file_type: str,
+    pages: Optional[range],
+    max_chars: int,
+    deadline: Optional[float] = None,
+    limits: Optional[TableLimits] = None
+) -> ExtractedRangeDTO:
+    """
+    Text of a range of pages, up to about max_chars, for extraction in pool
+    processes. Raises ExtractionLimitExceeded when past the deadline or out
+    of memory.
+    """
+    result = ExtractedRangeDTO(texts=[])
+    length = 0
+    try:
+        for text in iter_text(path, file_type, pages, deadline, limits, result.structure):
+            result.texts.append(text)
+            length += len(text)
+            if length >= max_chars:
+                break
+    except MemoryError:
+        raise ExtractionLimitExceeded(f"Extracting {path} ran out of memory") from None
+    return result
+
+
+def limit_memory(max_bytes: int) -> None:
+    """
+    Let the calling process grow by at most max_bytes more address space;
+    initializer of extraction pool processes. 0 leaves it unlimited.
+    """
+    if max_bytes:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = _address_space() + max_bytes
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+@contextmanager
+def time_limit(deadline: float):
+    """
+    Raise ExtractionLimitExceeded within the block once time.monotonic()
+    passes the deadline, even while a parser is stuck on one page. Uses
+    SIGALRM, so only in the main thread; elsewhere iter_text still checks the
+    deadline between pieces.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    
+    def expire(signum, frame):
+        raise ExtractionLimitExceeded("Extraction took too long")
+    
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, max(deadline - time.monotonic(), 0.001))
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@contextmanager
+def memory_limit(max_bytes: int):
+    """limit_memory for the duration of the block, restoring the previous limit afterwards"""
+    previous = resource.getrlimit(resource.RLIMIT_AS)
+    limit_memory(max_bytes)
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, previous)
+
+
+def _address_space() -> int:
+    """Bytes of address space the process uses now"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _iter_pdf(path: str, pages: Optional[range], limits: TableLimits, structure: dict) -> Iterator[str]:
+    with open(path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for number in pages if pages is not None else range(len(reader.pages)):
+            yield (reader.pages[number].extract_text() or '') + '\n'
+
+
+def _iter_word(path: str, pages: Optional[range], limits: TableLimits, structure: dict) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as xml:
+        parents = []
+        for event, element in iterparse(xml, events=('start', 'end')):
+            if event == 'start':
+                parents.append(element)
+                continue
+            parents.pop()
+            
+            if element.tag == WORD_PARAGRAPH:
+                yield ''.join(_word_text(element)) + '\n'
+            if element.tag in (WORD_PARAGRAPH, WORD_TABLE) and parents:
+                # Read already; dropping it keeps only the open elements in memory
+                parents[-1].remove(element)
+
+
+def _word_text(paragraph) -> Iterator[str]:
+    for node in paragraph.iter():
+        if node.tag == f'{WORD_NAMESPACE}t':
+            yield node.text or ''
+        elif node.tag in WORD_TEXT:
+            yield WORD_TEXT[node.tag]
+
+
+def _iter_text_file(path: str, pages: Optional[range], limits: TableLimits, structure: dict) -> Iterator[str]:
+    with open(path, 'r', encoding='utf-8', errors='ignore') as text_file:
+        yield from iter(lambda: text_file.read(TEXT_BLOCK_SIZE), '')
+
+
+def _iter_workbook(path: str, pages: Optional[range], limits: TableLimits, structure: dict) -> Iterator[str]:
+    if not zipfile.is_zipfile(path):
+        # Legacy .xls workbooks are not Office Open XML, which openpyxl reads
+        logger.info(f"Not extracting text from {path}: not an XLSX workbook")
+        return
+    
+    from openpyxl import load_workbook
+    # Read-only workbooks stream the rows of each sheet from its XML
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheets = structure.setdefault('sheets', [])
+        for worksheet in workbook.worksheets:
+            summary = _TableSummary(worksheet.title, limits)
+            yield from summary.index(worksheet.iter_rows(values_only=True))
+            sheets.append(summary.as_dict())
+    finally:
+        workbook.close()
+
+
+def _iter_csv(path: str, pages: Optional[range], limits: TableLimits, structure: dict) -> Iterator[str]:
+    with open(path, 'r', encoding='utf-8-sig', errors='replace', newline='') as csv_file:
+        sample = csv_file.read(CSV_SNIFF_SIZE)
+        csv_file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        
+        summary = _TableSummary('', limits)
+        yield from summary.index(csv.reader(csv_file, dialect))
+        structure['sheets'] = [summary.as_dict()]
+
+
+class _TableSummary:
+    """
+    Indexes the rows of one sheet up to the limits, as tab-separated lines
+    under a heading with its name and columns, and summarizes its columns.
+    The first row is taken as the header if all of its cells are text.
+    """
+    
+    def __init__(self, name: str, limits: TableLimits):
+        self.name = name
+        self.limits = limits
+        self.rows = 0
+        self.truncated = False
+        self.header: Optional[List[str]] = None
+        self.columns: List[dict] = []
+    
+    def index(self, rows: Iterable[tuple]) -> Iterator[str]:
+        first = True
+        for row in rows:
+            cells = list(row[:self.limits.columns])
+            while cells and _is_empty(cells[-1]):
+                cells.pop()
+            if not cells:
+                continue
+            
+            if first:
+                first = False
+                if all(isinstance(cell, str) for cell in cells):
+                    self.header = [self._cell_text(cell) for cell in cells]
+                    self.columns = [{'values': 0, 'types': {}} for _ in cells]
+                yield self._heading()
+                if self.header:
+                    continue
+            if self.rows >= self.limits.rows:
+                self.truncated = True
+                break
+            
+            self.rows += 1
+            self._summarize(cells)
+            yield '\t'.join(self._cell_text(cell) for cell in cells) + '\n'
+    
+    def as_dict(self) -> dict:
+        return {
+            'name': self.name,
+            # Rows indexed, which are all of them unless truncated
+            'rows': self.rows,
+            'truncated': self.truncated,
+            'columns': [
+                {'name': self._column_name(index), **column}
+                for index, column in enumerate(self.columns)
+            ],
+        }
+    
+    def _heading(self) -> str:
+        heading = f"{self.name}\n" if self.name else ''
+        if self.header:
+            heading += '\t'.join(self.header) + '\n'
+        return heading
+    
+    def _summarize(self, cells: list) -> None:
+        while len(self.columns) < len(cells):
+            self.columns.append({'values': 0, 'types': {}})
+        for cell, column in zip(cells, self.columns):
+            if _is_empty(cell):
+                continue
+            column['values'] += 1
+            kind = _cell_type(cell)
+            column['types'][kind] = column['types'].get(kind, 0) + 1
+            if kind == 'number':
+                number = float(cell)
+                column['min'] = min(column.get('min', number), number)
+                column['max'] = max(column.get('max', number), number)
+    
+    def _column_name(self, index: int) -> str:
+        if self.header and index < len(self.header):
+            return self.header[index]
+        return _column_letter(index)
+    
+    def _cell_text(self, cell) -> str:
+        if cell is None:
+            return ''
+        if isinstance(cell, (date, time_of_day)):
+            return cell.isoformat()
+        return str(cell).replace('\t', ' ').replace('\n', ' ')[:self.limits.cell_chars]
+
+
+def _is_empty(cell) -> bool:
+    return cell is None or (isinstance(cell, str) and not cell.strip())
+
+
+def _cell_type(cell) -> str:
+    if isinstance(cell, bool):
+        return 'boolean'
+    if isinstance(cell, (date, time_of_day)):
+        return 'date'
+    try:
+        # CSV cells are all text
+        return 'number' if math.isfinite(float(cell)) else 'text'
+    except (TypeError, ValueError):
+        return 'text'
+
+
+def _column_letter(index: int) -> str:
+    """Spreadsheet letter of the column at a zero-based index: A, B, ..., Z, AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+# Extractors by file type, yielding the text of a local file piece by piece
+EXTRACTORS: Dict[str, Callable[[str, Optional[range], TableLimits, dict], Iterator[str]]] = {
+    'pdf': _iter_pdf,
+    'word': _iter_word,
+    'excel': _iter_workbook,
+    'csv': _iter_csv,
+    'text': _iter_text_file,
+}
@@ -0,0 +1,78 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from ...rendering import render_previews
+from ...services.preview_batch_service import available_cores
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure preview rendering throughput in documents per second per core, '
+        'with synthetic photos and no database or storage'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=48)
+        parser.add_argument('--width', type=int, default=4000)
+        parser.add_argument('--height', type=int, default=3000)
+        parser.add_argument(
+            '--processes',
+            type=int,
+            nargs='+',
+            help='Process counts to compare; 1 and every available core by default'
+        )
+    
+    def handle(self, *args, **options):
+        cores = available_cores()
+        counts = options['processes'] or sorted({1, cores})
+        options_for_render = {
+            'formats': settings.DOCUMENTS_PREVIEW_FORMATS,
+            'quality': settings.DOCUMENTS_PREVIEW_QUALITY,
+            'max_pixels': settings.DOCUMENTS_PREVIEW_MAX_PIXELS,
+        }
+        
+        with tempfile.TemporaryDirectory() as directory:
+            paths = self._sources(directory, options['documents'], (options['width'], options['height']))
+            self.stdout.write(
+                f"{len(paths)} JPEGs of {options['width']}x{options['height']} to sizes "
+                f"{settings.DOCUMENTS_PREVIEW_EAGER_SIZES} as {settings.DOCUMENTS_PREVIEW_FORMATS}, "
+                f"{cores} cores available"
+            )
+            
+            for processes in counts:
+                with ProcessPoolExecutor(max_workers=processes) as executor:
+                    # Start the processes before timing
+                    list(executor.map(abs, range(processes)))
+                    
+                    started = time.monotonic()
+                    list(executor.map(
+                        render_previews,
+                        paths,
+                        ['image'] * len(paths),
+                        [settings.DOCUMENTS_PREVIEW_EAGER_SIZES] * len(paths),
+                        *([value] * len(paths) for value in options_for_render.values())
+                    ))
+                    elapsed = time.monotonic() - started
+                
+                rate = len(paths) / elapsed
+                self.stdout.write(
+                    f"{processes:>3} processes: {rate:7.1f} documents/s, "
+                    f"{rate / min(processes, cores):6.1f} documents/s per core"
+                )
+    
+    def _sources(self, directory: str, count: int, size) -> list:
+        """Write distinct photo-like JPEGs, noise over a gradient, so none compress trivially"""
+        base = Image.linear_gradient('L').resize(size).convert('RGB')
+        paths = []
+        for index in range(count):
+            noise = Image.effect_noise(size, 40 + index % 20).convert('RGB')
+            path = os.path.join(directory, f"{index}.jpg")
+            Image.blend(base, noise, 0.5).save(path, 'JPEG', quality=90)
+            paths.append(path)
+        return paths
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from ...scanning import StandInClamd
+
+
+class Command(BaseCommand):
+    help = 'Serve a clamd stand-in for local development without ClamAV'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--address',
+            default='tcp://127.0.0.1:3310',
+            help="Address to listen on, 'tcp://host:port' or 'unix:///path'"
+        )
+    
+    def handle(self, *args, **options):
+        standin = StandInClamd(options['address'])
+        self.stdout.write(
+            f"clamd stand-in on {options['address']}; "
+            f"set DOCUMENTS_CLAMD_ADDRESS to it. Only the EICAR test file is detected."
+        )
+        standin.serve_forever()
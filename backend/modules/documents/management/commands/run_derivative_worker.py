@@ -0,0 +1,45 @@
+from concurrent.futures import ProcessPoolExecutor
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...services.preview_batch_service import PreviewBatchService, available_cores
+
+
+class Command(BaseCommand):
+    help = 'Render previews of uploaded documents in batches, on every available core'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.DOCUMENTS_DERIVATIVE_BATCH_SIZE)
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.DOCUMENTS_DERIVATIVE_PROCESSES,
+            help='Render processes; one per available core when 0'
+        )
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds to wait when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once no documents are waiting')
+    
+    def handle(self, *args, **options):
+        processes = options['processes'] or available_cores()
+        self.stdout.write(f"Rendering previews with {processes} processes")
+        
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            service = PreviewBatchService(executor)
+            while True:
+                documents = service.claim(options['batch_size'])
+                if not documents:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+                
+                started = time.monotonic()
+                result = service.process(documents)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{result.completed} documents, {result.previews} previews, "
+                    f"{len(result.failed)} failed in {elapsed:.1f}s "
+                    f"({result.completed / elapsed / processes:.2f} documents/s per core)"
+                )
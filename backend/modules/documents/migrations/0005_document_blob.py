@@ -0,0 +1,89 @@
+# Generated by Django 5.1.3 on 2026-10-19 03:52
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+        ("documents", "0004_upload_session"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="content_sha256",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name="document",
+            name="s3_key",
+            field=models.CharField(db_index=True, max_length=500),
+        ),
+        migrations.CreateModel(
+            name="DocumentBlob",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64)),
+                ("s3_key", models.CharField(max_length=500, unique=True)),
+                ("s3_bucket", models.CharField(max_length=255)),
+                ("size", models.BigIntegerField()),
+                ("content_type", models.CharField(blank=True, max_length=100)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(app_label)s_%(class)s_created",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="%(app_label)s_%(class)s_set",
+                        to="core.account",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "documents_blobs",
+            },
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="documents",
+                to="documents.documentblob",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="documentblob",
+            index=models.Index(
+                fields=["ref_count", "updated_at"], name="documents_b_ref_cou_9a069e_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="documentblob",
+            unique_together={("tenant", "sha256")},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-19 04:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+        ("documents", "0005_document_blob"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="last_accessed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="storage_tier",
+            field=models.CharField(
+                choices=[("hot", "Hot"), ("cold", "Cold")], default="hot", max_length=10
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["storage_tier", "last_accessed_at"], name="documents_d_storage_ca9bdb_idx"
+            ),
+        ),
+    ]
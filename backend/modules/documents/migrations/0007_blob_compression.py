@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ("documents", "0006_document_storage_tier"),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name="documentblob",
+            name="encoding",
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddField(
+            model_name="documentblob",
+            name="stored_size",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
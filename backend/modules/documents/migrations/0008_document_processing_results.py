@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ("documents", "0007_blob_compression"),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="extracted_text",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="is_quarantined",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="quarantine_reason",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="text_extracted",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="text_extracted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="thumbnail_s3_key",
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="virus_scanned",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="virus_scanned_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ("documents", "0008_document_processing_results"),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="processed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="processing_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("completed", "Completed"),
+                    ("partial", "Completed with failed stages"),
+                    ("quarantined", "Quarantined"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ("documents", "0009_document_processing_status"),
+    ]
+    
+    operations = [
+        migrations.RemoveField(
+            model_name="document",
+            name="thumbnail_s3_key",
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="previews_generated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
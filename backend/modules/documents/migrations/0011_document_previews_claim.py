@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ("core", "0001_initial"),
+        ("documents", "0010_document_previews"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="previews_claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                condition=models.Q(("previews_generated_at__isnull", True)),
+                fields=["created_at"],
+                name="documents_previews_pending",
+            ),
+        ),
+    ]
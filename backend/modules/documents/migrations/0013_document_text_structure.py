@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ("documents", "0012_document_text_chunks"),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="text_structure",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
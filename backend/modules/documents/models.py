@@ -73,6 +73,62 @@ class Folder(TenantBaseModel):
         return descendants
 
 
+class DocumentBlob(TenantBaseModel):
+    """Content-addressed stored object shared by identical uploads"""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sha256 = models.CharField(max_length=64)
+    s3_key = models.CharField(max_length=500, unique=True)
+    s3_bucket = models.CharField(max_length=255)
+    size = models.BigIntegerField()  # Size in bytes
+    content_type = models.CharField(max_length=100, blank=True)
+    
+    # Content stored compressed: the encoding, and the size of the stored object
+    encoding = models.CharField(max_length=10, blank=True)
+    stored_size = models.BigIntegerField(null=True, blank=True)
+    
+    # Number of non-archived documents pointing at this blob
+    ref_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'documents_blobs'
+        unique_together = [['tenant', 'sha256']]
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at']),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+# File types by the extensions and MIME type fragments that identify them, in match order
+FILE_TYPE_RULES = [
+    ('word', ('doc', 'docx'), ('word',)),
+    ('excel', ('xls', 'xlsx'), ('excel', 'spreadsheet')),
+    ('pdf', ('pdf',), ('pdf',)),
+    ('image', ('jpg', 'jpeg', 'png', 'gif', 'bmp', 'svg'), ('image',)),
+    ('csv', ('csv',), ('csv',)),
+    ('text', ('txt', 'md'), ('text',)),
+]
+
+
+def file_type_for(file_extension: str, mime_type: str) -> str:
+    """
+    Classify a file by its MIME type, or by its extension when the type does
+    not tell. Uploads record the type detected from their content.
+    """
+    mime = mime_type.lower()
+    for file_type, _, fragments in FILE_TYPE_RULES:
+        if any(fragment in mime for fragment in fragments):
+            return file_type
+    
+    ext = file_extension.lower().lstrip('.')
+    for file_type, extensions, _ in FILE_TYPE_RULES:
+        if ext in extensions:
+            return file_type
+    return 'generic'
+
+
 class Document(TenantBaseModel):
     """Document metadata with S3 storage references"""
     
@@ -105,14 +161,59 @@ class Document(TenantBaseModel):
     file_extension = models.CharField(max_length=10)
     
     # S3 storage references
-    s3_key = models.CharField(max_length=500, unique=True)
+    # Documents with identical content share a blob and therefore its key
+    s3_key = models.CharField(max_length=500, db_index=True)
     s3_bucket = models.CharField(max_length=255)
     s3_version_id = models.CharField(max_length=255, blank=True, null=True)
+    blob = models.ForeignKey(
+        DocumentBlob,
+        on_delete=models.PROTECT,
+        related_name='documents',
+        null=True,
+        blank=True
+    )
+    content_sha256 = models.CharField(max_length=64, blank=True)
+    
+    # Storage tiering: objects nobody opened for a while move to the cold tier
+    STORAGE_TIER_CHOICES = [
+        ('hot', 'Hot'),
+        ('cold', 'Cold'),
+    ]
+    storage_tier = models.CharField(max_length=10, choices=STORAGE_TIER_CHOICES, default='hot')
+    last_accessed_at = models.DateTimeField(null=True, blank=True)
     
     # Additional metadata
     is_archived = models.BooleanField(default=False)
     archived_at = models.DateTimeField(null=True, blank=True)
     
+    # Results of processing the uploaded content
+    virus_scanned = models.BooleanField(default=False)
+    virus_scanned_at = models.DateTimeField(null=True, blank=True)
+    is_quarantined = models.BooleanField(default=False)
+    quarantine_reason = models.CharField(max_length=255, blank=True)
+    # Previews are stored under keys derived from the content (PreviewService)
+    previews_generated_at = models.DateTimeField(null=True, blank=True)
+    # Claimed by a derivative worker (run_derivative_worker) rendering its previews
+    previews_claimed_at = models.DateTimeField(null=True, blank=True)
+    # The start of the extracted text; all of it is in text_chunks
+    extracted_text = models.TextField(blank=True)
+    # Sheets and columns of spreadsheets and CSV files (TextExtractionService)
+    text_structure = models.JSONField(default=dict, blank=True)
+    text_extracted = models.BooleanField(default=False)
+    text_extracted_at = models.DateTimeField(null=True, blank=True)
+    
+    # Processing as a whole, recorded once every stage has finished
+    PROCESSING_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('partial', 'Completed with failed stages'),
+        ('quarantined', 'Quarantined'),
+        ('failed', 'Failed'),
+    ]
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_STATUS_CHOICES, default='pending')
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
     # Search optimization
     search_vector = models.TextField(blank=True)  # For full-text search
     
@@ -130,6 +231,13 @@ class Document(TenantBaseModel):
             models.Index(fields=['created_by']),
             models.Index(fields=['file_type']),
             models.Index(fields=['is_archived']),
+            models.Index(fields=['storage_tier', 'last_accessed_at']),
+            # Documents derivative workers still have to preview
+            models.Index(
+                fields=['created_at'],
+                name='documents_previews_pending',
+                condition=models.Q(previews_generated_at__isnull=True)
+            ),
         ]
     
     def __str__(self) -> str:
@@ -144,45 +252,72 @@ class Document(TenantBaseModel):
         name_without_ext = self.original_name.rsplit('.', 1)[0] if '.' in self.original_name else self.original_name
         return name_without_ext
     
-    def get_s3_url(self, expiration: int = 3600) -> str:
-        """Generate pre-signed S3 URL for download"""
-        # TODO: Implement proper S3 presigned URL generation
-        # For now, return a mock URL for testing
+    def get_s3_url(self) -> str:
+        """Get a pre-signed S3 URL for download; callers check permissions"""
+        from .services.presigned_url_service import PresignedUrlService
+        
         if self.s3_key:
-            return f"http://localhost:9000/{self.s3_bucket}/{self.s3_key}"
+            return PresignedUrlService().get_url(self) or ""
         return ""
     
     def determine_file_type(self) -> str:
-        """Determine file type based on extension and mime type"""
-        ext = self.file_extension.lower()
-        mime = self.mime_type.lower()
-        
-        if ext in ['doc', 'docx'] or 'word' in mime:
-            return 'word'
-        elif ext in ['xls', 'xlsx'] or 'excel' in mime or 'spreadsheet' in mime:
-            return 'excel'
-        elif ext == 'pdf' or 'pdf' in mime:
-            return 'pdf'
-        elif ext in ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'svg'] or 'image' in mime:
-            return 'image'
-        elif ext == 'csv' or 'csv' in mime:
-            return 'csv'
-        elif ext in ['txt', 'md'] or 'text' in mime:
-            return 'text'
-        else:
-            return 'generic'
+        """Determine file type based on mime type and extension"""
+        return file_type_for(self.file_extension, self.mime_type)
     
-    def save(self, *args, **kwargs):
-        """Auto-determine file type before saving"""
+    def populate_derived_fields(self) -> None:
+        """Fill fields computed from the file metadata; bulk_create skips save()"""
         if not self.file_type or self.file_type == 'generic':
             self.file_type = self.determine_file_type()
         
         # Update search vector for full-text search
         self.search_vector = f"{self.original_name} {self.nickname} {self.description}".lower()
-        
+    
+    def save(self, *args, **kwargs):
+        """Auto-determine file type before saving"""
+        self.populate_derived_fields()
         super().save(*args, **kwargs)
 
 
+class DocumentTextChunk(TenantBaseModel):
+    """Extracted text of a document, stored in order in chunks of DOCUMENTS_EXTRACTION_CHUNK_SIZE characters"""
+    
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='text_chunks')
+    position = models.PositiveIntegerField()
+    text = models.TextField()
+    
+    class Meta:
+        db_table = 'documents_text_chunks'
+        ordering = ['document', 'position']
+        unique_together = [['document', 'position']]
+    
+    def __str__(self) -> str:
+        return f"{self.document_id} #{self.position}"
+
+
+class ProcessingResult(TenantBaseModel):
+    """
+    Result of a processing stage for content, reused by later processing of
+    the same content until the stage's version changes
+    """
+    
+    STAGE_CHOICES = [
+        ('scan', 'Virus scan'),
+        ('previews', 'Previews'),
+        ('text', 'Text extraction'),
+    ]
+    sha256 = models.CharField(max_length=64)
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
+    version = models.PositiveIntegerField()
+    result = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        db_table = 'documents_processing_results'
+        unique_together = [['tenant', 'sha256', 'stage', 'version']]
+    
+    def __str__(self) -> str:
+        return f"{self.sha256[:12]} {self.stage} v{self.version}"
+
+
 class DocumentShare(TenantBaseModel):
     """Sharing relationships between users for documents"""
     
@@ -308,6 +443,76 @@ class ShareNotification(TenantBaseModel):
         self.save()
 
 
+class UploadSession(TenantBaseModel):
+    """Resumable chunked upload backed by an S3 multipart upload"""
+    
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+        ('expired', 'Expired'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    folder = models.ForeignKey(
+        Folder,
+        on_delete=models.SET_NULL,
+        related_name='upload_sessions',
+        null=True,
+        blank=True
+    )
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.SET_NULL,
+        related_name='upload_session',
+        null=True,
+        blank=True
+    )
+    
+    # Target file metadata (declared by the client up front)
+    original_name = models.CharField(max_length=255)
+    nickname = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    mime_type = models.CharField(max_length=100)
+    file_size = models.BigIntegerField()
+    part_size = models.BigIntegerField()
+    
+    # S3 multipart upload references
+    s3_key = models.CharField(max_length=500, unique=True)
+    s3_bucket = models.CharField(max_length=255)
+    upload_id = models.CharField(max_length=1024)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'documents_upload_sessions'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', 'status']),
+            models.Index(fields=['status', 'expires_at']),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.original_name} ({self.status})"
+    
+    @property
+    def total_parts(self) -> int:
+        """Number of parts the file is split into"""
+        return max(1, -(-self.file_size // self.part_size))
+    
+    def expected_part_size(self, part_number: int) -> int:
+        """Size in bytes the given part must have"""
+        if part_number < self.total_parts:
+            return self.part_size
+        return self.file_size - self.part_size * (self.total_parts - 1)
+    
+    def is_expired(self) -> bool:
+        """Check if the session has passed its expiry time"""
+        return timezone.now() > self.expires_at
+
+
 class FolderUserState(TenantBaseModel):
     """Track user-specific folder states (expanded/collapsed)"""
     
@@ -0,0 +1,144 @@
+"""
+Rendering of preview images.
+
+Nothing here touches Django, the database or storage, so renders can run in
+worker processes of a process pool; callers pass settings in and store the
+encoded images themselves. Each source is decoded once for every size, JPEGs
+at the smallest scale that still covers the largest size, and sources that
+would decode to more than max_pixels are skipped, so memory stays bounded
+however large the upload. Sources that cannot be rendered raise a RenderError
+saying whether their format is unsupported or their content is unreadable.
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+import io
+import logging
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Version of the previews rendered, stored for content (ProcessingResultService);
+# bump it when they change so stored content is rendered again
+RENDER_VERSION = 1
+
+# Pillow format, content type and key extension of each preview format
+PREVIEW_FORMATS = {
+    'webp': ('WEBP', 'image/webp', 'webp'),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+}
+
+
+class RenderError(Exception):
+    """Raised when a source cannot be rendered; rendering it again will not help"""
+
+
+class UnsupportedSource(RenderError):
+    """Raised for sources in a format the renderer cannot read"""
+
+
+class UnreadableSource(RenderError):
+    """Raised for sources that are truncated, malformed or would decode too large"""
+
+
+@dataclass
+class RenderedPreviewDTO:
+    """An encoded preview, not stored yet"""
+    size: int
+    format: str
+    content: bytes
+
+
+def render_previews(
+    path: str,
+    file_type: str,
+    sizes: List[int],
+    formats: List[str],
+    quality: int,
+    max_pixels: int
+) -> List[RenderedPreviewDTO]:
+    """
+    Render a local image or PDF at each size (longest side in pixels) in each
+    format. Returns nothing for sources too large to preview. Raises
+    UnsupportedSource or UnreadableSource for sources that cannot be rendered.
+    """
+    if not sizes:
+        return []
+    
+    try:
+        image = _open(path, file_type, max(sizes), max_pixels)
+        if image is None:
+            return []
+        
+        rendered = []
+        try:
+            # Each size is reduced from the one before, largest first
+            for size in sorted(sizes, reverse=True):
+                image.thumbnail((size, size))
+                for file_format in formats:
+                    rendered.append(RenderedPreviewDTO(size, file_format, _encode(image, file_format, quality)))
+        finally:
+            image.close()
+        return rendered
+    
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        # Pillow decodes lazily, so truncated or malformed data only fails
+        # once pixels are read, with either error
+        raise UnreadableSource(f"Could not decode {path}: {str(e)}") from e
+
+
+def _open(path: str, file_type: str, largest: int, max_pixels: int) -> Optional[Image.Image]:
+    """Decode the source no larger than needed for the largest size, as RGB or RGBA"""
+    if file_type == 'pdf':
+        # Rasterize only the first page, with its longest side at the largest size
+        from pdf2image import convert_from_path
+        from pdf2image.exceptions import PDFInfoNotInstalledError, PDFPageCountError, PDFSyntaxError
+        try:
+            pages = convert_from_path(path, first_page=1, last_page=1, size=largest)
+        except PDFInfoNotInstalledError as e:
+            raise UnsupportedSource("Rendering PDFs needs poppler, which is not installed") from e
+        except (PDFPageCountError, PDFSyntaxError) as e:
+            raise UnreadableSource(f"Could not read {path}: {str(e)}") from e
+        return pages[0] if pages else None
+    
+    try:
+        image = Image.open(path)
+    except Image.DecompressionBombError as e:
+        logger.warning(f"Not previewing {path}: {str(e)}")
+        return None
+    except UnidentifiedImageError as e:
+        raise UnsupportedSource(f"Could not identify {path} as an image") from e
+    
+    if image.format == 'JPEG':
+        # The decoder scales by 1/2 to 1/8 while decoding, so only the
+        # reduced image is ever held in memory
+        image.draft('RGB', (largest, largest))
+    
+    if image.width * image.height > max_pixels:
+        logger.warning(f"Not previewing {path}: {image.width}x{image.height} pixels")
+        image.close()
+        return None
+    
+    transposed = ImageOps.exif_transpose(image)
+    if transposed is not image:
+        image.close()
+    
+    mode = 'RGBA' if transposed.has_transparency_data else 'RGB'
+    if transposed.mode == mode:
+        return transposed
+    converted = transposed.convert(mode)
+    transposed.close()
+    return converted
+
+
+def _encode(image: Image.Image, file_format: str, quality: int) -> bytes:
+    pil_format = PREVIEW_FORMATS[file_format][0]
+    if pil_format == 'JPEG' and image.mode == 'RGBA':
+        # JPEG has no alpha channel; transparent areas become white
+        flattened = Image.new('RGB', image.size, 'white')
+        flattened.paste(image, mask=image.getchannel('A'))
+        image = flattened
+    
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, quality=quality)
+    return buffer.getvalue()
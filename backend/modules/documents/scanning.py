@@ -0,0 +1,311 @@
+"""
+Virus scanning with clamd.
+
+Content is streamed to clamd with the INSTREAM command in length-prefixed
+chunks, so workers share no filesystem with the daemon and nothing is written
+to disk for a scan. Each worker thread keeps its clamd connection open in an
+IDSESSION session and reuses it from one scan to the next, replacing it before
+clamd would drop it as idle.
+
+StandInClamd speaks the same protocol for tests and local development without
+the daemon; `manage.py run_clamd_standin` serves one.
+"""
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+import os
+import socket
+import struct
+import threading
+import time
+
+from django.conf import settings
+
+# Version of the verdicts stored for content (ProcessingResultService); bump it to
+# scan all content again
+SCAN_VERSION = 1
+
+# Replace session connections idle this long, below clamd's default IdleTimeout of 30s
+SESSION_IDLE_TIMEOUT = 25  # seconds
+
+# Standard antivirus test file, which every scanner reports
+EICAR_SIGNATURE = b'X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*'
+
+
+class ClamdError(RuntimeError):
+    """Raised when clamd cannot be reached or cannot scan the content"""
+
+
+class ClamdStreamRefused(ClamdError):
+    """
+    Raised when clamd will not scan content, such as content larger than its
+    StreamMaxLength; there is no verdict, and scanning again will not give one
+    """
+
+
+@dataclass
+class ScanResultDTO:
+    """Outcome of scanning one stream"""
+    infected: bool
+    signature: Optional[str] = None
+
+
+def parse_address(address: str) -> Tuple[int, object]:
+    """Socket family and address of 'unix:///path/to/clamd.ctl' or 'tcp://host:port'"""
+    parsed = urlparse(address)
+    if parsed.scheme == 'unix':
+        return socket.AF_UNIX, parsed.path
+    if parsed.scheme == 'tcp':
+        port = 3310 if parsed.port is None else parsed.port
+        return socket.AF_INET, (parsed.hostname, port)
+    raise ValueError(f"Unsupported clamd address: {address}")
+
+
+class ClamdClient:
+    """Connection to clamd that scans streams within one reused session"""
+    
+    def __init__(self, address: str, timeout: float = 60, stream_max_length: Optional[int] = None):
+        self.address = address
+        self.timeout = timeout
+        # clamd's StreamMaxLength; longer content is refused without sending it
+        self.stream_max_length = stream_max_length
+        self._socket = None
+        self._buffer = b''
+        self._last_used = 0.0
+    
+    def scan_stream(self, chunks: Iterable[bytes]) -> ScanResultDTO:
+        """
+        Stream content to clamd and return the verdict. Raises ClamdError if
+        clamd cannot be reached, and ClamdStreamRefused if it refuses the
+        stream, for example when it is larger than clamd's StreamMaxLength.
+        """
+        sent = 0
+        try:
+            sock = self._session()
+            sock.sendall(b'zINSTREAM\0')
+            for chunk in chunks:
+                if chunk:
+                    sent += len(chunk)
+                    if self.stream_max_length and sent > self.stream_max_length:
+                        raise ClamdStreamRefused(f"Content is larger than {self.stream_max_length} bytes, clamd's limit")
+                    sock.sendall(struct.pack('!L', len(chunk)))
+                    sock.sendall(chunk)
+            sock.sendall(struct.pack('!L', 0))
+            reply = self._reply()
+        
+        except OSError as e:
+            self.close()
+            raise ClamdError(f"clamd at {self.address} failed: {e}") from e
+        except Exception:
+            # Reading the content failed, or it ran past the limit, mid-stream,
+            # which leaves the session unusable
+            self.close()
+            raise
+        
+        self._last_used = time.monotonic()
+        if reply.endswith(' FOUND'):
+            return ScanResultDTO(infected=True, signature=reply[len('stream: '):-len(' FOUND')])
+        if reply == 'stream: OK':
+            return ScanResultDTO(infected=False)
+        self.close()
+        if 'size limit exceeded' in reply:
+            raise ClamdStreamRefused(f"clamd at {self.address} refused the stream: {reply}")
+        raise ClamdError(f"clamd at {self.address} could not scan: {reply}")
+    
+    def scan_file(self, file: BinaryIO, chunk_size: int = 64 * 1024) -> ScanResultDTO:
+        """Stream a readable file object to clamd"""
+        return self.scan_stream(iter(lambda: file.read(chunk_size), b''))
+    
+    def close(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.sendall(b'zEND\0')
+            except OSError:
+                pass
+            self._socket.close()
+            self._socket = None
+            self._buffer = b''
+    
+    def _session(self) -> socket.socket:
+        if self._socket is not None and time.monotonic() - self._last_used >= SESSION_IDLE_TIMEOUT:
+            self.close()
+        if self._socket is None:
+            family, address = parse_address(self.address)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(address)
+                sock.sendall(b'zIDSESSION\0')
+            except OSError:
+                sock.close()
+                raise
+            self._socket = sock
+        return self._socket
+    
+    def _reply(self) -> str:
+        """Read one NUL-terminated session reply, without its request id"""
+        while b'\0' not in self._buffer:
+            data = self._socket.recv(4096)
+            if not data:
+                raise ConnectionResetError("clamd closed the connection")
+            self._buffer += data
+        reply, self._buffer = self._buffer.split(b'\0', 1)
+        # Replies within a session are prefixed with "<id>: "
+        _, _, result = reply.decode('utf-8', 'replace').partition(': ')
+        return result
+
+
+_clients = threading.local()
+
+
+def clamd_client() -> ClamdClient:
+    """The calling thread's clamd client, reused across scans"""
+    client = getattr(_clients, 'client', None)
+    if client is None or client.address != settings.DOCUMENTS_CLAMD_ADDRESS:
+        if client is not None:
+            client.close()
+        client = _clients.client = ClamdClient(
+            settings.DOCUMENTS_CLAMD_ADDRESS,
+            timeout=settings.DOCUMENTS_CLAMD_TIMEOUT,
+            stream_max_length=settings.DOCUMENTS_CLAMD_STREAM_MAX_LENGTH
+        )
+    return client
+
+
+class StandInClamd:
+    """
+    Local server speaking the clamd commands ClamdClient uses. Content that
+    contains the EICAR test string, or one of the extra signatures, is
+    reported infected; streams beyond stream_max_length are refused like
+    clamd does. Counts connections and scans so reuse can be checked.
+    """
+    
+    def __init__(
+        self,
+        address: str = 'tcp://127.0.0.1:0',
+        signatures: Dict[str, bytes] = None,
+        stream_max_length: int = 25 * 1024 * 1024
+    ):
+        self.address = address
+        self.signatures = {'Eicar-Test-Signature': EICAR_SIGNATURE, **(signatures or {})}
+        self.stream_max_length = stream_max_length
+        self.connections = 0
+        self.scans = 0
+        self._server = None
+        self._lock = threading.Lock()
+    
+    def __enter__(self) -> 'StandInClamd':
+        return self.start()
+    
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+    
+    def start(self) -> 'StandInClamd':
+        """Listen on the address; a TCP port of 0 picks a free one"""
+        family, address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.remove(address)
+        self._server = socket.socket(family, socket.SOCK_STREAM)
+        self._server.bind(address)
+        self._server.listen()
+        if family == socket.AF_INET:
+            host, port = self._server.getsockname()
+            self.address = f"tcp://{host}:{port}"
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+    
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+    
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        finally:
+            self.stop()
+    
+    def _accept(self) -> None:
+        server = self._server
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                # Stopped
+                return
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+    
+    def _serve(self, connection: socket.socket) -> None:
+        reader = connection.makefile('rb')
+        session = False
+        request_id = 0
+        try:
+            while True:
+                command = self._command(reader)
+                if command is None:
+                    return
+                request_id += 1
+                prefix = f"{request_id}: " if session else ''
+                
+                if command == 'IDSESSION':
+                    session = True
+                    request_id = 0
+                    continue
+                if command == 'END':
+                    return
+                if command == 'PING':
+                    reply = 'PONG'
+                elif command == 'VERSION':
+                    reply = 'ClamAV stand-in'
+                elif command == 'INSTREAM':
+                    reply = self._instream(reader)
+                else:
+                    reply = 'UNKNOWN COMMAND'
+                
+                connection.sendall(f"{prefix}{reply}\0".encode())
+                if not session or reply.endswith('ERROR'):
+                    return
+        except OSError:
+            return
+        finally:
+            reader.close()
+            connection.close()
+    
+    def _command(self, reader: BinaryIO) -> Optional[str]:
+        """Read a 'z' (NUL-terminated) or 'n' (newline-terminated) command"""
+        style = reader.read(1)
+        if not style:
+            return None
+        terminator = b'\0' if style == b'z' else b'\n'
+        command = b''
+        while True:
+            byte = reader.read(1)
+            if not byte:
+                return None
+            if byte == terminator:
+                return command.decode()
+            command += byte
+    
+    def _instream(self, reader: BinaryIO) -> str:
+        content = bytearray()
+        while True:
+            header = reader.read(4)
+            if len(header) < 4:
+                raise ConnectionResetError("Stream ended early")
+            (length,) = struct.unpack('!L', header)
+            if length == 0:
+                break
+            if len(content) + length > self.stream_max_length:
+                return 'INSTREAM size limit exceeded. ERROR'
+            content += reader.read(length)
+        
+        with self._lock:
+            self.scans += 1
+        for name, signature in self.signatures.items():
+            if signature in content:
+                return f"stream: {name} FOUND"
+        return 'stream: OK'
@@ -0,0 +1,81 @@
+"""
+Scheduling of document tasks.
+
+CELERY_TASK_ROUTES sends document tasks to named queues (processing, scan,
+reports, maintenance), so workers can be started per queue and a backlog of
+one kind of task never waits in front of another; within the processing
+queue, route priorities serve scans ahead of previews and text extraction.
+Within the upload pipeline, each tenant draws from its own token bucket:
+uploads of a tenant beyond its share are put back for later, so one tenant's
+bulk import does not delay every other tenant's uploads. Failed tasks retry
+after jittered exponential backoff.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Longest a task is put back for at once; Redis redelivers tasks held past its
+# visibility timeout, so waits stay well below it
+MAX_DEFER = 5 * 60  # seconds
+
+
+def retry_delay(retries: int) -> float:
+    """
+    Seconds before the next retry of a task that has been retried `retries`
+    times: a random time up to DOCUMENTS_RETRY_BASE_DELAY * 2^retries, capped
+    at DOCUMENTS_RETRY_MAX_DELAY. The jitter spreads out retries of tasks
+    that failed together, such as during a storage outage.
+    """
+    ceiling = min(settings.DOCUMENTS_RETRY_MAX_DELAY, settings.DOCUMENTS_RETRY_BASE_DELAY * 2 ** retries)
+    return random.uniform(0, ceiling)
+
+
+class TenantTokenBucket:
+    """
+    Token buckets per tenant, holding `capacity` tokens that are refilled in
+    full every `window` seconds. Buckets are counters in the cache, taken
+    from with one atomic increment, so every worker shares them. A capacity
+    of 0 never runs out.
+    """
+    
+    def __init__(self, name: str, capacity: int, window: int):
+        self.name = name
+        self.capacity = capacity
+        self.window = window
+    
+    def take(self, tenant_id: str) -> float:
+        """
+        Take a token from the tenant's bucket. Returns 0 if there was one,
+        otherwise the seconds to wait for one. Callers that were turned away
+        are spread over the following windows in the order they arrived.
+        """
+        if not self.capacity:
+            return 0
+        
+        now = time.time()
+        period = int(now // self.window)
+        key = f"documents:tokens:{self.name}:{tenant_id}:{period}"
+        cache.add(key, 0, timeout=self.window * 2)
+        try:
+            taken = cache.incr(key)
+        except ValueError:
+            # Expired in between
+            cache.add(key, 1, timeout=self.window * 2)
+            taken = 1
+        
+        if taken <= self.capacity:
+            return 0
+        windows_ahead = (taken - self.capacity - 1) // self.capacity
+        wait = (period + 1 + windows_ahead) * self.window - now + random.uniform(0, self.window)
+        return min(wait, MAX_DEFER)
+
+
+def processing_bucket() -> TenantTokenBucket:
+    """Bucket of uploads each tenant may start processing"""
+    return TenantTokenBucket(
+        'processing',
+        settings.DOCUMENTS_TENANT_PROCESSING_RATE,
+        settings.DOCUMENTS_TENANT_RATE_WINDOW
+    )
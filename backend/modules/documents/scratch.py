@@ -0,0 +1,93 @@
+"""
+Worker scratch space for document content.
+
+Processing reads a document from a local copy in DOCUMENTS_SCRATCH_DIR rather
+than downloading it for every stage. The copy is kept in a directory named
+after the document, so stages that run on the same host after the virus scan
+reuse the copy it downloaded; stages on other hosts download their own. The
+copy is released when processing ends, and directories left on other hosts or
+by killed workers are swept once older than DOCUMENTS_SCRATCH_MAX_AGE.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+
+from .storage import storage_for_bucket
+
+# How often a process looks for scratch directories left behind
+SWEEP_INTERVAL = 15 * 60  # seconds
+
+_last_sweep = None
+
+
+class DownloadError(RuntimeError):
+    """Raised when a document cannot be copied into scratch space"""
+
+
+def scratch_root() -> str:
+    root = settings.DOCUMENTS_SCRATCH_DIR or os.path.join(tempfile.gettempdir(), 'document-scratch')
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def local_copy(document) -> str:
+    """
+    Return the path of a local copy of a document, downloading it unless a
+    stage on this host already did. Raises DownloadError if it cannot be
+    downloaded.
+    """
+    root = scratch_root()
+    _sweep_due(root)
+    
+    directory = os.path.join(root, str(document.id))
+    path = os.path.join(directory, f"content{document.file_extension}")
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(path):
+        # Keep the copy from being swept while stages still read it
+        os.utime(directory)
+        return path
+    
+    # Downloaded under a temporary name, so stages never read a partial copy
+    fd, partial_path = tempfile.mkstemp(suffix='.part', dir=directory)
+    os.close(fd)
+    try:
+        if not storage_for_bucket(document.s3_bucket).download_file(document.s3_key, partial_path):
+            raise DownloadError(f"Could not download {document.s3_key}")
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return path
+
+
+def release_local_copy(document_id) -> None:
+    """Remove the local copy of a document, if this host has one"""
+    shutil.rmtree(os.path.join(scratch_root(), str(document_id)), ignore_errors=True)
+
+
+def sweep_scratch_space(root: str = None) -> int:
+    """Remove scratch directories older than DOCUMENTS_SCRATCH_MAX_AGE; returns how many"""
+    cutoff = time.time() - settings.DOCUMENTS_SCRATCH_MAX_AGE
+    removed = 0
+    with os.scandir(root or scratch_root()) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+            except FileNotFoundError:
+                # Removed by another process meanwhile
+                continue
+    return removed
+
+
+def _sweep_due(root: str) -> None:
+    global _last_sweep
+    
+    now = time.monotonic()
+    if _last_sweep is None or now - _last_sweep >= SWEEP_INTERVAL:
+        _last_sweep = now
+        sweep_scratch_space(root)
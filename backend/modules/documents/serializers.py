@@ -1,11 +1,13 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from .models import (
     Document, Folder, DocumentShare, 
-    ShareNotification, FolderUserState
+    ShareNotification, FolderUserState, UploadSession
 )
-from typing import List, Dict, Any
+from .services.presigned_url_service import PresignedUrlService
+from typing import List, Dict, Any, Optional
 
 User = get_user_model()
 
@@ -40,6 +42,18 @@ class FolderSerializer(serializers.ModelSerializer):
         return obj.get_full_path()
 
 
+class DocumentListSerializer(serializers.ListSerializer):
+    """List serializer that signs the download URLs of all rows in one batch"""
+    
+    def to_representation(self, data):
+        documents = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        self.context['download_urls'] = PresignedUrlService(
+            request.user if request else None
+        ).get_urls(documents)
+        return super().to_representation(documents)
+
+
 class DocumentSerializer(serializers.ModelSerializer):
     """Serializer for Document model"""
     display_name = serializers.ReadOnlyField()
@@ -54,6 +68,7 @@ class DocumentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Document
+        list_serializer_class = DocumentListSerializer
         fields = [
             'id', 'folder', 'original_name', 'nickname', 'display_name',
             'description', 'file_type', 'mime_type', 'file_size',
@@ -68,9 +83,15 @@ class DocumentSerializer(serializers.ModelSerializer):
             'file_type', 'search_vector'
         ]
     
-    def get_download_url(self, obj) -> str:
-        """Generate pre-signed download URL"""
-        return obj.get_s3_url()
+    def get_download_url(self, obj) -> Optional[str]:
+        """Get the pre-signed download URL, if the user may download the document"""
+        download_urls = self.context.get('download_urls')
+        if download_urls is None:
+            request = self.context.get('request')
+            download_urls = PresignedUrlService(
+                request.user if request else None
+            ).get_urls([obj])
+        return download_urls.get(obj.pk)
     
     def get_folder_path(self, obj) -> str:
         """Get folder path"""
@@ -155,6 +176,107 @@ class DocumentUploadSerializer(serializers.Serializer):
         return []
 
 
+class DocumentBulkUploadSerializer(serializers.Serializer):
+    """Serializer for uploading many files or a ZIP archive at once"""
+    files = serializers.ListField(
+        child=serializers.FileField(),
+        required=False,
+        default=list
+    )
+    archive = serializers.FileField(required=False)
+    folder = serializers.UUIDField(required=False, allow_null=True)
+    
+    def validate(self, attrs):
+        """Require exactly one of files or archive"""
+        if bool(attrs.get('files')) == bool(attrs.get('archive')):
+            raise serializers.ValidationError("Provide either files or an archive")
+        return attrs
+
+
+class DocumentZipDownloadSerializer(serializers.Serializer):
+    """Serializer for downloading a folder or several documents as a ZIP"""
+    folder = serializers.UUIDField(required=False, allow_null=True)
+    documents = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        default=list,
+        max_length=1000
+    )
+    
+    def validate(self, attrs):
+        """Require exactly one of folder or documents"""
+        if bool(attrs.get('folder')) == bool(attrs.get('documents')):
+            raise serializers.ValidationError("Provide either a folder or documents")
+        return attrs
+
+
+class DocumentBulkFilterSerializer(serializers.Serializer):
+    """Serializer for selecting documents by filter instead of by id"""
+    folder = serializers.CharField(required=False)  # Folder id or 'root'
+    name = serializers.CharField(required=False, max_length=255)
+    file_extension = serializers.CharField(required=False, max_length=10)
+    created_before = serializers.DateTimeField(required=False)
+    
+    def validate_folder(self, value):
+        """Accept a folder id or 'root'"""
+        if value == 'root':
+            return value
+        return str(serializers.UUIDField().to_internal_value(value))
+    
+    def validate(self, attrs):
+        """Require at least one criterion so a filter never selects everything by accident"""
+        if not attrs:
+            raise serializers.ValidationError("Provide at least one filter")
+        return attrs
+
+
+class DocumentBulkActionSerializer(serializers.Serializer):
+    """Serializer for archiving or restoring many documents"""
+    ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        allow_empty=False,
+        max_length=settings.DOCUMENTS_BULK_ACTION_MAX_IDS
+    )
+    filter = DocumentBulkFilterSerializer(required=False)
+    
+    def validate(self, attrs):
+        """Require exactly one of ids or filter"""
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide either ids or a filter")
+        return attrs
+
+
+class DocumentBulkMoveSerializer(DocumentBulkActionSerializer):
+    """Serializer for moving many documents into a folder"""
+    folder = serializers.UUIDField(allow_null=True)  # None moves to the root
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """Serializer for starting a resumable upload"""
+    file_name = serializers.CharField(max_length=255)
+    file_size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=100)
+    folder = serializers.UUIDField(required=False, allow_null=True)
+    nickname = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    description = serializers.CharField(required=False, allow_blank=True)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for UploadSession model"""
+    total_parts = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'folder', 'document', 'original_name', 'nickname',
+            'description', 'mime_type', 'file_size', 'part_size',
+            'total_parts', 'status', 'expires_at', 'completed_at',
+            'created_at'
+        ]
+        read_only_fields = fields
+
+
 class DocumentShareSerializer(serializers.ModelSerializer):
     """Serializer for DocumentShare model"""
     document_name = serializers.CharField(
@@ -0,0 +1,102 @@
+from typing import Set
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import Document
+from ..tasks.storage_tasks import change_storage_tier
+
+logger = logging.getLogger(__name__)
+
+# How long an access that started moving a cold object back suppresses others
+WARMING_TIMEOUT = 15 * 60  # seconds
+
+
+class AccessRecorder:
+    """
+    Buffer document accesses in process memory and write them with one
+    UPDATE per flush, so reading a document does not write a row.
+    A flush is due every DOCUMENTS_ACCESS_FLUSH_SIZE documents or
+    DOCUMENTS_ACCESS_FLUSH_INTERVAL seconds, whichever comes first. Besides
+    on access, the interval is checked when any request finishes (see
+    signals), and what is left is written when the process exits.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Set = set()
+        self._flushed_at = time.monotonic()
+    
+    def record(self, document_id) -> None:
+        with self._lock:
+            self._pending.add(document_id)
+            due = len(self._pending) >= settings.DOCUMENTS_ACCESS_FLUSH_SIZE or self._interval_passed()
+            document_ids = self._take() if due else None
+        
+        if document_ids:
+            self._write(document_ids)
+    
+    def flush_due(self) -> None:
+        """Write buffered accesses if the flush interval has passed"""
+        with self._lock:
+            document_ids = self._take() if self._pending and self._interval_passed() else None
+        
+        if document_ids:
+            self._write(document_ids)
+    
+    def flush(self) -> None:
+        """Write buffered accesses now"""
+        with self._lock:
+            document_ids = self._take()
+        
+        if document_ids:
+            self._write(document_ids)
+    
+    def _interval_passed(self) -> bool:
+        return time.monotonic() - self._flushed_at >= settings.DOCUMENTS_ACCESS_FLUSH_INTERVAL
+    
+    def _take(self) -> Set:
+        document_ids, self._pending = self._pending, set()
+        self._flushed_at = time.monotonic()
+        return document_ids
+    
+    @staticmethod
+    def _write(document_ids: Set) -> None:
+        # Access times are only needed to the flush interval
+        Document.objects.all_tenants().filter(pk__in=document_ids).update(last_accessed_at=timezone.now())
+
+
+access_recorder = AccessRecorder()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    """Write the accesses of a process that is shutting down or being recycled"""
+    try:
+        access_recorder.flush()
+    except Exception as e:
+        logger.warning(f"Could not write document accesses at exit: {str(e)}")
+
+
+class AccessService:
+    """Track when documents are opened and bring cold ones back to the hot tier"""
+    
+    @staticmethod
+    def record(document: Document) -> None:
+        """
+        Record that a document was opened. A document in the cold tier stays
+        readable where it is while a background task moves it back.
+        """
+        access_recorder.record(document.pk)
+        
+        if document.storage_tier == 'cold' and cache.add(
+            f"documents:warming:{document.s3_key}",
+            True,
+            timeout=WARMING_TIMEOUT
+        ):
+            change_storage_tier.delay([document.s3_key], 'hot')
@@ -0,0 +1,100 @@
+from collections import Counter
+from typing import List
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Document
+from ..tasks.storage_tasks import sync_archive_storage
+from .blob_service import BlobService
+
+
+class ArchiveService:
+    """
+    Archive and restore documents as metadata changes.
+    Objects stay under their key; storage-side effects run in a background job.
+    """
+    
+    def __init__(self, tenant):
+        self.tenant = tenant
+    
+    def archive(self, document: Document) -> bool:
+        """Archive a document; returns False if it was already archived"""
+        if not self.archive_many([document.pk]):
+            return False
+        
+        document.is_archived = True
+        document.archived_at = timezone.now()
+        return True
+    
+    def restore(self, document: Document) -> bool:
+        """Restore an archived document; returns False if it was not archived"""
+        if not self.restore_many([document.pk]):
+            return False
+        
+        document.is_archived = False
+        document.archived_at = None
+        return True
+    
+    @transaction.atomic
+    def archive_many(self, document_ids: List) -> List:
+        """Archive documents with one UPDATE; returns the ids that were archived"""
+        rows = self._lock(document_ids, is_archived=False)
+        if not rows:
+            return []
+        
+        now = timezone.now()
+        archived_ids = [pk for pk, _ in rows]
+        Document.objects.filter(pk__in=archived_ids).update(
+            is_archived=True,
+            archived_at=now,
+            updated_at=now
+        )
+        
+        BlobService.release_many(Counter(blob_id for _, blob_id in rows if blob_id))
+        self._schedule_storage_sync(archived_ids)
+        return archived_ids
+    
+    @transaction.atomic
+    def restore_many(self, document_ids: List) -> List:
+        """Restore documents with one UPDATE; returns the ids that were restored"""
+        rows = self._lock(document_ids, is_archived=True)
+        if not rows:
+            return []
+        
+        restored_ids = [pk for pk, _ in rows]
+        Document.objects.filter(pk__in=restored_ids).update(
+            is_archived=False,
+            archived_at=None,
+            updated_at=timezone.now()
+        )
+        
+        BlobService.acquire_many(Counter(blob_id for _, blob_id in rows if blob_id))
+        self._schedule_storage_sync(restored_ids)
+        return restored_ids
+    
+    def _lock(self, document_ids: List, is_archived: bool) -> List:
+        """Lock the documents still in the given state, so refcounts match the update"""
+        return list(Document.objects.select_for_update().filter(
+            pk__in=document_ids,
+            tenant=self.tenant,
+            is_archived=is_archived
+        ).values_list('pk', 'blob_id'))
+    
+    def _schedule_storage_sync(self, document_ids: List) -> None:
+        """Queue the optional storage update once the state change is committed"""
+        if not settings.DOCUMENTS_ARCHIVE_SYNC_STORAGE:
+            return
+        
+        batch_size = settings.DOCUMENTS_ARCHIVE_SYNC_BATCH_SIZE
+        batches = [
+            [str(pk) for pk in document_ids[start:start + batch_size]]
+            for start in range(0, len(document_ids), batch_size)
+        ]
+        
+        def queue_batches():
+            for batch in batches:
+                sync_archive_storage.delay(batch)
+        
+        transaction.on_commit(queue_batches)
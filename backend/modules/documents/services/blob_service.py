@@ -0,0 +1,318 @@
+from collections import Counter
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional
+import hashlib
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from ..models import Document, DocumentBlob
+from ..storage import document_storage, storage_for_bucket
+from .preview_service import PreviewService
+from .processing_result_service import ProcessingResultService
+
+
+@dataclass
+class BlobContentDTO:
+    """Content to store through the blob store"""
+    content: bytes
+    content_type: Optional[str] = None
+    metadata: Optional[Dict[str, str]] = None
+
+
+@dataclass
+class StoredBlobDTO:
+    """Result of storing content through the blob store"""
+    blob: DocumentBlob
+    deduplicated: bool
+
+
+@dataclass
+class CompressionSavingsDTO:
+    """Storage saved by compressing content at rest for a tenant"""
+    original_bytes: int
+    stored_bytes: int
+    saved_bytes: int
+    blob_count: int
+
+
+@dataclass
+class StorageSavingsDTO:
+    """Storage saved by deduplication for a tenant"""
+    logical_bytes: int
+    stored_bytes: int
+    saved_bytes: int
+    blob_count: int
+    document_count: int
+
+
+class BlobService:
+    """Content-addressed, reference-counted storage for document content"""
+    
+    def __init__(self, tenant):
+        self.tenant = tenant
+    
+    def store(
+        self,
+        content: bytes,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> StoredBlobDTO:
+        """
+        Store content and take a reference to its blob.
+        Content the tenant already stored is not uploaded again.
+        """
+        sha256 = hashlib.sha256(content).hexdigest()
+        
+        blob = self.acquire_by_hash(sha256)
+        if blob:
+            return StoredBlobDTO(blob=blob, deduplicated=True)
+        
+        # Identical content maps to the same key, so concurrent uploads of the
+        # same file overwrite each other with identical bytes
+        s3_key = document_storage.generate_blob_key(str(self.tenant.id), sha256)
+        upload_result = document_storage.upload_file(
+            content,
+            s3_key,
+            content_type=content_type,
+            metadata=metadata,
+            file_hash=sha256,
+            encoding=document_storage.compression_for(content_type, len(content))
+        )
+        
+        if not upload_result['success']:
+            raise RuntimeError("Failed to upload file to storage")
+        
+        with transaction.atomic():
+            blob, _ = DocumentBlob.objects.get_or_create(
+                tenant=self.tenant,
+                sha256=sha256,
+                defaults={
+                    's3_key': s3_key,
+                    's3_bucket': document_storage.bucket_name,
+                    'size': len(content),
+                    'content_type': content_type or '',
+                    'encoding': upload_result['encoding'],
+                    'stored_size': upload_result['stored_size'],
+                }
+            )
+            self.acquire(blob.pk)
+        
+        blob.refresh_from_db()
+        return StoredBlobDTO(blob=blob, deduplicated=False)
+    
+    def store_many(
+        self,
+        items: List[BlobContentDTO],
+        executor: Executor
+    ) -> List[Optional[StoredBlobDTO]]:
+        """
+        Store a batch of contents and take one reference per item.
+        New content is uploaded concurrently on the executor, once per hash;
+        database writes stay on the calling thread.
+        Returns None in place of items whose upload failed.
+        """
+        hashes = [hashlib.sha256(item.content).hexdigest() for item in items]
+        
+        existing = set(DocumentBlob.objects.filter(
+            tenant=self.tenant,
+            sha256__in=set(hashes)
+        ).values_list('sha256', flat=True))
+        
+        uploads = {}
+        for item, sha256 in zip(items, hashes):
+            if sha256 not in existing and sha256 not in uploads:
+                uploads[sha256] = (item, executor.submit(self._put, item, sha256))
+        
+        new_blobs = []
+        for sha256, (item, future) in uploads.items():
+            try:
+                upload_result = future.result()
+            except Exception:
+                # Connection errors fail the items instead of the whole batch
+                upload_result = {'success': False}
+            
+            if upload_result['success']:
+                new_blobs.append(DocumentBlob(
+                    tenant=self.tenant,
+                    sha256=sha256,
+                    s3_key=document_storage.generate_blob_key(str(self.tenant.id), sha256),
+                    s3_bucket=document_storage.bucket_name,
+                    size=len(item.content),
+                    content_type=item.content_type or '',
+                    encoding=upload_result['encoding'],
+                    stored_size=upload_result['stored_size']
+                ))
+        
+        with transaction.atomic():
+            # Another upload may have created the same blob concurrently
+            DocumentBlob.objects.bulk_create(new_blobs, ignore_conflicts=True)
+            blobs = DocumentBlob.objects.filter(tenant=self.tenant, sha256__in=set(hashes))
+            blobs_by_hash = {blob.sha256: blob for blob in blobs}
+            
+            acquired = set()
+            for sha256, count in Counter(hashes).items():
+                blob = blobs_by_hash.get(sha256)
+                if blob and self.acquire(blob.pk, count):
+                    acquired.add(sha256)
+        
+        return [
+            StoredBlobDTO(blob=blobs_by_hash[sha256], deduplicated=sha256 not in uploads)
+            if sha256 in acquired else None
+            for sha256 in hashes
+        ]
+    
+    def _put(self, item: BlobContentDTO, sha256: str) -> Dict:
+        """Upload content to its content-addressed key"""
+        return document_storage.upload_file(
+            item.content,
+            document_storage.generate_blob_key(str(self.tenant.id), sha256),
+            content_type=item.content_type,
+            metadata=item.metadata,
+            file_hash=sha256,
+            encoding=document_storage.compression_for(item.content_type, len(item.content))
+        )
+    
+    def acquire_by_hash(self, sha256: str) -> Optional[DocumentBlob]:
+        """Take a reference to an existing blob, if the tenant has one"""
+        blob = DocumentBlob.objects.filter(tenant=self.tenant, sha256=sha256).first()
+        if blob and self.acquire(blob.pk):
+            blob.refresh_from_db()
+            return blob
+        return None
+    
+    @staticmethod
+    def acquire(blob_id, count: int = 1) -> bool:
+        """
+        Increment a blob's reference count.
+        Returns False when the blob was garbage collected in the meantime.
+        """
+        updated = DocumentBlob.objects.filter(pk=blob_id).update(
+            ref_count=F('ref_count') + count,
+            updated_at=timezone.now()
+        )
+        return updated > 0
+    
+    @staticmethod
+    def release(blob_id, count: int = 1) -> None:
+        """Decrement a blob's reference count"""
+        DocumentBlob.objects.filter(pk=blob_id, ref_count__gte=count).update(
+            ref_count=F('ref_count') - count,
+            updated_at=timezone.now()
+        )
+    
+    @staticmethod
+    def acquire_many(counts: Dict) -> None:
+        """Increment reference counts of many blobs, keyed by blob id"""
+        for count, blob_ids in BlobService._group_by_count(counts).items():
+            DocumentBlob.objects.filter(pk__in=blob_ids).update(
+                ref_count=F('ref_count') + count,
+                updated_at=timezone.now()
+            )
+    
+    @staticmethod
+    def release_many(counts: Dict) -> None:
+        """Decrement reference counts of many blobs, keyed by blob id"""
+        for count, blob_ids in BlobService._group_by_count(counts).items():
+            DocumentBlob.objects.filter(
+                pk__in=blob_ids,
+                ref_count__gte=count
+            ).update(
+                ref_count=F('ref_count') - count,
+                updated_at=timezone.now()
+            )
+    
+    @staticmethod
+    def _group_by_count(counts: Dict) -> Dict[int, List]:
+        """One UPDATE per distinct count instead of one per blob"""
+        groups = {}
+        for blob_id, count in counts.items():
+            groups.setdefault(count, []).append(blob_id)
+        return groups
+    
+    def storage_savings(self) -> StorageSavingsDTO:
+        """Report bytes saved by deduplication for the tenant"""
+        documents = Document.objects.filter(
+            tenant=self.tenant,
+            blob__isnull=False
+        ).aggregate(total=Sum('file_size'), count=Count('id'))
+        
+        # Each referenced blob once, by id; DISTINCT over sizes would merge
+        # different blobs of the same size
+        blobs = DocumentBlob.objects.filter(
+            tenant=self.tenant,
+            pk__in=Document.objects.filter(tenant=self.tenant, blob__isnull=False).values('blob_id')
+        ).aggregate(total=Sum('size'), count=Count('id'))
+        
+        logical_bytes = documents['total'] or 0
+        stored_bytes = blobs['total'] or 0
+        return StorageSavingsDTO(
+            logical_bytes=logical_bytes,
+            stored_bytes=stored_bytes,
+            saved_bytes=logical_bytes - stored_bytes,
+            blob_count=blobs['count'],
+            document_count=documents['count']
+        )
+    
+    def compression_savings(self) -> CompressionSavingsDTO:
+        """Report bytes saved by storing the tenant's blobs compressed"""
+        totals = DocumentBlob.objects.filter(
+            tenant=self.tenant,
+            stored_size__isnull=False
+        ).exclude(encoding='').aggregate(
+            original=Sum('size'),
+            stored=Sum('stored_size'),
+            count=Count('id')
+        )
+        
+        original_bytes = totals['original'] or 0
+        stored_bytes = totals['stored'] or 0
+        return CompressionSavingsDTO(
+            original_bytes=original_bytes,
+            stored_bytes=stored_bytes,
+            saved_bytes=original_bytes - stored_bytes,
+            blob_count=totals['count']
+        )
+    
+    @staticmethod
+    def collect_garbage(grace_period: timedelta) -> int:
+        """
+        Delete blobs that no document references any more.
+        Only blobs unreferenced for longer than the grace period are removed,
+        so uploads that are about to reference them are not affected.
+        """
+        cutoff = timezone.now() - grace_period
+        candidates = DocumentBlob.objects.all_tenants().filter(
+            ref_count=0,
+            updated_at__lt=cutoff,
+            documents__isnull=True
+        ).values_list('pk', flat=True)
+        
+        collected = 0
+        for blob_id in list(candidates):
+            with transaction.atomic():
+                # Lock the row so a concurrent acquire waits until the object
+                # is gone and then falls back to uploading it again
+                blob = DocumentBlob.objects.all_tenants().select_for_update(
+                    skip_locked=True
+                ).filter(
+                    pk=blob_id,
+                    ref_count=0,
+                    updated_at__lt=cutoff
+                ).first()
+                
+                if not blob or blob.documents.exists():
+                    continue
+                
+                if not storage_for_bucket(blob.s3_bucket).delete_file(blob.s3_key):
+                    continue
+                PreviewService.delete_for_content(str(blob.tenant_id), blob.sha256)
+                ProcessingResultService.delete_for_content(str(blob.tenant_id), blob.sha256)
+                
+                blob.delete()
+                collected += 1
+        
+        return collected
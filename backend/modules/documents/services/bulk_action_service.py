@@ -0,0 +1,272 @@
+from dataclasses import dataclass, field
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Set
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from ..models import Document, Folder
+from .archive_service import ArchiveService
+
+
+@dataclass
+class BulkActionFailureDTO:
+    """Document a bulk action could not be applied to"""
+    id: str
+    error: str
+
+
+@dataclass
+class BulkActionResultDTO:
+    """Outcome of a bulk action"""
+    updated: int = 0
+    failed: List[BulkActionFailureDTO] = field(default_factory=list)
+
+
+class BulkActionService:
+    """
+    Service layer for archiving, restoring and moving many documents at once.
+    Documents are selected by id or by filter and updated in chunks, each chunk
+    with one UPDATE in its own transaction, so selections of any size keep
+    transactions and row locks short.
+    """
+    
+    def __init__(self, tenant):
+        self.tenant = tenant
+    
+    def archive(
+        self,
+        document_ids: Optional[List] = None,
+        filters: Optional[Dict] = None
+    ) -> BulkActionResultDTO:
+        """Archive the selected documents"""
+        return self._run(
+            ArchiveService(self.tenant).archive_many,
+            self._select(filters, is_archived=False),
+            document_ids,
+            "Document is already archived"
+        )
+    
+    def restore(
+        self,
+        document_ids: Optional[List] = None,
+        filters: Optional[Dict] = None
+    ) -> BulkActionResultDTO:
+        """Restore the selected archived documents"""
+        return self._run(
+            ArchiveService(self.tenant).restore_many,
+            self._select(filters, is_archived=True),
+            document_ids,
+            "Document is not archived"
+        )
+    
+    def move(
+        self,
+        folder_id: Optional[str],
+        document_ids: Optional[List] = None,
+        filters: Optional[Dict] = None
+    ) -> BulkActionResultDTO:
+        """Move the selected documents into a folder, or to the root without one"""
+        folder = None
+        if folder_id:
+            folder = self._folders(folder_id).first()
+            if not folder:
+                raise ValueError("Folder not found")
+        
+        return self._run(partial(self._move_many, folder), self._select(filters), document_ids, None)
+    
+    async def aarchive(
+        self,
+        document_ids: Optional[List] = None,
+        filters: Optional[Dict] = None
+    ) -> BulkActionResultDTO:
+        """Async variant of archive, for views served under ASGI"""
+        return await self._arun(
+            ArchiveService(self.tenant).archive_many,
+            self._select(filters, is_archived=False),
+            document_ids,
+            "Document is already archived"
+        )
+    
+    async def arestore(
+        self,
+        document_ids: Optional[List] = None,
+        filters: Optional[Dict] = None
+    ) -> BulkActionResultDTO:
+        """Async variant of restore, for views served under ASGI"""
+        return await self._arun(
+            ArchiveService(self.tenant).restore_many,
+            self._select(filters, is_archived=True),
+            document_ids,
+            "Document is not archived"
+        )
+    
+    async def amove(
+        self,
+        folder_id: Optional[str],
+        document_ids: Optional[List] = None,
+        filters: Optional[Dict] = None
+    ) -> BulkActionResultDTO:
+        """Async variant of move, for views served under ASGI"""
+        folder = None
+        if folder_id:
+            folder = await self._folders(folder_id).afirst()
+            if not folder:
+                raise ValueError("Folder not found")
+        
+        return await self._arun(partial(self._move_many, folder), self._select(filters), document_ids, None)
+    
+    @transaction.atomic
+    def _move_many(self, folder: Optional[Folder], chunk_ids: List) -> List:
+        """Move one chunk; keys do not depend on the folder, so this never touches storage"""
+        moved_ids = list(Document.objects.select_for_update().filter(
+            pk__in=chunk_ids,
+            tenant=self.tenant
+        ).values_list('pk', flat=True))
+        Document.objects.filter(pk__in=moved_ids).update(
+            folder=folder,
+            updated_at=timezone.now()
+        )
+        return moved_ids
+    
+    def _folders(self, folder_id: str) -> QuerySet:
+        return Folder.objects.filter(id=folder_id, tenant=self.tenant)
+    
+    def _select(self, filters: Optional[Dict], **state) -> QuerySet:
+        """Documents matching a filter selection"""
+        queryset = Document.objects.filter(tenant=self.tenant, **state)
+        if not filters:
+            return queryset
+        
+        folder_id = filters.get('folder')
+        if folder_id == 'root':
+            queryset = queryset.filter(folder__isnull=True)
+        elif folder_id:
+            queryset = queryset.filter(folder_id=folder_id)
+        
+        if filters.get('name'):
+            queryset = queryset.filter(original_name__icontains=filters['name'])
+        if filters.get('file_extension'):
+            queryset = queryset.filter(file_extension__iexact=filters['file_extension'])
+        if filters.get('created_before'):
+            queryset = queryset.filter(created_at__lt=filters['created_before'])
+        
+        return queryset
+    
+    def _run(
+        self,
+        apply: Callable[[List], List],
+        selection: QuerySet,
+        document_ids: Optional[List],
+        state_error: Optional[str]
+    ) -> BulkActionResultDTO:
+        """Apply an action chunk by chunk and collect per-document failures"""
+        result = BulkActionResultDTO()
+        
+        if document_ids is None:
+            for chunk_ids in self._iter_selection(selection):
+                result.updated += len(apply(chunk_ids))
+            return result
+        
+        for chunk_ids in self._iter_ids(document_ids):
+            updated_ids = {str(pk) for pk in apply(chunk_ids)}
+            result.updated += len(updated_ids)
+            
+            skipped = [pk for pk in chunk_ids if pk not in updated_ids]
+            if not skipped:
+                continue
+            
+            existing = {str(pk) for pk in self._existing(skipped)}
+            result.failed.extend(self._failures(skipped, existing, state_error))
+        
+        return result
+    
+    async def _arun(
+        self,
+        apply: Callable[[List], List],
+        selection: QuerySet,
+        document_ids: Optional[List],
+        state_error: Optional[str]
+    ) -> BulkActionResultDTO:
+        """
+        Async variant of _run. Selections are read with the async ORM; the
+        async ORM has no transactions, so each chunk's update runs in a
+        worker thread.
+        """
+        apply = sync_to_async(apply)
+        result = BulkActionResultDTO()
+        
+        if document_ids is None:
+            async for chunk_ids in self._aiter_selection(selection):
+                result.updated += len(await apply(chunk_ids))
+            return result
+        
+        for chunk_ids in self._iter_ids(document_ids):
+            updated_ids = {str(pk) for pk in await apply(chunk_ids)}
+            result.updated += len(updated_ids)
+            
+            skipped = [pk for pk in chunk_ids if pk not in updated_ids]
+            if not skipped:
+                continue
+            
+            existing = {str(pk) async for pk in self._existing(skipped)}
+            result.failed.extend(self._failures(skipped, existing, state_error))
+        
+        return result
+    
+    def _existing(self, document_ids: List) -> QuerySet:
+        """Ids of the tenant's documents among document_ids"""
+        return Document.objects.filter(
+            pk__in=document_ids,
+            tenant=self.tenant
+        ).values_list('pk', flat=True)
+    
+    @staticmethod
+    def _failures(skipped: List[str], existing: Set[str], state_error: Optional[str]) -> List[BulkActionFailureDTO]:
+        """Why each skipped document was not updated"""
+        return [
+            BulkActionFailureDTO(
+                id=pk,
+                error=state_error if pk in existing and state_error else "Document not found"
+            )
+            for pk in skipped
+        ]
+    
+    def _iter_ids(self, document_ids: List) -> Iterator[List[str]]:
+        """Split requested ids into chunks, dropping duplicates"""
+        ids = list(dict.fromkeys(str(pk) for pk in document_ids))
+        chunk_size = settings.DOCUMENTS_BULK_ACTION_CHUNK_SIZE
+        for start in range(0, len(ids), chunk_size):
+            yield ids[start:start + chunk_size]
+    
+    def _iter_selection(self, selection: QuerySet) -> Iterator[List]:
+        """Walk a filter selection in primary key order, one chunk at a time"""
+        last_pk = None
+        while True:
+            chunk_ids = list(self._chunk_after(selection, last_pk))
+            if not chunk_ids:
+                return
+            
+            yield chunk_ids
+            last_pk = chunk_ids[-1]
+    
+    async def _aiter_selection(self, selection: QuerySet) -> AsyncIterator[List]:
+        """Async variant of _iter_selection"""
+        last_pk = None
+        while True:
+            chunk_ids = [pk async for pk in self._chunk_after(selection, last_pk)]
+            if not chunk_ids:
+                return
+            
+            yield chunk_ids
+            last_pk = chunk_ids[-1]
+    
+    def _chunk_after(self, selection: QuerySet, last_pk) -> QuerySet:
+        """Ids of the next chunk of a selection, in primary key order"""
+        chunk = selection.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        return chunk.values_list('pk', flat=True)[:settings.DOCUMENTS_BULK_ACTION_CHUNK_SIZE]
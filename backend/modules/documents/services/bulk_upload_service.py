@@ -0,0 +1,288 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import mimetypes
+import os
+import zipfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+
+from ..models import Document, Folder
+from ..sniffing import sniff_content
+from ..storage import document_storage
+from ..tasks.document_tasks import process_uploaded_document
+from .blob_service import BlobContentDTO, BlobService
+
+
+@dataclass
+class BulkUploadResultDTO:
+    """Outcome for a single file of a bulk upload"""
+    path: str
+    status: str  # 'created' or 'failed'
+    document_id: Optional[str] = None
+    deduplicated: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class _BulkUploadItem:
+    """File waiting to be stored; content is read only when it is batched"""
+    path: str
+    name: str
+    folder_path: Tuple[str, ...]
+    size: int
+    content_type: str
+    read: Callable[[], bytes]
+
+
+class BulkUploadService:
+    """Service layer for uploading many documents in one request"""
+    
+    def __init__(self, user, tenant):
+        self.user = user
+        self.tenant = tenant
+        self._folders: Dict[Tuple[str, ...], Optional[Folder]] = {}
+    
+    def upload_files(
+        self,
+        files: List[UploadedFile],
+        folder_id: Optional[str] = None
+    ) -> List[BulkUploadResultDTO]:
+        """Upload several files into one folder"""
+        self._check_file_count(len(files))
+        
+        items = (
+            _BulkUploadItem(
+                path=file.name,
+                name=file.name,
+                folder_path=(),
+                size=file.size,
+                content_type=file.content_type or 'application/octet-stream',
+                read=file.read
+            )
+            for file in files
+        )
+        return self._upload(items, self._get_folder(folder_id))
+    
+    def upload_archive(
+        self,
+        archive: UploadedFile,
+        folder_id: Optional[str] = None
+    ) -> List[BulkUploadResultDTO]:
+        """
+        Expand a ZIP archive into documents, recreating its directories as folders.
+        Entries are decompressed one at a time as they are batched, so the archive
+        is never extracted as a whole.
+        """
+        try:
+            zip_file = zipfile.ZipFile(archive)
+        except zipfile.BadZipFile:
+            raise ValueError("Invalid ZIP archive")
+        
+        with zip_file:
+            entries = [info for info in zip_file.infolist() if not self._is_skipped_entry(info)]
+            self._check_file_count(len(entries))
+            return self._upload(
+                self._iter_archive(zip_file, entries),
+                self._get_folder(folder_id)
+            )
+    
+    def _iter_archive(
+        self,
+        zip_file: zipfile.ZipFile,
+        entries: List[zipfile.ZipInfo]
+    ) -> Iterator[_BulkUploadItem]:
+        """Yield archive entries lazily"""
+        for info in entries:
+            parts = PurePosixPath(info.filename).parts
+            yield _BulkUploadItem(
+                path=info.filename,
+                name=parts[-1],
+                folder_path=tuple(parts[:-1]),
+                size=info.file_size,
+                content_type=mimetypes.guess_type(parts[-1])[0] or 'application/octet-stream',
+                # Bounded by the declared size, which is validated before reading
+                read=lambda info=info: zip_file.read(info)
+            )
+    
+    @staticmethod
+    def _is_skipped_entry(info: zipfile.ZipInfo) -> bool:
+        """Skip directories and OS metadata files"""
+        if info.is_dir():
+            return True
+        parts = PurePosixPath(info.filename).parts
+        return parts[0] == '__MACOSX' or parts[-1].startswith('.')
+    
+    def _check_file_count(self, count: int) -> None:
+        max_files = settings.DOCUMENTS_BULK_UPLOAD_MAX_FILES
+        if count == 0:
+            raise ValueError("No files to upload")
+        if count > max_files:
+            raise ValueError(f"A bulk upload can contain at most {max_files} files")
+    
+    def _upload(
+        self,
+        items: Iterable[_BulkUploadItem],
+        root: Optional[Folder]
+    ) -> List[BulkUploadResultDTO]:
+        """Validate items and store them in batches bounded by count and bytes"""
+        results = []
+        batch = []
+        batch_bytes = 0
+        
+        with ThreadPoolExecutor(max_workers=settings.DOCUMENTS_BULK_UPLOAD_WORKERS) as executor:
+            for item in items:
+                error = self._validate(item)
+                if error:
+                    results.append(BulkUploadResultDTO(path=item.path, status='failed', error=error))
+                    continue
+                
+                content = item.read()
+                sniffed = sniff_content(
+                    content[:settings.DOCUMENTS_SNIFF_SIZE],
+                    os.path.splitext(item.name)[1],
+                    item.content_type
+                )
+                if sniffed.error:
+                    results.append(BulkUploadResultDTO(path=item.path, status='failed', error=sniffed.error))
+                    continue
+                
+                item.content_type = sniffed.mime_type
+                batch.append((item, content))
+                batch_bytes += item.size
+                
+                if (len(batch) >= settings.DOCUMENTS_BULK_UPLOAD_BATCH_SIZE
+                        or batch_bytes >= settings.DOCUMENTS_BULK_UPLOAD_BATCH_BYTES):
+                    results.extend(self._store_batch(batch, root, executor))
+                    batch = []
+                    batch_bytes = 0
+            
+            if batch:
+                results.extend(self._store_batch(batch, root, executor))
+        
+        return results
+    
+    def _validate(self, item: _BulkUploadItem) -> Optional[str]:
+        """Return why an item cannot be uploaded, if it cannot"""
+        if any(part in ('', '..') for part in item.folder_path) or item.path.startswith('/'):
+            return "Invalid file path"
+        
+        file_extension = os.path.splitext(item.name)[1]
+        if len(item.name) > 255 or any(len(part) > 255 for part in item.folder_path):
+            return "File or folder name is too long"
+        if len(file_extension) > 10:
+            return "File extension is too long"
+        
+        is_valid, error_msg = document_storage.validate_file_upload(
+            item.size,
+            file_extension,
+            item.content_type
+        )
+        return error_msg if not is_valid else None
+    
+    @transaction.atomic
+    def _store_batch(
+        self,
+        batch: List[Tuple[_BulkUploadItem, bytes]],
+        root: Optional[Folder],
+        executor: Executor
+    ) -> List[BulkUploadResultDTO]:
+        """Upload a batch concurrently, then insert its documents in one query"""
+        stored_blobs = BlobService(self.tenant).store_many(
+            [
+                BlobContentDTO(
+                    content=content,
+                    content_type=item.content_type,
+                    metadata={
+                        'uploaded_by': str(self.user.id),
+                        'original_name': item.name,
+                        'tenant_id': str(self.tenant.id)
+                    }
+                )
+                for item, content in batch
+            ],
+            executor
+        )
+        
+        results = []
+        documents = []
+        for (item, content), stored in zip(batch, stored_blobs):
+            if not stored:
+                results.append(BulkUploadResultDTO(
+                    path=item.path,
+                    status='failed',
+                    error="Failed to upload file to storage"
+                ))
+                continue
+            
+            document = Document(
+                tenant=self.tenant,
+                folder=self._resolve_folder(root, item.folder_path),
+                original_name=item.name,
+                file_size=len(content),
+                file_extension=os.path.splitext(item.name)[1],
+                mime_type=item.content_type,
+                s3_key=stored.blob.s3_key,
+                s3_bucket=stored.blob.s3_bucket,
+                blob=stored.blob,
+                content_sha256=stored.blob.sha256,
+                created_by=self.user
+            )
+            document.populate_derived_fields()
+            documents.append(document)
+            results.append(BulkUploadResultDTO(
+                path=item.path,
+                status='created',
+                document_id=str(document.id),
+                deduplicated=stored.deduplicated
+            ))
+        
+        Document.objects.bulk_create(documents)
+        
+        tenant_id = str(self.tenant.id)
+        task_args = [(str(document.id), tenant_id) for document in documents]
+        if task_args:
+            # One broker message per chunk instead of one per document
+            transaction.on_commit(
+                lambda: process_uploaded_document.chunks(
+                    task_args,
+                    settings.DOCUMENTS_BULK_TASK_BATCH_SIZE
+                ).apply_async()
+            )
+        
+        return results
+    
+    def _get_folder(self, folder_id: Optional[str]) -> Optional[Folder]:
+        if not folder_id:
+            return None
+        
+        folder = Folder.objects.filter(id=folder_id, tenant=self.tenant).first()
+        if not folder:
+            raise ValueError("Folder not found")
+        return folder
+    
+    def _resolve_folder(
+        self,
+        root: Optional[Folder],
+        folder_path: Tuple[str, ...]
+    ) -> Optional[Folder]:
+        """Get or create the folder for an archive directory, caching each level"""
+        if folder_path in self._folders:
+            return self._folders[folder_path]
+        
+        if not folder_path:
+            folder = root
+        else:
+            parent = self._resolve_folder(root, folder_path[:-1])
+            folder, _ = Folder.objects.get_or_create(
+                tenant=self.tenant,
+                parent=parent,
+                name=folder_path[-1],
+                defaults={'created_by': self.user}
+            )
+        
+        self._folders[folder_path] = folder
+        return folder
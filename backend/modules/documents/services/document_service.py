@@ -2,11 +2,13 @@ from dataclasses import dataclass
 from typing import List, Optional, BinaryIO
 from django.db import transaction
 from django.core.files.uploadedfile import UploadedFile
-import uuid
 import os
 
 from ..models import Document, Folder, DocumentShare, ShareNotification
+from ..sniffing import read_head, sniff_content
 from ..storage import document_storage
+from .archive_service import ArchiveService
+from .blob_service import BlobService
 
 
 @dataclass
@@ -92,28 +94,24 @@ class DocumentService:
         if not is_valid:
             raise ValueError(error_msg)
         
-        # Generate document ID and S3 key
-        document_id = str(uuid.uuid4())
-        s3_key = document_storage.generate_s3_key(
-            str(self.tenant.id),
-            dto.file.name,
-            document_id
-        )
+        # The real type comes from the content rather than the client
+        sniffed = sniff_content(read_head(dto.file), file_extension, dto.file.content_type)
+        if sniffed.error:
+            raise ValueError(sniffed.error)
         
-        # Upload to S3
+        # Store content once per tenant; identical files share a blob
         file_content = dto.file.read()
-        upload_result = document_storage.upload_file(
-            file_content,
-            s3_key,
-            content_type=dto.file.content_type,
-            metadata={
-                'uploaded_by': str(self.user.id),
-                'original_name': dto.file.name,
-                'tenant_id': str(self.tenant.id)
-            }
-        )
-        
-        if not upload_result['success']:
+        try:
+            stored = BlobService(self.tenant).store(
+                file_content,
+                content_type=sniffed.mime_type,
+                metadata={
+                    'uploaded_by': str(self.user.id),
+                    'original_name': dto.file.name,
+                    'tenant_id': str(self.tenant.id)
+                }
+            )
+        except RuntimeError:
             raise Exception("Failed to upload file to storage")
         
         # Get folder if specified
@@ -126,7 +124,6 @@ class DocumentService:
         
         # Create document record
         document = Document.objects.create(
-            id=document_id,
             tenant=self.tenant,
             folder=folder,
             original_name=dto.file.name,
@@ -134,10 +131,11 @@ class DocumentService:
             description=dto.description or '',
             file_size=dto.file.size,
             file_extension=file_extension,
-            mime_type=dto.file.content_type,
-            s3_key=s3_key,
-            s3_bucket=document_storage.bucket_name,
-            s3_version_id=upload_result.get('version_id', ''),
+            mime_type=sniffed.mime_type,
+            s3_key=stored.blob.s3_key,
+            s3_bucket=stored.blob.s3_bucket,
+            blob=stored.blob,
+            content_sha256=stored.blob.sha256,
             created_by=self.user
         )
         
@@ -157,17 +155,7 @@ class DocumentService:
         if not document:
             return False
         
-        # Move to archive in S3
-        archive_result = document_storage.move_to_archive(document.s3_key)
-        
-        if archive_result['success']:
-            document.is_archived = True
-            document.archived_at = timezone.now()
-            document.s3_key = archive_result['archived_key']
-            document.save()
-            return True
-        
-        return False
+        return ArchiveService(self.tenant).archive(document)
     
     @transaction.atomic
     def share_document(self, dto: ShareDocumentDTO) -> bool:
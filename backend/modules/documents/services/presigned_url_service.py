@@ -0,0 +1,182 @@
+from typing import Dict, Iterable, Optional, Set
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import Document, DocumentBlob
+from ..storage import storage_for_bucket
+from .zip_download_service import downloadable_by
+
+
+class PresignedUrlService:
+    """
+    Download URLs for documents, signed in batches and cached.
+    A URL grants the same access whoever asked for it, so entries are shared by
+    every user with download permission; permission is checked before lookup.
+    """
+    
+    # Permission a cached URL was issued for
+    PERMISSION = 'download'
+    
+    def __init__(self, user=None):
+        # Without a user the caller has already checked permissions
+        self.user = user
+    
+    def get_url(self, document: Document, disposition: str = 'attachment') -> Optional[str]:
+        """Get the download URL for one document, or None without permission"""
+        return self.get_urls([document], disposition)[document.pk]
+    
+    def get_urls(
+        self,
+        documents: Iterable[Document],
+        disposition: str = 'attachment'
+    ) -> Dict:
+        """Get download URLs keyed by document id, signing only cache misses"""
+        documents = list(documents)
+        cache_keys = self._cache_keys(documents, self._downloadable_ids(documents), disposition)
+        
+        urls = cache.get_many(list(set(cache_keys.values())))
+        missing = self._missing(documents, cache_keys, urls)
+        new_urls = self._sign(missing, cache_keys, disposition, self._encodings(missing))
+        if new_urls:
+            cache.set_many(new_urls, timeout=self._cache_timeout())
+            urls.update(new_urls)
+        
+        return self._by_document(documents, cache_keys, urls)
+    
+    async def aget_url(self, document: Document, disposition: str = 'attachment') -> Optional[str]:
+        """Async variant of get_url, for views served under ASGI"""
+        return (await self.aget_urls([document], disposition))[document.pk]
+    
+    async def aget_urls(
+        self,
+        documents: Iterable[Document],
+        disposition: str = 'attachment'
+    ) -> Dict:
+        """Async variant of get_urls; signing itself is local and needs no I/O"""
+        documents = list(documents)
+        cache_keys = self._cache_keys(documents, await self._adownloadable_ids(documents), disposition)
+        
+        urls = await cache.aget_many(list(set(cache_keys.values())))
+        missing = self._missing(documents, cache_keys, urls)
+        new_urls = self._sign(missing, cache_keys, disposition, await self._aencodings(missing))
+        if new_urls:
+            await cache.aset_many(new_urls, timeout=self._cache_timeout())
+            urls.update(new_urls)
+        
+        return self._by_document(documents, cache_keys, urls)
+    
+    def _cache_keys(self, documents: list, allowed: Set, disposition: str) -> Dict:
+        return {
+            document.pk: self._cache_key(document, disposition)
+            for document in documents
+            if document.pk in allowed
+        }
+    
+    @staticmethod
+    def _missing(documents: list, cache_keys: Dict, urls: Dict) -> list:
+        """Allowed documents whose URL is not cached"""
+        return [
+            document for document in documents
+            if document.pk in cache_keys and cache_keys[document.pk] not in urls
+        ]
+    
+    def _sign(
+        self,
+        missing: list,
+        cache_keys: Dict,
+        disposition: str,
+        encodings: Dict
+    ) -> Dict:
+        """Sign URLs for documents missing from the cache, keyed by cache key"""
+        if not missing:
+            return {}
+        
+        # Documents in the cold tier bucket are signed by its storage
+        by_bucket = {}
+        for document in missing:
+            by_bucket.setdefault(storage_for_bucket(document.s3_bucket).bucket_name, []).append(document)
+        
+        new_urls = {}
+        for bucket_name, documents in by_bucket.items():
+            signed = storage_for_bucket(bucket_name).generate_presigned_download_urls(
+                [(document.s3_key, self._filename(document)) for document in documents],
+                expiration=settings.DOCUMENTS_DOWNLOAD_URL_TTL,
+                disposition=disposition,
+                encodings=encodings
+            )
+            new_urls.update(
+                (cache_keys[document.pk], url)
+                for document, url in zip(documents, signed)
+                if url
+            )
+        return new_urls
+    
+    def _encodings(self, documents: list) -> Dict:
+        """Encodings of compressed content by key, which URLs pass on for clients to decode"""
+        blobs = self._encoded_blobs(documents)
+        return dict(blobs) if blobs is not None else {}
+    
+    async def _aencodings(self, documents: list) -> Dict:
+        blobs = self._encoded_blobs(documents)
+        return {s3_key: encoding async for s3_key, encoding in blobs} if blobs is not None else {}
+    
+    @staticmethod
+    def _encoded_blobs(documents: list):
+        blob_ids = {document.blob_id for document in documents if document.blob_id}
+        if not blob_ids:
+            return None
+        return DocumentBlob.objects.filter(pk__in=blob_ids).exclude(encoding='').values_list('s3_key', 'encoding')
+    
+    @staticmethod
+    def _cache_timeout() -> int:
+        # Expire entries early so a cached URL always has time left to be used
+        return settings.DOCUMENTS_DOWNLOAD_URL_TTL - settings.DOCUMENTS_DOWNLOAD_URL_CACHE_MARGIN
+    
+    @staticmethod
+    def _by_document(documents: list, cache_keys: Dict, urls: Dict) -> Dict:
+        return {
+            document.pk: urls.get(cache_keys.get(document.pk))
+            for document in documents
+        }
+    
+    def _downloadable_ids(self, documents: list) -> Set:
+        if self.user is None:
+            return {document.pk for document in documents}
+        
+        if not self.user.is_authenticated:
+            return set()
+        
+        return set(self._downloadable(documents).values_list('pk', flat=True))
+    
+    async def _adownloadable_ids(self, documents: list) -> Set:
+        if self.user is None:
+            return {document.pk for document in documents}
+        
+        if not self.user.is_authenticated:
+            return set()
+        
+        return {pk async for pk in self._downloadable(documents).values_list('pk', flat=True)}
+    
+    def _downloadable(self, documents: list):
+        return Document.objects.filter(
+            downloadable_by(self.user),
+            pk__in=[document.pk for document in documents]
+        )
+    
+    @staticmethod
+    def _filename(document: Document) -> str:
+        return document.display_name + document.file_extension
+    
+    def _cache_key(self, document: Document, disposition: str) -> str:
+        """Key on the stored object version and everything that shapes the URL"""
+        version = '|'.join([
+            document.s3_bucket,
+            document.s3_key,
+            document.s3_version_id or '',
+            self.PERMISSION,
+            disposition,
+            self._filename(document)
+        ])
+        return f"documents:download-url:{hashlib.sha256(version.encode('utf-8')).hexdigest()}"
@@ -0,0 +1,148 @@
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import List, Optional
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Document
+from ..rendering import RenderError, render_previews
+from ..scratch import scratch_root
+from ..storage import storage_for_bucket
+from .preview_service import PREVIEW_FILE_TYPES, PreviewService
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores() -> int:
+    """Cores this process may run on, which in a container can be fewer than the machine has"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+@dataclass
+class PreviewBatchResultDTO:
+    """Outcome of previewing one batch of documents"""
+    documents: int
+    # Documents done, including sources too large to preview
+    completed: int = 0
+    previews: int = 0
+    # Ids of documents left to be claimed again once their claim expires
+    failed: List[str] = field(default_factory=list)
+
+
+class PreviewBatchService:
+    """
+    Previews of batches of documents, for dedicated derivative workers.
+    
+    Decoding and resizing run in a process pool, so rendering uses every core
+    without holding the GIL the I/O threads need. Sources are downloaded and
+    previews uploaded on threads, and each document moves on to rendering and
+    then uploading as soon as its previous step is done, so downloads, renders
+    and uploads of different documents overlap.
+    """
+    
+    def __init__(self, executor: Executor, io_workers: int = None):
+        self.executor = executor
+        self.io_workers = io_workers or settings.DOCUMENTS_DERIVATIVE_IO_WORKERS
+    
+    @staticmethod
+    def claim(batch_size: int) -> List[Document]:
+        """
+        Claim up to batch_size clean documents still without previews, oldest
+        first. Claims expire after DOCUMENTS_DERIVATIVE_CLAIM_TIMEOUT, so the
+        documents of a worker that died are claimed again.
+        """
+        now = timezone.now()
+        expired = now - timedelta(seconds=settings.DOCUMENTS_DERIVATIVE_CLAIM_TIMEOUT)
+        
+        with transaction.atomic():
+            documents = list(Document.objects.all_tenants().select_for_update(
+                skip_locked=True
+            ).filter(
+                Q(previews_claimed_at__isnull=True) | Q(previews_claimed_at__lt=expired),
+                previews_generated_at__isnull=True,
+                file_type__in=PREVIEW_FILE_TYPES,
+                virus_scanned=True,
+                is_quarantined=False
+            ).order_by('created_at')[:batch_size])
+            
+            Document.objects.all_tenants().filter(
+                pk__in=[document.pk for document in documents]
+            ).update(previews_claimed_at=now)
+        
+        return documents
+    
+    def process(self, documents: List[Document]) -> PreviewBatchResultDTO:
+        """Render and store the eager preview sizes of every document in the batch"""
+        result = PreviewBatchResultDTO(documents=len(documents))
+        sizes = settings.DOCUMENTS_PREVIEW_EAGER_SIZES
+        completed_ids = []
+        
+        # Content rendered before, for another document or by an earlier attempt
+        reused = [document for document in documents if PreviewService(document).rendered_before(sizes)]
+        completed_ids.extend(document.pk for document in reused)
+        documents = [document for document in documents if document not in reused]
+        
+        with tempfile.TemporaryDirectory(dir=scratch_root()) as directory, \
+                ThreadPoolExecutor(max_workers=self.io_workers) as io:
+            # The pending step of each document, on either pool; a document is
+            # rendered as soon as it is downloaded and stored as soon as it is
+            # rendered, whatever the rest of the batch is doing
+            steps = {io.submit(self._download, document, directory): ('download', document) for document in documents}
+            
+            while steps:
+                done, _ = wait(steps, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step, document = steps.pop(future)
+                    try:
+                        outcome = future.result()
+                    except RenderError as e:
+                        # Like sources too large to preview, done without previews
+                        logger.warning(f"Not previewing document {document.id}: {str(e)}")
+                        completed_ids.append(document.pk)
+                        continue
+                    except Exception as e:
+                        logger.error(f"Failed to {step} previews of document {document.id}: {str(e)}")
+                        result.failed.append(str(document.id))
+                        continue
+                    
+                    if step == 'download':
+                        if outcome is None:
+                            result.failed.append(str(document.id))
+                            continue
+                        render = self.executor.submit(
+                            render_previews,
+                            outcome,
+                            document.file_type,
+                            sizes,
+                            **PreviewService(document).render_options()
+                        )
+                        steps[render] = ('render', document)
+                    elif step == 'render':
+                        steps[io.submit(PreviewService(document).store, outcome)] = ('store', document)
+                    else:
+                        result.previews += len(outcome)
+                        PreviewService(document).record(sizes)
+                        completed_ids.append(document.pk)
+        
+        result.completed = Document.objects.all_tenants().filter(
+            pk__in=completed_ids
+        ).update(previews_generated_at=timezone.now())
+        return result
+    
+    @staticmethod
+    def _download(document: Document, directory: str) -> Optional[str]:
+        """Download a source into the batch's directory; returns None if it cannot be"""
+        path = os.path.join(directory, f"{document.id}{document.file_extension}")
+        if not storage_for_bucket(document.s3_bucket).download_file(document.s3_key, path):
+            logger.error(f"Failed to download document {document.id} for previews")
+            return None
+        return path
@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+from typing import List, Optional
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+from ..models import Document
+from ..rendering import PREVIEW_FORMATS, RenderedPreviewDTO, render_previews
+from ..scratch import DownloadError, scratch_root
+from ..storage import document_storage, storage_for_bucket
+from .processing_result_service import ProcessingResultService
+
+logger = logging.getLogger(__name__)
+
+# File types previews are rendered for
+PREVIEW_FILE_TYPES = ('image', 'pdf')
+
+
+@dataclass
+class PreviewDTO:
+    """A stored preview of a document"""
+    key: str
+    size: int
+    format: str
+    content_type: str
+    # Rendered by this call rather than found in storage
+    created: bool = False
+
+
+class PreviewService:
+    """
+    Resized previews of image and PDF documents in several sizes and formats.
+    
+    Previews are stored under keys derived from the document's content, so
+    documents with identical content share them and a stored preview is found
+    without a database lookup. DOCUMENTS_PREVIEW_EAGER_SIZES are rendered after
+    upload; other sizes are rendered on first request and then served from
+    storage. Rendering itself is in the rendering module, which keeps memory
+    bounded however large the upload. The sizes rendered are recorded for the
+    content, so later documents with it find them without rendering again, and
+    stored sizes not recorded at the current RENDER_VERSION are rendered again.
+    """
+    
+    def __init__(self, document: Document):
+        self.document = document
+        self.formats = settings.DOCUMENTS_PREVIEW_FORMATS
+    
+    @property
+    def previewable(self) -> bool:
+        return self.document.file_type in PREVIEW_FILE_TYPES and not self.document.is_quarantined
+    
+    def key(self, size: int, file_format: str) -> str:
+        return document_storage.generate_preview_key(
+            str(self.document.tenant_id),
+            self.document.content_sha256 or str(self.document.id),
+            size,
+            PREVIEW_FORMATS[file_format][2]
+        )
+    
+    def get_or_create(self, size: int, file_format: str) -> Optional[PreviewDTO]:
+        """
+        Get a stored preview, rendering it if it does not exist yet. Returns
+        None for documents that cannot be previewed. Raises ValueError for
+        sizes and formats that are not configured, DownloadError if the
+        document cannot be read, and UnsupportedSource or UnreadableSource
+        if it cannot be rendered.
+        """
+        if size not in settings.DOCUMENTS_PREVIEW_SIZES:
+            raise ValueError(f"Preview size must be one of {settings.DOCUMENTS_PREVIEW_SIZES}")
+        if file_format not in self.formats:
+            raise ValueError(f"Preview format must be one of {self.formats}")
+        if not self.previewable:
+            return None
+        
+        key = self.key(size, file_format)
+        if self.current(size) and document_storage.get_file_metadata(key) is not None:
+            return PreviewDTO(key, size, file_format, PREVIEW_FORMATS[file_format][1])
+        
+        with tempfile.TemporaryDirectory(dir=scratch_root()) as directory:
+            path = os.path.join(directory, f"content{self.document.file_extension}")
+            storage = storage_for_bucket(self.document.s3_bucket)
+            if not storage.download_file(self.document.s3_key, path):
+                raise DownloadError(f"Could not download {self.document.s3_key}")
+            previews = self.render(path, [size])
+        
+        return next((preview for preview in previews if preview.format == file_format), None)
+    
+    def render(self, path: str, sizes: List[int]) -> List[PreviewDTO]:
+        """
+        Render and store previews of the given sizes in every format from a
+        local copy of the document. Returns nothing for documents that cannot
+        be previewed. Raises RuntimeError if a preview cannot be stored.
+        """
+        if not self.previewable:
+            return []
+        
+        previews = self.store(render_previews(path, self.document.file_type, sizes, **self.render_options()))
+        self.record(sizes)
+        logger.info(f"Rendered {len(previews)} previews of document {self.document.id}")
+        return previews
+    
+    def rendered_before(self, sizes: List[int]) -> bool:
+        """Whether previews of the content were rendered in these sizes and every format"""
+        stored = ProcessingResultService(self.document).get('previews')
+        return (
+            stored is not None
+            and set(sizes) <= set(stored.result['sizes'])
+            and set(self.formats) <= set(stored.result['formats'])
+        )
+    
+    def current(self, size: int) -> bool:
+        """
+        Whether a stored preview of this size can be served: one rendered
+        before the current RENDER_VERSION is rendered again under its key.
+        Previews of documents without a content hash are not versioned.
+        """
+        return not self.document.content_sha256 or self.rendered_before([size])
+    
+    def record(self, sizes: List[int]) -> None:
+        """Record that previews of the content were stored in these sizes and every format"""
+        results = ProcessingResultService(self.document)
+        stored = results.get('previews')
+        if stored is not None and stored.result['formats'] == self.formats:
+            sizes = set(sizes) | set(stored.result['sizes'])
+        results.record('previews', {'sizes': sorted(sizes), 'formats': self.formats})
+    
+    def render_options(self) -> dict:
+        """Settings render_previews takes besides the source, for renders in other processes"""
+        return {
+            'formats': self.formats,
+            'quality': settings.DOCUMENTS_PREVIEW_QUALITY,
+            'max_pixels': settings.DOCUMENTS_PREVIEW_MAX_PIXELS,
+        }
+    
+    def store(self, rendered: List[RenderedPreviewDTO]) -> List[PreviewDTO]:
+        """Upload rendered previews. Raises RuntimeError if one cannot be stored."""
+        previews = []
+        for preview in rendered:
+            content_type = PREVIEW_FORMATS[preview.format][1]
+            key = self.key(preview.size, preview.format)
+            result = document_storage.upload_file(preview.content, key, content_type=content_type)
+            if not result['success']:
+                raise RuntimeError(result['error'])
+            previews.append(PreviewDTO(key, preview.size, preview.format, content_type, created=True))
+        return previews
+    
+    @classmethod
+    def delete_for_content(cls, tenant_id: str, sha256: str) -> List[str]:
+        """Delete the previews of content in every size and format; returns the keys that could not be"""
+        return document_storage.delete_files([
+            document_storage.generate_preview_key(tenant_id, sha256, size, extension)
+            for size in settings.DOCUMENTS_PREVIEW_SIZES
+            for _, _, extension in PREVIEW_FORMATS.values()
+        ])
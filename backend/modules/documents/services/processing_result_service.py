@@ -0,0 +1,61 @@
+from typing import Optional
+
+from ..extraction import EXTRACTION_VERSION
+from ..models import Document, ProcessingResult
+from ..rendering import RENDER_VERSION
+from ..scanning import SCAN_VERSION
+
+# Current version of each stage; results of other versions are not reused
+STAGE_VERSIONS = {
+    'scan': SCAN_VERSION,
+    'previews': RENDER_VERSION,
+    'text': EXTRACTION_VERSION,
+}
+
+
+class ProcessingResultService:
+    """
+    Results of processing stages, stored by content.
+    
+    Each stage records its result under the content's sha256, the stage and
+    the stage's version. Retries, re-uploads of the same content and
+    reprocessing find the result and reuse it without downloading the content
+    or running the stage again. Bumping one stage's version makes only that
+    stage run again. Documents without a content hash are always processed.
+    """
+    
+    def __init__(self, document: Document):
+        self.document = document
+    
+    def get(self, stage: str) -> Optional[ProcessingResult]:
+        """The stored result of a stage at its current version, if any"""
+        if not self.document.content_sha256:
+            return None
+        return self._results(stage).filter(version=STAGE_VERSIONS[stage]).first()
+    
+    def record(self, stage: str, result: dict) -> None:
+        """Store the result of a stage at its current version, replacing those of other versions"""
+        if not self.document.content_sha256:
+            return
+        version = STAGE_VERSIONS[stage]
+        ProcessingResult.objects.all_tenants().update_or_create(
+            tenant_id=self.document.tenant_id,
+            sha256=self.document.content_sha256,
+            stage=stage,
+            version=version,
+            defaults={'result': result}
+        )
+        self._results(stage).exclude(version=version).delete()
+    
+    @staticmethod
+    def delete_for_content(tenant_id: str, sha256: str) -> int:
+        """Forget every result for content, such as when its blob is deleted"""
+        deleted, _ = ProcessingResult.objects.all_tenants().filter(tenant_id=tenant_id, sha256=sha256).delete()
+        return deleted
+    
+    def _results(self, stage: str):
+        return ProcessingResult.objects.all_tenants().filter(
+            tenant_id=self.document.tenant_id,
+            sha256=self.document.content_sha256,
+            stage=stage
+        )
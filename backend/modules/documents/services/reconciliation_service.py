@@ -0,0 +1,209 @@
+from dataclasses import dataclass, field
+from datetime import timedelta
+from heapq import merge
+from itertools import groupby
+from typing import Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.functions import Coalesce, Collate
+from django.utils import timezone
+
+from core.storage.backends import ObjectInfo
+from ..models import Document, DocumentBlob
+from ..storage import document_storage
+
+# Areas of objects derived from a document's object rather than recorded in a row
+DERIVED_KEY_AREAS = ('previews/',)
+
+
+@dataclass
+class ExpectedObjectDTO:
+    """An object a document or blob row says is stored"""
+    key: str
+    size: int
+    document_id: Optional[str] = None
+    blob_id: Optional[str] = None
+    # Stored compressed, so size is the stored size rather than the content's
+    encoded: bool = False
+
+
+@dataclass
+class ReconciliationIssueDTO:
+    """A key where storage and the database disagree"""
+    key: str
+    object_size: Optional[int] = None
+    recorded_size: Optional[int] = None
+    document_ids: List[str] = field(default_factory=list)
+    blob_id: Optional[str] = None
+
+
+@dataclass
+class ReconciliationReportDTO:
+    """Outcome of reconciling a tenant's objects with its rows"""
+    tenant_id: str
+    objects_scanned: int = 0
+    keys_expected: int = 0
+    orphan_count: int = 0
+    missing_count: int = 0
+    size_mismatch_count: int = 0
+    orphans: List[ReconciliationIssueDTO] = field(default_factory=list)
+    missing: List[ReconciliationIssueDTO] = field(default_factory=list)
+    size_mismatches: List[ReconciliationIssueDTO] = field(default_factory=list)
+    orphans_deleted: int = 0
+    sizes_fixed: int = 0
+
+
+class ReconciliationService:
+    """
+    Compare a tenant's stored objects with its document and blob rows.
+    
+    The object listing and the rows are both read in key order and merge-joined
+    in one pass, so memory stays constant however many objects the tenant has.
+    """
+    
+    def __init__(self, tenant):
+        self.tenant = tenant
+        self.batch_size = settings.DOCUMENTS_RECONCILE_BATCH_SIZE
+        self.max_reported = settings.DOCUMENTS_RECONCILE_MAX_REPORTED
+    
+    def reconcile(self, repair: bool = False) -> ReconciliationReportDTO:
+        """
+        Report orphaned objects, rows whose object is missing and size mismatches.
+        With repair, orphans are deleted and recorded sizes are set to the stored
+        size; missing objects cannot be recovered and are only reported.
+        Objects written within the grace period are not reported as orphans,
+        as their upload may not be recorded yet. Raises StorageError.
+        """
+        report = ReconciliationReportDTO(tenant_id=str(self.tenant.id))
+        derived_prefixes = tuple(f"tenants/{self.tenant.id}/{area}" for area in DERIVED_KEY_AREAS)
+        cutoff = timezone.now() - timedelta(hours=settings.DOCUMENTS_RECONCILE_GRACE_HOURS)
+        orphan_keys = []
+        size_fixes = []
+        
+        objects = document_storage.iter_tenant_objects(str(self.tenant.id))
+        rows = groupby(self._expected_objects(), key=lambda expected: expected.key)
+        
+        obj = next(objects, None)
+        key, group = next(rows, (None, None))
+        while obj is not None or key is not None:
+            if key is None or (obj is not None and obj.key < key):
+                report.objects_scanned += 1
+                if not obj.key.startswith(derived_prefixes) and not _is_recent(obj, cutoff):
+                    report.orphan_count += 1
+                    self._record(report.orphans, ReconciliationIssueDTO(key=obj.key, object_size=obj.size))
+                    orphan_keys.append(obj.key)
+                obj = next(objects, None)
+            elif obj is None or key < obj.key:
+                expected = list(group)
+                report.keys_expected += 1
+                report.missing_count += 1
+                self._record(report.missing, _issue(key, None, expected))
+                key, group = next(rows, (None, None))
+            else:
+                expected = list(group)
+                report.objects_scanned += 1
+                report.keys_expected += 1
+                stale = [row for row in expected if row.size != obj.size]
+                if stale:
+                    report.size_mismatch_count += 1
+                    self._record(report.size_mismatches, _issue(key, obj.size, stale))
+                    size_fixes.extend((row, obj.size) for row in stale)
+                obj = next(objects, None)
+                key, group = next(rows, (None, None))
+            
+            if repair and len(orphan_keys) >= self.batch_size:
+                report.orphans_deleted += self._delete_orphans(orphan_keys)
+            if repair and len(size_fixes) >= self.batch_size:
+                report.sizes_fixed += self._fix_sizes(size_fixes)
+        
+        if repair:
+            report.orphans_deleted += self._delete_orphans(orphan_keys)
+            report.sizes_fixed += self._fix_sizes(size_fixes)
+        return report
+    
+    def _expected_objects(self) -> Iterator[ExpectedObjectDTO]:
+        """Yield the objects the tenant's rows point at, in key order"""
+        prefix = f"tenants/{self.tenant.id}/"
+        documents = Document.objects.all_tenants().filter(
+            tenant=self.tenant,
+            s3_key__startswith=prefix
+        )
+        blobs = DocumentBlob.objects.all_tenants().filter(
+            tenant=self.tenant,
+            s3_key__startswith=prefix
+        )
+        if settings.DOCUMENTS_COLD_BUCKET:
+            # Objects in the cold tier bucket are not in the listing
+            documents = documents.exclude(s3_bucket=settings.DOCUMENTS_COLD_BUCKET)
+            blobs = blobs.exclude(s3_bucket=settings.DOCUMENTS_COLD_BUCKET)
+        # Compressed content is stored smaller than the size recorded for it
+        documents = documents.order_by(_binary_order('s3_key')).values_list(
+            's3_key', Coalesce('blob__stored_size', 'file_size'), 'pk', 'blob__encoding'
+        )
+        blobs = blobs.order_by(_binary_order('s3_key')).values_list(
+            's3_key', Coalesce('stored_size', 'size'), 'pk', 'encoding'
+        )
+        
+        return merge(
+            (
+                ExpectedObjectDTO(key=key, size=size, document_id=str(pk), encoded=bool(encoding))
+                for key, size, pk, encoding in documents.iterator(chunk_size=self.batch_size)
+            ),
+            (
+                ExpectedObjectDTO(key=key, size=size, blob_id=str(pk), encoded=bool(encoding))
+                for key, size, pk, encoding in blobs.iterator(chunk_size=self.batch_size)
+            ),
+            key=lambda expected: expected.key
+        )
+    
+    def _record(self, issues: List[ReconciliationIssueDTO], issue: ReconciliationIssueDTO) -> None:
+        # Counts stay exact; only the listed examples are capped
+        if len(issues) < self.max_reported:
+            issues.append(issue)
+    
+    def _delete_orphans(self, keys: List[str]) -> int:
+        failed = document_storage.delete_files(keys)
+        deleted = len(keys) - len(failed)
+        keys.clear()
+        return deleted
+    
+    def _fix_sizes(self, fixes: List) -> int:
+        # Only the stored size of compressed content can be read off its object
+        documents = [
+            Document(pk=row.document_id, file_size=size)
+            for row, size in fixes if row.document_id and not row.encoded
+        ]
+        blobs = [
+            DocumentBlob(pk=row.blob_id, size=size)
+            for row, size in fixes if row.blob_id and not row.encoded
+        ]
+        encoded_blobs = [
+            DocumentBlob(pk=row.blob_id, stored_size=size)
+            for row, size in fixes if row.blob_id and row.encoded
+        ]
+        Document.objects.all_tenants().bulk_update(documents, ['file_size'])
+        DocumentBlob.objects.all_tenants().bulk_update(blobs, ['size'])
+        DocumentBlob.objects.all_tenants().bulk_update(encoded_blobs, ['stored_size'])
+        fixes.clear()
+        return len(documents) + len(blobs) + len(encoded_blobs)
+
+
+def _binary_order(field_name: str) -> Collate:
+    """Order by code point, the order object listings use, whatever the column collation"""
+    return Collate(field_name, 'C' if connection.vendor == 'postgresql' else 'BINARY')
+
+
+def _is_recent(obj: ObjectInfo, cutoff) -> bool:
+    return obj.last_modified is not None and obj.last_modified > cutoff
+
+
+def _issue(key: str, object_size: Optional[int], rows: List[ExpectedObjectDTO]) -> ReconciliationIssueDTO:
+    blob_ids = [row.blob_id for row in rows if row.blob_id]
+    return ReconciliationIssueDTO(
+        key=key,
+        object_size=object_size,
+        recorded_size=rows[0].size,
+        document_ids=[row.document_id for row in rows if row.document_id],
+        blob_id=blob_ids[0] if blob_ids else None
+    )
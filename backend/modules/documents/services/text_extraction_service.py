@@ -0,0 +1,301 @@
+from contextlib import closing
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Iterator, List
+import logging
+import multiprocessing
+import time
+
+from billiard.pool import Pool
+from django.conf import settings
+from django.utils import timezone
+
+from ..extraction import (
+    EXTRACTORS,
+    ExtractionLimitExceeded,
+    TableLimits,
+    extract_range,
+    iter_text,
+    limit_memory,
+    memory_limit,
+    page_count,
+    time_limit,
+)
+from ..models import Document, DocumentTextChunk
+from .processing_result_service import ProcessingResultService
+
+logger = logging.getLogger(__name__)
+
+# Characters of the text kept on the document itself, and in its search vector
+EXTRACTED_TEXT_LENGTH = 10000
+SEARCH_TEXT_LENGTH = 1000
+
+# Chunks copied per INSERT when reusing the text of the same content
+COPY_BATCH_SIZE = 16
+
+# Extraction pool processes are replaced after this many extractions, which
+# returns the memory parsers hold on to
+POOL_TASKS_PER_PROCESS = 100
+
+_pool = None
+
+
+def extraction_pool() -> Pool:
+    """
+    This worker's pool of DOCUMENTS_EXTRACTION_PROCESSES extraction processes.
+    A billiard pool, since Celery's prefork workers are daemonic processes,
+    which multiprocessing does not let have children.
+    """
+    global _pool
+    if _pool is None:
+        _pool = Pool(
+            settings.DOCUMENTS_EXTRACTION_PROCESSES,
+            initializer=limit_memory,
+            initargs=(settings.DOCUMENTS_EXTRACTION_MEMORY_LIMIT,),
+            maxtasksperchild=POOL_TASKS_PER_PROCESS
+        )
+    return _pool
+
+
+def _discard_pool() -> None:
+    """Kill the extraction processes, for one stuck on a document past its time limit"""
+    global _pool
+    if _pool is not None:
+        # billiard waits for the results still pending before it returns from
+        # terminate(); none of them will come from processes it kills
+        _pool._cache.clear()
+        _pool.terminate()
+        _pool = None
+
+
+@dataclass
+class TextExtractionResultDTO:
+    """Outcome of extracting the text of one document"""
+    characters: int
+    chunks: int
+    # Stopped at DOCUMENTS_EXTRACTION_MAX_CHARS
+    truncated: bool = False
+    # Sheets and columns of spreadsheets and CSV files
+    structure: dict = field(default_factory=dict)
+
+
+class TextExtractionService:
+    """
+    Text of documents for search.
+    
+    Text is extracted page by page or paragraph by paragraph and written to
+    DocumentTextChunk rows as it comes, so memory stays bounded however large
+    the document; the document keeps the start of it. Each extraction gets
+    DOCUMENTS_EXTRACTION_TIME_LIMIT seconds and DOCUMENTS_EXTRACTION_MEMORY_LIMIT
+    bytes. With DOCUMENTS_EXTRACTION_PROCESSES, extraction runs in a pool of
+    processes so a stuck parser can be killed, and long PDFs are split into
+    page ranges extracted across the pool. Spreadsheets and CSV files are
+    indexed up to DOCUMENTS_EXTRACTION_TABLE_ROWS rows and _TABLE_COLUMNS
+    columns per sheet, and their sheets and columns summarized in the
+    document's text_structure. The text of content extracted before is copied
+    from the document it was extracted for rather than extracted again.
+    """
+    
+    def __init__(self, document: Document):
+        self.document = document
+        self.structure = {}
+    
+    @property
+    def extractable(self) -> bool:
+        return self.document.file_type in EXTRACTORS
+    
+    def extract(self, path: str) -> TextExtractionResultDTO:
+        """
+        Extract and store the text of a local copy of the document, replacing
+        any extracted before. Raises ExtractionLimitExceeded past the time or
+        memory limit, after storing the text extracted until then.
+        """
+        writer = _ChunkWriter(self.document, settings.DOCUMENTS_EXTRACTION_CHUNK_SIZE)
+        max_chars = settings.DOCUMENTS_EXTRACTION_MAX_CHARS
+        deadline = time.monotonic() + settings.DOCUMENTS_EXTRACTION_TIME_LIMIT
+        truncated = False
+        
+        DocumentTextChunk.objects.filter(document=self.document).delete()
+        try:
+            with closing(self._pieces(path, deadline)) as pieces:
+                for text in pieces:
+                    if writer.characters + len(text) >= max_chars:
+                        writer.write(text[:max_chars - writer.characters])
+                        truncated = True
+                        break
+                    writer.write(text)
+        except ExtractionLimitExceeded:
+            # Keep the text extracted within the limits
+            writer.close()
+            self._save(writer.head)
+            raise
+        
+        writer.close()
+        self._save(writer.head)
+        ProcessingResultService(self.document).record('text', {
+            'document': str(self.document.id),
+            'characters': writer.characters,
+            'chunks': writer.chunks,
+            'truncated': truncated,
+        })
+        
+        logger.info(f"Extracted {writer.characters} characters of text from document {self.document.id}")
+        return TextExtractionResultDTO(writer.characters, writer.chunks, truncated, self.structure)
+    
+    def reuse(self) -> bool:
+        """
+        Copy the text of the same content from the document it was extracted
+        for, within the database. Returns False if there is none to copy, such
+        as when that document was deleted since.
+        """
+        stored = ProcessingResultService(self.document).get('text')
+        if stored is None:
+            return False
+        
+        source = Document.objects.all_tenants().filter(
+            pk=stored.result['document'],
+            tenant_id=self.document.tenant_id,
+            content_sha256=self.document.content_sha256
+        ).first()
+        if source is None or source.text_chunks.count() != stored.result['chunks']:
+            return False
+        if source.pk == self.document.pk:
+            return True
+        
+        DocumentTextChunk.objects.filter(document=self.document).delete()
+        chunks = source.text_chunks.order_by('position').values_list('position', 'text')
+        batch = []
+        for position, text in chunks.iterator(chunk_size=COPY_BATCH_SIZE):
+            batch.append(DocumentTextChunk(
+                tenant_id=self.document.tenant_id,
+                document=self.document,
+                position=position,
+                text=text
+            ))
+            if len(batch) == COPY_BATCH_SIZE:
+                DocumentTextChunk.objects.bulk_create(batch)
+                batch = []
+        DocumentTextChunk.objects.bulk_create(batch)
+        
+        self.structure = source.text_structure
+        self._save(source.extracted_text)
+        logger.info(f"Reused the text of document {source.id} for document {self.document.id}")
+        return True
+    
+    @staticmethod
+    def table_limits() -> TableLimits:
+        return TableLimits(
+            rows=settings.DOCUMENTS_EXTRACTION_TABLE_ROWS,
+            columns=settings.DOCUMENTS_EXTRACTION_TABLE_COLUMNS,
+            cell_chars=settings.DOCUMENTS_EXTRACTION_CELL_CHARS
+        )
+    
+    def _pieces(self, path: str, deadline: float) -> Iterator[str]:
+        """Text of the document piece by piece, in order"""
+        file_type = self.document.file_type
+        if not settings.DOCUMENTS_EXTRACTION_PROCESSES or file_type == 'text':
+            # Plain text is only read in blocks, never worth another process
+            pieces = iter_text(path, file_type, deadline=deadline, limits=self.table_limits(), structure=self.structure)
+            with closing(pieces):
+                while True:
+                    # The limits apply while the next piece is parsed only,
+                    # never while the caller stores the last one
+                    try:
+                        with memory_limit(settings.DOCUMENTS_EXTRACTION_MEMORY_LIMIT), time_limit(deadline):
+                            text = next(pieces)
+                    except StopIteration:
+                        return
+                    except MemoryError:
+                        raise ExtractionLimitExceeded(f"Extracting document {self.document.id} ran out of memory") from None
+                    yield text
+        
+        pool = extraction_pool()
+        ranges = [None]
+        if file_type == 'pdf':
+            pages = self._wait(pool.apply_async(page_count, (path,)).get, deadline)
+            if pages >= settings.DOCUMENTS_EXTRACTION_PARALLEL_PAGES:
+                step = settings.DOCUMENTS_EXTRACTION_RANGE_PAGES
+                ranges = [range(start, min(start + step, pages)) for start in range(0, pages, step)]
+        
+        # Ranges are extracted in parallel but their text comes back in order
+        results = pool.imap(partial(
+            extract_range,
+            path,
+            file_type,
+            max_chars=settings.DOCUMENTS_EXTRACTION_MAX_CHARS,
+            deadline=deadline,
+            limits=self.table_limits()
+        ), ranges)
+        for _ in ranges:
+            extracted = self._wait(results.next, deadline)
+            self.structure.update(extracted.structure)
+            yield from extracted.texts
+    
+    def _wait(self, get: Callable, deadline: float):
+        """A result from the pool, killing the pool if it is not ready by the deadline"""
+        try:
+            return get(timeout=max(deadline - time.monotonic(), 0))
+        except multiprocessing.TimeoutError:
+            _discard_pool()
+            raise ExtractionLimitExceeded(f"Extracting document {self.document.id} took too long") from None
+    
+    def _save(self, head: str) -> None:
+        if not head and not self.structure:
+            return
+        document = self.document
+        fields = {
+            'extracted_text': head,
+            'search_vector': f"{document.original_name} {document.nickname} {document.description} {head[:SEARCH_TEXT_LENGTH]}".lower(),
+            'text_structure': self.structure,
+            'text_extracted': True,
+            'text_extracted_at': timezone.now(),
+        }
+        # Not save(), which would derive search_vector from the name alone again
+        Document.objects.filter(pk=document.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(document, name, value)
+
+
+class _ChunkWriter:
+    """Buffers text and stores it in chunks of chunk_size characters"""
+    
+    def __init__(self, document: Document, chunk_size: int):
+        self.document = document
+        self.chunk_size = chunk_size
+        self.characters = 0
+        self.chunks = 0
+        # The start of the text, kept on the document
+        self.head = ''
+        self._buffer: List[str] = []
+        self._buffered = 0
+    
+    def write(self, text: str) -> None:
+        if len(self.head) < EXTRACTED_TEXT_LENGTH:
+            self.head += text[:EXTRACTED_TEXT_LENGTH - len(self.head)]
+        self.characters += len(text)
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.chunk_size:
+            self._flush(final=False)
+    
+    def close(self) -> None:
+        self._flush(final=True)
+    
+    def _flush(self, final: bool) -> None:
+        text = ''.join(self._buffer)
+        end = len(text) if final else len(text) - len(text) % self.chunk_size
+        chunks = [
+            DocumentTextChunk(
+                tenant_id=self.document.tenant_id,
+                document=self.document,
+                position=self.chunks + index,
+                text=text[start:start + self.chunk_size]
+            )
+            for index, start in enumerate(range(0, end, self.chunk_size))
+        ]
+        DocumentTextChunk.objects.bulk_create(chunks)
+        self.chunks += len(chunks)
+        
+        rest = text[end:]
+        self._buffer = [rest] if rest else []
+        self._buffered = len(rest)
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import Document, DocumentBlob
+from ..storage import DocumentS3Storage, document_storage, storage_for_bucket
+
+
+@dataclass
+class TierMoveDTO:
+    """Result of moving objects between tiers"""
+    moved: int = 0
+    failed: List[str] = field(default_factory=list)
+    # Keys left behind in the bucket they were moved out of
+    stale_copies: Dict[str, List[str]] = field(default_factory=dict)
+
+
+class TieringService:
+    """
+    Move the objects of documents nobody opens between the hot and cold tier.
+    Tiers apply to objects, so a key shared through a blob is cold only while
+    none of its documents was opened recently.
+    """
+    
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.DOCUMENTS_COLD_BUCKET or settings.DOCUMENTS_COLD_STORAGE_CLASS)
+    
+    @staticmethod
+    def cold_keys(s3_keys: Iterable[str] = None) -> Iterator[str]:
+        """
+        Yield the keys of hot objects whose documents were all last opened,
+        or created if never opened, before the cold cutoff. Archived documents
+        are left to the archive storage class.
+        """
+        cutoff = timezone.now() - timedelta(days=settings.DOCUMENTS_COLD_AFTER_DAYS)
+        documents = Document.objects.all_tenants().filter(is_archived=False)
+        if s3_keys is not None:
+            documents = documents.filter(s3_key__in=list(s3_keys))
+        
+        recently_used = documents.annotate(
+            last_used=Coalesce('last_accessed_at', 'created_at')
+        ).filter(last_used__gte=cutoff).values('s3_key')
+        
+        return documents.filter(storage_tier='hot').exclude(
+            s3_key__in=recently_used
+        ).order_by('s3_key').values_list('s3_key', flat=True).distinct().iterator()
+    
+    @staticmethod
+    def move(s3_keys: List[str], tier: str) -> TierMoveDTO:
+        """
+        Move objects to a tier and record it on their documents and blobs.
+        Objects moved to another bucket leave their old copy behind, for the
+        caller to delete once URLs signed for it have expired.
+        """
+        sources = dict(Document.objects.all_tenants().filter(
+            s3_key__in=s3_keys
+        ).exclude(storage_tier=tier).order_by().values_list('s3_key', 's3_bucket').distinct())
+        
+        with ThreadPoolExecutor(max_workers=settings.DOCUMENTS_TIERING_WORKERS) as executor:
+            targets = list(executor.map(
+                lambda source: _move_object(source[0], source[1], tier),
+                sources.items()
+            ))
+        
+        result = TierMoveDTO()
+        for (s3_key, source_bucket), target_bucket in zip(sources.items(), targets):
+            if target_bucket is None:
+                result.failed.append(s3_key)
+                continue
+            
+            with transaction.atomic():
+                Document.objects.all_tenants().filter(s3_key=s3_key).update(
+                    storage_tier=tier,
+                    s3_bucket=target_bucket
+                )
+                DocumentBlob.objects.all_tenants().filter(s3_key=s3_key).update(s3_bucket=target_bucket)
+            
+            result.moved += 1
+            stale_bucket = storage_for_bucket(source_bucket).bucket_name
+            if stale_bucket != storage_for_bucket(target_bucket).bucket_name:
+                result.stale_copies.setdefault(stale_bucket, []).append(s3_key)
+        return result
+
+
+def _move_object(s3_key: str, source_bucket: str, tier: str) -> Optional[str]:
+    """Move one object; returns the bucket it ends up in, or None on failure"""
+    source = storage_for_bucket(source_bucket)
+    target = _target_storage(tier)
+    if target is None:
+        if not source.set_storage_class(s3_key, _storage_class(tier)):
+            return None
+        return source_bucket
+    
+    if target.bucket_name != source.bucket_name and not source.transfer_file(s3_key, target):
+        return None
+    return target.bucket_name
+
+
+def _target_storage(tier: str) -> Optional[DocumentS3Storage]:
+    """Storage objects of a tier are moved to, or None when they stay in place"""
+    if not settings.DOCUMENTS_COLD_BUCKET:
+        return None
+    return storage_for_bucket(settings.DOCUMENTS_COLD_BUCKET) if tier == 'cold' else document_storage
+
+
+def _storage_class(tier: str) -> str:
+    return settings.DOCUMENTS_COLD_STORAGE_CLASS if tier == 'cold' else 'STANDARD'
@@ -0,0 +1,332 @@
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional
+import base64
+import hashlib
+import os
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Document, Folder, UploadSession
+from ..sniffing import sniff_content
+from ..storage import async_document_storage, document_storage
+
+
+# S3 limits for multipart uploads
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+
+class UploadSessionError(Exception):
+    """Raised when an upload session cannot accept the requested operation"""
+
+
+class UploadSessionExpired(UploadSessionError):
+    """Raised when a session has expired or is no longer active"""
+
+
+@dataclass
+class CreateUploadSessionDTO:
+    """Input DTO for starting a resumable upload"""
+    file_name: str
+    file_size: int
+    content_type: str
+    folder_id: Optional[str] = None
+    nickname: Optional[str] = None
+    description: Optional[str] = None
+
+
+@dataclass
+class UploadedPartDTO:
+    """Part already stored for an upload session"""
+    part_number: int
+    etag: str
+    size: int
+
+
+@dataclass
+class UploadSessionStatusDTO:
+    """Progress of an upload session, used by clients to resume"""
+    id: str
+    status: str
+    part_size: int
+    total_parts: int
+    uploaded_parts: List[UploadedPartDTO]
+    missing_parts: List[int]
+    expires_at: str
+
+
+class UploadSessionService:
+    """Service layer for resumable, chunked document uploads"""
+
+    def __init__(self, user, tenant):
+        self.user = user
+        self.tenant = tenant
+
+    def create_session(self, dto: CreateUploadSessionDTO) -> UploadSession:
+        """Validate the declared file and start a multipart upload"""
+        file_extension = os.path.splitext(dto.file_name)[1]
+        is_valid, error_msg = document_storage.validate_file_upload(
+            dto.file_size,
+            file_extension,
+            dto.content_type
+        )
+
+        if not is_valid:
+            raise ValueError(error_msg)
+
+        part_size = max(settings.DOCUMENTS_UPLOAD_PART_SIZE, MIN_PART_SIZE)
+        # Grow the part size for files that would exceed the S3 part limit
+        while -(-dto.file_size // part_size) > MAX_PARTS:
+            part_size *= 2
+
+        folder = None
+        if dto.folder_id:
+            folder = Folder.objects.filter(
+                id=dto.folder_id,
+                tenant=self.tenant
+            ).first()
+
+        session_id = str(uuid.uuid4())
+        s3_key = document_storage.generate_s3_key(
+            str(self.tenant.id),
+            dto.file_name,
+            session_id
+        )
+
+        result = document_storage.create_multipart_upload(
+            s3_key,
+            content_type=dto.content_type,
+            metadata={
+                'uploaded_by': str(self.user.id),
+                'original_name': dto.file_name,
+                'tenant_id': str(self.tenant.id)
+            }
+        )
+
+        if not result['success']:
+            raise RuntimeError("Failed to start upload in storage")
+
+        return UploadSession.objects.create(
+            id=session_id,
+            tenant=self.tenant,
+            folder=folder,
+            original_name=dto.file_name,
+            nickname=dto.nickname or '',
+            description=dto.description or '',
+            mime_type=dto.content_type,
+            file_size=dto.file_size,
+            part_size=part_size,
+            s3_key=s3_key,
+            s3_bucket=document_storage.bucket_name,
+            upload_id=result['upload_id'],
+            expires_at=self._next_expiry(),
+            created_by=self.user
+        )
+
+    def upload_part(
+        self,
+        session: UploadSession,
+        part_number: int,
+        body: bytes,
+        content_md5: str
+    ) -> UploadedPartDTO:
+        """Verify and store one part; parts may arrive in any order or in parallel"""
+        self._ensure_active(session)
+
+        if not 1 <= part_number <= session.total_parts:
+            raise ValueError(f"Part number must be between 1 and {session.total_parts}")
+
+        expected_size = session.expected_part_size(part_number)
+        if len(body) != expected_size:
+            raise ValueError(
+                f"Part {part_number} must be {expected_size} bytes, got {len(body)}"
+            )
+
+        if not content_md5:
+            raise ValueError("Content-MD5 header is required")
+
+        digest = base64.b64encode(hashlib.md5(body).digest()).decode('ascii')
+        if digest != content_md5:
+            raise ValueError(f"Checksum mismatch for part {part_number}")
+
+        # The first part carries the bytes the file's type is detected from;
+        # a forbidden or mislabeled file ends the session before other parts
+        updates = {}
+        if part_number == 1:
+            sniffed = sniff_content(
+                body[:settings.DOCUMENTS_SNIFF_SIZE],
+                os.path.splitext(session.original_name)[1],
+                session.mime_type
+            )
+            if sniffed.error:
+                self.abort(session)
+                raise ValueError(sniffed.error)
+            updates['mime_type'] = sniffed.mime_type
+
+        result = document_storage.upload_part(
+            session.s3_key,
+            session.upload_id,
+            part_number,
+            body,
+            content_md5=content_md5
+        )
+
+        if not result['success']:
+            raise RuntimeError("Failed to store part in storage")
+
+        # Activity keeps the session alive
+        UploadSession.objects.filter(pk=session.pk).update(expires_at=self._next_expiry(), **updates)
+
+        return UploadedPartDTO(
+            part_number=part_number,
+            etag=result['etag'],
+            size=len(body)
+        )
+
+    def get_status(self, session: UploadSession) -> UploadSessionStatusDTO:
+        """Report which parts are already stored so a client can resume"""
+        parts = self._list_parts(session) if session.status == 'active' else []
+        uploaded = {part.part_number for part in parts}
+
+        return UploadSessionStatusDTO(
+            id=str(session.id),
+            status=session.status,
+            part_size=session.part_size,
+            total_parts=session.total_parts,
+            uploaded_parts=parts,
+            missing_parts=[
+                number for number in range(1, session.total_parts + 1)
+                if number not in uploaded
+            ],
+            expires_at=session.expires_at.isoformat()
+        )
+
+    def complete(self, session: UploadSession) -> Document:
+        """Assemble all parts and create the document record"""
+        self._ensure_active(session)
+
+        parts = self._list_parts(session)
+        self._check_complete(session, parts)
+
+        result = document_storage.complete_multipart_upload(
+            session.s3_key,
+            session.upload_id,
+            self._manifest(parts)
+        )
+
+        if not result['success']:
+            raise RuntimeError("Failed to complete upload in storage")
+
+        return self._create_document(session, result.get('version_id'))
+
+    async def acomplete(self, session: UploadSession) -> Document:
+        """Async variant of complete, for views served under ASGI"""
+        self._ensure_active(session)
+
+        parts = self._parse_parts(
+            await async_document_storage.list_uploaded_parts(session.s3_key, session.upload_id)
+        )
+        self._check_complete(session, parts)
+
+        result = await async_document_storage.complete_multipart_upload(
+            session.s3_key,
+            session.upload_id,
+            self._manifest(parts)
+        )
+
+        if not result['success']:
+            raise RuntimeError("Failed to complete upload in storage")
+
+        # The async ORM has no transactions, so the writes run in a worker thread
+        return await sync_to_async(self._create_document)(session, result.get('version_id'))
+
+    def _check_complete(self, session: UploadSession, parts: List[UploadedPartDTO]) -> None:
+        """Reject completion while parts are missing or sizes do not add up"""
+        uploaded = {part.part_number for part in parts}
+        missing = [
+            number for number in range(1, session.total_parts + 1)
+            if number not in uploaded
+        ]
+        if missing:
+            raise UploadSessionError(f"Missing parts: {missing}")
+
+        total_size = sum(part.size for part in parts)
+        if total_size != session.file_size:
+            raise UploadSessionError(
+                f"Uploaded {total_size} bytes, expected {session.file_size}"
+            )
+
+    @staticmethod
+    def _manifest(parts: List[UploadedPartDTO]) -> List[dict]:
+        return [
+            {'part_number': part.part_number, 'etag': part.etag}
+            for part in parts
+        ]
+
+    @transaction.atomic
+    def _create_document(self, session: UploadSession, version_id: Optional[str]) -> Document:
+        """Create the document and close the session"""
+        document = Document.objects.create(
+            tenant=self.tenant,
+            folder=session.folder,
+            original_name=session.original_name,
+            nickname=session.nickname,
+            description=session.description,
+            file_size=session.file_size,
+            file_extension=os.path.splitext(session.original_name)[1],
+            mime_type=session.mime_type,
+            s3_key=session.s3_key,
+            s3_bucket=session.s3_bucket,
+            s3_version_id=version_id or '',
+            created_by=self.user
+        )
+
+        session.document = document
+        session.status = 'completed'
+        session.completed_at = timezone.now()
+        session.save(update_fields=['document', 'status', 'completed_at', 'updated_at'])
+
+        return document
+
+    def abort(self, session: UploadSession) -> None:
+        """Abort an upload and discard any stored parts"""
+        if session.status != 'active':
+            raise UploadSessionExpired("Upload session is no longer active")
+
+        document_storage.abort_multipart_upload(session.s3_key, session.upload_id)
+        session.status = 'aborted'
+        session.save(update_fields=['status', 'updated_at'])
+
+    def _ensure_active(self, session: UploadSession) -> None:
+        """Reject operations on finished or expired sessions"""
+        if session.status != 'active' or session.is_expired():
+            raise UploadSessionExpired("Upload session is no longer active")
+
+    def _list_parts(self, session: UploadSession) -> List[UploadedPartDTO]:
+        """Fetch stored parts from S3, the source of truth for progress"""
+        return self._parse_parts(
+            document_storage.list_uploaded_parts(session.s3_key, session.upload_id)
+        )
+
+    @staticmethod
+    def _parse_parts(result: dict) -> List[UploadedPartDTO]:
+        if not result['success']:
+            raise RuntimeError("Failed to list uploaded parts")
+
+        return [
+            UploadedPartDTO(
+                part_number=part['part_number'],
+                etag=part['etag'],
+                size=part['size']
+            )
+            for part in result['parts']
+        ]
+
+    def _next_expiry(self):
+        """Expiry time for a session that has just seen activity"""
+        return timezone.now() + timedelta(seconds=settings.DOCUMENTS_UPLOAD_SESSION_TTL)
@@ -0,0 +1,214 @@
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+import os
+import zipfile
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from ..models import Document, Folder
+from ..storage import storage_for_bucket
+
+logger = logging.getLogger(__name__)
+
+
+def downloadable_by(user) -> Q:
+    """Documents the user may download: their own, or shared with download rights"""
+    return Q(created_by=user) | Q(
+        shares__shared_with=user,
+        shares__status='accepted',
+        shares__can_download=True
+    )
+
+
+@dataclass
+class ZipEntryDTO:
+    """Document to be written into a ZIP download"""
+    path: str
+    s3_key: str
+    s3_bucket: str
+    size: int
+    modified: datetime
+
+
+class _ZipStreamBuffer:
+    """Write-only sink for ZipFile that hands written bytes back to the caller"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def drain(self) -> Iterator[bytes]:
+        """Yield what was written since the last drain, if anything"""
+        if self._chunks:
+            data = b''.join(self._chunks)
+            self._chunks = []
+            yield data
+
+
+class ZipDownloadService:
+    """Service layer for downloading several documents as one ZIP stream"""
+    
+    def __init__(self, user, tenant):
+        self.user = user
+        self.tenant = tenant
+    
+    def collect_folder(self, folder_id: str) -> Tuple[str, List[ZipEntryDTO]]:
+        """
+        Collect the downloadable documents of a folder subtree.
+        Documents the user may not download are left out.
+        """
+        folder = Folder.objects.get(id=folder_id, tenant=self.tenant)
+        
+        # One query per tree level instead of one per folder
+        folder_paths = {folder.id: ''}
+        level = [folder.id]
+        while level:
+            children = Folder.objects.filter(
+                tenant=self.tenant,
+                parent_id__in=level
+            ).values_list('id', 'parent_id', 'name')
+            level = []
+            for child_id, parent_id, name in children:
+                folder_paths[child_id] = f"{folder_paths[parent_id]}{name}/"
+                level.append(child_id)
+        
+        documents = Document.objects.filter(
+            tenant=self.tenant,
+            folder_id__in=folder_paths.keys(),
+            is_archived=False
+        )
+        return f"{folder.name}.zip", self._build_entries(
+            self._filter_downloadable(documents),
+            folder_paths
+        )
+    
+    def collect_documents(self, document_ids: List[str]) -> Tuple[str, List[ZipEntryDTO]]:
+        """Collect a selection of documents; every one of them must be downloadable"""
+        documents = Document.objects.filter(tenant=self.tenant, id__in=document_ids)
+        
+        if documents.count() != len(set(document_ids)):
+            raise Document.DoesNotExist("Some documents not found")
+        
+        downloadable = self._filter_downloadable(documents)
+        if downloadable.count() != len(set(document_ids)):
+            raise PermissionError("No permission to download some of the documents")
+        
+        return "documents.zip", self._build_entries(downloadable, {})
+    
+    def stream(self, entries: List[ZipEntryDTO]) -> Iterator[bytes]:
+        """
+        Yield the ZIP archive incrementally.
+        Objects are read in fixed-size chunks; only the next few are opened ahead
+        of time, so memory use does not depend on the number or size of files.
+        """
+        buffer = _ZipStreamBuffer()
+        chunk_size = settings.DOCUMENTS_ZIP_CHUNK_SIZE
+        
+        with ThreadPoolExecutor(max_workers=settings.DOCUMENTS_ZIP_PREFETCH) as executor:
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                for entry, body in self._prefetch(entries, executor):
+                    if body is None:
+                        logger.warning(f"Skipping unreadable object {entry.s3_key} in ZIP download")
+                        continue
+                    
+                    info = zipfile.ZipInfo(
+                        entry.path,
+                        date_time=timezone.localtime(entry.modified).timetuple()[:6]
+                    )
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    info.file_size = entry.size
+                    
+                    try:
+                        with zip_file.open(info, 'w') as destination:
+                            for chunk in body.iter_chunks(chunk_size):
+                                destination.write(chunk)
+                                yield from buffer.drain()
+                    finally:
+                        body.close()
+                    
+                    yield from buffer.drain()
+            
+            # Central directory, written when the archive is closed
+            yield from buffer.drain()
+    
+    def _prefetch(
+        self,
+        entries: List[ZipEntryDTO],
+        executor: Executor
+    ) -> Iterator[Tuple[ZipEntryDTO, Optional[object]]]:
+        """Open upcoming objects in the background while the current one streams"""
+        pending = deque()
+        remaining = iter(entries)
+        
+        for entry in remaining:
+            pending.append((entry, executor.submit(_open, entry)))
+            if len(pending) >= settings.DOCUMENTS_ZIP_PREFETCH:
+                break
+        
+        try:
+            while pending:
+                entry, future = pending.popleft()
+                upcoming = next(remaining, None)
+                if upcoming:
+                    pending.append((upcoming, executor.submit(_open, upcoming)))
+                yield entry, future.result()
+        finally:
+            # Release connections opened ahead when the download is abandoned
+            for _, future in pending:
+                body = future.result()
+                if body is not None:
+                    body.close()
+    
+    def _filter_downloadable(self, documents: QuerySet) -> QuerySet:
+        return documents.filter(downloadable_by(self.user)).distinct()
+    
+    def _build_entries(
+        self,
+        documents: QuerySet,
+        folder_paths: Dict
+    ) -> List[ZipEntryDTO]:
+        """Build archive paths, renaming duplicates within a directory"""
+        entries = []
+        used_paths = set()
+        
+        rows = documents.order_by('folder_id', 'original_name').values_list(
+            'folder_id', 'original_name', 'nickname', 'file_extension',
+            's3_key', 's3_bucket', 'file_size', 'updated_at'
+        )
+        for folder_id, original_name, nickname, extension, s3_key, s3_bucket, size, modified in rows:
+            name = f"{nickname}{extension}" if nickname else original_name
+            base_path = f"{folder_paths.get(folder_id, '')}{name}"
+            
+            path = base_path
+            counter = 1
+            while path in used_paths:
+                stem, suffix = os.path.splitext(base_path)
+                path = f"{stem} ({counter}){suffix}"
+                counter += 1
+            used_paths.add(path)
+            
+            entries.append(ZipEntryDTO(
+                path=path,
+                s3_key=s3_key,
+                s3_bucket=s3_bucket,
+                size=size,
+                modified=modified
+            ))
+        
+        return entries
+
+
+def _open(entry: ZipEntryDTO):
+    return storage_for_bucket(entry.s3_bucket).open_file_stream(entry.s3_key)
@@ -0,0 +1,24 @@
+"""
+Signal handlers for the documents module.
+"""
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Document
+
+
+@receiver(post_delete, sender=Document)
+def release_document_blob(sender, instance: Document, **kwargs) -> None:
+    """Drop the deleted document's reference to its blob"""
+    # Archived documents already released their reference
+    if instance.blob_id and not instance.is_archived:
+        from .services.blob_service import BlobService
+        BlobService.release(instance.blob_id)
+
+
+@receiver(request_finished)
+def flush_document_accesses(sender, **kwargs) -> None:
+    """Write buffered document accesses once due, even when no document was opened since"""
+    from .services.access_service import access_recorder
+    access_recorder.flush_due()
@@ -1,34 +1,49 @@
-import boto3
 import hashlib
 import os
-from django.conf import settings
-from django.core.files.base import ContentFile
+import shutil
 from django.utils import timezone
-from typing import Optional, Dict, Any, Tuple
-from botocore.exceptions import ClientError
+from django.conf import settings
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+from core.storage.backends import (
+    ObjectInfo, ObjectStream, StorageBackend, StorageError, get_storage_backend
+)
+from core.storage.compression import compress, decoded, encoding_metadata, stored_encoding
+from core.storage.listing import iter_objects, iter_objects_parallel, partition
 import mimetypes
-from datetime import datetime, timedelta
+
+# Levels below each area of a tenant's key space whose prefixes are listed concurrently
+TENANT_AREA_SPLIT_DEPTH = {
+    'blobs/': 1,  # {sha256[:2]} shards
+    'documents/': 2,  # {year}/{month}
+    'previews/': 1  # {digest[:2]} shards
+}
+
+# Content is stored compressed only when that saves at least this share of its size
+MIN_COMPRESSION_SAVING = 0.1
+
+# Object tag marking content of archived documents
+ARCHIVE_TAG = 'archived'
+
+# Largest file accepted by presigned browser uploads
+MAX_UPLOAD_SIZE = 104857600  # 100MB
+
+# Read size when downloading objects to local files
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 class DocumentS3Storage:
-    """Handle S3 operations for document storage"""
+    """
+    Handle object storage operations for documents.
+    Works on the backend selected by STORAGE_BACKEND: S3 or MinIO in
+    deployments, a local directory or process memory on a single machine.
+    """
     
-    def __init__(self):
-        # For testing without S3
-        self.s3_client = None
-        self.bucket_name = 'test-bucket'
-        try:
-            import boto3
-            self.s3_client = boto3.client(
-                's3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                endpoint_url=getattr(settings, 'AWS_S3_ENDPOINT_URL', None),  # For MinIO
-                region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1')
-            )
-            self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
-        except Exception:
-            pass  # S3 not configured, use mock mode
+    def __init__(self, backend: StorageBackend = None):
+        self.backend = backend or get_storage_backend()
+    
+    @property
+    def bucket_name(self) -> str:
+        return self.backend.bucket_name
     
     def generate_s3_key(self, tenant_id: str, file_name: str, document_id: str) -> str:
         """Generate S3 key with tenant isolation and date organization"""
@@ -41,61 +56,144 @@ class DocumentS3Storage:
         s3_key = f"tenants/{tenant_id}/documents/{now.year}/{now.month:02d}/{document_id}/{base_name}{extension}"
         return s3_key
     
+    def generate_blob_key(self, tenant_id: str, sha256: str) -> str:
+        """Generate content-addressed S3 key for a deduplicated blob"""
+        # Structure: tenants/{tenant_id}/blobs/{sha256[:2]}/{sha256}
+        return f"tenants/{tenant_id}/blobs/{sha256[:2]}/{sha256}"
+    
     def upload_file(
         self,
         file_content: bytes,
         s3_key: str,
         content_type: str = None,
-        metadata: Dict[str, str] = None
+        metadata: Dict[str, str] = None,
+        file_hash: str = None,
+        encoding: str = None
     ) -> Dict[str, Any]:
-        """Upload file to S3 with metadata"""
-        # Mock mode for testing without S3
-        if not self.s3_client:
+        """
+        Upload file to storage with metadata. With an encoding, the content is
+        stored compressed unless that would save little; reads decode it again.
+        """
+        # Calculate file hash for integrity unless the caller already has it
+        if not file_hash:
+            file_hash = hashlib.sha256(file_content).hexdigest()
+        metadata = dict(metadata or {}, sha256=file_hash)
+        
+        body = file_content
+        if encoding:
+            compressed = compress(file_content, encoding)
+            if len(compressed) <= len(file_content) * (1 - MIN_COMPRESSION_SAVING):
+                body = compressed
+                metadata.update(encoding_metadata(encoding, len(file_content)))
+            else:
+                encoding = None
+        
+        try:
+            info = self.backend.put_object(s3_key, body, content_type, metadata)
+            
             return {
                 'success': True,
                 's3_key': s3_key,
-                'version_id': 'mock-version',
-                'etag': 'mock-etag',
-                'file_hash': 'mock-hash'
+                'version_id': info.version_id,
+                'etag': info.etag,
+                'file_hash': file_hash,
+                'encoding': encoding or '',
+                'stored_size': len(body)
             }
-        
-        try:
-            extra_args = {}
-            
-            if content_type:
-                extra_args['ContentType'] = content_type
-            
-            if metadata:
-                extra_args['Metadata'] = metadata
-            
-            # Calculate file hash for integrity
-            file_hash = hashlib.sha256(file_content).hexdigest()
-            if not metadata:
-                extra_args['Metadata'] = {}
-            extra_args['Metadata']['sha256'] = file_hash
             
-            # Upload to S3
-            response = self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                **extra_args
-            )
+        except StorageError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def create_multipart_upload(
+        self,
+        s3_key: str,
+        content_type: str = None,
+        metadata: Dict[str, str] = None
+    ) -> Dict[str, Any]:
+        """Start a multipart upload for a resumable upload session"""
+        try:
+            upload_id = self.backend.create_multipart_upload(s3_key, content_type, metadata)
             
             return {
                 'success': True,
-                's3_key': s3_key,
-                'version_id': response.get('VersionId'),
-                'etag': response.get('ETag', '').strip('"'),
-                'file_hash': file_hash
+                'upload_id': upload_id
+            }
+        
+        except StorageError as e:
+            return {
+                'success': False,
+                'error': str(e)
             }
+    
+    def upload_part(
+        self,
+        s3_key: str,
+        upload_id: str,
+        part_number: int,
+        body: bytes,
+        content_md5: str = None
+    ) -> Dict[str, Any]:
+        """Upload a single part of a multipart upload"""
+        try:
+            # The part is rejected if the body does not match the checksum
+            etag = self.backend.upload_part(s3_key, upload_id, part_number, body, content_md5)
             
-        except ClientError as e:
+            return {
+                'success': True,
+                'part_number': part_number,
+                'etag': etag
+            }
+        
+        except StorageError as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def list_uploaded_parts(self, s3_key: str, upload_id: str) -> Dict[str, Any]:
+        """List parts already stored for a multipart upload"""
+        try:
+            return {
+                'success': True,
+                'parts': self.backend.list_parts(s3_key, upload_id)
+            }
+        
+        except StorageError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def complete_multipart_upload(
+        self,
+        s3_key: str,
+        upload_id: str,
+        parts: list
+    ) -> Dict[str, Any]:
+        """Assemble uploaded parts into the final object"""
+        try:
+            info = self.backend.complete_multipart_upload(s3_key, upload_id, _ordered(parts))
+            return _completed(s3_key, info)
+        
+        except StorageError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def abort_multipart_upload(self, s3_key: str, upload_id: str) -> bool:
+        """Abort a multipart upload and discard its stored parts"""
+        try:
+            self.backend.abort_multipart_upload(s3_key, upload_id)
+            return True
+        
+        except StorageError as e:
+            # Already aborted or completed uploads are gone either way
+            return e.code == 'NoSuchUpload'
+    
     def generate_presigned_upload_url(
         self,
         s3_key: str,
@@ -104,15 +202,11 @@ class DocumentS3Storage:
     ) -> Dict[str, Any]:
         """Generate pre-signed URL for direct browser upload"""
         try:
-            # Generate the presigned POST URL
-            response = self.s3_client.generate_presigned_post(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Fields={'Content-Type': content_type} if content_type else None,
-                Conditions=[
-                    ['content-length-range', 0, 104857600],  # Max 100MB
-                ],
-                ExpiresIn=expiration
+            response = self.backend.presign_post(
+                s3_key,
+                content_type=content_type,
+                max_size=MAX_UPLOAD_SIZE,
+                expiration=expiration
             )
             
             return {
@@ -121,7 +215,7 @@ class DocumentS3Storage:
                 'fields': response['fields']
             }
             
-        except ClientError as e:
+        except StorageError as e:
             return {
                 'success': False,
                 'error': str(e)
@@ -131,115 +225,176 @@ class DocumentS3Storage:
         self,
         s3_key: str,
         expiration: int = 3600,
-        filename: str = None
+        filename: str = None,
+        disposition: str = 'attachment'
     ) -> str:
         """Generate pre-signed URL for file download"""
-        try:
-            params = {
-                'Bucket': self.bucket_name,
-                'Key': s3_key
-            }
-            
+        return self.generate_presigned_download_urls(
+            [(s3_key, filename)],
+            expiration=expiration,
+            disposition=disposition
+        )[0]
+    
+    def generate_presigned_download_urls(
+        self,
+        objects: List[Tuple[str, Optional[str]]],
+        expiration: int = 3600,
+        disposition: str = 'attachment',
+        encodings: Dict[str, str] = None
+    ) -> List[Optional[str]]:
+        """
+        Generate pre-signed download URLs for (s3_key, filename) pairs in one batch.
+        Objects stored compressed, given by key in encodings, are served with
+        a Content-Encoding header so clients decode them.
+        """
+        if not objects:
+            return []
+        
+        encodings = encodings or {}
+        signed = []
+        for s3_key, filename in objects:
+            params = {}
             if filename:
-                params['ResponseContentDisposition'] = f'attachment; filename="{filename}"'
-            
-            url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params=params,
-                ExpiresIn=expiration
-            )
-            
-            return url
-            
-        except ClientError as e:
+                params['response-content-disposition'] = f'{disposition}; filename="{filename}"'
+            if encodings.get(s3_key):
+                params['response-content-encoding'] = encodings[s3_key]
+            signed.append((s3_key, params))
+        
+        try:
+            return self.backend.presign_get(signed, expiration)
+        except StorageError:
+            return [None] * len(objects)
+    
+    def open_file_stream(self, s3_key: str):
+        """
+        Open an object for streaming reads of its original content, decoding
+        compressed objects; returns None if it cannot be read.
+        """
+        try:
+            return decoded(self.backend.get_object(s3_key))
+        
+        except StorageError:
             return None
     
-    def delete_file(self, s3_key: str) -> bool:
-        """Delete file from S3"""
+    def open_file_range(
+        self,
+        s3_key: str,
+        byte_range: str = None,
+        if_none_match: str = None
+    ) -> ObjectStream:
+        """
+        Open an object, or one byte range of it, for streaming reads.
+        Raises StorageError: NotModified when If-None-Match matches its ETag,
+        InvalidRange when the range starts beyond the object, NoSuchKey.
+        Ranges of compressed objects apply to the original content, which is
+        decoded from the start of the object.
+        """
+        if not byte_range:
+            return decoded(self.backend.get_object(s3_key, if_none_match=if_none_match))
+        
         try:
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=s3_key
-            )
+            stream = self.backend.get_object(s3_key, byte_range, if_none_match)
+        except StorageError as e:
+            if e.code != 'InvalidRange':
+                raise
+            # The range may be beyond the stored bytes but within the original content
+            stream = self.backend.get_object(s3_key, if_none_match=if_none_match)
+            if stored_encoding(stream.info) is None:
+                stream.close()
+                raise
+            return decoded(stream, byte_range)
+        
+        if stored_encoding(stream.info) is None:
+            return stream
+        
+        stream.close()
+        return decoded(self.backend.get_object(s3_key, if_none_match=if_none_match), byte_range)
+    
+    def compression_for(self, content_type: str, size: int) -> Optional[str]:
+        """The encoding to store content of a type and size with, or None to store it as is"""
+        if not settings.DOCUMENTS_COMPRESSION or size < settings.DOCUMENTS_COMPRESSION_MIN_SIZE:
+            return None
+        
+        content_type = (content_type or '').split(';', 1)[0].strip().lower()
+        if any(content_type.startswith(prefix) for prefix in settings.DOCUMENTS_COMPRESSIBLE_TYPES):
+            return settings.DOCUMENTS_COMPRESSION
+        return None
+    
+    def download_file(self, s3_key: str, local_path: str) -> bool:
+        """Stream an object into a local file"""
+        stream = self.open_file_stream(s3_key)
+        if stream is None:
+            return False
+        
+        try:
+            with stream, open(local_path, 'wb') as f:
+                shutil.copyfileobj(stream, f, DOWNLOAD_CHUNK_SIZE)
             return True
-            
-        except ClientError:
+        
+        except (StorageError, OSError):
             return False
     
+    def delete_file(self, s3_key: str) -> bool:
+        """Delete file from storage"""
+        return not self.delete_files([s3_key])
+    
+    def delete_files(self, s3_keys: List[str]) -> List[str]:
+        """
+        Delete many objects, on S3 with one DeleteObjects request per 1000 keys.
+        Returns the keys that could not be deleted.
+        """
+        keys = list(dict.fromkeys(s3_keys))
+        if not keys:
+            return []
+        
+        try:
+            return self.backend.delete_objects(keys)
+        except StorageError:
+            return keys
+    
     def copy_file(self, source_key: str, destination_key: str) -> Dict[str, Any]:
-        """Copy file within S3"""
+        """Copy file within the bucket"""
         try:
-            copy_source = {
-                'Bucket': self.bucket_name,
-                'Key': source_key
-            }
-            
-            response = self.s3_client.copy_object(
-                CopySource=copy_source,
-                Bucket=self.bucket_name,
-                Key=destination_key
-            )
+            info = self.backend.copy_object(source_key, destination_key)
             
             return {
                 'success': True,
                 'new_key': destination_key,
-                'version_id': response.get('VersionId')
+                'version_id': info.version_id
             }
             
-        except ClientError as e:
+        except StorageError as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
     def get_file_metadata(self, s3_key: str) -> Optional[Dict[str, Any]]:
-        """Get file metadata from S3"""
+        """Get file metadata from storage"""
         try:
-            response = self.s3_client.head_object(
-                Bucket=self.bucket_name,
-                Key=s3_key
-            )
+            info = self.backend.head_object(s3_key)
             
             return {
-                'size': response['ContentLength'],
-                'content_type': response.get('ContentType'),
-                'last_modified': response['LastModified'],
-                'etag': response.get('ETag', '').strip('"'),
-                'metadata': response.get('Metadata', {}),
-                'version_id': response.get('VersionId')
+                'size': info.size,
+                'content_type': info.content_type,
+                'last_modified': info.last_modified,
+                'etag': info.etag,
+                'metadata': info.metadata,
+                'version_id': info.version_id
             }
             
-        except ClientError:
+        except StorageError:
             return None
     
     def list_folder_contents(self, tenant_id: str, folder_path: str = '') -> Dict[str, Any]:
         """List all files in a folder for a tenant"""
-        prefix = f"tenants/{tenant_id}/documents/"
-        if folder_path:
-            prefix += folder_path.strip('/') + '/'
+        files = []
+        folders = []
         
         try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=prefix,
-                Delimiter='/'
-            )
-            
-            files = []
-            folders = []
-            
-            # Process files
-            for obj in response.get('Contents', []):
-                files.append({
-                    'key': obj['Key'],
-                    'size': obj['Size'],
-                    'last_modified': obj['LastModified']
-                })
-            
-            # Process folders (common prefixes)
-            for prefix_info in response.get('CommonPrefixes', []):
-                folder_name = prefix_info['Prefix'].rstrip('/').split('/')[-1]
-                folders.append(folder_name)
+            for page in self.iter_folder_contents(tenant_id, folder_path):
+                files.extend(page['files'])
+                folders.extend(page['folders'])
             
             return {
                 'success': True,
@@ -247,12 +402,71 @@ class DocumentS3Storage:
                 'folders': folders
             }
             
-        except ClientError as e:
+        except StorageError as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def iter_folder_contents(self, tenant_id: str, folder_path: str = '') -> Iterator[Dict[str, Any]]:
+        """
+        Yield a folder's files and subfolders one listing page at a time,
+        following continuation tokens. Raises StorageError.
+        """
+        prefix = f"tenants/{tenant_id}/documents/"
+        if folder_path:
+            prefix += folder_path.strip('/') + '/'
+        
+        for objects, prefixes in self.backend.list_objects(prefix, delimiter='/'):
+            yield {
+                'files': [
+                    {
+                        'key': info.key,
+                        'size': info.size,
+                        'last_modified': info.last_modified
+                    }
+                    for info in objects
+                ],
+                # Process folders (common prefixes)
+                'folders': [common_prefix.rstrip('/').split('/')[-1] for common_prefix in prefixes]
+            }
+    
+    def iter_objects(self, prefix: str, split_depth: int = 0, workers: int = None) -> Iterator[ObjectInfo]:
+        """
+        Yield every object under a prefix in key order. With split_depth, the
+        sub-prefixes that many levels down are listed concurrently.
+        Raises StorageError.
+        """
+        workers = workers or settings.DOCUMENTS_LISTING_WORKERS
+        if split_depth and workers > 1:
+            return iter_objects_parallel(self.backend, prefix, split_depth, workers)
+        return iter_objects(self.backend, prefix)
+    
+    def iter_tenant_documents(self, tenant_id: str, parallel: bool = True) -> Iterator[ObjectInfo]:
+        """
+        Yield every document object of a tenant in key order. In parallel,
+        the {year}/{month} prefixes are listed at the same time.
+        """
+        return self.iter_objects(
+            f"tenants/{tenant_id}/documents/",
+            split_depth=2 if parallel else 0
+        )
+    
+    def iter_tenant_objects(self, tenant_id: str) -> Iterator[ObjectInfo]:
+        """
+        Yield every object of a tenant in key order, area by area, listing
+        the shards of each area concurrently. Raises StorageError.
+        """
+        prefix = f"tenants/{tenant_id}/"
+        for part in partition(self.backend, prefix, 1):
+            if isinstance(part, ObjectInfo):
+                yield part
+                continue
+            yield from self.iter_objects(
+                part,
+                split_depth=TENANT_AREA_SPLIT_DEPTH.get(part[len(prefix):], 0)
+            )
+    
     def validate_file_upload(
         self,
         file_size: int,
@@ -282,25 +496,152 @@ class DocumentS3Storage:
         
         return True, None
     
-    def generate_thumbnail_key(self, original_key: str) -> str:
-        """Generate S3 key for thumbnail"""
-        parts = original_key.rsplit('.', 1)
-        if len(parts) == 2:
-            return f"{parts[0]}_thumb.jpg"
-        return f"{original_key}_thumb.jpg"
-    
-    def move_to_archive(self, s3_key: str) -> Dict[str, Any]:
-        """Move file to archive folder"""
-        # Replace 'documents' with 'archive' in the path
-        archive_key = s3_key.replace('/documents/', '/archive/', 1)
+    def generate_preview_key(self, tenant_id: str, digest: str, size: int, extension: str) -> str:
+        """Generate S3 key for a preview of some content at one size"""
+        # Structure: tenants/{tenant_id}/previews/{digest[:2]}/{digest}/{size}.{extension}
+        return f"tenants/{tenant_id}/previews/{digest[:2]}/{digest}/{size}.{extension}"
+    
+    def set_archive_state(
+        self,
+        s3_key: str,
+        archived: bool,
+        storage_class: str = None
+    ) -> bool:
+        """
+        Mark an object as archived or active without moving it.
+        The object is tagged so bucket lifecycle rules can act on it; with a
+        storage class, the object is rewritten in place under the same key.
+        """
+        try:
+            tags = self.backend.get_object_tags(s3_key)
+            tags.pop(ARCHIVE_TAG, None)
+            if archived:
+                tags[ARCHIVE_TAG] = 'true'
+            self.backend.put_object_tags(s3_key, tags)
+            
+            if storage_class:
+                self._change_storage_class(s3_key, storage_class if archived else 'STANDARD')
+            
+            return True
         
-        result = self.copy_file(s3_key, archive_key)
-        if result['success']:
-            self.delete_file(s3_key)
-            result['archived_key'] = archive_key
+        except StorageError:
+            return False
+    
+    def set_storage_class(self, s3_key: str, storage_class: str) -> bool:
+        """Rewrite an object in place under another storage class, if it is not in it already"""
+        try:
+            self._change_storage_class(s3_key, storage_class)
+            return True
         
-        return result
+        except StorageError:
+            return False
+    
+    def transfer_file(self, s3_key: str, target: 'DocumentS3Storage') -> bool:
+        """
+        Copy an object with its metadata and tags to the same key in another
+        bucket, streaming it through in upload parts so memory stays bounded.
+        """
+        part_size = settings.DOCUMENTS_UPLOAD_PART_SIZE
+        try:
+            tags = self.backend.get_object_tags(s3_key)
+            with self.backend.get_object(s3_key) as stream:
+                info = stream.info
+                if info.size <= part_size:
+                    target.backend.put_object(s3_key, stream.read(), info.content_type, info.metadata)
+                else:
+                    upload_id = target.backend.create_multipart_upload(
+                        s3_key,
+                        info.content_type,
+                        info.metadata
+                    )
+                    try:
+                        parts = []
+                        for part_number, chunk in enumerate(iter(lambda: stream.read(part_size), b''), 1):
+                            etag = target.backend.upload_part(s3_key, upload_id, part_number, chunk)
+                            parts.append({'part_number': part_number, 'etag': etag})
+                        target.backend.complete_multipart_upload(s3_key, upload_id, parts)
+                    except StorageError:
+                        target.backend.abort_multipart_upload(s3_key, upload_id)
+                        raise
+            
+            if tags:
+                target.backend.put_object_tags(s3_key, tags)
+            return True
+        
+        except StorageError:
+            return False
+    
+    def _change_storage_class(self, s3_key: str, storage_class: str) -> None:
+        if self.backend.head_object(s3_key).storage_class != storage_class:
+            self.backend.copy_object(s3_key, s3_key, storage_class=storage_class)
+
+
+class AsyncDocumentS3Storage:
+    """
+    Async counterparts of the storage calls made while serving requests.
+    Used by the async views so an ASGI worker keeps serving other requests
+    while storage responds.
+    """
+    
+    def __init__(self, backend: StorageBackend = None):
+        self.backend = backend or get_storage_backend()
+    
+    async def list_uploaded_parts(self, s3_key: str, upload_id: str) -> Dict[str, Any]:
+        """List parts already stored for a multipart upload"""
+        try:
+            return {
+                'success': True,
+                'parts': await self.backend.alist_parts(s3_key, upload_id)
+            }
+        
+        except StorageError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    async def complete_multipart_upload(
+        self,
+        s3_key: str,
+        upload_id: str,
+        parts: list
+    ) -> Dict[str, Any]:
+        """Assemble uploaded parts into the final object"""
+        try:
+            info = await self.backend.acomplete_multipart_upload(s3_key, upload_id, _ordered(parts))
+            return _completed(s3_key, info)
+        
+        except StorageError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+
+def _ordered(parts: list) -> list:
+    """Parts of a completion request, which must be in part number order"""
+    return sorted(parts, key=lambda part: part['part_number'])
+
+
+def _completed(s3_key: str, info) -> Dict[str, Any]:
+    return {
+        'success': True,
+        's3_key': s3_key,
+        'version_id': info.version_id,
+        'etag': info.etag
+    }
+
+
+# Initialize storage instances
+document_storage = DocumentS3Storage()
+async_document_storage = AsyncDocumentS3Storage()
 
 
-# Initialize storage instance
-document_storage = DocumentS3Storage()
\ No newline at end of file
+def storage_for_bucket(bucket_name: str) -> DocumentS3Storage:
+    """
+    Get the storage holding objects recorded in a bucket. Only the cold tier
+    bucket differs; any other recorded bucket is the documents bucket.
+    """
+    if not bucket_name or bucket_name != settings.DOCUMENTS_COLD_BUCKET:
+        return document_storage
+    return DocumentS3Storage(get_storage_backend(bucket_name))
\ No newline at end of file
@@ -1,7 +1,18 @@
 from .document_tasks import (
-    generate_thumbnail,
+    generate_previews,
     scan_document_for_viruses,
     extract_document_text,
     process_uploaded_document,
+    finish_document_processing,
     cleanup_expired_shares
-)
\ No newline at end of file
+)
+from .upload_tasks import cleanup_expired_upload_sessions
+from .storage_tasks import (
+    collect_unreferenced_blobs,
+    sync_archive_storage,
+    move_cold_documents,
+    change_storage_tier,
+    delete_moved_objects,
+    reconcile_storage,
+    reconcile_tenant_storage
+)
@@ -1,28 +1,171 @@
-from celery import shared_task
+from celery import chord, shared_task
 from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
+from dataclasses import asdict
 from datetime import timedelta
-import boto3
-import os
-import tempfile
-from PIL import Image
-import PyPDF2
-import clamd
-from typing import Optional
-import magic
+from typing import Callable, Iterable, Iterator, List, Optional
 
 from ..models import Document, DocumentShare
-from ..storage import document_storage
+from ..rendering import RenderError
+from ..scanning import ClamdStreamRefused, ScanResultDTO, clamd_client
+from ..scheduling import processing_bucket, retry_delay
+from ..services.blob_service import BlobService
+from ..services.preview_service import PREVIEW_FILE_TYPES, PreviewService
+from ..services.processing_result_service import ProcessingResultService
+from ..services.text_extraction_service import TextExtractionService
+from ..scratch import DownloadError, local_copy, release_local_copy
+from ..storage import document_storage, storage_for_bucket
 from core.tenancy.models import current_tenant, Account
 
 logger = get_task_logger(__name__)
 
+# Time the text stage may take beyond DOCUMENTS_EXTRACTION_TIME_LIMIT, for
+# downloading the document and storing its text
+EXTRACTION_TASK_OVERHEAD = 5 * 60  # seconds
+
+
+def _file_chunks(path: str) -> Iterator[bytes]:
+    with open(path, 'rb') as file:
+        yield from iter(lambda: file.read(settings.DOCUMENTS_CLAMD_CHUNK_SIZE), b'')
+
+
+def _stored_chunks(document: Document) -> Iterator[bytes]:
+    """Content streamed from storage, without a local copy"""
+    stream = storage_for_bucket(document.s3_bucket).open_file_stream(document.s3_key)
+    if stream is None:
+        raise DownloadError(f"Could not read {document.s3_key}")
+    with stream:
+        yield from stream.iter_chunks(settings.DOCUMENTS_CLAMD_CHUNK_SIZE)
+
+
+def _scan_content(document: Document, read: Callable[[], Iterable[bytes]]) -> bool:
+    """
+    Stream content to ClamAV unless a verdict on the same content is stored;
+    returns False if the document was quarantined. read is only called to
+    scan, so stored verdicts download nothing. Clean verdicts are reused for
+    DOCUMENTS_SCAN_RESULT_MAX_AGE only, since signatures keep being updated.
+    Content clamd refuses is left unscanned (virus_scanned stays False); other
+    clamd failures raise ClamdError, for the task to retry.
+    """
+    results = ProcessingResultService(document)
+    stored = results.get('scan')
+    fresh_after = timezone.now() - timedelta(seconds=settings.DOCUMENTS_SCAN_RESULT_MAX_AGE)
+    try:
+        if stored is not None and (stored.result['infected'] or stored.updated_at > fresh_after):
+            result = ScanResultDTO(**stored.result)
+            logger.info(f"Reusing the virus scan of the content of document {document.id}")
+        else:
+            result = clamd_client().scan_stream(read())
+            results.record('scan', asdict(result))
+        
+        if result.infected:
+            # Virus detected - quarantine document
+            logger.warning(f"Virus detected in document {document.id}: {result.signature}")
+            
+            _quarantine(document, f"Virus detected: {result.signature}")
+            
+            # TODO: Send notification to user and admin
+            
+            return False
+    
+    except ClamdStreamRefused as e:
+        logger.warning(f"Document {document.id} was not virus scanned: {str(e)}")
+        return True
+    
+    # Clean file - mark as scanned
+    document.virus_scanned = True
+    document.virus_scanned_at = timezone.now()
+    document.save(update_fields=['virus_scanned', 'virus_scanned_at'])
+    
+    logger.info(f"Document {document.id} passed virus scan")
+    return True
+
+
+def _quarantine(document: Document, reason: str) -> None:
+    """
+    Quarantine a document, with every document sharing its content. They let
+    go of their blob, whose object blob garbage collection then deletes; the
+    object is not deleted here, since the blob is shared and later uploads of
+    the same content would be stored against a missing object.
+    """
+    if not document.blob_id:
+        # Documents stored before blobs own their object
+        document.is_quarantined = True
+        document.quarantine_reason = reason
+        document.save(update_fields=['is_quarantined', 'quarantine_reason'])
+        document_storage.delete_file(document.s3_key)
+        return
+    
+    with transaction.atomic():
+        sharing = dict(
+            Document.objects.select_for_update().filter(blob_id=document.blob_id).values_list('pk', 'is_archived')
+        )
+        Document.objects.filter(pk__in=sharing).update(
+            is_quarantined=True,
+            quarantine_reason=reason,
+            blob=None,
+            updated_at=timezone.now()
+        )
+        # Archived documents released their reference already
+        references = sum(1 for is_archived in sharing.values() if not is_archived)
+        if references:
+            BlobService.release(document.blob_id, references)
+    
+    logger.info(f"Quarantined {len(sharing)} documents with the content of document {document.id}")
+    document.is_quarantined = True
+    document.quarantine_reason = reason
+    document.blob = None
+
+
+def _generate_previews_file(document: Document, path: str) -> bool:
+    """
+    Render previews of image and PDF documents from the local copy, in the
+    sizes requested most; other sizes are rendered on first request.
+    """
+    if document.file_type not in PREVIEW_FILE_TYPES:
+        logger.info(f"Skipping previews for {document.file_type} document {document.id}")
+        return True
+    
+    # Sources too large to preview, or that cannot be rendered at all, are
+    # done too, so workers do not claim them and retries do not render them again
+    try:
+        PreviewService(document).render(path, settings.DOCUMENTS_PREVIEW_EAGER_SIZES)
+    except RenderError as e:
+        logger.warning(f"Not previewing document {document.id}: {str(e)}")
+    _previews_generated(document)
+    
+    logger.info(f"Generated previews for document {document.id}")
+    return True
+
+
+def _previews_generated(document: Document) -> None:
+    document.previews_generated_at = timezone.now()
+    document.save(update_fields=['previews_generated_at'])
+
+
+def _extract_text_file(document: Document, path: str) -> bool:
+    """Extract text content from the local copy for search indexing"""
+    # Only process text-based documents
+    service = TextExtractionService(document)
+    if not service.extractable:
+        return True
+    
+    result = service.extract(path)
+    if result.truncated:
+        logger.info(f"Stored the first {result.characters} characters of text of document {document.id}")
+    
+    logger.info(f"Extracted text from document {document.id}")
+    return True
+
 
 @shared_task(bind=True, max_retries=3)
-def generate_thumbnail(self, document_id: str, tenant_id: str) -> bool:
+def generate_previews(self, document_id: str, tenant_id: str) -> bool:
     """
-    Generate thumbnail for image and PDF documents.
-    For PDFs, generate thumbnail from first page.
+    Generate previews for image and PDF documents.
+    For PDFs, previews show the first page.
+    Returns False once out of retries, so processing can still complete.
     """
     try:
         # Set tenant context
@@ -32,64 +175,22 @@ def generate_thumbnail(self, document_id: str, tenant_id: str) -> bool:
         document = Document.objects.get(id=document_id, tenant_id=tenant_id)
         
         # Only process images and PDFs
-        if document.file_type not in ['image', 'pdf']:
-            logger.info(f"Skipping thumbnail for {document.file_type} document {document_id}")
+        if document.file_type not in PREVIEW_FILE_TYPES:
+            logger.info(f"Skipping previews for {document.file_type} document {document_id}")
             return True
         
-        # Download file from S3 to temp location
-        s3_client = boto3.client('s3')
-        with tempfile.NamedTemporaryFile(suffix=document.file_extension, delete=False) as tmp_file:
-            s3_client.download_file(
-                document.s3_bucket,
-                document.s3_key,
-                tmp_file.name
-            )
-            
-            # Generate thumbnail
-            thumbnail_path = tmp_file.name + '_thumb.jpg'
-            
-            if document.file_type == 'image':
-                # Generate image thumbnail
-                with Image.open(tmp_file.name) as img:
-                    img.thumbnail((200, 200))
-                    img.save(thumbnail_path, 'JPEG', quality=85)
-            
-            elif document.file_type == 'pdf':
-                # Generate PDF thumbnail from first page
-                # This requires pdf2image library
-                from pdf2image import convert_from_path
-                images = convert_from_path(tmp_file.name, first_page=1, last_page=1)
-                if images:
-                    images[0].thumbnail((200, 200))
-                    images[0].save(thumbnail_path, 'JPEG', quality=85)
-            
-            # Upload thumbnail to S3
-            if os.path.exists(thumbnail_path):
-                thumbnail_key = document_storage.generate_thumbnail_key(document.s3_key)
-                
-                with open(thumbnail_path, 'rb') as thumb_file:
-                    s3_client.upload_file(
-                        thumb_file,
-                        document.s3_bucket,
-                        thumbnail_key,
-                        ExtraArgs={'ContentType': 'image/jpeg'}
-                    )
-                
-                # Update document with thumbnail key
-                document.thumbnail_s3_key = thumbnail_key
-                document.save(update_fields=['thumbnail_s3_key'])
-                
-                logger.info(f"Generated thumbnail for document {document_id}")
-                
-                # Cleanup temp files
-                os.unlink(tmp_file.name)
-                os.unlink(thumbnail_path)
-                
-                return True
+        if PreviewService(document).rendered_before(settings.DOCUMENTS_PREVIEW_EAGER_SIZES):
+            # Rendered for the same content already
+            _previews_generated(document)
+            return True
+        
+        return _generate_previews_file(document, local_copy(document))
     
     except Exception as e:
-        logger.error(f"Failed to generate thumbnail for document {document_id}: {str(e)}")
-        raise self.retry(exc=e, countdown=60)
+        logger.error(f"Failed to generate previews for document {document_id}: {str(e)}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=retry_delay(self.request.retries))
+        return False
     
     finally:
         current_tenant.set(None)
@@ -107,64 +208,28 @@ def scan_document_for_viruses(self, document_id: str, tenant_id: str) -> bool:
         
         document = Document.objects.get(id=document_id, tenant_id=tenant_id)
         
-        # Download file from S3
-        s3_client = boto3.client('s3')
-        with tempfile.NamedTemporaryFile(suffix=document.file_extension, delete=False) as tmp_file:
-            s3_client.download_file(
-                document.s3_bucket,
-                document.s3_key,
-                tmp_file.name
-            )
-            
-            # Scan with ClamAV
-            try:
-                cd = clamd.ClamdUnixSocket()
-                scan_result = cd.scan(tmp_file.name)
-                
-                if scan_result and tmp_file.name in scan_result:
-                    status, virus_name = scan_result[tmp_file.name]
-                    
-                    if status == 'FOUND':
-                        # Virus detected - quarantine document
-                        logger.warning(f"Virus detected in document {document_id}: {virus_name}")
-                        
-                        document.is_quarantined = True
-                        document.quarantine_reason = f"Virus detected: {virus_name}"
-                        document.save(update_fields=['is_quarantined', 'quarantine_reason'])
-                        
-                        # Delete from S3
-                        document_storage.delete_file(document.s3_key)
-                        
-                        # TODO: Send notification to user and admin
-                        
-                        return False
-                    
-            except Exception as e:
-                logger.warning(f"ClamAV not available, skipping virus scan: {str(e)}")
-            
-            # Clean file - mark as scanned
-            document.virus_scanned = True
-            document.virus_scanned_at = timezone.now()
-            document.save(update_fields=['virus_scanned', 'virus_scanned_at'])
-            
-            # Cleanup
-            os.unlink(tmp_file.name)
-            
-            logger.info(f"Document {document_id} passed virus scan")
-            return True
+        # Streamed from storage straight to clamd, without a local copy
+        return _scan_content(document, lambda: _stored_chunks(document))
     
     except Exception as e:
         logger.error(f"Failed to scan document {document_id}: {str(e)}")
-        raise self.retry(exc=e, countdown=60)
+        raise self.retry(exc=e, countdown=retry_delay(self.request.retries))
     
     finally:
         current_tenant.set(None)
 
 
-@shared_task(bind=True)
+@shared_task(
+    bind=True,
+    soft_time_limit=settings.DOCUMENTS_EXTRACTION_TIME_LIMIT + EXTRACTION_TASK_OVERHEAD,
+    time_limit=settings.DOCUMENTS_EXTRACTION_TIME_LIMIT + 2 * EXTRACTION_TASK_OVERHEAD
+)
 def extract_document_text(self, document_id: str, tenant_id: str) -> bool:
     """
     Extract text content from documents for search indexing.
+    Past its soft time limit the stage fails like any other error, so
+    processing still completes; a worker stuck beyond the hard limit, such as
+    in native code, is killed.
     """
     try:
         # Set tenant context
@@ -174,52 +239,15 @@ def extract_document_text(self, document_id: str, tenant_id: str) -> bool:
         document = Document.objects.get(id=document_id, tenant_id=tenant_id)
         
         # Only process text-based documents
-        if document.file_type not in ['pdf', 'word', 'text']:
+        service = TextExtractionService(document)
+        if not service.extractable:
             return True
         
-        # Download file from S3
-        s3_client = boto3.client('s3')
-        with tempfile.NamedTemporaryFile(suffix=document.file_extension, delete=False) as tmp_file:
-            s3_client.download_file(
-                document.s3_bucket,
-                document.s3_key,
-                tmp_file.name
-            )
-            
-            extracted_text = ""
-            
-            if document.file_type == 'pdf':
-                # Extract text from PDF
-                with open(tmp_file.name, 'rb') as pdf_file:
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    for page in pdf_reader.pages:
-                        extracted_text += page.extract_text() + "\n"
-            
-            elif document.file_type == 'text':
-                # Read text file
-                with open(tmp_file.name, 'r', encoding='utf-8', errors='ignore') as text_file:
-                    extracted_text = text_file.read()
-            
-            elif document.file_type == 'word':
-                # Extract text from Word document
-                from docx import Document as DocxDocument
-                doc = DocxDocument(tmp_file.name)
-                for paragraph in doc.paragraphs:
-                    extracted_text += paragraph.text + "\n"
-            
-            # Update document with extracted text for search
-            if extracted_text:
-                document.extracted_text = extracted_text[:10000]  # Limit to 10k chars
-                document.search_vector = f"{document.original_name} {document.nickname} {document.description} {extracted_text[:1000]}".lower()
-                document.text_extracted = True
-                document.text_extracted_at = timezone.now()
-                document.save(update_fields=['extracted_text', 'search_vector', 'text_extracted', 'text_extracted_at'])
-            
-            # Cleanup
-            os.unlink(tmp_file.name)
-            
-            logger.info(f"Extracted text from document {document_id}")
+        # Extracted for the same content already
+        if service.reuse():
             return True
+        
+        return _extract_text_file(document, local_copy(document))
     
     except Exception as e:
         logger.error(f"Failed to extract text from document {document_id}: {str(e)}")
@@ -229,20 +257,102 @@ def extract_document_text(self, document_id: str, tenant_id: str) -> bool:
         current_tenant.set(None)
 
 
-@shared_task
-def process_uploaded_document(document_id: str, tenant_id: str) -> None:
+# Stages that need a clean document but not each other, run in parallel
+# after the virus scan. Each returns whether it succeeded.
+DERIVATIVE_STAGES = [
+    generate_previews,
+    extract_document_text,
+]
+
+# Stages left to dedicated derivative workers (run_derivative_worker) when
+# DOCUMENTS_DERIVATIVE_WORKERS is set, which render them in batches
+WORKER_STAGES = [
+    generate_previews,
+]
+
+
+@shared_task(bind=True, max_retries=3)
+def process_uploaded_document(self, document_id: str, tenant_id: str) -> bool:
     """
     Main task to process newly uploaded documents.
-    Chains multiple processing tasks.
+    The virus scan gates the derivative stages, which then run as a parallel
+    group; finish_document_processing records completion once all of them
+    have finished, so a document is processed as soon as its slowest stage
+    is. Returns False if the document was quarantined or could not be scanned.
+    
+    Each tenant starts processing at most DOCUMENTS_TENANT_PROCESSING_RATE
+    uploads per window; the task is put back for later beyond that, which
+    returns False too and does not count as a retry.
     """
+    wait = processing_bucket().take(tenant_id)
+    if wait:
+        logger.info(f"Deferring document {document_id} of tenant {tenant_id} by {wait:.0f}s")
+        process_uploaded_document.apply_async((document_id, tenant_id), countdown=wait)
+        return False
+    
     logger.info(f"Processing uploaded document {document_id}")
     
-    # Chain tasks
-    (
-        scan_document_for_viruses.si(document_id, tenant_id) |
-        generate_thumbnail.si(document_id, tenant_id) |
-        extract_document_text.si(document_id, tenant_id)
-    ).apply_async()
+    try:
+        # Set tenant context
+        tenant = Account.objects.get(id=tenant_id)
+        current_tenant.set(tenant)
+        
+        document = Document.objects.get(id=document_id, tenant_id=tenant_id)
+        document.processing_status = 'processing'
+        document.save(update_fields=['processing_status'])
+        
+        # The copy is left for the derivative stages that run on this host
+        if not _scan_content(document, lambda: _file_chunks(local_copy(document))):
+            _finish_processing(document_id, 'quarantined')
+            return False
+    
+    except Exception as e:
+        logger.error(f"Failed to scan document {document_id}: {str(e)}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=retry_delay(self.request.retries))
+        _finish_processing(document_id, 'failed')
+        return False
+    
+    finally:
+        current_tenant.set(None)
+    
+    stages = DERIVATIVE_STAGES
+    if settings.DOCUMENTS_DERIVATIVE_WORKERS:
+        stages = [stage for stage in stages if stage not in WORKER_STAGES]
+    chord(
+        stage.si(document_id, tenant_id) for stage in stages
+    )(finish_document_processing.s(document_id, tenant_id))
+    return True
+
+
+@shared_task
+def finish_document_processing(results: List[bool], document_id: str, tenant_id: str) -> str:
+    """
+    Record that every derivative stage of a document has finished.
+    Runs once the whole group has, with the result of each stage.
+    """
+    status = 'completed' if all(results) else 'partial'
+    
+    try:
+        # Set tenant context
+        tenant = Account.objects.get(id=tenant_id)
+        current_tenant.set(tenant)
+        
+        _finish_processing(document_id, status)
+        logger.info(f"Finished processing document {document_id}: {status}")
+        return status
+    
+    finally:
+        current_tenant.set(None)
+
+
+def _finish_processing(document_id: str, status: str) -> None:
+    """Record the outcome of processing and release the local copy"""
+    release_local_copy(document_id)
+    Document.objects.filter(id=document_id).update(
+        processing_status=status,
+        processed_at=timezone.now()
+    )
 
 
 @shared_task
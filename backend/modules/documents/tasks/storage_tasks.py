@@ -0,0 +1,217 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import timedelta
+from typing import Dict, List
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.conf import settings
+
+from core.tenancy.models import Account
+from ..models import Document
+from ..scheduling import retry_delay
+from ..services.blob_service import BlobService
+from ..services.reconciliation_service import ReconciliationService
+from ..services.tiering_service import TieringService
+from ..storage import document_storage, storage_for_bucket
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def collect_unreferenced_blobs() -> int:
+    """
+    Periodic task to delete deduplicated blobs no document references.
+    Blobs are kept for a grace period after their last reference is dropped.
+    Run daily via Celery beat.
+    """
+    grace_period = timedelta(hours=settings.DOCUMENTS_BLOB_GC_GRACE_HOURS)
+    count = BlobService.collect_garbage(grace_period)
+    
+    logger.info(f"Collected {count} unreferenced blobs")
+    return count
+
+
+@shared_task
+def reconcile_storage() -> int:
+    """
+    Periodic task to reconcile every active tenant's objects with its rows,
+    one task per tenant. Repairs only when DOCUMENTS_RECONCILE_REPAIR is set.
+    Run weekly via Celery beat.
+    """
+    tenant_ids = list(Account.objects.filter(is_active=True).values_list('pk', flat=True))
+    for tenant_id in tenant_ids:
+        reconcile_tenant_storage.delay(str(tenant_id), repair=settings.DOCUMENTS_RECONCILE_REPAIR)
+    return len(tenant_ids)
+
+
+@shared_task
+def reconcile_tenant_storage(tenant_id: str, repair: bool = False) -> Dict:
+    """Reconcile a tenant's stored objects with its document and blob rows"""
+    report = ReconciliationService(Account.objects.get(pk=tenant_id)).reconcile(repair=repair)
+    
+    logger.info(
+        f"Reconciled storage of tenant {tenant_id}: {report.orphan_count} orphans, "
+        f"{report.missing_count} missing, {report.size_mismatch_count} size mismatches"
+    )
+    if repair:
+        logger.info(f"Deleted {report.orphans_deleted} orphans and fixed {report.sizes_fixed} sizes")
+    return asdict(report)
+
+
+@shared_task
+def move_cold_documents() -> int:
+    """
+    Periodic task to move the objects of documents nobody opened for
+    DOCUMENTS_COLD_AFTER_DAYS to the cold tier, in batches of tasks.
+    Run daily via Celery beat.
+    """
+    if not TieringService.enabled():
+        return 0
+    
+    count = 0
+    batch = []
+    for s3_key in TieringService.cold_keys():
+        batch.append(s3_key)
+        if len(batch) >= settings.DOCUMENTS_TIERING_BATCH_SIZE:
+            change_storage_tier.delay(batch, 'cold')
+            count += len(batch)
+            batch = []
+    if batch:
+        change_storage_tier.delay(batch, 'cold')
+        count += len(batch)
+    
+    logger.info(f"Scheduled {count} objects for the cold tier")
+    return count
+
+
+@shared_task(bind=True, max_retries=3)
+def change_storage_tier(self, s3_keys: List[str], tier: str) -> int:
+    """
+    Move objects to the hot or cold tier. Keys bound for the cold tier are
+    checked again, as their documents may have been opened since.
+    Only the objects that could not be moved are retried.
+    """
+    if tier == 'cold':
+        s3_keys = list(TieringService.cold_keys(s3_keys))
+    
+    result = TieringService.move(s3_keys, tier)
+    for bucket_name, stale_keys in result.stale_copies.items():
+        # Download URLs signed before the move keep working until they expire
+        delete_moved_objects.apply_async(
+            args=[bucket_name, stale_keys],
+            countdown=settings.DOCUMENTS_DOWNLOAD_URL_TTL
+        )
+    
+    if result.failed:
+        logger.warning(f"Failed to move {len(result.failed)} objects to the {tier} tier")
+        raise self.retry(args=[result.failed, tier], countdown=retry_delay(self.request.retries))
+    
+    return result.moved
+
+
+@shared_task
+def delete_moved_objects(bucket_name: str, s3_keys: List[str]) -> int:
+    """
+    Delete the copies moved objects left in their old bucket. Keys whose
+    documents were moved back into that bucket since are kept.
+    """
+    storage = storage_for_bucket(bucket_name)
+    in_use = {
+        s3_key
+        for s3_key, s3_bucket in Document.objects.all_tenants().filter(
+            s3_key__in=s3_keys
+        ).values_list('s3_key', 's3_bucket')
+        if storage_for_bucket(s3_bucket).bucket_name == storage.bucket_name
+    }
+    stale_keys = [s3_key for s3_key in s3_keys if s3_key not in in_use]
+    
+    not_deleted = storage.delete_files(stale_keys)
+    if not_deleted:
+        logger.warning(f"Failed to delete {len(not_deleted)} moved objects from {bucket_name}")
+    return len(stale_keys) - len(not_deleted)
+
+
+@shared_task(bind=True, max_retries=3)
+def sync_archive_storage(self, document_ids: List[str]) -> int:
+    """
+    Apply the archive state of a batch of documents to their stored objects.
+    Objects are tagged for bucket lifecycle rules and, when
+    DOCUMENTS_ARCHIVE_STORAGE_CLASS is set, moved to that class in place.
+    Shared blobs count as archived only while no active document uses them.
+    Only the documents whose objects could not be updated are retried.
+    """
+    documents = list(Document.objects.all_tenants().filter(
+        pk__in=document_ids
+    ).values_list('pk', 's3_key', 'blob_id', 'is_archived', 's3_bucket'))
+    
+    blob_ids = {blob_id for _, _, blob_id, _, _ in documents if blob_id}
+    active_blob_ids = set(Document.objects.all_tenants().filter(
+        blob_id__in=blob_ids,
+        is_archived=False
+    ).values_list('blob_id', flat=True))
+    
+    # Shared objects are updated once however many documents point at them
+    states = {}
+    buckets = {}
+    legacy = []
+    for pk, s3_key, blob_id, is_archived, s3_bucket in documents:
+        buckets[s3_key] = s3_bucket
+        if blob_id:
+            states[s3_key] = blob_id not in active_blob_ids
+        elif not is_archived and '/archive/' in s3_key:
+            legacy.append((pk, s3_key))
+        else:
+            states[s3_key] = is_archived
+    
+    with ThreadPoolExecutor(max_workers=settings.DOCUMENTS_ARCHIVE_SYNC_WORKERS) as executor:
+        updated = executor.map(
+            lambda state: storage_for_bucket(buckets[state[0]]).set_archive_state(
+                state[0],
+                state[1],
+                storage_class=settings.DOCUMENTS_ARCHIVE_STORAGE_CLASS
+            ),
+            states.items()
+        )
+        failed_keys = {s3_key for s3_key, success in zip(states, updated) if not success}
+        failed_ids = _restore_legacy_objects(legacy, executor)
+    
+    failed_ids += [str(pk) for pk, s3_key, _, _, _ in documents if s3_key in failed_keys]
+    if failed_ids:
+        logger.warning(f"Failed to update archive state of {len(failed_ids)} documents in storage")
+        raise self.retry(args=[failed_ids], countdown=retry_delay(self.request.retries))
+    
+    return len(documents)
+
+
+def _restore_legacy_objects(documents: List, executor) -> List[str]:
+    """
+    Copy restored documents archived under the old /archive/ prefix back to
+    their original keys, then delete the archived copies in batches.
+    Returns the ids of documents that could not be copied.
+    """
+    keys = {
+        pk: (s3_key, s3_key.replace('/archive/', '/documents/', 1))
+        for pk, s3_key in documents
+    }
+    results = executor.map(
+        lambda pair: document_storage.copy_file(*pair)['success'],
+        keys.values()
+    )
+    
+    failed_ids = []
+    copied_keys = []
+    for (pk, (archived_key, original_key)), success in zip(keys.items(), results):
+        if not success:
+            failed_ids.append(str(pk))
+            continue
+        
+        Document.objects.all_tenants().filter(pk=pk, s3_key=archived_key).update(s3_key=original_key)
+        copied_keys.append(archived_key)
+    
+    # The documents already point at the copies, so a failed delete only leaves garbage
+    not_deleted = document_storage.delete_files(copied_keys)
+    if not_deleted:
+        logger.warning(f"Failed to delete {len(not_deleted)} archived copies after restore")
+    
+    return failed_ids
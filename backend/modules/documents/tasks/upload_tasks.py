@@ -0,0 +1,36 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.utils import timezone
+
+from ..models import UploadSession
+from ..storage import document_storage
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def cleanup_expired_upload_sessions() -> int:
+    """
+    Periodic task to abort abandoned resumable uploads.
+    Discards the stored S3 parts and marks the sessions as expired.
+    Run hourly via Celery beat.
+    """
+    expired_sessions = UploadSession.objects.all_tenants().filter(
+        status='active',
+        expires_at__lt=timezone.now()
+    )
+    
+    count = 0
+    for session in expired_sessions.iterator():
+        if not document_storage.abort_multipart_upload(session.s3_key, session.upload_id):
+            logger.warning(f"Failed to abort multipart upload for session {session.id}")
+            continue
+        
+        # Guard against a client completing the upload in the meantime
+        count += UploadSession.objects.all_tenants().filter(
+            pk=session.pk,
+            status='active'
+        ).update(status='expired', updated_at=timezone.now())
+    
+    logger.info(f"Cleaned up {count} expired upload sessions")
+    return count
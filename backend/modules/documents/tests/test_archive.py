@@ -0,0 +1,99 @@
+import pytest
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from unittest import mock
+
+from ..models import Document, DocumentBlob
+from ..services.archive_service import ArchiveService
+from ..storage import document_storage
+from ..services import archive_service
+from ..tasks import storage_tasks
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestMetadataArchive(TestCase):
+    """Test cases for archiving without moving stored objects"""
+    
+    def setUp(self):
+        """Set up two documents sharing one blob"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.user = User.objects.create_user(
+            username="owner",
+            email="owner@test.com",
+            password="testpass123"
+        )
+        self.service = ArchiveService(self.tenant)
+        self.blob = DocumentBlob.objects.create(
+            tenant=self.tenant,
+            sha256='a' * 64,
+            s3_key=f"tenants/{self.tenant.id}/blobs/aa/{'a' * 64}",
+            s3_bucket='media',
+            size=10,
+            ref_count=2
+        )
+        self.first, self.second = [
+            Document.objects.create(
+                tenant=self.tenant,
+                original_name=name,
+                file_size=10,
+                file_extension='.txt',
+                mime_type='text/plain',
+                s3_key=self.blob.s3_key,
+                s3_bucket='media',
+                blob=self.blob,
+                created_by=self.user
+            )
+            for name in ("first.txt", "second.txt")
+        ]
+        
+        patcher = mock.patch.object(document_storage, 'set_archive_state', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_archive_only_changes_metadata(self):
+        """Test the object key stays and storage is only touched after commit"""
+        with mock.patch.object(document_storage, 'copy_file') as copy_file, \
+                mock.patch.object(archive_service.sync_archive_storage, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(self.service.archive(self.first))
+                delay.assert_not_called()
+            
+            copy_file.assert_not_called()
+            delay.assert_called_once_with([str(self.first.id)])
+        
+        self.first.refresh_from_db()
+        self.blob.refresh_from_db()
+        self.assertTrue(self.first.is_archived)
+        self.assertEqual(self.first.s3_key, self.blob.s3_key)
+        self.assertEqual(self.blob.ref_count, 1)
+        
+        # Archiving twice must not release the blob twice
+        self.assertFalse(self.service.archive(self.first))
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.ref_count, 1)
+    
+    def test_shared_blob_is_tagged_once_no_active_document_uses_it(self):
+        """Test the background job only marks content archived when unused"""
+        self.service.archive(self.first)
+        storage_tasks.sync_archive_storage([str(self.first.id)])
+        document_storage.set_archive_state.assert_called_with(
+            self.blob.s3_key, False, storage_class=''
+        )
+        
+        self.service.archive(self.second)
+        storage_tasks.sync_archive_storage([str(self.second.id)])
+        document_storage.set_archive_state.assert_called_with(
+            self.blob.s3_key, True, storage_class=''
+        )
+        
+        self.assertTrue(self.service.restore(self.first))
+        storage_tasks.sync_archive_storage([str(self.first.id)])
+        document_storage.set_archive_state.assert_called_with(
+            self.blob.s3_key, False, storage_class=''
+        )
@@ -0,0 +1,165 @@
+import json
+import pytest
+from django.test import AsyncRequestFactory, TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
+from rest_framework.test import force_authenticate
+from unittest import mock
+from datetime import timedelta
+
+from .. import async_views
+from ..models import Document, UploadSession
+from ..services import archive_service
+from ..storage import async_document_storage, document_storage
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestAsyncViews(TestCase):
+    """Test cases for the async document actions"""
+    
+    def setUp(self):
+        """Set up a document and its owner"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.user = User.objects.create_user(
+            username="owner",
+            email="owner@test.com",
+            password="testpass123"
+        )
+        self.document = Document.objects.create(
+            tenant=self.tenant,
+            original_name="report.pdf",
+            file_size=1024,
+            file_extension='.pdf',
+            mime_type='application/pdf',
+            s3_key=f"tenants/{self.tenant.id}/documents/report.pdf",
+            s3_bucket='media',
+            created_by=self.user
+        )
+        self.factory = AsyncRequestFactory()
+        
+        patcher = mock.patch.object(archive_service, 'sync_archive_storage')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def request(self, method, path, user, **kwargs):
+        request = getattr(self.factory, method)(path, **kwargs)
+        request.tenant = self.tenant
+        force_authenticate(request, user)
+        return request
+    
+    async def test_download_url_checks_permission(self):
+        """Test the owner gets a URL and other users are refused"""
+        path = f'/api/v1/files/{self.document.id}/download_url/'
+        
+        with mock.patch.object(
+            document_storage, 'generate_presigned_download_urls',
+            return_value=['https://s3.example.com/report.pdf?signed']
+        ):
+            response = await async_views.download_url(self.request('get', path, self.user), pk=self.document.id)
+            refused = await async_views.download_url(self.request('get', path, AnonymousUser()), pk=self.document.id)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'https://s3.example.com/report.pdf?signed', response.content)
+        self.assertEqual(refused.status_code, 403)
+    
+    async def test_users_are_authenticated_like_the_viewset(self):
+        """Test only the viewset's authentication classes count, not the session user"""
+        path = f'/api/v1/files/{self.document.id}/download_url/'
+        request = self.factory.get(path)
+        request.tenant = self.tenant
+        request.user = self.user
+        
+        async def auser():
+            return self.user
+        
+        request.auser = auser
+        response = await async_views.download_url(request, pk=self.document.id)
+        
+        self.assertEqual(response.status_code, 403)
+    
+    async def test_archive_and_restore(self):
+        """Test archive state changes and repeated requests"""
+        path = f'/api/v1/files/{self.document.id}/archive/'
+        
+        response = await async_views.archive(self.request('post', path, self.user), pk=self.document.id)
+        self.assertEqual(response.status_code, 200)
+        
+        response = await async_views.archive(self.request('post', path, self.user), pk=self.document.id)
+        self.assertEqual(response.status_code, 404)
+        
+        path = f'/api/v1/files/{self.document.id}/restore/?archived=true'
+        response = await async_views.restore(self.request('post', path, self.user), pk=self.document.id)
+        self.assertEqual(response.status_code, 200)
+        
+        await self.document.arefresh_from_db()
+        self.assertFalse(self.document.is_archived)
+    
+    async def test_complete_upload_uses_async_storage(self):
+        """Test upload completion awaits the async storage calls"""
+        session = await UploadSession.objects.acreate(
+            tenant=self.tenant,
+            original_name="video.mp4",
+            mime_type='video/mp4',
+            file_size=10,
+            part_size=8,
+            s3_key=f"tenants/{self.tenant.id}/documents/video.mp4",
+            s3_bucket='media',
+            upload_id='upload-1',
+            created_by=self.user,
+            expires_at=timezone.now() + timedelta(hours=1)
+        )
+        parts = {'success': True, 'parts': [
+            {'part_number': 1, 'etag': 'a', 'size': 8},
+            {'part_number': 2, 'etag': 'b', 'size': 2},
+        ]}
+        
+        with mock.patch.object(async_document_storage, 'list_uploaded_parts', mock.AsyncMock(return_value=parts)), \
+                mock.patch.object(
+                    async_document_storage, 'complete_multipart_upload',
+                    mock.AsyncMock(return_value={'success': True, 'version_id': 'v1'})
+                ) as complete:
+            response = await async_views.complete_upload(
+                self.request('post', f'/api/v1/uploads/{session.id}/complete/', self.user),
+                pk=session.id
+            )
+        
+        self.assertEqual(response.status_code, 201)
+        complete.assert_awaited_once()
+        document = await Document.objects.aget(s3_key=session.s3_key)
+        self.assertEqual(document.s3_version_id, 'v1')
+    
+    async def test_bulk_actions(self):
+        """Test bulk actions by filter and by id, with failures per document"""
+        missing = '00000000-0000-0000-0000-000000000000'
+        
+        response = await async_views.bulk_archive(self.request(
+            'post', '/api/v1/files/bulk_archive/', self.user,
+            data={'filter': {'file_extension': '.pdf'}}, content_type='application/json'
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {'updated': 1, 'failed': []})
+        
+        response = await async_views.bulk_restore(self.request(
+            'post', '/api/v1/files/bulk_restore/', self.user,
+            data={'ids': [str(self.document.id), missing]}, content_type='application/json'
+        ))
+        self.assertEqual(json.loads(response.content), {
+            'updated': 1,
+            'failed': [{'id': missing, 'error': 'Document not found'}]
+        })
+        
+        response = await async_views.bulk_move(self.request(
+            'post', '/api/v1/files/bulk_move/', self.user,
+            data={'folder': missing, 'ids': [str(self.document.id)]}, content_type='application/json'
+        ))
+        self.assertEqual(response.status_code, 400)
+        
+        await self.document.arefresh_from_db()
+        self.assertFalse(self.document.is_archived)
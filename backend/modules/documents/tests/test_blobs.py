@@ -0,0 +1,128 @@
+import pytest
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from datetime import timedelta
+from unittest import mock
+
+from ..models import Document, DocumentBlob
+from ..services.archive_service import ArchiveService
+from ..services.blob_service import BlobService
+from ..services.document_service import DocumentService, UploadDocumentDTO
+from ..storage import document_storage
+from ..tasks.storage_tasks import collect_unreferenced_blobs
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestBlobDeduplication(TestCase):
+    """Test cases for content-addressed document storage"""
+    
+    def setUp(self):
+        """Set up tenant, user and mocked object storage"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.user = User.objects.create_user(
+            username="uploader",
+            email="uploader@test.com",
+            password="testpass123"
+        )
+        self.service = DocumentService(self.user, self.tenant)
+        
+        patches = [
+            mock.patch.object(
+                document_storage, 'upload_file',
+                return_value={'success': True, 'encoding': '', 'stored_size': 12}
+            ),
+            mock.patch.object(document_storage, 'delete_file', return_value=True),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def _upload(self, name, content=b"same content"):
+        dto = self.service.upload_document(UploadDocumentDTO(
+            file=SimpleUploadedFile(name, content, content_type="text/plain"),
+            folder_id=None,
+            nickname=None,
+            description=None,
+            share_with_user_ids=[]
+        ))
+        return Document.objects.get(pk=dto.id)
+    
+    def test_identical_content_is_stored_once(self):
+        """Test a second upload of the same bytes reuses the blob"""
+        first = self._upload("a.txt")
+        second = self._upload("b.txt")
+        other = self._upload("c.txt", b"different content")
+        
+        self.assertEqual(first.blob, second.blob)
+        self.assertEqual(first.s3_key, second.s3_key)
+        self.assertNotEqual(first.blob, other.blob)
+        self.assertEqual(document_storage.upload_file.call_count, 2)
+        
+        first.blob.refresh_from_db()
+        self.assertEqual(first.blob.ref_count, 2)
+        
+        savings = BlobService(self.tenant).storage_savings()
+        self.assertEqual(savings.document_count, 3)
+        self.assertEqual(savings.blob_count, 2)
+        self.assertEqual(savings.saved_bytes, len(b"same content"))
+    
+    def test_savings_count_blobs_of_equal_size_separately(self):
+        """Test different content of the same size is stored, and counted, twice"""
+        self._upload("a.txt", b"content one")
+        self._upload("b.txt", b"content two")
+        self._upload("c.txt", b"content two")
+        
+        savings = BlobService(self.tenant).storage_savings()
+        self.assertEqual(savings.blob_count, 2)
+        self.assertEqual(savings.stored_bytes, 2 * len(b"content one"))
+        self.assertEqual(savings.saved_bytes, len(b"content two"))
+    
+    def test_archive_restore_and_delete_adjust_ref_count(self):
+        """Test lifecycle operations keep the reference count in sync"""
+        first = self._upload("a.txt")
+        second = self._upload("b.txt")
+        blob = first.blob
+        
+        self.assertTrue(self.service.archive_document(str(first.id)))
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        
+        # Archiving is metadata-only for deduplicated content
+        first.refresh_from_db()
+        self.assertTrue(first.is_archived)
+        self.assertEqual(first.s3_key, blob.s3_key)
+        
+        self.assertTrue(ArchiveService(self.tenant).restore(first))
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 2)
+        
+        second.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+    
+    def test_garbage_collection_removes_unreferenced_blobs(self):
+        """Test only blobs without references past the grace period are removed"""
+        kept = self._upload("a.txt")
+        removed = self._upload("b.txt", b"removed content")
+        removed_blob = removed.blob
+        removed.delete()
+        
+        # Still inside the grace period
+        self.assertEqual(collect_unreferenced_blobs(), 0)
+        
+        DocumentBlob.objects.filter(pk=removed_blob.pk).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(collect_unreferenced_blobs(), 1)
+        
+        self.assertFalse(DocumentBlob.objects.filter(pk=removed_blob.pk).exists())
+        self.assertTrue(DocumentBlob.objects.filter(pk=kept.blob_id).exists())
+        document_storage.delete_file.assert_called_once_with(removed_blob.s3_key)
@@ -0,0 +1,174 @@
+import pytest
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from unittest import mock
+import uuid
+
+from ..models import Document, DocumentBlob, Folder
+from ..services import archive_service
+from ..storage import document_storage
+from ..tasks import storage_tasks
+from core.storage.backends import S3Backend
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+@override_settings(DOCUMENTS_BULK_ACTION_CHUNK_SIZE=2, DOCUMENTS_ARCHIVE_SYNC_BATCH_SIZE=2)
+class TestBulkActions(TestCase):
+    """Test cases for bulk archive, restore and move"""
+    
+    def setUp(self):
+        """Set up documents sharing one blob plus a legacy document without one"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.user = User.objects.create_user(
+            username="manager",
+            email="manager@test.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.folder = Folder.objects.create(
+            tenant=self.tenant,
+            name="Projects",
+            created_by=self.user
+        )
+        self.blob = DocumentBlob.objects.create(
+            tenant=self.tenant,
+            sha256='b' * 64,
+            s3_key=f"tenants/{self.tenant.id}/blobs/bb/{'b' * 64}",
+            s3_bucket='media',
+            size=10,
+            ref_count=3
+        )
+        self.documents = [
+            self.create_document(f"report-{index}.txt", blob=self.blob)
+            for index in range(3)
+        ]
+        self.legacy = self.create_document(
+            "legacy.txt",
+            s3_key=f"tenants/{self.tenant.id}/archive/2024/01/legacy.txt",
+            is_archived=True
+        )
+        
+        patcher = mock.patch.object(archive_service, 'sync_archive_storage')
+        self.sync_task = patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def create_document(self, name, blob=None, **fields):
+        return Document.objects.create(
+            tenant=self.tenant,
+            original_name=name,
+            file_size=10,
+            file_extension='.txt',
+            mime_type='text/plain',
+            s3_key=fields.pop('s3_key', blob.s3_key if blob else f"tenants/{self.tenant.id}/documents/{name}"),
+            s3_bucket='media',
+            blob=blob,
+            created_by=self.user,
+            **fields
+        )
+    
+    def test_bulk_archive_reports_failures_per_document(self):
+        """Test chunked archiving with unknown and already archived ids"""
+        missing_id = str(uuid.uuid4())
+        ids = [str(document.id) for document in self.documents] + [str(self.legacy.id), missing_id]
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/v1/files/bulk_archive/',
+                {'ids': ids},
+                format='json'
+            )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(
+            sorted((failure['id'], failure['error']) for failure in response.data['failed']),
+            sorted([
+                (str(self.legacy.id), "Document is already archived"),
+                (missing_id, "Document not found"),
+            ])
+        )
+        
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.ref_count, 0)
+        self.assertEqual(Document.objects.filter(is_archived=True).count(), 4)
+        # Storage sync is queued in batches after commit
+        self.assertEqual(
+            sum(len(call.args[0]) for call in self.sync_task.delay.call_args_list),
+            3
+        )
+    
+    def test_bulk_restore_and_move_by_filter(self):
+        """Test filter selections spanning several chunks"""
+        Document.objects.filter(blob=self.blob).update(is_archived=True)
+        
+        response = self.client.post(
+            '/api/v1/files/bulk_restore/',
+            {'filter': {'name': 'report'}},
+            format='json'
+        )
+        self.assertEqual(response.data, {'updated': 3, 'failed': []})
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.ref_count, 6)
+        
+        response = self.client.post(
+            '/api/v1/files/bulk_move/',
+            {'folder': str(self.folder.id), 'filter': {'folder': 'root', 'file_extension': '.txt'}},
+            format='json'
+        )
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(Document.objects.filter(folder=self.folder).count(), 4)
+        
+        response = self.client.post(
+            '/api/v1/files/bulk_move/',
+            {'folder': str(uuid.uuid4()), 'ids': [str(self.legacy.id)]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post(
+            '/api/v1/files/bulk_archive/',
+            {'filter': {'folder': 'abc'}},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+    
+    def test_sync_restores_legacy_archive_objects(self):
+        """Test legacy archived copies are copied back and deleted in one batch"""
+        Document.objects.filter(pk=self.legacy.pk).update(is_archived=False)
+        
+        with mock.patch.object(document_storage, 'copy_file', return_value={'success': True}) as copy_file, \
+                mock.patch.object(document_storage, 'delete_files', return_value=[]) as delete_files, \
+                mock.patch.object(document_storage, 'set_archive_state', return_value=True) as set_state:
+            storage_tasks.sync_archive_storage([str(self.legacy.id), str(self.documents[0].id)])
+        
+        legacy_key = f"tenants/{self.tenant.id}/archive/2024/01/legacy.txt"
+        original_key = f"tenants/{self.tenant.id}/documents/2024/01/legacy.txt"
+        copy_file.assert_called_once_with(legacy_key, original_key)
+        delete_files.assert_called_once_with([legacy_key])
+        set_state.assert_called_once_with(self.blob.s3_key, False, storage_class='')
+        
+        self.legacy.refresh_from_db()
+        self.assertEqual(self.legacy.s3_key, original_key)
+    
+    def test_delete_files_batches_keys(self):
+        """Test DeleteObjects is called with at most 1000 keys and errors are reported"""
+        client = mock.Mock()
+        client.delete_objects.side_effect = [
+            {'Errors': [{'Key': 'key-3', 'Code': 'AccessDenied'}]},
+            {},
+        ]
+        
+        with mock.patch.object(document_storage, 'backend', S3Backend()), \
+                mock.patch('core.storage.backends.s3.get_s3_client', return_value=client):
+            failed = document_storage.delete_files([f"key-{index}" for index in range(1500)])
+        
+        self.assertEqual(failed, ['key-3'])
+        batches = [call.kwargs['Delete']['Objects'] for call in client.delete_objects.call_args_list]
+        self.assertEqual([len(batch) for batch in batches], [1000, 500])
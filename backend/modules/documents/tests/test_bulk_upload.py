@@ -0,0 +1,120 @@
+import pytest
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+from unittest import mock
+import io
+import zipfile
+
+from ..models import Document, DocumentBlob, Folder
+from ..services import bulk_upload_service
+from ..storage import document_storage
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+
+def make_zip(entries) -> SimpleUploadedFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    return SimpleUploadedFile("import.zip", buffer.getvalue(), content_type="application/zip")
+
+
+@pytest.mark.django_db
+@override_settings(DOCUMENTS_BULK_UPLOAD_BATCH_SIZE=2)
+class TestBulkUpload(TestCase):
+    """Test cases for the bulk upload endpoint"""
+    
+    def setUp(self):
+        """Set up tenant, user and mocked storage and task queue"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.user = User.objects.create_user(
+            username="uploader",
+            email="uploader@test.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        
+        patches = [
+            mock.patch.object(
+                document_storage, 'upload_file',
+                return_value={'success': True, 'encoding': '', 'stored_size': 12}
+            ),
+            mock.patch.object(bulk_upload_service, 'process_uploaded_document'),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def test_upload_many_files(self):
+        """Test per-file results for a multi-file upload"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/files/bulk_upload/', {
+                'files': [
+                    SimpleUploadedFile("a.txt", b"alpha", content_type="text/plain"),
+                    SimpleUploadedFile("b.txt", b"alpha", content_type="text/plain"),
+                    SimpleUploadedFile("c.pdf", b"%PDF-1.4", content_type="application/pdf"),
+                    SimpleUploadedFile("run.exe", b"MZ", content_type="application/octet-stream"),
+                ]
+            }, format='multipart')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['failed'], 1)
+        
+        results = {result['path']: result for result in response.data['results']}
+        self.assertEqual(results['run.exe']['status'], 'failed')
+        self.assertEqual(results['b.txt']['status'], 'created')
+        
+        # Identical content is written to storage once
+        self.assertEqual(document_storage.upload_file.call_count, 2)
+        self.assertEqual(DocumentBlob.objects.count(), 2)
+        self.assertEqual(Document.objects.get(original_name="c.pdf").file_type, 'pdf')
+        
+        # Two batches of documents, each queued with one chunked task call
+        chunks = bulk_upload_service.process_uploaded_document.chunks
+        self.assertEqual(chunks.call_count, 2)
+        queued = [args for call in chunks.call_args_list for args in call.args[0]]
+        self.assertEqual(len(queued), 3)
+    
+    def test_zip_archive_is_expanded_into_folders(self):
+        """Test directories inside the archive become folders"""
+        archive = make_zip({
+            "reports/2024/q1.csv": b"a,b\n1,2\n",
+            "reports/2024/q2.csv": b"a,b\n3,4\n",
+            "reports/summary.txt": b"summary",
+            "__MACOSX/reports/._summary.txt": b"",
+            "../escape.txt": b"nope",
+        })
+        
+        response = self.client.post('/api/v1/files/bulk_upload/', {
+            'archive': archive
+        }, format='multipart')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['failed'], 1)
+        
+        reports = Folder.objects.get(name="reports", parent=None)
+        year = Folder.objects.get(name="2024", parent=reports)
+        self.assertEqual(
+            set(Document.objects.filter(folder=year).values_list('original_name', flat=True)),
+            {"q1.csv", "q2.csv"}
+        )
+        self.assertTrue(Document.objects.filter(folder=reports, original_name="summary.txt").exists())
+    
+    def test_requires_files_or_archive(self):
+        """Test validation of the request payload"""
+        response = self.client.post('/api/v1/files/bulk_upload/', {}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post('/api/v1/files/bulk_upload/', {
+            'archive': SimpleUploadedFile("broken.zip", b"not a zip")
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
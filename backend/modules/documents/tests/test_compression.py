@@ -0,0 +1,99 @@
+import os
+import pytest
+import tempfile
+from django.core import signing
+from django.test import TestCase, override_settings
+from unittest import mock
+
+from ..models import Document
+from ..services.blob_service import BlobService
+from ..services.presigned_url_service import PresignedUrlService
+from ..storage import document_storage
+from core.storage.backends import MemoryBackend
+from core.storage.backends.base import URL_SIGNING_SALT
+from core.tenancy.models import Account
+
+CSV = b'id,name,amount\n' + b''.join(b'%d,row %d,%d\n' % (i, i, i * 7) for i in range(2000))
+
+
+@pytest.mark.django_db
+@override_settings(DOCUMENTS_COMPRESSION='zstd', DOCUMENTS_COMPRESSION_MIN_SIZE=1024)
+class TestCompressionAtRest(TestCase):
+    """Test cases for storing compressible content compressed"""
+    
+    def setUp(self):
+        """Set up a tenant whose objects are in an in-memory store"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.backend = MemoryBackend()
+        self.enterContext(mock.patch.object(document_storage, 'backend', self.backend))
+        self.service = BlobService(self.tenant)
+    
+    def test_compressible_content_is_stored_compressed(self):
+        """Test text is stored zstd-compressed with its original size recorded"""
+        stored = self.service.store(CSV, 'text/csv; charset=utf-8')
+        
+        blob = stored.blob
+        self.assertEqual(blob.encoding, 'zstd')
+        self.assertEqual(blob.size, len(CSV))
+        self.assertLess(blob.stored_size, len(CSV) // 2)
+        info = self.backend.head_object(blob.s3_key)
+        self.assertEqual(info.size, blob.stored_size)
+        self.assertEqual(info.metadata['original-size'], str(len(CSV)))
+        
+        savings = self.service.compression_savings()
+        self.assertEqual(savings.blob_count, 1)
+        self.assertEqual(savings.saved_bytes, len(CSV) - blob.stored_size)
+    
+    def test_reads_return_original_content(self):
+        """Test downloads and ranged reads decode the stored content"""
+        blob = self.service.store(CSV, 'text/csv').blob
+        
+        with tempfile.NamedTemporaryFile() as tmp_file:
+            self.assertTrue(document_storage.download_file(blob.s3_key, tmp_file.name))
+            self.assertEqual(tmp_file.read(), CSV)
+        
+        with document_storage.open_file_range(blob.s3_key) as stream:
+            self.assertEqual(stream.info.size, len(CSV))
+            self.assertEqual(stream.read(), CSV)
+        
+        # Ranges beyond the stored bytes are still within the original content
+        stream = document_storage.open_file_range(blob.s3_key, f'bytes={blob.stored_size + 10}-')
+        self.assertEqual(stream.read(), CSV[blob.stored_size + 10:])
+        self.assertEqual(stream.content_range, (blob.stored_size + 10, len(CSV) - 1))
+    
+    def test_other_content_is_stored_as_is(self):
+        """Test small, incompressible or other types of content are not compressed"""
+        for content, content_type in [
+            (b'a,b\n1,2\n', 'text/csv'),
+            (os.urandom(4096), 'text/plain'),
+            (CSV, 'application/pdf'),
+        ]:
+            with self.subTest(content_type=content_type, size=len(content)):
+                blob = self.service.store(content, content_type).blob
+                self.assertEqual(blob.encoding, '')
+                self.assertEqual(blob.stored_size, len(content))
+                self.assertEqual(self.backend.head_object(blob.s3_key).size, len(content))
+        
+        self.assertEqual(self.service.compression_savings().saved_bytes, 0)
+    
+    def test_download_urls_pass_encoding_on(self):
+        """Test URLs of compressed content have clients decode it"""
+        blob = self.service.store(CSV, 'text/csv').blob
+        document = Document.objects.create(
+            tenant=self.tenant,
+            original_name='data.csv',
+            file_size=len(CSV),
+            file_extension='.csv',
+            mime_type='text/csv',
+            s3_key=blob.s3_key,
+            s3_bucket=blob.s3_bucket,
+            blob=blob
+        )
+        
+        url = PresignedUrlService().get_url(document)
+        
+        payload = signing.loads(url.split('/')[-2], salt=URL_SIGNING_SALT)
+        self.assertEqual(payload['p']['response-content-encoding'], 'zstd')
@@ -0,0 +1,114 @@
+import pytest
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient, force_authenticate
+from unittest import mock
+
+from .. import async_views
+from ..models import Document
+from ..storage import document_storage
+from core.storage.backends import MemoryBackend
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+@override_settings(DOCUMENTS_STREAM_CHUNK_SIZE=1000)
+class TestContentStreaming(TestCase):
+    """Test cases for streaming document content with byte ranges and ETags"""
+    
+    def setUp(self):
+        """Set up a stored document and its owner"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@test.com",
+            password="testpass123"
+        )
+        self.content = bytes(range(256)) * 20
+        self.document = Document.objects.create(
+            tenant=self.tenant,
+            original_name="manual.pdf",
+            file_size=len(self.content),
+            file_extension='.pdf',
+            mime_type='application/pdf',
+            s3_key=f"tenants/{self.tenant.id}/documents/manual.pdf",
+            s3_bucket='media',
+            created_by=self.owner
+        )
+        
+        self.backend = MemoryBackend()
+        self.etag = self.backend.put_object(self.document.s3_key, self.content).etag
+        patcher = mock.patch.object(document_storage, 'backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.path = f'/api/v1/files/{self.document.id}/content/'
+    
+    def test_full_download_is_streamed_in_chunks(self):
+        """Test the whole document streams in fixed-size chunks with validators"""
+        response = self.client.get(self.path + '?download=true')
+        
+        self.assertEqual(response.status_code, 200)
+        chunks = list(response.streaming_content)
+        self.assertEqual(b''.join(chunks), self.content)
+        self.assertEqual(max(len(chunk) for chunk in chunks), 1000)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['ETag'], f'"{self.etag}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="manual.pdf"')
+    
+    def test_range_requests(self):
+        """Test single ranges get partial content and unsatisfiable ones 416"""
+        response = self.client.get(self.path, HTTP_RANGE='bytes=100-1099')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:1100])
+        self.assertEqual(response['Content-Range'], f'bytes 100-1099/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '1000')
+        self.assertTrue(response['Content-Disposition'].startswith('inline;'))
+        
+        suffix = self.client.get(self.path, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(suffix.streaming_content), self.content[-10:])
+        
+        unsatisfiable = self.client.get(self.path, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], f'bytes */{len(self.content)}')
+        
+        # Several ranges are not supported, so the whole document is returned
+        multiple = self.client.get(self.path, HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(multiple.status_code, 200)
+    
+    def test_if_none_match(self):
+        """Test a matching ETag answers 304 without a body"""
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=f'"{self.etag}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], f'"{self.etag}"')
+        
+        changed = self.client.get(self.path, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(changed.status_code, 200)
+    
+    def test_permission_and_missing_content(self):
+        """Test other users are refused and a missing object is reported"""
+        other = User.objects.create_user(username="other", email="other@test.com", password="x")
+        client = APIClient()
+        client.force_authenticate(other)
+        self.assertEqual(client.get(self.path).status_code, 403)
+        
+        self.backend.delete_objects([self.document.s3_key])
+        self.assertEqual(self.client.get(self.path).status_code, 404)
+    
+    async def test_async_view_streams_range(self):
+        """Test the async view streams partial content through an async iterator"""
+        request = AsyncRequestFactory().get(self.path, headers={'Range': 'bytes=10-19'})
+        request.tenant = self.tenant
+        force_authenticate(request, self.owner)
+        response = await async_views.content(request, pk=self.document.id)
+        
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), self.content[10:20])
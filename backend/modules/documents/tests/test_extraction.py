@@ -0,0 +1,321 @@
+import io
+import multiprocessing
+import pytest
+import resource
+import signal
+import tempfile
+import time
+import zipfile
+from datetime import date
+from django.test import TestCase, override_settings
+from openpyxl import Workbook
+from unittest import mock
+
+from ..extraction import EXTRACTORS, ExtractionLimitExceeded, extract_range, memory_limit
+from ..models import Document, DocumentTextChunk
+from ..services import text_extraction_service
+from ..services.text_extraction_service import TextExtractionService
+from ..storage import document_storage
+from ..tasks.document_tasks import extract_document_text
+from core.storage.backends import MemoryBackend
+from core.tenancy.models import Account
+
+
+def pdf_bytes(texts) -> bytes:
+    """A PDF with a line of Helvetica text on each page"""
+    pages = [4 + 2 * index for index in range(len(texts))]
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(b'%d 0 R' % page for page in pages), len(pages)),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for page, text in zip(pages, texts):
+        stream = b'BT /F1 12 Tf 72 720 Td (%s) Tj ET' % text.encode()
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (page + 1)
+        )
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+    
+    pdf = io.BytesIO()
+    pdf.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(pdf.tell())
+        pdf.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+    xref = pdf.tell()
+    pdf.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        pdf.write(b'%010d 00000 n \n' % offset)
+    pdf.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return pdf.getvalue()
+
+
+def docx_bytes(body: str) -> bytes:
+    """A Word document with the given body XML"""
+    document = io.BytesIO()
+    with zipfile.ZipFile(document, 'w') as archive:
+        archive.writestr('word/document.xml', (
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{body}</w:body></w:document>'
+        ))
+    return document.getvalue()
+
+
+def xlsx_bytes(sheets) -> bytes:
+    """A workbook with the given rows on each named sheet"""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        worksheet = workbook.create_sheet(title)
+        for row in rows:
+            worksheet.append(row)
+    document = io.BytesIO()
+    workbook.save(document)
+    return document.getvalue()
+
+
+def _stuck(path, pages, limits, structure):
+    time.sleep(60)
+    yield ''
+
+
+def _extract_in_daemon(path, results):
+    """Extract a text file in the extraction pool of a daemonic process, like a Celery prefork worker"""
+    text_extraction_service._pool = None
+    try:
+        pool = text_extraction_service.extraction_pool()
+        results.put(pool.apply_async(extract_range, (path, 'text', None, 100)).get(timeout=30).texts)
+    except Exception as e:
+        results.put(repr(e))
+    finally:
+        text_extraction_service._discard_pool()
+
+
+@pytest.mark.django_db
+@override_settings(
+    DOCUMENTS_EXTRACTION_CHUNK_SIZE=16,
+    DOCUMENTS_EXTRACTION_PROCESSES=0,
+    DOCUMENTS_EXTRACTION_TIME_LIMIT=60
+)
+class TestTextExtraction(TestCase):
+    """Test cases for extracting text in pieces and storing it in chunks"""
+    
+    def setUp(self):
+        """Set up a tenant whose objects are in an in-memory store"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.backend = MemoryBackend()
+        self.enterContext(mock.patch.object(document_storage, 'backend', self.backend))
+        self.enterContext(override_settings(DOCUMENTS_SCRATCH_DIR=self.enterContext(tempfile.TemporaryDirectory())))
+        self.addCleanup(text_extraction_service._discard_pool)
+    
+    def create_document(self, content: bytes, name: str, mime_type: str) -> Document:
+        s3_key = f"tenants/{self.tenant.id}/documents/{name}"
+        self.backend.put_object(s3_key, content, mime_type)
+        return Document.objects.create(
+            tenant=self.tenant,
+            original_name=name,
+            file_size=len(content),
+            file_extension='.' + name.rsplit('.', 1)[1],
+            mime_type=mime_type,
+            s3_key=s3_key,
+            s3_bucket='test-bucket'
+        )
+    
+    def extract(self, content: bytes, name: str, mime_type: str):
+        document = self.create_document(content, name, mime_type)
+        with tempfile.NamedTemporaryFile(suffix=document.file_extension) as source:
+            source.write(content)
+            source.flush()
+            return document, TextExtractionService(document).extract(source.name)
+    
+    def stored_text(self, document: Document) -> str:
+        return ''.join(DocumentTextChunk.objects.filter(document=document).values_list('text', flat=True))
+    
+    def test_text_is_stored_in_chunks(self):
+        """Test extraction writes the whole text in ordered chunks and keeps its start on the document"""
+        text = 'quarterly revenue grew\n' * 1000
+        document = self.create_document(text.encode(), 'report.txt', 'text/plain')
+        
+        self.assertTrue(extract_document_text(str(document.id), str(self.tenant.id)))
+        
+        document.refresh_from_db()
+        self.assertTrue(document.text_extracted)
+        self.assertEqual(document.extracted_text, text[:10000])
+        self.assertIn('quarterly revenue grew', document.search_vector)
+        self.assertEqual(self.stored_text(document), text)
+        self.assertEqual(document.text_chunks.count(), len(text) // 16 + 1)
+    
+    def test_pdf_pages_and_word_paragraphs(self):
+        """Test PDFs are read page by page and Word paragraphs, tables included, in order"""
+        document, result = self.extract(pdf_bytes(['First page', 'Second page']), 'a.pdf', 'application/pdf')
+        self.assertEqual(self.stored_text(document), 'First page\nSecond page\n')
+        self.assertEqual(result.chunks, 2)
+        
+        document, _ = self.extract(docx_bytes(
+            '<w:p><w:r><w:t>Budget</w:t><w:tab/><w:t>2025</w:t></w:r></w:p>'
+            '<w:tbl><w:tr><w:tc><w:p><w:r><w:t>Cell</w:t></w:r></w:p></w:tc></w:tr></w:tbl>'
+            '<w:p><w:r><w:t>Closing</w:t></w:r></w:p>'
+        ), 'b.docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+        self.assertEqual(self.stored_text(document), 'Budget\t2025\nCell\nClosing\n')
+    
+    @override_settings(DOCUMENTS_EXTRACTION_MAX_CHARS=40)
+    def test_text_beyond_the_limit_is_not_stored(self):
+        """Test extraction stops at DOCUMENTS_EXTRACTION_MAX_CHARS"""
+        document, result = self.extract(b'x' * 1000, 'long.txt', 'text/plain')
+        
+        self.assertTrue(result.truncated)
+        self.assertEqual(self.stored_text(document), 'x' * 40)
+    
+    @override_settings(DOCUMENTS_EXTRACTION_PROCESSES=2, DOCUMENTS_EXTRACTION_PARALLEL_PAGES=4, DOCUMENTS_EXTRACTION_RANGE_PAGES=2)
+    def test_long_pdfs_are_split_across_the_pool(self):
+        """Test page ranges extracted in pool processes come back in order"""
+        texts = [f'Page {number}' for number in range(7)]
+        
+        document, result = self.extract(pdf_bytes(texts), 'long.pdf', 'application/pdf')
+        
+        self.assertEqual(self.stored_text(document), ''.join(f'{text}\n' for text in texts))
+        self.assertEqual(result.characters, sum(len(text) + 1 for text in texts))
+    
+    @override_settings(DOCUMENTS_EXTRACTION_PROCESSES=1)
+    def test_pool_runs_in_daemonic_workers(self):
+        """Test the extraction pool starts within a daemonic process"""
+        results = multiprocessing.get_context('fork').Queue()
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as source:
+            source.write('minutes')
+            source.flush()
+            worker = multiprocessing.get_context('fork').Process(
+                target=_extract_in_daemon,
+                args=(source.name, results),
+                daemon=True
+            )
+            worker.start()
+            self.addCleanup(worker.join, 10)
+            
+            self.assertEqual(results.get(timeout=60), ['minutes'])
+    
+    def test_limits_are_lifted_while_text_is_stored(self):
+        """Test the time and memory limits apply to parsing only, not to writing chunks"""
+        armed = []
+        write = text_extraction_service._ChunkWriter.write
+        
+        def record_limits(writer, text):
+            armed.append((signal.getitimer(signal.ITIMER_REAL)[0], resource.getrlimit(resource.RLIMIT_AS)))
+            write(writer, text)
+        
+        self.enterContext(mock.patch.object(text_extraction_service._ChunkWriter, 'write', record_limits))
+        with override_settings(DOCUMENTS_EXTRACTION_MEMORY_LIMIT=512 * 1024 * 1024):
+            self.extract(b'minutes\n' * 100, 'minutes.txt', 'text/plain')
+        
+        unlimited = resource.getrlimit(resource.RLIMIT_AS)
+        self.assertTrue(armed)
+        self.assertEqual(set(armed), {(0.0, unlimited)})
+    
+    @override_settings(DOCUMENTS_EXTRACTION_PROCESSES=1, DOCUMENTS_EXTRACTION_TIME_LIMIT=1)
+    def test_stuck_extraction_is_killed(self):
+        """Test a parser still running at the time limit is killed with its pool"""
+        self.enterContext(mock.patch.dict(EXTRACTORS, word=_stuck))
+        
+        started = time.monotonic()
+        with self.assertRaises(ExtractionLimitExceeded):
+            self.extract(docx_bytes(''), 'stuck.docx', 'application/msword')
+        
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertIsNone(text_extraction_service._pool)
+    
+    @override_settings(DOCUMENTS_EXTRACTION_TIME_LIMIT=1)
+    def test_stuck_extraction_is_stopped_in_process(self):
+        """Test a parser stuck within one page is interrupted at the time limit without a pool"""
+        self.enterContext(mock.patch.dict(EXTRACTORS, word=_stuck))
+        
+        started = time.monotonic()
+        with self.assertRaises(ExtractionLimitExceeded):
+            self.extract(docx_bytes(''), 'stuck.docx', 'application/msword')
+        
+        self.assertLess(time.monotonic() - started, 10)
+    
+    def test_memory_limit(self):
+        """Test allocations beyond the memory limit fail, and only within the limit's block"""
+        with memory_limit(64 * 1024 * 1024):
+            with self.assertRaises(MemoryError):
+                bytearray(1024 * 1024 * 1024)
+        self.assertEqual(len(bytearray(256 * 1024 * 1024)), 256 * 1024 * 1024)
+    
+    def test_spreadsheets_are_indexed_with_sheet_summaries(self):
+        """Test workbooks are indexed row by row under each sheet's name and header, and summarized"""
+        content = xlsx_bytes({
+            'Budget': [
+                ['Item', 'Amount', 'Due'],
+                ['Venue', 1200, date(2025, 3, 1)],
+                ['Catering', 830.5, None],
+            ],
+            'Notes': [[None], ['Approved by finance']],
+        })
+        mime_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        
+        document, result = self.extract(content, 'budget.xlsx', mime_type)
+        
+        self.assertEqual(self.stored_text(document), (
+            'Budget\nItem\tAmount\tDue\n'
+            'Venue\t1200\t2025-03-01T00:00:00\n'
+            'Catering\t830.5\n'
+            'Notes\nApproved by finance\n'
+        ))
+        budget, notes = result.structure['sheets']
+        self.assertEqual((budget['name'], budget['rows'], budget['truncated']), ('Budget', 2, False))
+        self.assertEqual(budget['columns'][1], {
+            'name': 'Amount', 'values': 2, 'types': {'number': 2}, 'min': 830.5, 'max': 1200
+        })
+        self.assertEqual(budget['columns'][2]['types'], {'date': 1})
+        self.assertEqual(notes['columns'], [{'name': 'Approved by finance', 'values': 0, 'types': {}}])
+        document.refresh_from_db()
+        self.assertEqual(document.text_structure, result.structure)
+        
+        with override_settings(DOCUMENTS_EXTRACTION_PROCESSES=1):
+            _, pooled = self.extract(content, 'copy.xlsx', mime_type)
+        self.assertEqual(pooled.structure, result.structure)
+    
+    @override_settings(DOCUMENTS_EXTRACTION_TABLE_ROWS=2, DOCUMENTS_EXTRACTION_TABLE_COLUMNS=2, DOCUMENTS_EXTRACTION_CELL_CHARS=5)
+    def test_csv_files_are_indexed_up_to_the_limits(self):
+        """Test CSV rows, columns and cells beyond the limits are not indexed"""
+        content = b'\xef\xbb\xbf' + '\n'.join([
+            'Stakeholder;Score;Notes',
+            'Alexandra;7;first',
+            'Bo;nine;second',
+            'Cy;3;third',
+        ]).encode()
+        
+        document, result = self.extract(content, 'people.csv', 'text/csv')
+        
+        self.assertEqual(self.stored_text(document), 'Stake\tScore\nAlexa\t7\nBo\tnine\n')
+        sheet, = result.structure['sheets']
+        self.assertEqual((sheet['rows'], sheet['truncated']), (2, True))
+        self.assertEqual([column['name'] for column in sheet['columns']], ['Stake', 'Score'])
+        self.assertEqual(sheet['columns'][1]['types'], {'number': 1, 'text': 1})
+    
+    def test_text_of_the_same_content_is_copied(self):
+        """Test text extracted for content is copied to documents with it, until its document is gone"""
+        text = 'minutes of the board meeting\n' * 10
+        first = self.create_document(text.encode(), 'minutes.txt', 'text/plain')
+        second = self.create_document(text.encode(), 'copy.txt', 'text/plain')
+        Document.objects.update(content_sha256='cd' * 32)
+        downloads = self.enterContext(mock.patch.object(
+            document_storage, 'download_file',
+            wraps=document_storage.download_file
+        ))
+        
+        for document in (first, second):
+            self.assertTrue(extract_document_text(str(document.id), str(self.tenant.id)))
+        
+        self.assertEqual(downloads.call_count, 1)
+        second.refresh_from_db()
+        self.assertEqual(second.extracted_text, text)
+        self.assertEqual(self.stored_text(second), text)
+        
+        first.delete()
+        self.assertTrue(extract_document_text(str(second.id), str(self.tenant.id)))
+        self.assertEqual(downloads.call_count, 2)
+        self.assertEqual(self.stored_text(second), text)
@@ -0,0 +1,113 @@
+import pytest
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from botocore.config import Config
+from unittest import mock
+import boto3
+
+from ..models import Document
+from ..storage import document_storage
+from core.storage.backends import S3Backend, s3 as s3_backend
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+})
+class TestPresignedUrls(TestCase):
+    """Test cases for batch-signed, cached download URLs in listings"""
+    
+    def setUp(self):
+        """Set up documents and an offline S3 client (signing needs no network)"""
+        cache.clear()
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@test.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        
+        self.documents = [
+            Document.objects.create(
+                tenant=self.tenant,
+                original_name=f"report-{number}.pdf",
+                file_size=100,
+                file_extension='.pdf',
+                mime_type='application/pdf',
+                s3_key=f"tenants/{self.tenant.id}/documents/report-{number}.pdf",
+                s3_bucket='media',
+                created_by=self.owner
+            )
+            for number in range(3)
+        ]
+        
+        s3_client = boto3.session.Session().client(
+            's3',
+            aws_access_key_id='test',
+            aws_secret_access_key='test',
+            endpoint_url='http://localhost:9000',
+            region_name='us-east-1',
+            config=Config(signature_version='s3v4')
+        )
+        patches = [
+            mock.patch.object(document_storage, 'backend', S3Backend('media')),
+            mock.patch.object(s3_backend, 'get_s3_client', return_value=s3_client),
+            mock.patch.object(s3_backend, 'BatchURLSigner', wraps=s3_backend.BatchURLSigner),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def _list_urls(self):
+        response = self.client.get('/api/v1/files/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if 'results' in response.data else response.data
+        return {row['id']: row['download_url'] for row in rows}
+    
+    def test_list_signs_page_in_one_batch_and_caches(self):
+        """Test a page is signed with one signer and served from cache afterwards"""
+        urls = self._list_urls()
+        
+        self.assertEqual(len(urls), 3)
+        for url in urls.values():
+            self.assertTrue(url.startswith('http://localhost:9000/'))
+            self.assertIn('X-Amz-Signature=', url)
+        self.assertEqual(s3_backend.BatchURLSigner.call_count, 1)
+        
+        self.assertEqual(self._list_urls(), urls)
+        self.assertEqual(s3_backend.BatchURLSigner.call_count, 1)
+    
+    def test_changed_filename_is_signed_again(self):
+        """Test a renamed document gets a new URL while others stay cached"""
+        urls = self._list_urls()
+        
+        renamed = self.documents[0]
+        renamed.nickname = "Quarterly"
+        renamed.save()
+        
+        new_urls = self._list_urls()
+        self.assertNotEqual(new_urls[str(renamed.id)], urls[str(renamed.id)])
+        self.assertIn('Quarterly.pdf', new_urls[str(renamed.id)])
+        self.assertEqual(new_urls[str(self.documents[1].id)], urls[str(self.documents[1].id)])
+    
+    def test_no_url_without_download_permission(self):
+        """Test users who may not download get no URL"""
+        other = User.objects.create_user(
+            username="other",
+            email="other@test.com",
+            password="testpass123"
+        )
+        self.client.force_authenticate(other)
+        
+        self.assertEqual(set(self._list_urls().values()), {None})
+        s3_backend.BatchURLSigner.assert_not_called()
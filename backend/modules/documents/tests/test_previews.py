@@ -0,0 +1,247 @@
+import io
+import pytest
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+from pdf2image.exceptions import PDFInfoNotInstalledError
+from rest_framework.test import APIClient
+from unittest import mock
+
+from ..models import Document
+from ..services.preview_batch_service import PreviewBatchService
+from ..services.preview_service import PreviewService
+from ..services.processing_result_service import STAGE_VERSIONS
+from ..storage import document_storage
+from core.storage.backends import MemoryBackend
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+
+def image_bytes(size, file_format='JPEG', mode='RGB') -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 0) if mode == 'RGBA' else 'red').save(buffer, file_format)
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+@override_settings(
+    DOCUMENTS_PREVIEW_SIZES=[64, 200, 800],
+    DOCUMENTS_PREVIEW_EAGER_SIZES=[64, 200],
+    DOCUMENTS_PREVIEW_FORMATS=['webp', 'jpeg']
+)
+class TestPreviews(TestCase):
+    """Test cases for rendering and caching image previews"""
+    
+    def setUp(self):
+        """Set up a tenant whose objects are in an in-memory store"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.user = User.objects.create_user(
+            username="viewer",
+            email="viewer@test.com",
+            password="testpass123"
+        )
+        self.backend = MemoryBackend()
+        self.enterContext(mock.patch.object(document_storage, 'backend', self.backend))
+        self.enterContext(override_settings(DOCUMENTS_SCRATCH_DIR=self.enterContext(tempfile.TemporaryDirectory())))
+    
+    def create_document(self, content: bytes, name: str = 'photo.jpg', mime_type: str = 'image/jpeg') -> Document:
+        s3_key = f"tenants/{self.tenant.id}/documents/{name}"
+        self.backend.put_object(s3_key, content, mime_type)
+        return Document.objects.create(
+            tenant=self.tenant,
+            original_name=name,
+            file_size=len(content),
+            file_extension='.' + name.rsplit('.', 1)[1],
+            mime_type=mime_type,
+            s3_key=s3_key,
+            s3_bucket='test-bucket',
+            content_sha256='ab' * 32,
+            created_by=self.user
+        )
+    
+    def stored_size(self, key: str):
+        with Image.open(io.BytesIO(self.backend.get_object(key).read())) as image:
+            return image.format, image.size
+    
+    def test_sizes_and_formats_from_one_decode(self):
+        """Test every size is rendered in every format, decoding the JPEG at reduced scale"""
+        document = self.create_document(image_bytes((4000, 3000)))
+        service = PreviewService(document)
+        
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as source:
+            source.write(self.backend.get_object(document.s3_key).read())
+            source.flush()
+            with mock.patch.object(JpegImageFile, 'draft', autospec=True, side_effect=JpegImageFile.draft) as draft:
+                previews = service.render(source.name, [64, 200, 800])
+        
+        draft.assert_called_once_with(mock.ANY, 'RGB', (800, 800))
+        self.assertEqual(len(previews), 6)
+        self.assertEqual(
+            service.key(200, 'webp'),
+            f"tenants/{self.tenant.id}/previews/ab/{'ab' * 32}/200.webp"
+        )
+        self.assertEqual(self.stored_size(service.key(800, 'jpeg')), ('JPEG', (800, 600)))
+        self.assertEqual(self.stored_size(service.key(200, 'webp')), ('WEBP', (200, 150)))
+        self.assertEqual(self.stored_size(service.key(64, 'webp')), ('WEBP', (64, 48)))
+    
+    def test_other_sizes_are_rendered_once_on_request(self):
+        """Test a lazily rendered size is stored on first request and then reused"""
+        document = self.create_document(image_bytes((1200, 600)))
+        service = PreviewService(document)
+        
+        with mock.patch.object(document_storage, 'download_file', wraps=document_storage.download_file) as download:
+            first = service.get_or_create(800, 'webp')
+            second = service.get_or_create(800, 'webp')
+        
+        self.assertTrue(first.created)
+        self.assertFalse(second.created)
+        self.assertEqual(download.call_count, 1)
+        self.assertEqual(self.stored_size(second.key), ('WEBP', (800, 400)))
+        with self.assertRaises(ValueError):
+            service.get_or_create(300, 'webp')
+    
+    def test_new_render_version_renders_requested_sizes_again(self):
+        """Test a lazily rendered size stored by an earlier renderer is not served"""
+        document = self.create_document(image_bytes((1200, 600)))
+        service = PreviewService(document)
+        service.get_or_create(800, 'webp')
+        self.enterContext(mock.patch.dict(STAGE_VERSIONS, previews=STAGE_VERSIONS['previews'] + 1))
+        
+        again = service.get_or_create(800, 'webp')
+        
+        self.assertTrue(again.created)
+        self.assertFalse(service.get_or_create(800, 'webp').created)
+    
+    def test_oversized_and_other_documents_are_not_previewed(self):
+        """Test sources beyond the pixel limit and non-image documents get no previews"""
+        huge = self.create_document(image_bytes((3000, 3000), 'PNG'), 'huge.png', 'image/png')
+        notes = self.create_document(b'meeting notes', 'notes.txt', 'text/plain')
+        
+        with override_settings(DOCUMENTS_PREVIEW_MAX_PIXELS=1_000_000):
+            self.assertIsNone(PreviewService(huge).get_or_create(200, 'webp'))
+        self.assertIsNone(PreviewService(notes).get_or_create(200, 'webp'))
+        self.assertFalse(any('/previews/' in key for key in self.backend._objects))
+    
+    def test_transparent_images_are_flattened_for_jpeg(self):
+        """Test JPEG previews of images with alpha are rendered on white"""
+        document = self.create_document(image_bytes((100, 100), 'PNG', 'RGBA'), 'logo.png', 'image/png')
+        
+        preview = PreviewService(document).get_or_create(64, 'jpeg')
+        
+        with Image.open(io.BytesIO(self.backend.get_object(preview.key).read())) as image:
+            self.assertEqual(image.mode, 'RGB')
+            self.assertEqual(image.getpixel((32, 32)), (255, 255, 255))
+    
+    def test_preview_endpoint(self):
+        """Test the API streams previews and rejects sizes that are not configured"""
+        document = self.create_document(image_bytes((400, 300)))
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        
+        response = client.get(f'/api/v1/files/{document.id}/preview/', {'size': 64, 'image_format': 'jpeg'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (64, 48))
+        
+        response = client.get(f'/api/v1/files/{document.id}/preview/', {'size': 65})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_sources_that_cannot_be_rendered_are_refused(self):
+        """Test truncated, unidentifiable and unrenderable sources get 422 and 415, not server errors"""
+        photo = image_bytes((400, 300))
+        truncated = self.create_document(photo[:len(photo) // 2], 'truncated.jpg')
+        mislabelled = self.create_document(b'meeting notes', 'notes.jpg')
+        scan = self.create_document(b'%PDF-1.4 scan', 'scan.pdf', 'application/pdf')
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        
+        def preview(document):
+            return client.get(f'/api/v1/files/{document.id}/preview/', {'size': 64})
+        
+        self.assertEqual(preview(truncated).status_code, 422)
+        self.assertEqual(preview(mislabelled).status_code, 415)
+        with mock.patch('pdf2image.convert_from_path', side_effect=PDFInfoNotInstalledError):
+            self.assertEqual(preview(scan).status_code, 415)
+    
+    def test_workers_claim_clean_documents_without_previews(self):
+        """Test batches skip claimed, unscanned, quarantined and other documents"""
+        pending = self.create_document(image_bytes((100, 100)), 'a.jpg')
+        expired = self.create_document(image_bytes((100, 100)), 'b.jpg')
+        claimed = self.create_document(image_bytes((100, 100)), 'c.jpg')
+        unscanned = self.create_document(image_bytes((100, 100)), 'd.jpg')
+        quarantined = self.create_document(image_bytes((100, 100)), 'e.jpg')
+        notes = self.create_document(b'meeting notes', 'notes.txt', 'text/plain')
+        Document.objects.exclude(pk=unscanned.pk).update(virus_scanned=True)
+        Document.objects.filter(pk=quarantined.pk).update(is_quarantined=True)
+        Document.objects.filter(pk=claimed.pk).update(previews_claimed_at=timezone.now())
+        Document.objects.filter(pk=expired.pk).update(previews_claimed_at=timezone.now() - timedelta(hours=1))
+        
+        with override_settings(DOCUMENTS_DERIVATIVE_CLAIM_TIMEOUT=600):
+            batch = PreviewBatchService.claim(10)
+            self.assertEqual({document.pk for document in batch}, {pending.pk, expired.pk})
+            self.assertEqual(PreviewBatchService.claim(10), [])
+        self.assertFalse(Document.objects.filter(pk=notes.pk, previews_claimed_at__isnull=False).exists())
+    
+    def test_batches_render_in_a_process_pool(self):
+        """Test a batch stores every document's previews, leaving failed ones for another claim"""
+        photos = [self.create_document(image_bytes((900, 600)), f'{index}.jpg') for index in range(3)]
+        for index, photo in enumerate(photos):
+            Document.objects.filter(pk=photo.pk).update(content_sha256=f'{index:02d}' * 32)
+        missing = self.create_document(image_bytes((100, 100)), 'missing.jpg')
+        self.backend.delete_objects([missing.s3_key])
+        Document.objects.update(virus_scanned=True)
+        
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            service = PreviewBatchService(executor, io_workers=4)
+            result = service.process(service.claim(10))
+        
+        self.assertEqual((result.documents, result.completed, result.previews), (4, 3, 12))
+        self.assertEqual(result.failed, [str(missing.id)])
+        for photo in Document.objects.filter(pk__in=[photo.pk for photo in photos]):
+            self.assertIsNotNone(photo.previews_generated_at)
+            self.assertEqual(self.stored_size(PreviewService(photo).key(200, 'webp')), ('WEBP', (200, 133)))
+        missing.refresh_from_db()
+        self.assertIsNone(missing.previews_generated_at)
+    
+    def test_documents_are_stored_while_others_download(self):
+        """Test a rendered document is stored without waiting for the batch's other downloads"""
+        self.create_document(image_bytes((300, 200)), 'fast.jpg')
+        slow = self.create_document(image_bytes((300, 200)), 'slow.jpg')
+        Document.objects.filter(pk=slow.pk).update(content_sha256='cd' * 32)
+        Document.objects.update(virus_scanned=True)
+        
+        stored = threading.Event()
+        waited = []
+        download = PreviewBatchService._download
+        store = PreviewService.store
+        
+        def slow_download(document, directory):
+            if document.pk == slow.pk:
+                waited.append(stored.wait(timeout=10))
+            return download(document, directory)
+        
+        def signalling_store(preview_service, rendered):
+            stored_keys = store(preview_service, rendered)
+            stored.set()
+            return stored_keys
+        
+        with mock.patch.object(PreviewBatchService, '_download', staticmethod(slow_download)), \
+                mock.patch.object(PreviewService, 'store', signalling_store), \
+                ThreadPoolExecutor(max_workers=2) as executor:
+            service = PreviewBatchService(executor, io_workers=2)
+            result = service.process(service.claim(10))
+        
+        self.assertEqual(waited, [True])
+        self.assertEqual((result.completed, result.failed), (2, []))
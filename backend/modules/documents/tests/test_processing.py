@@ -0,0 +1,229 @@
+import io
+import os
+import pytest
+import tempfile
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from PIL import Image
+from unittest import mock
+
+from ..extraction import EXTRACTORS
+from ..models import Document, DocumentBlob, ProcessingResult
+from ..scanning import StandInClamd
+from ..services.blob_service import BlobService
+from ..services.preview_batch_service import PreviewBatchService
+from ..services.preview_service import PreviewService
+from ..services.processing_result_service import STAGE_VERSIONS
+from ..storage import document_storage
+from ..tasks import document_tasks
+from ..tasks.document_tasks import process_uploaded_document
+from core.storage.backends import MemoryBackend
+from core.tenancy.models import Account
+
+
+@pytest.mark.django_db
+class TestUploadPipeline(TestCase):
+    """Test cases for processing an upload behind its virus scan"""
+    
+    def setUp(self):
+        """Set up a stored image, scratch space and a clean virus scanner"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.backend = MemoryBackend()
+        self.enterContext(mock.patch.object(document_storage, 'backend', self.backend))
+        self.scratch_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(DOCUMENTS_SCRATCH_DIR=self.scratch_dir))
+        self.downloads = self.enterContext(mock.patch.object(
+            document_storage, 'download_file',
+            wraps=document_storage.download_file
+        ))
+        # Chords of derivative stages run in the test process
+        conf = process_uploaded_document.app.conf
+        self.addCleanup(setattr, conf, 'task_always_eager', conf.task_always_eager)
+        conf.task_always_eager = True
+        self.clamd = self.enterContext(StandInClamd())
+        self.enterContext(override_settings(DOCUMENTS_CLAMD_ADDRESS=self.clamd.address))
+        
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(buffer, 'PNG')
+        s3_key = f"tenants/{self.tenant.id}/documents/photo.png"
+        self.backend.put_object(s3_key, buffer.getvalue(), 'image/png')
+        self.document = Document.objects.create(
+            tenant=self.tenant,
+            original_name='photo.png',
+            file_size=len(buffer.getvalue()),
+            file_extension='.png',
+            mime_type='image/png',
+            s3_key=s3_key,
+            s3_bucket='test-bucket'
+        )
+    
+    def process(self):
+        return process_uploaded_document.apply(args=(str(self.document.id), str(self.tenant.id))).get()
+    
+    def test_stages_share_one_download(self):
+        """Test every stage reads the copy the scan downloaded, which is removed afterwards"""
+        self.assertTrue(self.process())
+        
+        self.assertEqual(self.downloads.call_count, 1)
+        self.document.refresh_from_db()
+        self.assertTrue(self.document.virus_scanned)
+        self.assertEqual(self.clamd.scans, 1)
+        self.assertEqual(self.document.processing_status, 'completed')
+        self.assertIsNotNone(self.document.processed_at)
+        self.assertIsNotNone(self.document.previews_generated_at)
+        previews = PreviewService(self.document)
+        with Image.open(io.BytesIO(self.backend.get_object(previews.key(200, 'webp')).read())) as preview:
+            self.assertEqual(preview.size, (200, 150))
+        # Larger sizes wait until someone asks for them
+        self.assertNotIn(previews.key(800, 'webp'), self.backend._objects)
+        self.assertEqual(os.listdir(self.scratch_dir), [])
+    
+    def reupload(self) -> Document:
+        """Process the document, then upload the same content again"""
+        Document.objects.filter(pk=self.document.pk).update(content_sha256='ab' * 32)
+        self.document.refresh_from_db()
+        self.assertTrue(self.process())
+        
+        self.document.pk = None
+        self.document.id = None
+        self.document.previews_generated_at = None
+        self.document.virus_scanned = False
+        self.document.save()
+        return self.document
+    
+    def test_same_content_is_not_processed_again(self):
+        """Test stages reuse the results stored for the content, without downloading it"""
+        copy = self.reupload()
+        
+        self.assertTrue(self.process())
+        
+        self.assertEqual((self.downloads.call_count, self.clamd.scans), (1, 1))
+        copy.refresh_from_db()
+        self.assertTrue(copy.virus_scanned)
+        self.assertIsNotNone(copy.previews_generated_at)
+        self.assertEqual(copy.processing_status, 'completed')
+    
+    def test_new_stage_version_runs_only_that_stage_again(self):
+        """Test bumping the previews version renders again but reuses the scan"""
+        self.reupload()
+        self.enterContext(mock.patch.dict(STAGE_VERSIONS, previews=STAGE_VERSIONS['previews'] + 1))
+        
+        self.assertTrue(self.process())
+        
+        self.assertEqual((self.downloads.call_count, self.clamd.scans), (2, 1))
+        self.assertEqual(
+            list(ProcessingResult.objects.filter(stage='previews').values_list('version', flat=True)),
+            [STAGE_VERSIONS['previews']]
+        )
+    
+    @override_settings(DOCUMENTS_SCAN_RESULT_MAX_AGE=0)
+    def test_clean_verdicts_expire(self):
+        """Test content is scanned again once its clean verdict is older than the maximum age"""
+        self.reupload()
+        
+        self.assertTrue(self.process())
+        
+        self.assertEqual(self.clamd.scans, 2)
+    
+    def test_derivative_stages_run_as_one_group(self):
+        """Test the scan fans out to every derivative stage at once, then records completion"""
+        with mock.patch.object(document_tasks, 'chord') as fan_out:
+            self.assertTrue(self.process())
+        
+        header = list(fan_out.call_args.args[0])
+        self.assertEqual(
+            [signature.task for signature in header],
+            [stage.name for stage in document_tasks.DERIVATIVE_STAGES]
+        )
+        callback = fan_out.return_value.call_args.args[0]
+        self.assertEqual(callback.task, document_tasks.finish_document_processing.name)
+    
+    @override_settings(DOCUMENTS_DERIVATIVE_WORKERS=True)
+    def test_previews_are_left_to_derivative_workers(self):
+        """Test processing completes without previews, which workers then claim"""
+        self.assertTrue(self.process())
+        
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.processing_status, 'completed')
+        self.assertIsNone(self.document.previews_generated_at)
+        self.assertEqual([document.pk for document in PreviewBatchService.claim(10)], [self.document.pk])
+    
+    @override_settings(DOCUMENTS_TENANT_PROCESSING_RATE=1, DOCUMENTS_TENANT_RATE_WINDOW=60)
+    def test_uploads_beyond_the_tenant_rate_are_deferred(self):
+        """Test uploads past the tenant's share are put back for later, untouched"""
+        self.assertTrue(self.process())
+        requeue = self.enterContext(mock.patch.object(process_uploaded_document, 'apply_async'))
+        
+        self.assertFalse(self.process())
+        
+        self.assertEqual(self.downloads.call_count, 1)
+        args, kwargs = requeue.call_args
+        self.assertEqual(args[0], (str(self.document.id), str(self.tenant.id)))
+        self.assertGreater(kwargs['countdown'], 0)
+    
+    def test_failed_stage_does_not_hold_up_the_others(self):
+        """Test the other stages complete and processing is recorded as partial"""
+        failing = self.enterContext(mock.patch.object(
+            document_tasks, '_generate_previews_file',
+            side_effect=RuntimeError('boom')
+        ))
+        extract = self.enterContext(mock.patch.object(
+            document_tasks, '_extract_text_file',
+            return_value=True
+        ))
+        self.enterContext(mock.patch.dict(EXTRACTORS, image=None))
+        
+        self.process()
+        
+        self.assertEqual((failing.call_count, extract.call_count), (4, 1))
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.processing_status, 'partial')
+        self.assertEqual(os.listdir(self.scratch_dir), [])
+    
+    def test_infected_document_stops_the_pipeline(self):
+        """Test a quarantined document gets no derivatives"""
+        # Part of every PNG
+        self.clamd.signatures['Test-Signature'] = b'IHDR'
+        
+        self.assertFalse(self.process())
+        
+        self.document.refresh_from_db()
+        self.assertTrue(self.document.is_quarantined)
+        self.assertEqual(self.document.processing_status, 'quarantined')
+        self.assertIsNone(self.document.previews_generated_at)
+        self.assertNotIn(self.document.s3_key, self.backend._objects)
+        self.assertEqual(os.listdir(self.scratch_dir), [])
+    
+    def test_infected_content_quarantines_every_document_sharing_it(self):
+        """Test quarantine lets go of the shared blob instead of deleting its object"""
+        self.clamd.signatures['Test-Signature'] = b'IHDR'
+        content = self.backend.get_object(self.document.s3_key).read()
+        documents = []
+        for name in ('first.png', 'second.png'):
+            blob = BlobService(self.tenant).store(content, 'image/png').blob
+            documents.append(Document.objects.create(
+                tenant=self.tenant,
+                original_name=name,
+                file_size=len(content),
+                file_extension='.png',
+                mime_type='image/png',
+                s3_key=blob.s3_key,
+                s3_bucket=blob.s3_bucket,
+                blob=blob
+            ))
+        self.document = documents[0]
+        
+        self.assertFalse(self.process())
+        
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 0)
+        self.assertFalse(blob.documents.exists())
+        self.assertIn(blob.s3_key, self.backend._objects)
+        for document in documents:
+            document.refresh_from_db()
+            self.assertTrue(document.is_quarantined)
+        self.assertEqual(BlobService.collect_garbage(timedelta(0)), 1)
+        self.assertFalse(DocumentBlob.objects.filter(pk=blob.pk).exists())
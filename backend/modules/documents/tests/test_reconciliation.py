@@ -0,0 +1,126 @@
+import pytest
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest import mock
+
+from ..models import Document, DocumentBlob
+from ..services.reconciliation_service import ReconciliationService
+from ..storage import document_storage
+from core.storage.backends import MemoryBackend
+from core.tenancy.models import Account
+
+
+@pytest.mark.django_db
+@override_settings(DOCUMENTS_RECONCILE_GRACE_HOURS=1)
+class TestStorageReconciliation(TestCase):
+    """Test cases for merge-joining stored objects with document rows"""
+    
+    def setUp(self):
+        """Set up a tenant whose objects are in an in-memory store"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.backend = MemoryBackend()
+        patcher = mock.patch.object(document_storage, 'backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.prefix = f"tenants/{self.tenant.id}"
+        self.blob = DocumentBlob.objects.create(
+            tenant=self.tenant,
+            sha256='a' * 64,
+            s3_key=f"{self.prefix}/blobs/aa/{'a' * 64}",
+            s3_bucket='test-bucket',
+            size=5,
+            ref_count=2
+        )
+        self.put(self.blob.s3_key, b'hello')
+        self.shared = [self.document(self.blob.s3_key, 5, blob=self.blob) for _ in range(2)]
+        self.report = self.document(f"{self.prefix}/documents/2024/05/1/report.pdf", 4)
+        self.put(self.report.s3_key, b'%PDF')
+    
+    def put(self, key, body, age=timedelta(days=1)):
+        """Store an object written age ago"""
+        self.backend.put_object(key, body)
+        self.backend._objects[key][0].last_modified = timezone.now() - age
+    
+    def document(self, s3_key, file_size, blob=None):
+        return Document.objects.create(
+            tenant=self.tenant,
+            original_name=s3_key.rsplit('/', 1)[-1],
+            file_size=file_size,
+            file_extension='.pdf',
+            mime_type='application/pdf',
+            s3_key=s3_key,
+            s3_bucket='test-bucket',
+            blob=blob
+        )
+    
+    def test_consistent_tenant(self):
+        """Test matching objects and rows report nothing"""
+        # Previews are derived from documents rather than recorded
+        self.put(f"{self.prefix}/previews/ab/{'ab' * 32}/200.webp", b'webp')
+        
+        report = ReconciliationService(self.tenant).reconcile()
+        
+        self.assertEqual(report.objects_scanned, 3)
+        self.assertEqual(report.keys_expected, 2)
+        self.assertEqual(
+            (report.orphan_count, report.missing_count, report.size_mismatch_count),
+            (0, 0, 0)
+        )
+    
+    def test_reports_orphans_missing_and_size_mismatches(self):
+        """Test each kind of disagreement is found in one pass"""
+        self.put(f"{self.prefix}/documents/2024/04/9/stray.pdf", b'stray')
+        self.put(f"{self.prefix}/documents/2024/06/9/uploading.pdf", b'new', age=timedelta(0))
+        self.put(f"{self.prefix}/blobs/aa/{'a' * 64}", b'hello!')
+        missing = self.document(f"{self.prefix}/documents/2024/05/2/lost.pdf", 3)
+        
+        report = ReconciliationService(self.tenant).reconcile()
+        
+        # Objects still within the grace period may be uploads in flight
+        self.assertEqual([issue.key for issue in report.orphans], [f"{self.prefix}/documents/2024/04/9/stray.pdf"])
+        self.assertEqual(report.missing_count, 1)
+        self.assertEqual(report.missing[0].document_ids, [str(missing.id)])
+        self.assertEqual(report.size_mismatch_count, 1)
+        mismatch = report.size_mismatches[0]
+        self.assertEqual((mismatch.object_size, mismatch.recorded_size), (6, 5))
+        self.assertEqual(sorted(mismatch.document_ids), sorted(str(doc.id) for doc in self.shared))
+        self.assertEqual(mismatch.blob_id, str(self.blob.id))
+        
+        # Reporting changes nothing
+        self.assertIn(f"{self.prefix}/documents/2024/04/9/stray.pdf", self.backend._objects)
+    
+    def test_repair(self):
+        """Test repair deletes orphans and records stored sizes, in batches"""
+        strays = [f"{self.prefix}/documents/2024/04/{i}/stray.pdf" for i in range(3)]
+        for key in strays:
+            self.put(key, b'stray')
+        self.put(self.report.s3_key, b'%PDF-1.7')
+        
+        with override_settings(DOCUMENTS_RECONCILE_BATCH_SIZE=2):
+            report = ReconciliationService(self.tenant).reconcile(repair=True)
+        
+        self.assertEqual(report.orphans_deleted, 3)
+        self.assertEqual(report.sizes_fixed, 1)
+        for key in strays:
+            self.assertNotIn(key, self.backend._objects)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.file_size, 8)
+        
+        report = ReconciliationService(self.tenant).reconcile()
+        self.assertEqual((report.orphan_count, report.size_mismatch_count), (0, 0))
+    
+    @override_settings(DOCUMENTS_RECONCILE_MAX_REPORTED=2)
+    def test_issue_lists_are_capped(self):
+        """Test counts stay exact when listed issues are capped"""
+        for i in range(5):
+            self.put(f"{self.prefix}/documents/2024/04/{i}/stray.pdf", b'stray')
+        
+        report = ReconciliationService(self.tenant).reconcile()
+        
+        self.assertEqual(report.orphan_count, 5)
+        self.assertEqual(len(report.orphans), 2)
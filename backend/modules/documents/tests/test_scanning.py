@@ -0,0 +1,142 @@
+import os
+import pytest
+import tempfile
+from django.test import TestCase, override_settings
+from unittest import mock
+
+from ..models import Document
+from ..scanning import EICAR_SIGNATURE, ClamdClient, ClamdError, ClamdStreamRefused, StandInClamd, clamd_client
+from ..storage import document_storage
+from ..tasks.document_tasks import scan_document_for_viruses
+from core.storage.backends import MemoryBackend
+from core.tenancy.models import Account
+
+
+class TestClamdClient(TestCase):
+    """Test cases for streaming content to clamd"""
+    
+    def setUp(self):
+        self.clamd = self.enterContext(StandInClamd(stream_max_length=1024 * 1024))
+        self.client = ClamdClient(self.clamd.address, timeout=5)
+        self.addCleanup(self.client.close)
+    
+    def test_scans_reuse_one_connection(self):
+        """Test clean and infected streams are scanned within one session"""
+        clean = self.client.scan_stream(iter([b'quarterly ', b'figures']))
+        infected = self.client.scan_stream(iter([EICAR_SIGNATURE[:20], EICAR_SIGNATURE[20:]]))
+        again = self.client.scan_stream(iter([b'more figures']))
+        
+        self.assertFalse(clean.infected)
+        self.assertTrue(infected.infected)
+        self.assertEqual(infected.signature, 'Eicar-Test-Signature')
+        self.assertFalse(again.infected)
+        self.assertEqual((self.clamd.connections, self.clamd.scans), (1, 3))
+    
+    def test_idle_session_is_replaced(self):
+        """Test a connection clamd would have dropped as idle is not reused"""
+        self.client.scan_stream(iter([b'a']))
+        self.client._last_used -= 60
+        self.client.scan_stream(iter([b'b']))
+        
+        self.assertEqual(self.clamd.connections, 2)
+    
+    def test_refused_stream_raises(self):
+        """Test streams beyond clamd's limit and unreachable daemons are errors"""
+        with self.assertRaises(ClamdStreamRefused):
+            self.client.scan_stream(iter([b'x' * 600 * 1024] * 2))
+        # The next scan starts a new session
+        self.assertFalse(self.client.scan_stream(iter([b'small'])).infected)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ClamdError):
+                ClamdClient(f"unix://{os.path.join(directory, 'missing.ctl')}").scan_stream(iter([b'a']))
+    
+    def test_content_beyond_the_limit_is_refused_without_a_verdict(self):
+        """Test content longer than clamd's StreamMaxLength raises ClamdStreamRefused, not a connection error"""
+        client = ClamdClient(self.clamd.address, timeout=5, stream_max_length=1024 * 1024)
+        self.addCleanup(client.close)
+        
+        with self.assertRaises(ClamdStreamRefused):
+            client.scan_stream(iter([b'x' * 600 * 1024] * 2))
+        
+        self.assertEqual(self.clamd.scans, 0)
+        self.assertFalse(client.scan_stream(iter([b'small'])).infected)
+    
+    def test_unix_socket(self):
+        """Test scanning over a unix socket and the per-thread client"""
+        with tempfile.TemporaryDirectory() as directory:
+            address = f"unix://{os.path.join(directory, 'clamd.ctl')}"
+            with StandInClamd(address) as clamd, override_settings(DOCUMENTS_CLAMD_ADDRESS=address):
+                self.assertIs(clamd_client(), clamd_client())
+                self.assertFalse(clamd_client().scan_stream(iter([b'notes'])).infected)
+                self.assertEqual(clamd.scans, 1)
+                clamd_client().close()
+
+
+@pytest.mark.django_db
+class TestScanTask(TestCase):
+    """Test cases for scanning stored documents"""
+    
+    def setUp(self):
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.backend = MemoryBackend()
+        self.enterContext(mock.patch.object(document_storage, 'backend', self.backend))
+        self.downloads = self.enterContext(mock.patch.object(
+            document_storage, 'download_file',
+            wraps=document_storage.download_file
+        ))
+        self.clamd = self.enterContext(StandInClamd())
+        self.enterContext(override_settings(DOCUMENTS_CLAMD_ADDRESS=self.clamd.address, DOCUMENTS_CLAMD_CHUNK_SIZE=16))
+    
+    def create_document(self, content: bytes) -> Document:
+        s3_key = f"tenants/{self.tenant.id}/documents/notes.txt"
+        self.backend.put_object(s3_key, content, 'text/plain')
+        return Document.objects.create(
+            tenant=self.tenant,
+            original_name='notes.txt',
+            file_size=len(content),
+            file_extension='.txt',
+            mime_type='text/plain',
+            s3_key=s3_key,
+            s3_bucket='test-bucket'
+        )
+    
+    def scan(self, document: Document) -> bool:
+        return scan_document_for_viruses.apply(args=(str(document.id), str(self.tenant.id))).get()
+    
+    def test_content_is_streamed_from_storage(self):
+        """Test the scan reads the stored object without downloading it to disk"""
+        document = self.create_document(b'meeting notes ' * 100)
+        
+        self.assertTrue(self.scan(document))
+        
+        self.downloads.assert_not_called()
+        document.refresh_from_db()
+        self.assertTrue(document.virus_scanned)
+        self.assertEqual(self.clamd.scans, 1)
+    
+    def test_document_clamd_refuses_is_left_unscanned(self):
+        """Test a document beyond clamd's stream limit is not marked scanned and not retried"""
+        self.enterContext(override_settings(DOCUMENTS_CLAMD_STREAM_MAX_LENGTH=1024))
+        document = self.create_document(b'meeting notes ' * 100)
+        clamd_client().close()
+        
+        self.assertTrue(self.scan(document))
+        
+        document.refresh_from_db()
+        self.assertFalse(document.virus_scanned)
+        self.assertEqual(self.clamd.scans, 0)
+    
+    def test_infected_document_is_quarantined(self):
+        """Test a detected signature quarantines the document and deletes its object"""
+        document = self.create_document(b'notes\n' + EICAR_SIGNATURE)
+        
+        self.assertFalse(self.scan(document))
+        
+        document.refresh_from_db()
+        self.assertTrue(document.is_quarantined)
+        self.assertEqual(document.quarantine_reason, 'Virus detected: Eicar-Test-Signature')
+        self.assertNotIn(document.s3_key, self.backend._objects)
@@ -0,0 +1,105 @@
+from celery import Celery
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from unittest import mock
+
+from ..scheduling import MAX_DEFER, TenantTokenBucket, retry_delay
+
+
+class TestTaskRoutes(TestCase):
+    """Test cases for sending document tasks to their queues"""
+    
+    def setUp(self):
+        self.app = Celery(set_as_current=False)
+        self.app.config_from_object('django.conf:settings', namespace='CELERY')
+    
+    def route(self, name: str) -> dict:
+        return self.app.amqp.router.route({}, f"modules.documents.tasks.{name}")
+    
+    def queue(self, name: str) -> str:
+        return self.route(name)['queue'].name
+    
+    def test_tasks_run_on_their_own_queues(self):
+        """Test each kind of document task is routed to its named queue"""
+        self.assertEqual(self.queue('document_tasks.scan_document_for_viruses'), 'scan')
+        self.assertEqual(self.queue('document_tasks.generate_document_report'), 'reports')
+        self.assertEqual(self.queue('storage_tasks.collect_unreferenced_blobs'), 'maintenance')
+        self.assertEqual(self.queue('upload_tasks.cleanup_expired_upload_sessions'), 'maintenance')
+    
+    def test_upload_pipeline_stays_on_one_queue(self):
+        """Test the stages of the pipeline share a queue, and so the scan's local copy"""
+        stages = [
+            'process_uploaded_document',
+            'generate_previews',
+            'extract_document_text',
+            'finish_document_processing',
+        ]
+        
+        self.assertEqual({self.queue(f"document_tasks.{stage}") for stage in stages}, {'processing'})
+    
+    def test_scans_are_served_before_other_stages(self):
+        """Test uploads waiting for their scan go ahead of previews, and previews ahead of extraction"""
+        def priority(stage):
+            return self.route(f"document_tasks.{stage}")['priority']
+        
+        # Redis serves lower numbers first
+        self.assertEqual(priority('process_uploaded_document'), 0)
+        self.assertLess(priority('process_uploaded_document'), priority('generate_previews'))
+        self.assertLess(priority('generate_previews'), priority('extract_document_text'))
+
+
+class TestTenantTokenBucket(TestCase):
+    """Test cases for sharing processing fairly between tenants"""
+    
+    def setUp(self):
+        cache.clear()
+        self.bucket = TenantTokenBucket('test', capacity=2, window=10)
+        self.now = self.enterContext(mock.patch('modules.documents.scheduling.time.time', return_value=1000.0))
+    
+    def test_tenants_wait_only_beyond_their_share(self):
+        """Test a tenant past its tokens waits while another tenant does not"""
+        self.assertEqual([self.bucket.take('busy') for _ in range(2)], [0, 0])
+        
+        wait = self.bucket.take('busy')
+        
+        self.assertGreaterEqual(wait, 10)
+        self.assertLessEqual(wait, 20)
+        self.assertEqual(self.bucket.take('quiet'), 0)
+    
+    def test_waits_spread_over_later_windows(self):
+        """Test callers turned away wait for later windows in turn, up to MAX_DEFER"""
+        for _ in range(2):
+            self.bucket.take('busy')
+        waits = [self.bucket.take('busy') for _ in range(200)]
+        
+        self.assertLessEqual(max(waits[:2]), 20)
+        self.assertGreaterEqual(min(waits[2:4]), 20)
+        self.assertEqual(waits[-1], MAX_DEFER)
+    
+    def test_bucket_refills_every_window(self):
+        """Test a tenant gets new tokens in the next window"""
+        for _ in range(3):
+            self.bucket.take('busy')
+        self.now.return_value += 10
+        
+        self.assertEqual(self.bucket.take('busy'), 0)
+    
+    def test_no_capacity_means_no_limit(self):
+        """Test a bucket without capacity never makes anyone wait"""
+        bucket = TenantTokenBucket('test', capacity=0, window=10)
+        
+        self.assertEqual({bucket.take('busy') for _ in range(10)}, {0})
+
+
+class TestRetryDelay(TestCase):
+    """Test cases for backing off between retries"""
+    
+    @override_settings(DOCUMENTS_RETRY_BASE_DELAY=10, DOCUMENTS_RETRY_MAX_DELAY=600)
+    def test_delay_grows_with_jitter_up_to_the_cap(self):
+        """Test delays are random within a ceiling that doubles per retry and is capped"""
+        with mock.patch('modules.documents.scheduling.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([retry_delay(retries) for retries in range(8)], [10, 20, 40, 80, 160, 320, 600, 600])
+        
+        delays = {retry_delay(0) for _ in range(20)}
+        self.assertTrue(all(0 <= delay <= 10 for delay in delays))
+        self.assertGreater(len(delays), 1)
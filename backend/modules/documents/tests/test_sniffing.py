@@ -0,0 +1,149 @@
+import io
+import pytest
+import zipfile
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase
+from PIL import Image
+from rest_framework.test import APIClient
+from unittest import mock
+
+from ..models import Document, file_type_for
+from ..services.document_service import DocumentService, UploadDocumentDTO
+from ..sniffing import sniff_content
+from ..storage import document_storage
+from ..upload_handlers import ContentSniffingUploadHandler
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+MB = 1024 * 1024
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def docx_bytes() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('[Content_Types].xml', '<Types/>')
+        archive.writestr('word/document.xml', '<w:document/>')
+    return buffer.getvalue()
+
+
+class TestContentSniffing(TestCase):
+    """Test cases for detecting file types from their first bytes"""
+    
+    def test_matching_content_is_accepted(self):
+        """Test files whose content agrees with their name and type"""
+        for head, name, declared in [
+            (b'%PDF-1.7\n', '.pdf', 'application/pdf'),
+            (png_bytes(), '.png', 'image/png'),
+            (b'id,amount\n1,2\n', '.csv', 'text/csv'),
+            (b'# Notes\n', '.md', 'text/markdown'),
+            (docx_bytes(), '.docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+            (b'<svg xmlns="http://www.w3.org/2000/svg"/>', '.svg', 'image/svg+xml'),
+            (b'\x01' * 4096, '.pdf', 'application/pdf'),
+        ]:
+            with self.subTest(name=name, declared=declared):
+                sniffed = sniff_content(head, name, declared)
+                self.assertIsNone(sniffed.error)
+                self.assertEqual(sniffed.mime_type, declared)
+    
+    def test_forbidden_and_mislabeled_content_is_rejected(self):
+        """Test executables under any name and content of another kind"""
+        executable = b'MZ\x90\x00\x03' + b'\x00' * 59 + b'This program cannot be run in DOS mode'
+        for head, name, declared in [
+            (executable, '.pdf', 'application/pdf'),
+            (b'#!/bin/sh\nrm -rf /\n', '.txt', 'text/plain'),
+            (png_bytes(), '.pdf', 'application/pdf'),
+            (b'%PDF-1.7\n', '.docx', 'application/msword'),
+            (docx_bytes(), '.jpg', 'image/jpeg'),
+        ]:
+            with self.subTest(name=name, declared=declared):
+                self.assertIsNotNone(sniff_content(head, name, declared).error)
+    
+    def test_detected_type_is_recorded_for_unlabeled_content(self):
+        """Test specific detected types replace generic declared ones"""
+        sniffed = sniff_content(png_bytes(), '', 'application/octet-stream')
+        
+        self.assertIsNone(sniffed.error)
+        self.assertEqual(sniffed.mime_type, 'image/png')
+        self.assertEqual(file_type_for('', sniffed.mime_type), 'image')
+        # Extensions decide only when the type does not
+        self.assertEqual(file_type_for('.PDF', 'application/octet-stream'), 'pdf')
+
+
+@pytest.mark.django_db
+class TestSniffedUploads(TestCase):
+    """Test cases for rejecting uploads from their first bytes"""
+    
+    def setUp(self):
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.user = User.objects.create_user(
+            username="uploader",
+            email="uploader@test.com",
+            password="testpass123"
+        )
+        self.enterContext(mock.patch.object(
+            document_storage, 'upload_file',
+            return_value={'success': True, 'encoding': '', 'stored_size': 12}
+        ))
+    
+    def test_handler_stops_reading_the_body(self):
+        """Test a mislabeled file ends the upload after its first chunk"""
+        body = png_bytes() + b'\x00' * MB
+        request = RequestFactory().post('/upload/', {
+            'file': SimpleUploadedFile('report.pdf', body, content_type='application/pdf')
+        })
+        request.upload_handlers.insert(0, ContentSniffingUploadHandler(request))
+        
+        self.assertEqual(len(request.FILES), 0)
+        self.assertEqual(request.upload_rejections, [
+            ('report.pdf', 'File content (image/png) does not match its type')
+        ])
+        # Most of the file was never read
+        self.assertGreater(len(request.read()), MB // 2)
+    
+    def test_upload_endpoint_rejects_mislabeled_file(self):
+        """Test the API reports the rejection and stores nothing"""
+        response = APIClient().post('/api/v1/files/upload/', {
+            'file': SimpleUploadedFile('report.pdf', png_bytes() + b'\x00' * 8192, content_type='application/pdf')
+        }, format='multipart')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('report.pdf', response.data['error'])
+        document_storage.upload_file.assert_not_called()
+    
+    def test_bulk_upload_skips_only_rejected_files(self):
+        """Test other files of a bulk upload are still stored"""
+        response = APIClient().post('/api/v1/files/bulk_upload/', {
+            'files': [
+                SimpleUploadedFile('photo.pdf', png_bytes() + b'\x00' * 8192, content_type='application/pdf'),
+                SimpleUploadedFile('notes.txt', b'meeting notes', content_type='text/plain'),
+            ]
+        }, format='multipart')
+        
+        self.assertEqual(response.status_code, 201)
+        results = {result['path']: result for result in response.data['results']}
+        self.assertEqual(results['photo.pdf']['status'], 'failed')
+        self.assertEqual(results['notes.txt']['status'], 'created')
+    
+    def test_service_records_detected_type(self):
+        """Test uploads record the type of their content, not the client's"""
+        dto = DocumentService(self.user, self.tenant).upload_document(UploadDocumentDTO(
+            file=SimpleUploadedFile('scan', png_bytes(), content_type='application/octet-stream'),
+            folder_id=None,
+            nickname=None,
+            description=None,
+            share_with_user_ids=[]
+        ))
+        
+        document = Document.objects.get(pk=dto.id)
+        self.assertEqual((document.mime_type, document.file_type), ('image/png', 'image'))
@@ -0,0 +1,182 @@
+import pytest
+from datetime import timedelta
+from django.core import signing
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest import mock
+
+from ..models import Document, DocumentBlob
+from ..services import access_service
+from ..services.access_service import AccessRecorder, AccessService
+from ..services.presigned_url_service import PresignedUrlService
+from ..services.tiering_service import TieringService
+from ..signals import flush_document_accesses
+from ..storage import document_storage
+from ..tasks.storage_tasks import delete_moved_objects
+from core.storage.backends import MemoryBackend
+from core.storage.backends.base import URL_SIGNING_SALT
+from core.tenancy.models import Account
+
+
+@pytest.mark.django_db
+@override_settings(DOCUMENTS_COLD_AFTER_DAYS=30)
+class TestStorageTiering(TestCase):
+    """Test cases for moving documents nobody opens to the cold tier"""
+    
+    def setUp(self):
+        """Set up a hot and a cold bucket in memory"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.hot = MemoryBackend('test-bucket')
+        self.cold = MemoryBackend('cold-bucket')
+        self.enterContext(mock.patch.object(document_storage, 'backend', self.hot))
+        self.enterContext(mock.patch(
+            'modules.documents.storage.get_storage_backend',
+            return_value=self.cold
+        ))
+        self.recorder = self.enterContext(mock.patch.object(access_service, 'access_recorder', AccessRecorder()))
+        cache.clear()
+        
+        old = timezone.now() - timedelta(days=60)
+        self.stale = self.document('stale.pdf', b'stale', created_at=old)
+        self.recent = self.document('recent.pdf', b'recent', created_at=old, last_accessed_at=timezone.now())
+        self.new = self.document('new.pdf', b'new')
+    
+    def document(self, name, content, created_at=None, **fields):
+        s3_key = f"tenants/{self.tenant.id}/documents/2024/01/{name}"
+        self.hot.put_object(s3_key, content, 'application/pdf', {'sha256': 'x'})
+        document = Document.objects.create(
+            tenant=self.tenant,
+            original_name=name,
+            file_size=len(content),
+            file_extension='.pdf',
+            mime_type='application/pdf',
+            s3_key=s3_key,
+            s3_bucket='test-bucket',
+            **fields
+        )
+        if created_at:
+            Document.objects.filter(pk=document.pk).update(created_at=created_at)
+        return document
+    
+    def test_cold_keys(self):
+        """Test only objects none of whose documents were opened recently are cold"""
+        self.assertEqual(list(TieringService.cold_keys()), [self.stale.s3_key])
+        
+        # A recently opened document sharing the object keeps it hot
+        Document.objects.create(
+            tenant=self.tenant,
+            original_name='copy.pdf',
+            file_size=5,
+            file_extension='.pdf',
+            mime_type='application/pdf',
+            s3_key=self.stale.s3_key,
+            s3_bucket='test-bucket',
+            last_accessed_at=timezone.now()
+        )
+        self.assertEqual(list(TieringService.cold_keys()), [])
+    
+    @override_settings(DOCUMENTS_COLD_BUCKET='cold-bucket')
+    def test_move_to_cold_bucket_and_back(self):
+        """Test objects move between buckets and the old copy is deleted later"""
+        blob = DocumentBlob.objects.create(
+            tenant=self.tenant,
+            sha256='b' * 64,
+            s3_key=self.stale.s3_key,
+            s3_bucket='test-bucket',
+            size=5
+        )
+        
+        result = TieringService.move([self.stale.s3_key], 'cold')
+        
+        self.assertEqual(result.moved, 1)
+        self.assertEqual(result.stale_copies, {'test-bucket': [self.stale.s3_key]})
+        self.stale.refresh_from_db()
+        blob.refresh_from_db()
+        self.assertEqual((self.stale.storage_tier, self.stale.s3_bucket), ('cold', 'cold-bucket'))
+        self.assertEqual(blob.s3_bucket, 'cold-bucket')
+        info = self.cold.head_object(self.stale.s3_key)
+        self.assertEqual((info.size, info.metadata), (5, {'sha256': 'x'}))
+        
+        # Download URLs are signed for the bucket the document is in
+        url = PresignedUrlService().get_url(self.stale)
+        payload = signing.loads(url.split('/')[-2], salt=URL_SIGNING_SALT)
+        self.assertEqual((payload['b'], payload['k']), ('cold-bucket', self.stale.s3_key))
+        
+        self.assertEqual(delete_moved_objects('test-bucket', [self.stale.s3_key]), 1)
+        self.assertNotIn(self.stale.s3_key, self.hot._objects)
+        
+        result = TieringService.move([self.stale.s3_key], 'hot')
+        self.assertEqual(result.stale_copies, {'cold-bucket': [self.stale.s3_key]})
+        self.stale.refresh_from_db()
+        self.assertEqual((self.stale.storage_tier, self.stale.s3_bucket), ('hot', 'test-bucket'))
+        self.assertEqual(self.hot.get_object(self.stale.s3_key).read(), b'stale')
+    
+    @override_settings(DOCUMENTS_COLD_BUCKET='cold-bucket', DOCUMENTS_UPLOAD_PART_SIZE=4)
+    def test_large_objects_move_in_parts(self):
+        """Test objects larger than a part are streamed as a multipart upload"""
+        TieringService.move([self.recent.s3_key], 'cold')
+        
+        self.assertEqual(self.cold.get_object(self.recent.s3_key).read(), b'recent')
+        self.assertIn('-', self.cold.head_object(self.recent.s3_key).etag)
+    
+    @override_settings(DOCUMENTS_COLD_STORAGE_CLASS='STANDARD_IA')
+    def test_move_storage_class_in_place(self):
+        """Test without a cold bucket objects change storage class under their key"""
+        result = TieringService.move([self.stale.s3_key], 'cold')
+        
+        self.assertEqual((result.moved, result.stale_copies), (1, {}))
+        self.assertEqual(self.hot.head_object(self.stale.s3_key).storage_class, 'STANDARD_IA')
+        self.stale.refresh_from_db()
+        self.assertEqual((self.stale.storage_tier, self.stale.s3_bucket), ('cold', 'test-bucket'))
+        
+        TieringService.move([self.stale.s3_key], 'hot')
+        self.assertEqual(self.hot.head_object(self.stale.s3_key).storage_class, 'STANDARD')
+    
+    def test_opening_cold_document_moves_it_back_once(self):
+        """Test accesses of a cold document schedule one move back"""
+        Document.objects.filter(pk=self.stale.pk).update(storage_tier='cold')
+        self.stale.refresh_from_db()
+        
+        with mock.patch.object(access_service.change_storage_tier, 'delay') as delay:
+            AccessService.record(self.stale)
+            AccessService.record(self.stale)
+            AccessService.record(self.new)
+        
+        delay.assert_called_once_with([self.stale.s3_key], 'hot')
+    
+    @override_settings(DOCUMENTS_ACCESS_FLUSH_SIZE=2, DOCUMENTS_ACCESS_FLUSH_INTERVAL=3600)
+    def test_access_times_are_buffered(self):
+        """Test last access times are written in one UPDATE per flush"""
+        recorder = AccessRecorder()
+        
+        with self.assertNumQueries(0):
+            recorder.record(self.stale.pk)
+        with self.assertNumQueries(1):
+            recorder.record(self.new.pk)
+        
+        self.stale.refresh_from_db()
+        self.new.refresh_from_db()
+        self.assertIsNotNone(self.stale.last_accessed_at)
+        self.assertIsNotNone(self.new.last_accessed_at)
+        
+        recorder.record(self.recent.pk)
+        with self.assertNumQueries(1):
+            recorder.flush()
+    
+    @override_settings(DOCUMENTS_ACCESS_FLUSH_SIZE=100, DOCUMENTS_ACCESS_FLUSH_INTERVAL=60)
+    def test_finished_requests_flush_due_accesses(self):
+        """Test an access is written once the interval passes, without a later access"""
+        self.recorder.record(self.stale.pk)
+        
+        flush_document_accesses(sender=None)
+        self.stale.refresh_from_db()
+        self.assertIsNone(self.stale.last_accessed_at)
+        
+        self.recorder._flushed_at -= 60
+        flush_document_accesses(sender=None)
+        self.stale.refresh_from_db()
+        self.assertIsNotNone(self.stale.last_accessed_at)
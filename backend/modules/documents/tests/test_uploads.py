@@ -0,0 +1,157 @@
+import pytest
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from datetime import timedelta
+from unittest import mock
+import base64
+import hashlib
+
+from ..models import Document, UploadSession
+from ..services.upload_service import (
+    UploadSessionService, CreateUploadSessionDTO,
+    UploadSessionError, UploadSessionExpired
+)
+from ..storage import document_storage
+from ..tasks.upload_tasks import cleanup_expired_upload_sessions
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+MB = 1024 * 1024
+
+
+def md5_header(body: bytes) -> str:
+    return base64.b64encode(hashlib.md5(body).digest()).decode('ascii')
+
+
+@pytest.mark.django_db
+@override_settings(DOCUMENTS_UPLOAD_PART_SIZE=5 * MB)
+class TestUploadSessionService(TestCase):
+    """Test cases for resumable chunked uploads"""
+    
+    def setUp(self):
+        """Set up tenant, user and a mocked multipart backend"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.user = User.objects.create_user(
+            username="uploader",
+            email="uploader@test.com",
+            password="testpass123"
+        )
+        self.service = UploadSessionService(self.user, self.tenant)
+        
+        # In-memory stand-in for the S3 multipart API
+        self.stored_parts = {}
+        patches = [
+            mock.patch.object(
+                document_storage, 'create_multipart_upload',
+                return_value={'success': True, 'upload_id': 'upload-1'}
+            ),
+            mock.patch.object(
+                document_storage, 'upload_part',
+                side_effect=self._store_part
+            ),
+            mock.patch.object(
+                document_storage, 'list_uploaded_parts',
+                side_effect=lambda key, upload_id: {
+                    'success': True,
+                    'parts': sorted(self.stored_parts.values(), key=lambda p: p['part_number'])
+                }
+            ),
+            mock.patch.object(
+                document_storage, 'complete_multipart_upload',
+                return_value={'success': True, 'version_id': 'v1', 'etag': 'etag'}
+            ),
+            mock.patch.object(
+                document_storage, 'abort_multipart_upload',
+                return_value=True
+            ),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def _store_part(self, key, upload_id, part_number, body, content_md5=None):
+        self.stored_parts[part_number] = {
+            'part_number': part_number,
+            'etag': f'etag-{part_number}',
+            'size': len(body)
+        }
+        return {'success': True, 'part_number': part_number, 'etag': f'etag-{part_number}'}
+    
+    def _create_session(self, file_size=12 * MB):
+        return self.service.create_session(CreateUploadSessionDTO(
+            file_name="large.pdf",
+            file_size=file_size,
+            content_type="application/pdf"
+        ))
+    
+    def test_create_session_splits_file_into_parts(self):
+        """Test part layout for a new session"""
+        session = self._create_session()
+        
+        self.assertEqual(session.status, 'active')
+        self.assertEqual(session.part_size, 5 * MB)
+        self.assertEqual(session.total_parts, 3)
+        self.assertEqual(session.expected_part_size(3), 2 * MB)
+    
+    def test_out_of_order_parts_and_resume(self):
+        """Test uploading parts in any order and resuming missing ones"""
+        session = self._create_session()
+        last_part = b"c" * (2 * MB)
+        self.service.upload_part(session, 3, last_part, md5_header(last_part))
+        
+        upload_status = self.service.get_status(session)
+        self.assertEqual([p.part_number for p in upload_status.uploaded_parts], [3])
+        self.assertEqual(upload_status.missing_parts, [1, 2])
+        
+        with self.assertRaises(UploadSessionError):
+            self.service.complete(session)
+        
+        for number in (1, 2):
+            body = bytes([number]) * (5 * MB)
+            self.service.upload_part(session, number, body, md5_header(body))
+        
+        document = self.service.complete(session)
+        
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'completed')
+        self.assertEqual(session.document, document)
+        self.assertEqual(document.file_size, 12 * MB)
+        self.assertEqual(document.s3_key, session.s3_key)
+        self.assertEqual(Document.objects.count(), 1)
+    
+    def test_part_checksum_and_size_are_verified(self):
+        """Test rejecting corrupted or wrongly sized parts"""
+        session = self._create_session()
+        body = b"a" * (5 * MB)
+        
+        with self.assertRaises(ValueError):
+            self.service.upload_part(session, 1, body, md5_header(b"other"))
+        
+        with self.assertRaises(ValueError):
+            self.service.upload_part(session, 1, body[:-1], md5_header(body[:-1]))
+        
+        self.assertEqual(self.stored_parts, {})
+    
+    def test_expired_sessions_are_cleaned_up(self):
+        """Test background cleanup of abandoned sessions"""
+        session = self._create_session()
+        UploadSession.objects.filter(pk=session.pk).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        session.refresh_from_db()
+        
+        with self.assertRaises(UploadSessionExpired):
+            self.service.upload_part(session, 1, b"a", md5_header(b"a"))
+        
+        self.assertEqual(cleanup_expired_upload_sessions(), 1)
+        
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'expired')
+        document_storage.abort_multipart_upload.assert_called_once_with(
+            session.s3_key, session.upload_id
+        )
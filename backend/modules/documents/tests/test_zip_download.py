@@ -0,0 +1,138 @@
+import pytest
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from unittest import mock
+import io
+import zipfile
+
+from ..models import Document, DocumentShare, Folder
+from ..storage import document_storage
+from core.tenancy.models import Account
+
+User = get_user_model()
+
+
+class FakeBody:
+    """Minimal stand-in for a botocore streaming body"""
+    
+    def __init__(self, content: bytes):
+        self.stream = io.BytesIO(content)
+        self.closed = False
+    
+    def iter_chunks(self, chunk_size):
+        while True:
+            chunk = self.stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.django_db
+class TestZipDownload(TestCase):
+    """Test cases for streaming ZIP downloads"""
+    
+    def setUp(self):
+        """Set up a folder tree, documents and mocked object storage"""
+        self.tenant = Account.objects.create(
+            name="Test Company",
+            slug="test-company"
+        )
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@test.com",
+            password="testpass123"
+        )
+        self.other = User.objects.create_user(
+            username="other",
+            email="other@test.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.other)
+        
+        self.root = Folder.objects.create(tenant=self.tenant, name="Projects")
+        self.child = Folder.objects.create(tenant=self.tenant, name="Alpha", parent=self.root)
+        
+        self.objects = {}
+        self.shared = self._document(self.root, "plan.txt", b"plan" * 1000)
+        self.nested = self._document(self.child, "notes.txt", b"notes")
+        self.private = self._document(self.child, "secret.txt", b"secret")
+        
+        for document in (self.shared, self.nested):
+            DocumentShare.objects.create(
+                tenant=self.tenant,
+                document=document,
+                shared_by=self.owner,
+                shared_with=self.other,
+                status='accepted'
+            )
+        
+        patcher = mock.patch.object(
+            document_storage, 'open_file_stream',
+            side_effect=lambda key: FakeBody(self.objects[key])
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def _document(self, folder, name, content):
+        document = Document.objects.create(
+            tenant=self.tenant,
+            folder=folder,
+            original_name=name,
+            file_size=len(content),
+            file_extension='.txt',
+            mime_type='text/plain',
+            s3_key=f"tenants/{self.tenant.id}/documents/{name}",
+            s3_bucket='test-bucket',
+            created_by=self.owner
+        )
+        self.objects[document.s3_key] = content
+        return document
+    
+    def _read_zip(self, response) -> zipfile.ZipFile:
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+    
+    def test_folder_subtree_contains_only_downloadable_documents(self):
+        """Test folder paths are kept and unshared documents are left out"""
+        response = self.client.post('/api/v1/files/download_zip/', {
+            'folder': str(self.root.id)
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Projects.zip', response['Content-Disposition'])
+        
+        archive = self._read_zip(response)
+        self.assertEqual(sorted(archive.namelist()), ['Alpha/notes.txt', 'plan.txt'])
+        self.assertEqual(archive.read('plan.txt'), b"plan" * 1000)
+        self.assertIsNone(archive.testzip())
+    
+    def test_selection_requires_download_permission(self):
+        """Test an explicit selection fails when any document is not downloadable"""
+        response = self.client.post('/api/v1/files/download_zip/', {
+            'documents': [str(self.shared.id), str(self.private.id)]
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        
+        response = self.client.post('/api/v1/files/download_zip/', {
+            'documents': [str(self.shared.id), str(self.nested.id)]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(self._read_zip(response).namelist()),
+            ['notes.txt', 'plan.txt']
+        )
+    
+    def test_anonymous_requests_are_refused(self):
+        """Test a ZIP needs an authenticated user, like single downloads"""
+        self.client.force_authenticate(None)
+        
+        response = self.client.post('/api/v1/files/download_zip/', {
+            'folder': str(self.root.id)
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,57 @@
+import os
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+
+from .sniffing import sniff_content
+from .storage import document_storage
+
+
+class ContentSniffingUploadHandler(FileUploadHandler):
+    """
+    Check each file of a multipart upload against its first bytes as they
+    arrive, ahead of the handlers that store it. A forbidden or mislabeled
+    file is recorded in request.upload_rejections as (file name, reason).
+    With stop_upload the rest of the request body is not read at all.
+    Otherwise only that file is dropped and the others are still received;
+    files smaller than DOCUMENTS_SNIFF_SIZE then arrive whole and are left
+    to the checks of the service storing them, as a file cannot be dropped
+    once complete.
+    """
+    
+    def __init__(self, request=None, stop_upload=True):
+        super().__init__(request)
+        self.stop_upload = stop_upload
+    
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._head = bytearray()
+        self._checked = False
+    
+    def receive_data_chunk(self, raw_data, start):
+        if not self._checked:
+            self._head += raw_data[:settings.DOCUMENTS_SNIFF_SIZE - len(self._head)]
+            if len(self._head) >= settings.DOCUMENTS_SNIFF_SIZE:
+                self._check()
+        return raw_data
+    
+    def file_complete(self, file_size):
+        if not self._checked and self.stop_upload:
+            self._check()
+        return None
+    
+    def _check(self) -> None:
+        self._checked = True
+        file_extension = os.path.splitext(self.file_name)[1]
+        is_valid, error_msg = document_storage.validate_file_upload(0, file_extension, self.content_type)
+        if is_valid:
+            error_msg = sniff_content(self._head, file_extension, self.content_type).error
+        if not error_msg:
+            return
+        
+        if not hasattr(self.request, 'upload_rejections'):
+            self.request.upload_rejections = []
+        self.request.upload_rejections.append((self.file_name, error_msg))
+        if self.stop_upload:
+            raise StopUpload(connection_reset=True)
+        raise SkipFile()
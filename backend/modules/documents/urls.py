@@ -1,13 +1,33 @@
+from django.conf import settings
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     FolderViewSet, DocumentViewSet, 
-    DocumentShareViewSet, ShareNotificationViewSet
+    DocumentShareViewSet, ShareNotificationViewSet,
+    UploadSessionViewSet
 )
 
 router = DefaultRouter()
 router.register('folders', FolderViewSet, basename='folder')
 router.register('files', DocumentViewSet, basename='document')
+router.register('uploads', UploadSessionViewSet, basename='upload-session')
 router.register('shares', DocumentShareViewSet, basename='share')
 router.register('notifications', ShareNotificationViewSet, basename='notification')
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = []
+
+if settings.DOCUMENTS_ASYNC_VIEWS:
+    # Async actions answer before the viewset routes for the same URLs
+    urlpatterns += [
+        path('files/<uuid:pk>/download_url/', async_views.download_url),
+        path('files/<uuid:pk>/content/', async_views.content),
+        path('files/<uuid:pk>/archive/', async_views.archive),
+        path('files/<uuid:pk>/restore/', async_views.restore),
+        path('files/bulk_archive/', async_views.bulk_archive),
+        path('files/bulk_restore/', async_views.bulk_restore),
+        path('files/bulk_move/', async_views.bulk_move),
+        path('uploads/<uuid:pk>/complete/', async_views.complete_upload),
+    ]
+
+urlpatterns += router.urls
\ No newline at end of file
@@ -12,8 +12,11 @@ Date: December 2024
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.exceptions import MethodNotAllowed
 from django.db.models import Q, Count
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db import transaction
 from django.utils import timezone
 from .base import SimplifiedTenantViewSet as TenantAwareViewSet  # Temporary for testing
@@ -22,17 +25,124 @@ from rest_framework.permissions import AllowAny  # Temporary for testing
 # from core.auth.permissions import RoleBasedPermission
 from .models import (
     Document, Folder, DocumentShare, 
-    ShareNotification, FolderUserState
+    ShareNotification, FolderUserState, UploadSession
 )
+from .rendering import UnreadableSource, UnsupportedSource
 from .serializers import (
     DocumentSerializer, DocumentUploadSerializer,
     FolderSerializer, DocumentShareSerializer,
     ShareNotificationSerializer, FolderStateSerializer,
-    DocumentSearchSerializer
+    DocumentSearchSerializer, DocumentBulkUploadSerializer,
+    DocumentZipDownloadSerializer, DocumentBulkActionSerializer,
+    DocumentBulkMoveSerializer, UploadSessionCreateSerializer,
+    UploadSessionSerializer
 )
-from .storage import document_storage
+from .services.access_service import AccessService
+from .services.archive_service import ArchiveService
+from .services.blob_service import BlobService
+from .services.bulk_action_service import BulkActionService
+from .services.bulk_upload_service import BulkUploadResultDTO, BulkUploadService
+from .services.presigned_url_service import PresignedUrlService
+from .services.preview_service import PreviewService
+from .services.upload_service import (
+    UploadSessionService, CreateUploadSessionDTO,
+    UploadSessionError, UploadSessionExpired
+)
+from .services.zip_download_service import ZipDownloadService, downloadable_by
+from .scratch import DownloadError
+from .sniffing import read_head, sniff_content
+from .storage import document_storage, storage_for_bucket
+from .upload_handlers import ContentSniffingUploadHandler
+from core.storage.backends import StorageError
+from core.storage.client import connection_stats
+from core.storage.streaming import (
+    iter_chunks, not_modified_response, object_response, range_not_satisfiable_response,
+    single_range
+)
+from dataclasses import asdict
 import os
-import uuid
+
+
+def _get_request_tenant(request):
+    """Get the request tenant, falling back to the test tenant"""
+    # TODO: Drop the fallback when authentication is configured
+    from core.tenancy.models import Account
+    
+    tenant = getattr(request, 'tenant', None)
+    if tenant:
+        return tenant
+    
+    tenant = Account.objects.first()
+    if not tenant:
+        tenant = Account.objects.create(
+            name="Test Company",
+            slug="test",
+            is_active=True
+        )
+    return tenant
+
+
+def _get_request_user(request):
+    """Get the request user, falling back to the test user"""
+    # TODO: Drop the fallback when authentication is configured
+    from django.contrib.auth import get_user_model
+    
+    if request.user.is_authenticated:
+        return request.user
+    
+    User = get_user_model()
+    user = User.objects.first()
+    if not user:
+        user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass'
+        )
+    return user
+
+
+def _open_content(request, document):
+    """
+    Open a document's content for a GET, passing Range and If-None-Match on
+    to storage. Returns the stream, or the response when there is no body.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    try:
+        stream = storage_for_bucket(document.s3_bucket).open_file_range(
+            document.s3_key,
+            byte_range=single_range(request.headers.get('Range')),
+            if_none_match=if_none_match
+        )
+    except StorageError as e:
+        if e.code == 'NotModified':
+            return None, not_modified_response(if_none_match)
+        if e.code == 'InvalidRange':
+            return None, range_not_satisfiable_response(document.file_size)
+        if e.code == 'NoSuchKey':
+            return None, JsonResponse({'error': 'Document content not found'}, status=404)
+        return None, JsonResponse({'error': 'Failed to read document content'}, status=502)
+    
+    return stream, None
+
+
+def _content_disposition(request, document) -> str:
+    """Inline for previews, attachment with ?download=true"""
+    disposition = 'attachment' if request.GET.get('download', '').lower() == 'true' else 'inline'
+    return f'{disposition}; filename="{document.display_name}{document.file_extension}"'
+
+
+def _bulk_upload_response(results):
+    created = sum(1 for result in results if result.status == 'created')
+    return Response({
+        'created': created,
+        'failed': len(results) - created,
+        'results': [asdict(result) for result in results]
+    }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
+def _upload_rejections(request):
+    """Files of a multipart upload that content sniffing rejected while receiving it"""
+    return getattr(request, 'upload_rejections', [])
 
 
 class FolderViewSet(TenantAwareViewSet):
@@ -130,12 +240,34 @@ class DocumentViewSet(TenantAwareViewSet):
         'partial_update': ['manager', 'admin'],
         'destroy': ['admin'],
         'upload': ['user', 'manager', 'admin'],
+        'bulk_upload': ['user', 'manager', 'admin'],
         'archive': ['manager', 'admin'],
         'restore': ['manager', 'admin'],
+        'bulk_archive': ['manager', 'admin'],
+        'bulk_restore': ['manager', 'admin'],
+        'bulk_move': ['manager', 'admin'],
         'download_url': ['user', 'manager', 'admin'],
+        'content': ['user', 'manager', 'admin'],
+        'preview': ['user', 'manager', 'admin'],
+        'download_zip': ['user', 'manager', 'admin'],
         'search': ['user', 'manager', 'admin'],
+        'storage_stats': ['manager', 'admin'],
     }
     
+    # Actions whose files are checked against their first bytes while received
+    SNIFFED_UPLOAD_ACTIONS = ('upload', 'bulk_upload')
+    
+    def initialize_request(self, request, *args, **kwargs):
+        """Install the content sniffing handler before the body is parsed"""
+        drf_request = super().initialize_request(request, *args, **kwargs)
+        if self.action in self.SNIFFED_UPLOAD_ACTIONS:
+            # A bulk upload carries on with its other files
+            request.upload_handlers.insert(0, ContentSniffingUploadHandler(
+                request,
+                stop_upload=self.action != 'bulk_upload'
+            ))
+        return drf_request
+    
     def get_queryset(self):
         """Filter documents by tenant and apply filters"""
         queryset = super().get_queryset()
@@ -184,6 +316,13 @@ class DocumentViewSet(TenantAwareViewSet):
     def upload(self, request):
         """Upload a new document"""
         serializer = DocumentUploadSerializer(data=request.data, context={'request': request})
+        rejections = _upload_rejections(request)
+        if rejections:
+            file_name, error_msg = rejections[0]
+            return Response(
+                {'error': f"{file_name}: {error_msg}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         serializer.is_valid(raise_exception=True)
         
         file = serializer.validated_data['file']
@@ -196,15 +335,16 @@ class DocumentViewSet(TenantAwareViewSet):
             file_extension,
             file.content_type
         )
+        if is_valid:
+            sniffed = sniff_content(read_head(file), file_extension, file.content_type)
+            error_msg = sniffed.error
         
-        if not is_valid:
+        if error_msg:
             return Response(
                 {'error': error_msg},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Generate document ID and S3 key
-        document_id = str(uuid.uuid4())
         # Get or create test tenant for development
         from core.tenancy.models import Account
         tenant = Account.objects.first()
@@ -215,28 +355,8 @@ class DocumentViewSet(TenantAwareViewSet):
                 is_active=True
             )
         tenant_id = str(tenant.id)
-        s3_key = document_storage.generate_s3_key(tenant_id, file.name, document_id)
         
-        # Upload to S3
-        file_content = file.read()
-        upload_result = document_storage.upload_file(
-            file_content,
-            s3_key,
-            content_type=file.content_type,
-            metadata={
-                'uploaded_by': 'test-user',  # Simplified for testing
-                'original_name': file.name,
-                'tenant_id': tenant_id
-            }
-        )
-        
-        if not upload_result['success']:
-            return Response(
-                {'error': 'Failed to upload file'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        
-        # Create document record
+        # Get or create test user
         from django.contrib.auth import get_user_model
         User = get_user_model()
         user = User.objects.first()
@@ -247,9 +367,27 @@ class DocumentViewSet(TenantAwareViewSet):
                 password='testpass'
             )
         
+        file_content = file.read()
+        
         with transaction.atomic():
+            # Store content once per tenant; identical files share a blob
+            try:
+                stored = BlobService(tenant).store(
+                    file_content,
+                    content_type=sniffed.mime_type,
+                    metadata={
+                        'uploaded_by': 'test-user',  # Simplified for testing
+                        'original_name': file.name,
+                        'tenant_id': tenant_id
+                    }
+                )
+            except RuntimeError:
+                return Response(
+                    {'error': 'Failed to upload file'},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+            
             document = Document.objects.create(
-                id=document_id,
                 tenant=tenant,  # Use the tenant we got earlier
                 folder=folder,
                 original_name=file.name,
@@ -257,10 +395,11 @@ class DocumentViewSet(TenantAwareViewSet):
                 description=serializer.validated_data.get('description', ''),
                 file_size=file.size,
                 file_extension=file_extension,
-                mime_type=file.content_type,
-                s3_key=s3_key,
-                s3_bucket=document_storage.bucket_name,
-                s3_version_id=upload_result.get('version_id', ''),
+                mime_type=sniffed.mime_type,
+                s3_key=stored.blob.s3_key,
+                s3_bucket=stored.blob.s3_bucket,
+                blob=stored.blob,
+                content_sha256=stored.blob.sha256,
                 created_by=user
             )
             
@@ -287,55 +426,99 @@ class DocumentViewSet(TenantAwareViewSet):
         response_serializer = DocumentSerializer(document, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'])
+    def bulk_upload(self, request):
+        """Upload many files, or a ZIP archive expanded into folders"""
+        serializer = DocumentBulkUploadSerializer(data=request.data)
+        # Files rejected while the request was received are reported with the rest
+        rejected = [
+            BulkUploadResultDTO(path=file_name, status='failed', error=error_msg)
+            for file_name, error_msg in _upload_rejections(request)
+        ]
+        if rejected and not serializer.is_valid():
+            return _bulk_upload_response(rejected)
+        serializer.is_valid(raise_exception=True)
+        
+        service = BulkUploadService(_get_request_user(request), _get_request_tenant(request))
+        folder_id = serializer.validated_data.get('folder')
+        
+        try:
+            if serializer.validated_data.get('archive'):
+                results = service.upload_archive(serializer.validated_data['archive'], folder_id)
+            else:
+                results = service.upload_files(serializer.validated_data['files'], folder_id)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return _bulk_upload_response(rejected + results)
+    
     @action(detail=True, methods=['post'])
     def archive(self, request, pk=None):
         """Archive a document"""
         document = self.get_object()
         
-        # Move file to archive in S3
-        archive_result = document_storage.move_to_archive(document.s3_key)
-        
-        if archive_result['success']:
-            document.is_archived = True
-            document.archived_at = timezone.now()
-            document.s3_key = archive_result['archived_key']
-            document.save()
-            
-            return Response({'status': 'archived'})
-        else:
+        # Metadata-only; the stored object is updated by a background job
+        if not ArchiveService(_get_request_tenant(request)).archive(document):
             return Response(
-                {'error': 'Failed to archive document'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Document is already archived'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        
+        return Response({'status': 'archived'})
     
     @action(detail=True, methods=['post'])
     def restore(self, request, pk=None):
         """Restore an archived document"""
         document = self.get_object()
         
-        if not document.is_archived:
+        if not ArchiveService(_get_request_tenant(request)).restore(document):
             return Response(
                 {'error': 'Document is not archived'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Move file back from archive
-        original_key = document.s3_key.replace('/archive/', '/documents/', 1)
-        restore_result = document_storage.copy_file(document.s3_key, original_key)
+        return Response({'status': 'restored'})
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser])
+    def bulk_archive(self, request):
+        """Archive many documents selected by id or filter"""
+        serializer = DocumentBulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         
-        if restore_result['success']:
-            document_storage.delete_file(document.s3_key)
-            document.is_archived = False
-            document.archived_at = None
-            document.s3_key = original_key
-            document.save()
-            
-            return Response({'status': 'restored'})
-        else:
-            return Response(
-                {'error': 'Failed to restore document'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        result = BulkActionService(_get_request_tenant(request)).archive(
+            serializer.validated_data.get('ids'),
+            serializer.validated_data.get('filter')
+        )
+        return Response(asdict(result))
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser])
+    def bulk_restore(self, request):
+        """Restore many archived documents selected by id or filter"""
+        serializer = DocumentBulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = BulkActionService(_get_request_tenant(request)).restore(
+            serializer.validated_data.get('ids'),
+            serializer.validated_data.get('filter')
+        )
+        return Response(asdict(result))
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser])
+    def bulk_move(self, request):
+        """Move many documents selected by id or filter into a folder"""
+        serializer = DocumentBulkMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            result = BulkActionService(_get_request_tenant(request)).move(
+                serializer.validated_data['folder'],
+                serializer.validated_data.get('ids'),
+                serializer.validated_data.get('filter')
             )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(asdict(result))
     
     @action(detail=True, methods=['get'])
     def download_url(self, request, pk=None):
@@ -343,14 +526,62 @@ class DocumentViewSet(TenantAwareViewSet):
         document = self.get_object()
         
         # Check if user has access
-        can_access = (
-            document.created_by == request.user or
-            document.shares.filter(
-                shared_with=request.user,
-                status='accepted',
-                can_download=True
-            ).exists()
+        can_access = request.user.is_authenticated and Document.objects.filter(
+            downloadable_by(request.user),
+            pk=document.pk
+        ).exists()
+        
+        if not can_access:
+            return Response(
+                {'error': 'No permission to download this document'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        url = PresignedUrlService().get_url(document)
+        AccessService.record(document)
+        
+        return Response({'download_url': url})
+    
+    @action(detail=True, methods=['get'])
+    def content(self, request, pk=None):
+        """Stream the document, or one byte range of it, through the API"""
+        document = self.get_object()
+        
+        can_access = request.user.is_authenticated and Document.objects.filter(
+            downloadable_by(request.user),
+            pk=document.pk
+        ).exists()
+        
+        if not can_access:
+            return Response(
+                {'error': 'No permission to download this document'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        stream, response = _open_content(request, document)
+        if response is not None:
+            return response
+        AccessService.record(document)
+        
+        return object_response(
+            stream,
+            iter_chunks(stream, settings.DOCUMENTS_STREAM_CHUNK_SIZE),
+            content_type=document.mime_type,
+            disposition=_content_disposition(request, document)
         )
+    
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """
+        Stream a preview image (?size=200&image_format=webp), rendering and storing
+        it first if nobody has requested that size of this content before
+        """
+        document = self.get_object()
+        
+        can_access = request.user.is_authenticated and Document.objects.filter(
+            downloadable_by(request.user),
+            pk=document.pk
+        ).exists()
         
         if not can_access:
             return Response(
@@ -358,13 +589,73 @@ class DocumentViewSet(TenantAwareViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        url = document_storage.generate_presigned_download_url(
-            document.s3_key,
-            expiration=3600,
-            filename=document.display_name + document.file_extension
+        try:
+            preview = PreviewService(document).get_or_create(
+                int(request.GET.get('size', 200)),
+                request.GET.get('image_format', 'webp')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except DownloadError:
+            return Response({'error': 'Failed to read document content'}, status=status.HTTP_502_BAD_GATEWAY)
+        except UnsupportedSource:
+            return Response(
+                {'error': 'Previews of this document format are not supported'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        except UnreadableSource:
+            return Response(
+                {'error': 'The document content could not be decoded for a preview'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        
+        if preview is None:
+            return Response({'error': 'No preview for this document'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if_none_match = request.headers.get('If-None-Match')
+        try:
+            stream = document_storage.open_file_range(preview.key, if_none_match=if_none_match)
+        except StorageError as e:
+            if e.code == 'NotModified':
+                return not_modified_response(if_none_match)
+            return JsonResponse({'error': 'Failed to read preview'}, status=502)
+        
+        response = object_response(
+            stream,
+            iter_chunks(stream, settings.DOCUMENTS_STREAM_CHUNK_SIZE),
+            content_type=preview.content_type
         )
+        # Keys are derived from the content, so a preview only changes with RENDER_VERSION
+        response['Cache-Control'] = 'private, max-age=86400'
+        return response
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, FormParser])
+    def download_zip(self, request):
+        """Stream a ZIP of a folder subtree or a selection of documents"""
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'No permission to download these documents'},
+                status=status.HTTP_403_FORBIDDEN
+            )
         
-        return Response({'download_url': url})
+        serializer = DocumentZipDownloadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        service = ZipDownloadService(request.user, _get_request_tenant(request))
+        
+        try:
+            if serializer.validated_data.get('folder'):
+                archive_name, entries = service.collect_folder(serializer.validated_data['folder'])
+            else:
+                archive_name, entries = service.collect_documents(serializer.validated_data['documents'])
+        except (Folder.DoesNotExist, Document.DoesNotExist) as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except PermissionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        
+        response = StreamingHttpResponse(service.stream(entries), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{archive_name}"'
+        return response
     
     @action(detail=False, methods=['post'])
     def search(self, request):
@@ -410,6 +701,154 @@ class DocumentViewSet(TenantAwareViewSet):
         
         serializer = DocumentSerializer(queryset, many=True, context={'request': request})
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def storage_stats(self, request):
+        """Report storage saved for the tenant and S3 connection reuse of this process"""
+        blob_service = BlobService(_get_request_tenant(request))
+        return Response({
+            'deduplication': asdict(blob_service.storage_savings()),
+            'compression': asdict(blob_service.compression_savings()),
+            'connections': connection_stats()
+        })
+
+
+class UploadSessionViewSet(TenantAwareViewSet):
+    """API viewset for resumable, chunked uploads"""
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = []  # No permissions for testing
+    authentication_classes = []  # No authentication for testing
+    
+    role_permissions = {
+        'list': ['user', 'manager', 'admin'],
+        'retrieve': ['user', 'manager', 'admin'],
+        'create': ['user', 'manager', 'admin'],
+        'destroy': ['user', 'manager', 'admin'],
+        'parts': ['user', 'manager', 'admin'],
+        'upload_part': ['user', 'manager', 'admin'],
+        'complete': ['user', 'manager', 'admin'],
+    }
+    
+    def get_service(self) -> UploadSessionService:
+        """Build the upload service for the current request"""
+        return UploadSessionService(
+            _get_request_user(self.request),
+            _get_request_tenant(self.request)
+        )
+    
+    def create(self, request, *args, **kwargs):
+        """Start a resumable upload session"""
+        serializer = UploadSessionCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        dto = CreateUploadSessionDTO(
+            file_name=serializer.validated_data['file_name'],
+            file_size=serializer.validated_data['file_size'],
+            content_type=serializer.validated_data['content_type'],
+            folder_id=serializer.validated_data.get('folder'),
+            nickname=serializer.validated_data.get('nickname'),
+            description=serializer.validated_data.get('description')
+        )
+        
+        try:
+            session = self.get_service().create_session(dto)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except RuntimeError:
+            return Response(
+                {'error': 'Failed to start upload'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        return Response(
+            UploadSessionSerializer(session).data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    def update(self, request, *args, **kwargs):
+        """Sessions are immutable; progress is made by uploading parts"""
+        raise MethodNotAllowed(request.method)
+    
+    def destroy(self, request, *args, **kwargs):
+        """Abort the upload and discard stored parts"""
+        session = self.get_object()
+        
+        try:
+            self.get_service().abort(session)
+        except UploadSessionExpired as e:
+            return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+        
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['get'])
+    def parts(self, request, pk=None):
+        """List stored parts so an interrupted upload can resume"""
+        session = self.get_object()
+        
+        try:
+            upload_status = self.get_service().get_status(session)
+        except RuntimeError:
+            return Response(
+                {'error': 'Failed to list uploaded parts'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        return Response(asdict(upload_status))
+    
+    @action(detail=True, methods=['put'], url_path=r'parts/(?P<part_number>[0-9]+)')
+    def upload_part(self, request, pk=None, part_number=None):
+        """
+        Upload one part as the raw request body.
+        Parts can be sent in parallel and in any order. The Content-MD5
+        header carries the base64 MD5 of the body and is verified here
+        and again by S3.
+        """
+        session = self.get_object()
+        
+        # Read the raw stream rather than request.body, which is capped
+        # by DATA_UPLOAD_MAX_MEMORY_SIZE
+        stream = request.stream
+        body = stream.read(session.part_size + 1) if stream is not None else b''
+        
+        try:
+            part = self.get_service().upload_part(
+                session,
+                int(part_number),
+                body,
+                request.headers.get('Content-MD5', '')
+            )
+        except UploadSessionExpired as e:
+            return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except RuntimeError:
+            return Response(
+                {'error': 'Failed to store part'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        return Response(asdict(part))
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Assemble the uploaded parts into a document"""
+        session = self.get_object()
+        
+        try:
+            document = self.get_service().complete(session)
+        except UploadSessionExpired as e:
+            return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+        except UploadSessionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except RuntimeError:
+            return Response(
+                {'error': 'Failed to complete upload'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        response_serializer = DocumentSerializer(document, context={'request': request})
+        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
 class DocumentShareViewSet(TenantAwareViewSet):